@@ -0,0 +1,337 @@
+"""
+alarmy.py
+Silnik alarmów sterowany zdarzeniami.
+
+Alarm jest sprawdzany tylko wtedy, gdy zmieni się któryś z sygnałów, od
+których zależy - nie co krok dla każdego alarmu. Obsługiwane są:
+- strefa martwa (histereza) przy powrocie poniżej/powyżej progu,
+- opóźnienie załączenia i wyłączenia (timery w kopcu, bez odpytywania),
+- potwierdzanie i zawieszanie (shelving),
+- dziennik zdarzeń z czasem, o ograniczonej długości.
+"""
+
+from __future__ import annotations
+import heapq
+from collections import deque
+from enum import IntEnum
+from typing import Callable, Deque, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class StanAlarmu(IntEnum):
+    NORMALNY = 0
+    AKTYWNY_NIEPOTW = 1      # aktywny, niepotwierdzony
+    AKTYWNY_POTW = 2         # aktywny, potwierdzony
+    POWROT_NIEPOTW = 3       # wrócił do normy, ale nikt nie potwierdził
+
+
+OPISY_STANOW = {
+    StanAlarmu.NORMALNY: "OK",
+    StanAlarmu.AKTYWNY_NIEPOTW: "AKTYWNY",
+    StanAlarmu.AKTYWNY_POTW: "AKTYWNY (potw.)",
+    StanAlarmu.POWROT_NIEPOTW: "POWRÓT (niepotw.)",
+}
+
+
+class Zdarzenie(NamedTuple):
+    t: float
+    tag: str
+    rodzaj: str      # "ZAL", "WYL", "POTW", "ZAWIES", "ODWIES"
+    stan: StanAlarmu
+
+
+RODZAJE_ZDARZEN = ("ZAL", "WYL", "POTW", "ZAWIES", "ODWIES")
+
+
+# -------------------------
+# Alarm
+# -------------------------
+
+class Alarm:
+    """Definicja + stan jednego alarmu.
+
+    warunek(wartosci, aktywny) -> bool dostaje słownik wartości sygnałów i
+    bieżący stan warunku (do histerezy). Dla zwykłych progów wygodniej użyć
+    Alarm.prog().
+    """
+
+    __slots__ = (
+        "tag", "opis", "sygnaly", "warunek",
+        "opoznienie_zal", "opoznienie_wyl",
+        "stan", "warunek_spelniony", "aktywny", "zawieszony_do",
+        "czas_zmiany", "_pokolenie",
+    )
+
+    def __init__(self, tag: str, opis: str, sygnaly: Sequence[str],
+                 warunek: Callable[[Mapping[str, float], bool], bool],
+                 opoznienie_zal: float = 0.0, opoznienie_wyl: float = 0.0):
+        self.tag = tag
+        self.opis = opis
+        self.sygnaly = tuple(sygnaly)
+        self.warunek = warunek
+        self.opoznienie_zal = opoznienie_zal
+        self.opoznienie_wyl = opoznienie_wyl
+
+        self.stan = StanAlarmu.NORMALNY
+        self.warunek_spelniony = False   # surowy warunek (z histerezą)
+        self.aktywny = False             # po opóźnieniach
+        self.zawieszony_do: Optional[float] = None
+        self.czas_zmiany = 0.0
+        self._pokolenie = 0              # unieważnia stare timery
+
+    @classmethod
+    def prog(cls, tag: str, opis: str, sygnal: str, granica: float, kierunek: str = ">",
+             martwa_strefa: float = 0.0, **kwargs) -> "Alarm":
+        """Alarm progowy: sygnal > granica (albo <), wyłączenie dopiero za strefą martwą."""
+        if kierunek == ">":
+            def warunek(w, aktywny):
+                v = w[sygnal]
+                return v > (granica - martwa_strefa if aktywny else granica)
+        elif kierunek == "<":
+            def warunek(w, aktywny):
+                v = w[sygnal]
+                return v < (granica + martwa_strefa if aktywny else granica)
+        else:
+            raise ValueError(f"nieznany kierunek progu: {kierunek!r}")
+        return cls(tag, opis, (sygnal,), warunek, **kwargs)
+
+    @property
+    def zawieszony(self) -> bool:
+        return self.zawieszony_do is not None
+
+    @property
+    def potwierdzony(self) -> bool:
+        return self.stan in (StanAlarmu.NORMALNY, StanAlarmu.AKTYWNY_POTW)
+
+    def opis_stanu(self) -> str:
+        if self.zawieszony:
+            return "ZAWIESZONY"
+        return OPISY_STANOW[self.stan]
+
+
+# -------------------------
+# Silnik
+# -------------------------
+
+class SilnikAlarmow:
+    def __init__(self, alarmy: Iterable[Alarm] = (), dlugosc_dziennika: int = 10000):
+        self.alarmy: List[Alarm] = []
+        self._po_tagu: Dict[str, Alarm] = {}
+        self._zalezne: Dict[str, List[Alarm]] = {}     # sygnał -> alarmy od niego zależne
+        # ostatnio przekazane wartości sygnałów (nowy słownik po resetuj() / wczytaj_stan())
+        self.wartosci: Dict[str, float] = {}
+        # (termin, nr, rodzaj, pokolenie, tag); rodzaj: "O" opóźnienie, "Z" koniec zawieszenia
+        self._timery: List[Tuple[float, int, str, int, str]] = []
+        self._nr = 0
+
+        self.dziennik: Deque[Zdarzenie] = deque(maxlen=dlugosc_dziennika)
+        self.zmienione: List[Alarm] = []    # alarmy, które zmieniły stan w ostatnim aktualizuj()
+        self.wersja = 0                     # rośnie przy każdej zmianie stanu (= wpis w dzienniku)
+        self.resety = 0                     # rośnie przy resetuj() - zmiana bez wpisów w dzienniku
+
+        for a in alarmy:
+            self.dodaj(a)
+
+    def dodaj(self, alarm: Alarm) -> None:
+        if alarm.tag in self._po_tagu:
+            raise ValueError(f"alarm {alarm.tag} już istnieje")
+        self.alarmy.append(alarm)
+        self._po_tagu[alarm.tag] = alarm
+        for s in alarm.sygnaly:
+            self._zalezne.setdefault(s, []).append(alarm)
+
+    def __getitem__(self, tag: str) -> Alarm:
+        return self._po_tagu[tag]
+
+    def resetuj(self) -> None:
+        """Nowy przebieg (np. od parametrów startowych): stany i timery od zera, dziennik zostaje."""
+        self.wartosci = {}
+        self._timery.clear()
+        self.zmienione = []
+        for a in self.alarmy:
+            a.stan = StanAlarmu.NORMALNY
+            a.warunek_spelniony = False
+            a.aktywny = False
+            a.zawieszony_do = None
+            a._pokolenie += 1
+        self.resety += 1
+
+    # --- przebieg ---
+    def aktualizuj(self, t: float, odczyty: Mapping[str, float]) -> None:
+        """odczyty: wartości sygnałów (wystarczą te, które mogły się zmienić)."""
+        self.zmienione = []
+        timery = self._timery
+        if not odczyty and not (timery and timery[0][0] <= t):
+            return
+        wartosci = self.wartosci
+        zalezne = self._zalezne
+        do_sprawdzenia: Dict[Alarm, None] = {}
+        for nazwa, v in odczyty.items():
+            if wartosci.get(nazwa) != v:
+                wartosci[nazwa] = v
+                for a in zalezne.get(nazwa, ()):
+                    do_sprawdzenia[a] = None
+
+        for a in do_sprawdzenia:
+            # alarm jednego sygnału ma go właśnie w wartościach
+            if len(a.sygnaly) == 1 or all(s in wartosci for s in a.sygnaly):
+                warunek = bool(a.warunek(wartosci, a.warunek_spelniony))
+                if warunek != a.warunek_spelniony:
+                    self._zmiana_warunku(a, t, warunek)
+
+        # timery opóźnień i końca zawieszenia
+        while timery and timery[0][0] <= t:
+            termin, _, rodzaj, pokolenie, tag = heapq.heappop(timery)
+            a = self._po_tagu[tag]
+            if rodzaj == "Z":
+                if a.zawieszony_do == termin:
+                    self._odwies(a, t)
+            elif pokolenie == a._pokolenie and a.warunek_spelniony != a.aktywny:
+                self._przelacz(a, t, a.warunek_spelniony)
+
+    def _zmiana_warunku(self, a: Alarm, t: float, warunek: bool) -> None:
+        a.warunek_spelniony = warunek
+        a._pokolenie += 1     # zmiana warunku kasuje oczekujący timer
+
+        opoznienie = a.opoznienie_zal if warunek else a.opoznienie_wyl
+        if warunek == a.aktywny:
+            return
+        if opoznienie > 0:
+            self._zaplanuj(a, t + opoznienie, "O")
+        else:
+            self._przelacz(a, t, warunek)
+
+    def _zaplanuj(self, a: Alarm, termin: float, rodzaj: str) -> None:
+        self._nr += 1
+        heapq.heappush(self._timery, (termin, self._nr, rodzaj, a._pokolenie, a.tag))
+
+    def _przelacz(self, a: Alarm, t: float, aktywny: bool) -> None:
+        a.aktywny = aktywny
+        if aktywny:
+            a.stan = StanAlarmu.AKTYWNY_NIEPOTW
+        elif a.stan == StanAlarmu.AKTYWNY_POTW:
+            a.stan = StanAlarmu.NORMALNY
+        else:
+            a.stan = StanAlarmu.POWROT_NIEPOTW
+        self._zapisz(a, t, "ZAL" if aktywny else "WYL")
+
+    def _zapisz(self, a: Alarm, t: float, rodzaj: str) -> None:
+        a.czas_zmiany = t
+        self.dziennik.append(Zdarzenie(t, a.tag, rodzaj, a.stan))
+        self.zmienione.append(a)
+        self.wersja += 1
+
+    # --- obsługa operatora ---
+    def potwierdz(self, tag: str, t: float) -> None:
+        a = self._po_tagu[tag]
+        if a.stan == StanAlarmu.AKTYWNY_NIEPOTW:
+            a.stan = StanAlarmu.AKTYWNY_POTW
+        elif a.stan == StanAlarmu.POWROT_NIEPOTW:
+            a.stan = StanAlarmu.NORMALNY
+        else:
+            return
+        self._zapisz(a, t, "POTW")
+
+    def potwierdz_wszystkie(self, t: float) -> None:
+        for a in self.alarmy:
+            if not a.potwierdzony:
+                self.potwierdz(a.tag, t)
+
+    def zawies(self, tag: str, t: float, na_ile: Optional[float] = None) -> None:
+        """Zawieszenie (shelving) - na czas na_ile [s] albo do odwieszenia.
+
+        Zawieszony alarm dalej śledzi warunek (zmiany trafiają do dziennika),
+        tylko nie jest pokazywany jako aktywny/niepotwierdzony."""
+        a = self._po_tagu[tag]
+        a.zawieszony_do = t + na_ile if na_ile is not None else float("inf")
+        if na_ile is not None:
+            self._zaplanuj(a, a.zawieszony_do, "Z")
+        self._zapisz(a, t, "ZAWIES")
+
+    def odwies(self, tag: str, t: float) -> None:
+        a = self._po_tagu[tag]
+        if a.zawieszony:
+            self._odwies(a, t)
+
+    def _odwies(self, a: Alarm, t: float) -> None:
+        a.zawieszony_do = None
+        self._zapisz(a, t, "ODWIES")
+
+    # --- odczyt ---
+    def najblizszy_termin(self) -> float:
+        """Chwila najbliższego timera (opóźnienie, koniec zawieszenia); inf gdy brak.
+
+        Może to być timer już nieaktualny - wtedy aktualizuj() go po prostu zdejmie."""
+        return self._timery[0][0] if self._timery else float("inf")
+
+    def tagi_zmienione_od(self, wersja: int) -> Optional[set]:
+        """Tagi zmienione od podanej wersji; None gdy dziennik już tego nie pamięta."""
+        ile = self.wersja - wersja
+        if ile < 0 or ile > len(self.dziennik):
+            return None
+        dziennik = self.dziennik
+        return {dziennik[-i].tag for i in range(1, ile + 1)}
+
+    # --- migawka (migawka.py) ---
+    def zapisz_stan(self, m, prefiks: str = "alarmy", od_wersji: Optional[int] = None) -> None:
+        """Stany alarmów, timery, ostatnie wartości sygnałów i dziennik (jako tablice).
+
+        od_wersji - tylko wpisy dziennika nowsze niż ta wersja (przyrost dla
+        kopii silnika, która ma już wcześniejsze)."""
+        tagi = [a.tag for a in self.alarmy]
+        m.opis[prefiks] = dict(
+            tagi=tagi,
+            stany=[[int(a.stan), a.warunek_spelniony, a.aktywny, a.zawieszony_do,
+                    a.czas_zmiany, a._pokolenie] for a in self.alarmy],
+            wartosci=self.wartosci,
+            timery=[list(tm) for tm in self._timery],
+            nr=self._nr,
+            wersja=self.wersja,
+        )
+        indeks = {tag: i for i, tag in enumerate(tagi)}
+        dziennik = self.dziennik
+        if od_wersji is not None:
+            ile = min(self.wersja - od_wersji, len(dziennik))
+            m.opis[prefiks]["od_wersji"] = od_wersji
+            dziennik = [dziennik[-i] for i in range(ile, 0, -1)]
+        m[f"{prefiks}.dziennik_t"] = np.array([z.t for z in dziennik], dtype=np.float64)
+        m[f"{prefiks}.dziennik_tag"] = np.array([indeks[z.tag] for z in dziennik], dtype=np.int32)
+        m[f"{prefiks}.dziennik_rodzaj"] = np.array([RODZAJE_ZDARZEN.index(z.rodzaj) for z in dziennik],
+                                                   dtype=np.int8)
+        m[f"{prefiks}.dziennik_stan"] = np.array([int(z.stan) for z in dziennik], dtype=np.int8)
+
+    def wczytaj_stan(self, m, prefiks: str = "alarmy") -> None:
+        opis = m.opis[prefiks]
+        tagi = opis["tagi"]
+        if tagi != [a.tag for a in self.alarmy]:
+            raise ValueError(f"migawka z innymi alarmami: {', '.join(tagi)}")
+        for a, (stan, warunek, aktywny, zawieszony_do, czas_zmiany, pokolenie) in zip(self.alarmy, opis["stany"]):
+            a.stan = StanAlarmu(stan)
+            a.warunek_spelniony = warunek
+            a.aktywny = aktywny
+            a.zawieszony_do = zawieszony_do
+            a.czas_zmiany = czas_zmiany
+            a._pokolenie = pokolenie
+        self.wartosci = dict(opis["wartosci"])
+        self._timery[:] = [tuple(tm) for tm in opis["timery"]]     # kolejność listy = kopiec
+        self._nr = opis["nr"]
+        przyrost = opis.get("od_wersji") == self.wersja
+        self.wersja = opis["wersja"]
+
+        if not przyrost:
+            self.dziennik.clear()
+        self.dziennik.extend(
+            Zdarzenie(t, tagi[i], RODZAJE_ZDARZEN[r], StanAlarmu(st))
+            for t, i, r, st in zip(m[f"{prefiks}.dziennik_t"].tolist(), m[f"{prefiks}.dziennik_tag"].tolist(),
+                                   m[f"{prefiks}.dziennik_rodzaj"].tolist(), m[f"{prefiks}.dziennik_stan"].tolist())
+        )
+        self.zmienione = []
+        if not przyrost:
+            self.resety += 1     # widoki przebudowują się od zera
+
+    def aktywne(self) -> List[Alarm]:
+        return [a for a in self.alarmy if a.aktywny and not a.zawieszony]
+
+    def niepotwierdzone(self) -> List[Alarm]:
+        return [a for a in self.alarmy if not a.potwierdzony and not a.zawieszony]
@@ -0,0 +1,343 @@
+"""
+calkowanie.py
+Wymienne metody całkowania + sterownik z wykrywaniem zdarzeń.
+
+Metody (krok(f, t, y, h) -> (y_nowe, blad)):
+- Euler   - rząd 1, stały krok,
+- RK4     - klasyczny Runge-Kutta rzędu 4, stały krok,
+- RK45    - Dormand-Prince 5(4), krok adaptacyjny z oszacowaniem błędu,
+- ROS2    - Rosenbrock rzędu 2 (L-stabilny, jakobian różnicowy), krok
+            adaptacyjny; dla stanów ustalonych, gdzie jawny RK45 jest
+            ograniczony stabilnością (spływy zależne od poziomu, chłodzenie),
+- "auto"  - RK45, a po wykryciu sztywności (test Hairera dla Dormanda-Prince'a)
+            ROS2 - do najbliższego zdarzenia.
+Dla metod stałokrokowych błąd można oszacować podwójnym krokiem (Richardson).
+
+Układ (duck typing, np. graf.UkladCiagly) udostępnia:
+    pochodne(t, y) -> dy/dt
+    zdarzenia(t, y) -> g          funkcje zdarzeń, zdarzenie = przejście przez 0
+    kierunki                      +1: g rośnie przez 0, -1: maleje, 0: dowolnie
+    przelacz(t, y, indeksy)       zmiana trybów po zdarzeniach (None = start);
+                                  może poprawić y w miejscu (stan na progu)
+    nazwy_zdarzen                 opisy do raportu
+Między zdarzeniami prawa strona jest gładka, więc krok może być duży, a
+chwila przekroczenia progu jest szukana na interpolacji Hermite'a i
+dochodzona krokiem metody - z dokładnością tol_czasu.
+"""
+
+from __future__ import annotations
+import math
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# -------------------------
+# Metody
+# -------------------------
+
+class Euler:
+    nazwa = "euler"
+    rzad = 1
+    rzad_bledu = 1
+    adaptacyjna = False
+
+    def krok(self, f, t: float, y: np.ndarray, h: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        return y + h * f(t, y), None
+
+
+class RK4:
+    nazwa = "rk4"
+    rzad = 4
+    rzad_bledu = 4
+    adaptacyjna = False
+
+    def krok(self, f, t: float, y: np.ndarray, h: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        k1 = f(t, y)
+        k2 = f(t + h / 2, y + (h / 2) * k1)
+        k3 = f(t + h / 2, y + (h / 2) * k2)
+        k4 = f(t + h, y + h * k3)
+        return y + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4), None
+
+
+class RK45:
+    """Dormand-Prince 5(4): wynik rzędu 5, różnica z rzędem 4 = oszacowanie błędu."""
+    nazwa = "rk45"
+    rzad = 5
+    rzad_bledu = 4              # błąd ~ h^(rzad_bledu + 1) - wykładnik regulatora kroku
+    adaptacyjna = True
+
+    C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+    A = (
+        (),
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    )
+    B5 = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0)
+    B4 = (5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40)
+
+    def __init__(self):
+        self.sztywnosc = 0.0        # h * |lambda| z ostatniego kroku; > 3.25 = granica stabilności
+
+    def krok(self, f, t: float, y: np.ndarray, h: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        k: List[np.ndarray] = []
+        for c, a in zip(self.C, self.A):
+            yi = y
+            for aj, kj in zip(a, k):
+                if aj:
+                    yi = yi + (h * aj) * kj
+            k.append(f(t + c * h, yi))
+            if len(k) == 6:
+                y6 = yi
+        y5 = yi                     # ostatni etap jest liczony w wyniku (FSAL)
+        blad = h * sum((b5 - b4) * kj for b5, b4, kj in zip(self.B5, self.B4, k))
+        dy = float(np.linalg.norm(y5 - y6))
+        self.sztywnosc = h * float(np.linalg.norm(k[6] - k[5])) / dy if dy > 0 else 0.0
+        return y5, blad
+
+
+class ROS2:
+    """Rosenbrock 2. rzędu (Verwer), L-stabilny; błąd = różnica z Eulerem półjawnym.
+
+    Rząd 2 nie zależy od dokładności jakobianu (metoda typu W), więc jakobian
+    różnicowy (n wywołań pochodnych) jest liczony ponownie dopiero po odswiez() -
+    sterownik woła je po zmianie trybów układu i po odrzuconym kroku."""
+    nazwa = "ros2"
+    rzad = 2
+    rzad_bledu = 1
+    adaptacyjna = True
+    GAMMA = 1.0 + 1.0 / math.sqrt(2.0)
+
+    def __init__(self):
+        self.J: Optional[np.ndarray] = None
+
+    def odswiez(self) -> None:
+        self.J = None
+
+    @staticmethod
+    def jakobian(f, t: float, y: np.ndarray, f0: np.ndarray) -> np.ndarray:
+        n = len(y)
+        J = np.empty((n, n))
+        for j in range(n):
+            e = 1e-7 * max(1.0, abs(y[j]))
+            yj = y.copy()
+            yj[j] += e
+            J[:, j] = (f(t, yj) - f0) / e
+        return J
+
+    def krok(self, f, t: float, y: np.ndarray, h: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        f0 = f(t, y)
+        if self.J is None:
+            self.J = self.jakobian(f, t, y, f0)
+        W = np.eye(len(y)) - (self.GAMMA * h) * self.J
+        k1 = np.linalg.solve(W, f0)
+        k2 = np.linalg.solve(W, f(t + h, y + h * k1) - 2.0 * k1)
+        y1 = y + (1.5 * h) * k1 + (0.5 * h) * k2
+        return y1, (0.5 * h) * (k1 + k2)
+
+
+METODY = {m.nazwa: m for m in (Euler, RK4, RK45, ROS2)}
+
+
+# -------------------------
+# Wynik
+# -------------------------
+
+class ZdarzenieCalkowania(NamedTuple):
+    t: float
+    indeks: int
+    nazwa: str
+
+
+class StatystykiCalkowania:
+    def __init__(self, metoda: str):
+        self.metoda = metoda
+        self.kroki = 0
+        self.odrzucone = 0
+        self.ewaluacje = 0          # wywołania pochodne()
+        self.maks_blad = 0.0        # największa norma błędu (1.0 = na granicy tolerancji)
+        self.min_krok = math.inf
+        self.maks_krok = 0.0
+        self.zdarzenia: List[ZdarzenieCalkowania] = []
+
+    def __repr__(self) -> str:
+        return (f"StatystykiCalkowania({self.metoda}: kroki={self.kroki}, odrzucone={self.odrzucone}, "
+                f"ewaluacje={self.ewaluacje}, zdarzenia={len(self.zdarzenia)}, "
+                f"maks_blad={self.maks_blad:.3g}, krok={self.min_krok:.3g}..{self.maks_krok:.3g} s)")
+
+
+# -------------------------
+# Sterownik
+# -------------------------
+
+class Calkowanie:
+    """Całkowanie układu od t0 do t1 z lądowaniem na zdarzeniach.
+
+    metoda: "euler" / "rk4" (stały krok h), "rk45" / "ros2" (krok
+    adaptacyjny, startuje od h, nie większy niż h_max) albo "auto" (RK45,
+    przy sztywności ROS2). szacuj_blad=True dla metod
+    stałokrokowych liczy błąd podwójnym krokiem (3 razy drożej).
+    """
+
+    def __init__(self, metoda: str = "auto", h: float = 0.02, h_max: float = 60.0,
+                 tol_wzgl: float = 1e-6, tol_bezwzgl: float = 1e-8, tol_czasu: float = 1e-6,
+                 szacuj_blad: bool = False):
+        if metoda not in METODY and metoda != "auto":
+            raise ValueError(f"nieznana metoda całkowania: {metoda!r} (dostępne: {', '.join(METODY)}, auto)")
+        if h <= 0 or h_max <= 0:
+            raise ValueError("krok całkowania musi być dodatni")
+        self.auto = metoda == "auto"
+        self.metoda = RK45() if self.auto else METODY[metoda]()
+        self.h = h
+        self.h_max = h_max
+        self.tol_wzgl = tol_wzgl
+        self.tol_bezwzgl = tol_bezwzgl
+        self.tol_czasu = tol_czasu
+        self.szacuj_blad = szacuj_blad
+        self._h_adapt = h           # krok adaptacyjny przechodzi na kolejne wywołania
+
+    def _norma(self, blad: np.ndarray, y0: np.ndarray, y1: np.ndarray) -> float:
+        skala = self.tol_bezwzgl + self.tol_wzgl * np.maximum(np.abs(y0), np.abs(y1))
+        return float(np.sqrt(np.mean((blad / skala) ** 2)))
+
+    def _krok(self, f, t: float, y: np.ndarray, h: float):
+        y1, blad = self.metoda.krok(f, t, y, h)
+        if blad is None and self.szacuj_blad:
+            # Richardson: dwa półkroki vs jeden krok
+            ym, _ = self.metoda.krok(f, t, y, h / 2)
+            y2, _ = self.metoda.krok(f, t + h / 2, ym, h / 2)
+            blad = (y2 - y1) / (2 ** self.metoda.rzad - 1)
+            y1 = y2
+        return y1, blad
+
+    @staticmethod
+    def _przekroczone(g0: np.ndarray, g1: np.ndarray, kierunki: np.ndarray) -> np.ndarray:
+        w_gore = (g0 <= 0) & (g1 > 0)
+        w_dol = (g0 > 0) & (g1 <= 0)
+        return np.flatnonzero(np.where(kierunki > 0, w_gore, np.where(kierunki < 0, w_dol, w_gore | w_dol)))
+
+    def _pierwsze_przejscie(self, uklad, t: float, y0: np.ndarray, f0: np.ndarray,
+                            y1: np.ndarray, f1: np.ndarray, h: float, g0: np.ndarray,
+                            indeksy: np.ndarray) -> float:
+        """Najwcześniejsza chwila (prawy koniec przedziału) przejścia na interpolacji Hermite'a."""
+        kier = uklad.kierunki
+
+        def y_w(th: float) -> np.ndarray:
+            h00 = 2 * th ** 3 - 3 * th ** 2 + 1
+            h10 = th ** 3 - 2 * th ** 2 + th
+            h01 = -2 * th ** 3 + 3 * th ** 2
+            h11 = th ** 3 - th ** 2
+            return h00 * y0 + h10 * h * f0 + h01 * y1 + h11 * h * f1
+
+        lo, hi = 0.0, 1.0
+        dokladnosc = self.tol_czasu / h
+        while hi - lo > dokladnosc:
+            mid = 0.5 * (lo + hi)
+            g = uklad.zdarzenia(t + mid * h, y_w(mid))
+            if len(self._przekroczone(g0[indeksy], g[indeksy], kier[indeksy])):
+                hi = mid
+            else:
+                lo = mid
+        return hi * h
+
+    def calkuj(self, uklad, t0: float, t1: float, y0: np.ndarray,
+               po_kroku: Optional[Callable[[float, np.ndarray, Sequence[ZdarzenieCalkowania]], None]] = None,
+               termin: Optional[Callable[[], float]] = None) -> Tuple[np.ndarray, StatystykiCalkowania]:
+        """Zwraca (y(t1), statystyki). po_kroku(t, y, zdarzenia) po każdym przyjętym kroku;
+        termin() - najbliższa chwila, której nie wolno przeskoczyć (np. timer alarmu)."""
+        stat = StatystykiCalkowania("auto" if self.auto else self.metoda.nazwa)
+
+        def f(t, y):
+            stat.ewaluacje += 1
+            return uklad.pochodne(t, y)
+
+        adapt = self.metoda.adaptacyjna
+        wykl = -1.0 / (self.metoda.rzad_bledu + 1)
+        t = float(t0)
+        y = np.array(y0, dtype=float)
+        uklad.przelacz(t, y, None)
+        g0 = uklad.zdarzenia(t, y)
+        h = min(self._h_adapt, self.h_max) if adapt else self.h
+        koniec = float(t1)
+        sztywne = zwykle = 0
+
+        while koniec - t > 1e-12 * max(1.0, abs(koniec)):
+            hk = min(h, koniec - t)
+            if termin is not None:
+                tt = termin()
+                if t < tt < t + hk:
+                    hk = tt - t
+
+            y1, blad = self._krok(f, t, y, hk)
+            if blad is not None:
+                norma = self._norma(blad, y, y1)
+                if adapt:
+                    if norma > 1.0 and hk > self.tol_czasu:
+                        stat.odrzucone += 1
+                        if isinstance(self.metoda, ROS2):
+                            self.metoda.odswiez()
+                        h = hk * max(0.2, 0.9 * norma ** wykl)
+                        continue
+                    wsp = min(5.0, max(0.2, 0.9 * (norma or 1e-10) ** wykl))
+                    # krok przycięty (koniec, termin) nie zmniejsza kroku, jeśli błąd był mały
+                    h = min(self.h_max, hk * wsp if hk >= h or wsp < 1.0 else h)
+                stat.maks_blad = max(stat.maks_blad, norma)
+                if self.auto and isinstance(self.metoda, RK45):
+                    # krok ograniczany stabilnością, nie błędem -> metoda niejawna
+                    # (jak w DOPRI5: 15 kroków "sztywnych", zerowanie po 6 kolejnych zwykłych)
+                    if self.metoda.sztywnosc > 3.25:
+                        sztywne, zwykle = sztywne + 1, 0
+                    else:
+                        zwykle += 1
+                        if zwykle >= 6:
+                            sztywne = zwykle = 0
+                    if sztywne >= 15:
+                        self.metoda, sztywne = ROS2(), 0
+                        wykl = -1.0 / (self.metoda.rzad_bledu + 1)
+
+            g1 = uklad.zdarzenia(t + hk, y1)
+            indeksy = self._przekroczone(g0, g1, uklad.kierunki)
+            zdarzenia: List[ZdarzenieCalkowania] = []
+            if len(indeksy):
+                # lądowanie tuż za pierwszym przekroczeniem
+                he = self._pierwsze_przejscie(uklad, t, y, f(t, y), y1, f(t + hk, y1), hk, g0, indeksy)
+                he = min(hk, max(he, self.tol_czasu))
+                if he < hk:
+                    for _ in range(8):
+                        y1, _ = self.metoda.krok(f, t, y, he)
+                        g1 = uklad.zdarzenia(t + he, y1)
+                        indeksy = self._przekroczone(g0, g1, uklad.kierunki)
+                        if len(indeksy) or he >= hk:
+                            break
+                        he = min(hk, he + self.tol_czasu)
+                    hk = he
+                t_z = t + hk
+                zdarzenia = [ZdarzenieCalkowania(t_z, int(i), uklad.nazwy_zdarzen[i]) for i in indeksy]
+                stat.zdarzenia.extend(zdarzenia)
+
+            t += hk
+            y = y1
+            stat.kroki += 1
+            stat.min_krok = min(stat.min_krok, hk)
+            stat.maks_krok = max(stat.maks_krok, hk)
+            if zdarzenia:
+                uklad.przelacz(t, y, [z.indeks for z in zdarzenia])
+                if self.auto and not isinstance(self.metoda, RK45):
+                    # zmiana trybu = stan przejściowy, znów metoda jawna
+                    self.metoda = RK45()
+                    wykl = -1.0 / (self.metoda.rzad_bledu + 1)
+                elif isinstance(self.metoda, ROS2):
+                    self.metoda.odswiez()
+                g0 = uklad.zdarzenia(t, y)
+            else:
+                g0 = g1             # tryby bez zmian - zdarzenia w (t, y) już policzone
+            if po_kroku is not None:
+                po_kroku(t, y, zdarzenia)
+
+        if adapt:
+            self._h_adapt = h
+        return y, stat
@@ -0,0 +1,138 @@
+"""
+eksport.py
+Eksport archiwum (historian.py) do CSV albo Parquet - strumieniowo, blokami.
+
+Odczyt idzie blokami po BLOK wierszy z memmap (początek zakresu z indeksu
+czasu), zapis od razu do pliku - zużycie pamięci nie zależy od długości
+nagrania. Parquet wymaga pakietu pyarrow (opcjonalny); każdy blok to
+jedna grupa wierszy.
+
+Te same zapisy działają na żywo jako rejestratory modelu
+(model.rejestratory): dopisz(t, *wartosci) zbiera wiersze i zapisuje je
+co BLOK.
+
+    python eksport.py archiwum/20260101_120000 wynik.csv [--od t0] [--do t1]
+    python eksport.py archiwum/20260101_120000/stan wynik.parquet
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from historian import CzytnikArchiwum
+
+BLOK = 65536
+FORMATY = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+
+
+class ZapisCSV:
+    """Plik CSV: nagłówek t,<sygnały>, potem wiersze dopisywane blokami."""
+
+    def __init__(self, plik: str, sygnaly: Sequence[str], blok: int = BLOK):
+        self.sygnaly = tuple(sygnaly)
+        self.blok = blok
+        self.wiersze = 0
+        self._f = open(plik, "w", encoding="utf-8", newline="")
+        self._f.write("t," + ",".join(self.sygnaly) + "\n")
+        self._bufor: List[tuple] = []
+        self._format = ",".join(["%.3f"] + ["%.7g"] * len(self.sygnaly))
+
+    def dopisz(self, t: float, *wartosci: float) -> None:
+        self._bufor.append((t,) + wartosci)
+        if len(self._bufor) >= self.blok:
+            self._oproznij()
+
+    def _oproznij(self) -> None:
+        if self._bufor:
+            tab = np.array(self._bufor, dtype=np.float64)
+            self._bufor = []
+            self.dopisz_blok(tab[:, 0], tab[:, 1:].T)
+
+    def dopisz_blok(self, t: np.ndarray, wartosci: np.ndarray) -> None:
+        """t (n,), wartosci (sygnały, n)."""
+        np.savetxt(self._f, np.column_stack((t, np.asarray(wartosci, dtype=np.float64).T)),
+                   fmt=self._format, delimiter=",")
+        self.wiersze += len(t)
+
+    def zamknij(self) -> None:
+        if not self._f.closed:
+            self._oproznij()
+            self._f.close()
+
+
+class ZapisParquet(ZapisCSV):
+    """Plik Parquet (pyarrow): kolumna t (float64) i sygnały (float32), grupa wierszy na blok."""
+
+    def __init__(self, plik: str, sygnaly: Sequence[str], blok: int = BLOK):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("zapis Parquet wymaga pakietu pyarrow (pip install pyarrow)") from None
+        self._pa = pa
+        self.sygnaly = tuple(sygnaly)
+        self.blok = blok
+        self.wiersze = 0
+        self._bufor = []
+        self._schemat = pa.schema([("t", pa.float64())] + [(s, pa.float32()) for s in self.sygnaly])
+        self._zapis = pq.ParquetWriter(plik, self._schemat)
+
+    def dopisz_blok(self, t: np.ndarray, wartosci: np.ndarray) -> None:
+        pa = self._pa
+        kolumny = [pa.array(np.asarray(t, dtype=np.float64))] + [
+            pa.array(np.asarray(k, dtype=np.float32)) for k in wartosci]
+        self._zapis.write_table(pa.Table.from_arrays(kolumny, schema=self._schemat))
+        self.wiersze += len(t)
+
+    def zamknij(self) -> None:
+        if self._zapis is not None:
+            self._oproznij()
+            self._zapis.close()
+            self._zapis = None
+
+
+def zapis(plik: str, sygnaly: Sequence[str], blok: int = BLOK) -> ZapisCSV:
+    """Zapis wybrany po rozszerzeniu pliku (.csv, .parquet / .pq)."""
+    rozszerzenie = os.path.splitext(plik)[1].lower()
+    if rozszerzenie not in FORMATY:
+        raise ValueError(f"nieznany format pliku {plik!r} (dostępne: {', '.join(FORMATY)})")
+    return (ZapisParquet if FORMATY[rozszerzenie] == "parquet" else ZapisCSV)(plik, sygnaly, blok)
+
+
+def eksportuj(czytnik: CzytnikArchiwum, plik: str, t0: Optional[float] = None,
+              t1: Optional[float] = None, blok: int = BLOK) -> int:
+    """Zakres [t0, t1] archiwum do pliku; zwraca liczbę wierszy."""
+    i0 = czytnik.wiersz(t0, "left") if t0 is not None else 0
+    i1 = czytnik.wiersz(t1, "right") if t1 is not None else len(czytnik)
+    z = zapis(plik, czytnik.sygnaly, blok)
+    try:
+        for a in range(i0, i1, blok):
+            b = min(a + blok, i1)
+            z.dopisz_blok(np.asarray(czytnik.t[a:b]), np.array([k[a:b] for k in czytnik.kolumny]))
+    finally:
+        z.zamknij()
+    return z.wiersze
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Eksport archiwum do CSV / Parquet")
+    p.add_argument("katalog", help="katalog archiwum (trendy albo <archiwum>/stan)")
+    p.add_argument("plik", help="plik wynikowy .csv / .parquet")
+    p.add_argument("--od", type=float, default=None, help="początek zakresu [s]")
+    p.add_argument("--do", type=float, default=None, help="koniec zakresu [s]")
+    a = p.parse_args(argv)
+    try:
+        n = eksportuj(CzytnikArchiwum(a.katalog), a.plik, a.od, a.do)
+    except (OSError, ValueError, ImportError) as blad:
+        print(f"błąd: {blad}", file=sys.stderr)
+        return 1
+    print(f"{a.plik}: {n} wierszy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+flota.py
+Wiele jednakowych instalacji naraz - przegląd floty na jednym ekranie.
+
+Flota trzyma N instalacji (każda z własnymi parametrami startowymi) w jednym
+SilnikWsadowy: krok liczy wszystkie naraz, tablicami NumPy, więc setki
+instalacji kosztują niewiele więcej niż jedna. Do rysowania Flota daje stan
+wszystkich kafli jako tablice [N] (ScenaFloty w rysowanie.py porównuje je
+z poprzednią ramką), a stan jednej instalacji przepisuje do modelu
+(ModelInstalacji) tylko wtedy, gdy jej kafel rysowany jest w pełnych
+szczegółach.
+
+Scenariusze jak w przeglad.py: siatka parametrów albo lista z pliku;
+bez opcji - DOMYSLNA_SIATKA.
+
+    python flota.py
+    python flota.py --predkosc 0.2:2.0:0.2 --moc 0,3,6
+    python flota.py --scenariusze lista.json
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from przeglad import OPCJE, parsuj_wartosci, siatka, wczytaj_liste
+from silnik_wsadowy import PARAMETRY_STARTOWE, SilnikWsadowy
+
+# flota otwierana z okna głównego: 10 prędkości pompy x 13 mocy grzałki
+DOMYSLNA_SIATKA = dict(predkosc_pompy="0.2:2.0:0.2", moc_grzalki="0:6:0.5")
+
+
+class Flota:
+    """N instalacji liczonych razem (SilnikWsadowy) + odczyt stanu do rysowania."""
+
+    def __init__(self, scenariusze: Sequence[Mapping[str, float]]):
+        if not scenariusze:
+            raise ValueError("flota bez instalacji")
+        self.parametry: List[Dict[str, float]] = [dict(sc) for sc in scenariusze]
+        self.silnik = SilnikWsadowy.z_parametrow(self.parametry)
+        self.n = self.silnik.n
+
+    @property
+    def t(self) -> float:
+        return self.silnik.t
+
+    def krok(self, dt: float) -> None:
+        self.silnik.symuluj(1, dt)
+
+    # --- odczyt (tablice [N] albo [k, N]) ---
+    def poziomy(self) -> np.ndarray:
+        return self.silnik.poziomy()
+
+    def alarm(self) -> np.ndarray:
+        """Czy w instalacji jest aktywny którykolwiek alarm."""
+        s = self.silnik
+        return s._alarmy(s.ilosc, s.temperatura).any(axis=0)
+
+    def opis(self, i: int) -> str:
+        p = self.parametry[i]
+        return f"#{i + 1}  pompa {p['predkosc_pompy']:.1f}  grzałka {p['moc_grzalki']:.1f}"
+
+    def do_modelu(self, i: int, model) -> None:
+        """Stan i-tej instalacji do modelu (tylko do narysowania - bez alarmów modelu)."""
+        self.silnik.scenariusz(i).do_modelu(model, alarmy=False)
+
+
+def domyslna_flota() -> Flota:
+    osie = {k: parsuj_wartosci(v) for k, v in DOMYSLNA_SIATKA.items()}
+    return Flota(list(siatka(osie)))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Przegląd floty instalacji (wiele instalacji na jednym ekranie).")
+    ap.add_argument("--scenariusze", help="lista scenariuszy (.json / .jsonl / .csv) zamiast siatki")
+    for k, opcja in OPCJE.items():
+        ap.add_argument(f"--{opcja}", dest=k, help=f"wartości {k}: 'a:b:krok' albo 'x,y,z'")
+    args = ap.parse_args(argv)
+
+    try:
+        if args.scenariusze:
+            flota = Flota(list(wczytaj_liste(args.scenariusze)))
+        else:
+            osie = {}
+            for k in PARAMETRY_STARTOWE:
+                tekst = getattr(args, k)
+                if tekst is not None:
+                    osie[k] = parsuj_wartosci(tekst, logiczne=k in ("pompa_on", "grzalka_on"))
+            flota = Flota(list(siatka(osie))) if osie else domyslna_flota()
+    except (OSError, ValueError) as blad:
+        print(f"błąd: {blad}", file=sys.stderr)
+        return 1
+
+    from PyQt5.QtWidgets import QApplication
+    from okno_glowne import OknoFloty
+
+    app = QApplication(sys.argv[:1])
+    okno = OknoFloty(flota)
+    okno.show()
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,940 @@
+"""
+graf.py
+Instalacja opisana jako graf: zbiorniki, pompy, grzałki, węzły i rury.
+
+Konfiguracja to zwykły słownik (albo plik JSON o tej samej budowie):
+
+    zbiorniki: nazwa, x, y, w, h, pojemnosc, [przelew: {prog, wydatek}], [chlodzenie]
+    pompy:     nazwa, x, y, przeplyw, [pusty], [obroty]
+    grzalki:   nazwa, x, y, zbiornik, [wsp], [min_poziom]
+    wezly:     nazwa, x, y                (rozdział strumienia wg wolnego miejsca)
+    rury:      id, z, do, [grubosc], [punkty],
+               rury zbiornik -> zbiornik: wydatek, [wsp_poziomu], [min]
+    alarmy:    tag, opis, sygnal, granica, [kierunek, martwa_strefa, opoznienie_*]
+               albo tag, opis, pompa, granica   (pompa stoi, a źródło pełne)
+    trendy:    {nazwa_w_historii: "Z1.poziom", ...}
+
+Końce rur: "Z1.dol" / "Z1.gora" (zbiornik), "P1.wlot" / "P1.wylot" (pompa),
+"T" (węzeł). Trasa rury to sciezka_L() między końcami, o ile nie podano
+własnych punktów.
+
+GrafInstalacji kompiluje konfigurację do tablic indeksów (NumPy). Krok to
+kilka etapów liczonych wektorowo: pompy (+ rozdział w węzłach), spływy
+grawitacyjne w kolejności topologicznej źródeł, przelewy, grzanie i
+chłodzenie. Koszt kroku rośnie liniowo z liczbą rur.
+
+Małe instalacje (do PROG_SKALARNY rur) liczą te same etapy pętlami po
+skompilowanych listach indeksów na zwykłych liczbach (krok_listy): przy kilku
+zbiornikach narzut wywołań NumPy jest wielokrotnie większy niż sam rachunek. Oba warianty
+wykonują te same działania w tej samej kolejności - wyniki są identyczne
+co do bitu.
+"""
+
+from __future__ import annotations
+import copy
+import json
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from stale import (
+    BAZOWY_PRZEPLYW, TEMP_OTOCZENIA, PUSTY, SPLYW, SPLYW_MIN,
+    POWROT_BAZA, POWROT_POZIOM, POWROT_MIN, PRZELEW_PROG, PRZELEW,
+    GRZANIE, GRZANIE_MIN_POZIOM, CHLODZENIE, OBROTY_POMPY,
+    HOLD, PROG,
+)
+
+KOTWICE_ZBIORNIKA = ("dol", "gora")
+KOTWICE_POMPY = ("wlot", "wylot")
+
+# do tylu rur krok liczony na zwykłych liczbach (krok_listy), powyżej - wektorowo
+PROG_SKALARNY = 32
+
+
+def sciezka_L(p1: Tuple[float, float], p2: Tuple[float, float]) -> List[Tuple[float, float]]:
+    x1, y1 = p1
+    x2, y2 = p2
+    mid_y = (y1 + y2) / 2
+    return [(x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2)]
+
+
+# -------------------------
+# Konfiguracja domyślna (4 zbiorniki)
+# -------------------------
+
+def _prog_hh(nazwa: str) -> dict:
+    return dict(tag=f"{nazwa}.HH", opis=f"Przepełnienie {nazwa} (>95%)", sygnal=f"{nazwa}.poziom",
+                granica=0.95, martwa_strefa=0.02, opoznienie_wyl=1.0)
+
+
+INSTALACJA_DOMYSLNA = {
+    "temp_otoczenia": TEMP_OTOCZENIA,
+    "chlodzenie": CHLODZENIE,
+    "zbiorniki": [
+        dict(nazwa="Z1", x=60, y=70, w=110, h=150, pojemnosc=100.0),
+        dict(nazwa="Z2", x=270, y=70, w=110, h=150, pojemnosc=100.0),
+        dict(nazwa="Z3", x=480, y=70, w=110, h=150, pojemnosc=100.0),
+        dict(nazwa="Z4", x=270, y=320, w=110, h=150, pojemnosc=100.0,
+             przelew=dict(prog=PRZELEW_PROG, wydatek=PRZELEW)),
+    ],
+    "pompy": [
+        dict(nazwa="P1", x=200, y=300, przeplyw=BAZOWY_PRZEPLYW, pusty=PUSTY, obroty=OBROTY_POMPY),
+    ],
+    "grzalki": [
+        dict(nazwa="H1", x=535, y=255, zbiornik="Z3", wsp=GRZANIE, min_poziom=GRZANIE_MIN_POZIOM),
+    ],
+    "wezly": [
+        dict(nazwa="T", x=400, y=250),
+    ],
+    "rury": [
+        dict(id="z1p", z="Z1.dol", do="P1.wlot"),
+        dict(id="pT", z="P1.wylot", do="T"),
+        dict(id="Tz2", z="T", do="Z2.dol"),
+        dict(id="Tz3", z="T", do="Z3.dol"),
+        dict(id="z2z4", z="Z2.dol", do="Z4.gora", wydatek=SPLYW, min=SPLYW_MIN),
+        dict(id="z3z4", z="Z3.dol", do="Z4.gora", wydatek=SPLYW, min=SPLYW_MIN),
+        dict(id="z4z1", z="Z4.dol", do="Z1.gora", wydatek=POWROT_BAZA,
+             wsp_poziomu=POWROT_POZIOM, min=POWROT_MIN),
+    ],
+    # Progi ze strefą martwą i opóźnieniem wyłączenia 1 s - wracają do normy
+    # później niż dawne czyste progi (alarm = wartość za progiem), ale nie migają.
+    "alarmy": [
+        _prog_hh("Z2"),
+        _prog_hh("Z3"),
+        _prog_hh("Z4"),
+        dict(tag="T3.HI", opis="Wysoka temperatura Z3 (>80°C)", sygnal="Z3.temperatura",
+             granica=80.0, martwa_strefa=2.0, opoznienie_wyl=1.0),
+        dict(tag="P1.TRIP", opis="Pompa wyłączona przy zapotrzebowaniu", pompa="P1", granica=0.2),
+    ],
+    "trendy": {"z1": "Z1.poziom", "z2": "Z2.poziom", "z3": "Z3.poziom", "z4": "Z4.poziom",
+               "T3": "Z3.temperatura"},
+}
+
+
+def wczytaj_konfiguracje(sciezka: Optional[str] = None) -> dict:
+    """Konfiguracja z pliku JSON albo (bez ścieżki) kopia domyślnej."""
+    if sciezka is None:
+        return copy.deepcopy(INSTALACJA_DOMYSLNA)
+    with open(sciezka, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -------------------------
+# Kompilacja grafu
+# -------------------------
+
+class Etap(NamedTuple):
+    """Rury zbiornik -> zbiornik liczone razem (źródła na tym samym poziomie topologicznym)."""
+    rury: np.ndarray          # indeksy rur (do podtrzymania przepływu)
+    zrodlo: np.ndarray
+    wydatek: np.ndarray
+    wsp_poziomu: np.ndarray
+    minimum: np.ndarray
+    pojemnosc: np.ndarray     # pojemności źródeł
+    cel: np.ndarray           # unikalne zbiorniki docelowe
+    pojemnosc_celu: np.ndarray
+    cel_odw: np.ndarray       # rura -> pozycja w `cel`
+    wspolne_zrodla: bool      # kilka rur z jednego zbiornika - trzeba skalować
+
+
+def _idx(lista: Sequence[int]) -> np.ndarray:
+    return np.asarray(lista, dtype=np.intp)
+
+
+class GrafInstalacji:
+    """Skompilowany graf + stan (ilości, temperatury, aktuatory) w tablicach."""
+
+    def __init__(self, konfiguracja: Optional[Mapping] = None):
+        k = copy.deepcopy(INSTALACJA_DOMYSLNA if konfiguracja is None else konfiguracja)
+        self.konfiguracja = k
+        self.temp_otoczenia = float(k.get("temp_otoczenia", TEMP_OTOCZENIA))
+
+        zb = k["zbiorniki"]
+        pompy = k.get("pompy", [])
+        grzalki = k.get("grzalki", [])
+        wezly = k.get("wezly", [])
+        rury = k.get("rury", [])
+
+        self.nazwy_zbiornikow = [z["nazwa"] for z in zb]
+        self.nazwy_pomp = [p["nazwa"] for p in pompy]
+        self.nazwy_grzalek = [g["nazwa"] for g in grzalki]
+        self.nazwy_wezlow = [w["nazwa"] for w in wezly]
+        self.id_rur = [r["id"] for r in rury]
+
+        wszystkie = self.nazwy_zbiornikow + self.nazwy_pomp + self.nazwy_grzalek + self.nazwy_wezlow
+        if len(set(wszystkie)) != len(wszystkie):
+            raise ValueError("nazwy elementów instalacji muszą być unikalne")
+        if len(set(self.id_rur)) != len(self.id_rur):
+            raise ValueError("identyfikatory rur muszą być unikalne")
+
+        self.zbiornik = {n: i for i, n in enumerate(self.nazwy_zbiornikow)}
+        self.pompa = {n: i for i, n in enumerate(self.nazwy_pomp)}
+        self.wezel = {n: i for i, n in enumerate(self.nazwy_wezlow)}
+        self.rura = {n: i for i, n in enumerate(self.id_rur)}
+
+        n = len(zb)
+        self.n = n
+        self.pojemnosc = np.array([float(z.get("pojemnosc", 100.0)) for z in zb])
+        if n == 0 or self.pojemnosc.min() <= 0:
+            raise ValueError("instalacja musi mieć zbiorniki o dodatniej pojemności")
+        chl = float(k.get("chlodzenie", CHLODZENIE))
+        self.chlodzenie = np.array([float(z.get("chlodzenie", chl)) for z in zb])
+
+        # stan
+        self.ilosc = np.zeros(n)
+        self.temperatura = np.full(n, self.temp_otoczenia)
+        self.pompa_on = np.ones(len(pompy), dtype=bool)
+        self.predkosc = np.ones(len(pompy))
+        self.grzalka_on = np.ones(len(grzalki), dtype=bool)
+        self.moc = np.array([float(g.get("moc", 3.0)) for g in grzalki])
+        self._hold = np.zeros(len(rury))
+        self._przeplyw_rur = np.zeros(len(rury))    # ilości przeniesione w ostatnim kroku
+        # ostatni wynik krok_listy(); tablice dostają go dopiero przy odczycie
+        self._hold_lista: Optional[List[float]] = None
+        self._przeplyw_lista: Optional[List[float]] = None
+
+        self._kompiluj(pompy, grzalki, rury)
+        self.skalarny = len(rury) <= PROG_SKALARNY
+        if self.skalarny:
+            self._kompiluj_skalarny()
+
+    @property
+    def hold(self) -> np.ndarray:
+        """Podtrzymanie rur [s] (anty-miganie)."""
+        if self._hold_lista is not None:
+            self._hold[:] = self._hold_lista
+            self._hold_lista = None
+        return self._hold
+
+    @hold.setter
+    def hold(self, wartosc: np.ndarray) -> None:
+        self._hold = wartosc
+        self._hold_lista = None
+
+    @property
+    def przeplyw_rur(self) -> np.ndarray:
+        """Ilości przeniesione rurami w ostatnim kroku."""
+        if self._przeplyw_lista is not None:
+            self._przeplyw_rur[:] = self._przeplyw_lista
+            self._przeplyw_lista = None
+        return self._przeplyw_rur
+
+    @przeplyw_rur.setter
+    def przeplyw_rur(self, wartosc: np.ndarray) -> None:
+        self._przeplyw_rur = wartosc
+        self._przeplyw_lista = None
+
+    # --- budowa ---
+    def _koniec(self, opis: str) -> Tuple[str, int, str]:
+        """'Z1.dol' -> ("zbiornik", 0, "dol"), 'T' -> ("wezel", 0, "")."""
+        nazwa, _, kotwica = opis.partition(".")
+        if nazwa in self.zbiornik and kotwica in KOTWICE_ZBIORNIKA:
+            return ("zbiornik", self.zbiornik[nazwa], kotwica)
+        if nazwa in self.pompa and kotwica in KOTWICE_POMPY:
+            return ("pompa", self.pompa[nazwa], kotwica)
+        if nazwa in self.wezel and not kotwica:
+            return ("wezel", self.wezel[nazwa], "")
+        raise ValueError(f"nieznany koniec rury: {opis!r}")
+
+    def _kompiluj(self, pompy: Sequence[Mapping], grzalki: Sequence[Mapping],
+                  rury: Sequence[Mapping]) -> None:
+        n_p = len(pompy)
+        zrodlo_pompy: List[Optional[int]] = [None] * n_p
+        tloczenie: List[Optional[Tuple[str, int, int]]] = [None] * n_p   # (rodzaj, cel, rura)
+        rury_ssania: List[Optional[int]] = [None] * n_p
+        wyjscia_wezlow: Dict[int, List[Tuple[int, int]]] = {w: [] for w in range(len(self.nazwy_wezlow))}
+        pasywne: List[Tuple[int, int, int, Mapping]] = []                # (rura, z, do, opis)
+
+        for j, r in enumerate(rury):
+            (rz, iz, kz), (rd, id_, kd) = self._koniec(r["z"]), self._koniec(r["do"])
+            if rz == "zbiornik" and rd == "pompa" and kd == "wlot":
+                if zrodlo_pompy[id_] is not None:
+                    raise ValueError(f"pompa {self.nazwy_pomp[id_]} ma już ssanie")
+                zrodlo_pompy[id_] = iz
+                rury_ssania[id_] = j
+            elif rz == "pompa" and kz == "wylot" and rd in ("zbiornik", "wezel"):
+                if tloczenie[iz] is not None:
+                    raise ValueError(f"pompa {self.nazwy_pomp[iz]} ma już tłoczenie")
+                tloczenie[iz] = (rd, id_, j)
+            elif rz == "wezel" and rd == "zbiornik":
+                wyjscia_wezlow[iz].append((id_, j))
+            elif rz == "zbiornik" and rd == "zbiornik":
+                if "wydatek" not in r:
+                    raise ValueError(f"rura {r['id']} (zbiornik -> zbiornik) potrzebuje 'wydatek'")
+                pasywne.append((j, iz, id_, r))
+            else:
+                raise ValueError(f"nieobsługiwane połączenie rury {r['id']}: {r['z']} -> {r['do']}")
+
+        for i, p in enumerate(pompy):
+            if zrodlo_pompy[i] is None or tloczenie[i] is None:
+                raise ValueError(f"pompa {p['nazwa']} musi mieć rurę ssawną i tłoczną")
+
+        # --- pompy ---
+        self.p_zrodlo = _idx(zrodlo_pompy)
+        self.p_baza = np.array([float(p["przeplyw"]) for p in pompy])
+        self.p_pusty = np.array([float(p.get("pusty", PUSTY)) for p in pompy])
+        self.p_obroty = np.array([float(p.get("obroty", OBROTY_POMPY)) for p in pompy])
+        self.p_wspolne_zrodla = len(set(zrodlo_pompy)) < n_p
+        self.p_rury = _idx([rury_ssania[i] for i in range(n_p)] + [tloczenie[i][2] for i in range(n_p)])
+
+        bezposrednio = [i for i in range(n_p) if tloczenie[i][0] == "zbiornik"]
+        self.p_bezp = _idx(bezposrednio)
+        cele = [tloczenie[i][1] for i in bezposrednio]
+        self.p_bezp_cel, self.p_bezp_cel_odw = np.unique(_idx(cele), return_inverse=True)
+        self.p_bezp_poj = self.pojemnosc[self.p_bezp_cel]
+
+        do_wezla = [i for i in range(n_p) if tloczenie[i][0] == "wezel"]
+        self.p_do_wezla = _idx(do_wezla)
+        self.p_wezel = _idx([tloczenie[i][1] for i in do_wezla])
+
+        # --- węzły: wyjścia, ostatnie wyjście dostaje resztę (jak w dawnym krok()) ---
+        w_cel, w_wezel, w_rura, w_ostatnie = [], [], [], []
+        for w, wyjscia in wyjscia_wezlow.items():
+            for k, (cel, j) in enumerate(wyjscia):
+                w_cel.append(cel)
+                w_wezel.append(w)
+                w_rura.append(j)
+                w_ostatnie.append(k == len(wyjscia) - 1)
+        if len(set(w_cel)) != len(w_cel):
+            raise ValueError("wyjścia węzłów muszą prowadzić do różnych zbiorników")
+        self.w_cel = _idx(w_cel)
+        self.w_wezel = _idx(w_wezel)
+        self.w_rury = _idx(w_rura)
+        ostatnie = np.array(w_ostatnie, dtype=bool)
+        self.w_ostatnie = np.flatnonzero(ostatnie)
+        self.w_pozostale = np.flatnonzero(~ostatnie)
+        self.w_wezel_pozostalych = self.w_wezel[self.w_pozostale]
+        self.w_wezel_ostatnich = self.w_wezel[self.w_ostatnie]
+        self.w_poj = self.pojemnosc[self.w_cel]
+        self.n_wezlow = len(self.nazwy_wezlow)
+
+        # --- spływy w kolejności topologicznej źródeł ---
+        krawedzie = [(zrodlo_pompy[i], c) for i in range(n_p)
+                     for c in ([tloczenie[i][1]] if tloczenie[i][0] == "zbiornik"
+                               else [cel for cel, _ in wyjscia_wezlow[tloczenie[i][1]]])]
+        krawedzie += [(z, d) for _, z, d, _ in pasywne]
+        poziom = self._poziomy_topologiczne(krawedzie, [z for z in zrodlo_pompy])
+        self.poziom_topologiczny = poziom
+
+        self.etapy: List[Etap] = []
+        for lvl in sorted({poziom[z] for _, z, _, _ in pasywne}):
+            grupa = [e for e in pasywne if poziom[e[1]] == lvl]
+            zrodla = [z for _, z, _, _ in grupa]
+            cel, cel_odw = np.unique(_idx([d for _, _, d, _ in grupa]), return_inverse=True)
+            self.etapy.append(Etap(
+                rury=_idx([j for j, _, _, _ in grupa]),
+                zrodlo=_idx(zrodla),
+                wydatek=np.array([float(r["wydatek"]) for _, _, _, r in grupa]),
+                wsp_poziomu=np.array([float(r.get("wsp_poziomu", 0.0)) for _, _, _, r in grupa]),
+                minimum=np.array([float(r.get("min", 0.0)) for _, _, _, r in grupa]),
+                pojemnosc=self.pojemnosc[zrodla],
+                cel=cel,
+                pojemnosc_celu=self.pojemnosc[cel],
+                cel_odw=cel_odw,
+                wspolne_zrodla=len(set(zrodla)) < len(zrodla),
+            ))
+
+        # --- przelewy ---
+        zb = self.konfiguracja["zbiorniki"]
+        przelewy = [i for i, z in enumerate(zb) if z.get("przelew")]
+        self.pr_zb = _idx(przelewy)
+        self.pr_poj = self.pojemnosc[self.pr_zb]
+        self.pr_prog = np.array([float(zb[i]["przelew"]["prog"]) for i in przelewy])
+        self.pr_wydatek = np.array([float(zb[i]["przelew"]["wydatek"]) for i in przelewy])
+
+        # --- grzałki ---
+        self.g_zb = _idx([self.zbiornik[g["zbiornik"]] for g in grzalki])
+        self.g_poj = self.pojemnosc[self.g_zb]
+        self.g_wsp = np.array([float(g.get("wsp", GRZANIE)) for g in grzalki])
+        self.g_min = np.array([float(g.get("min_poziom", GRZANIE_MIN_POZIOM)) for g in grzalki])
+        self.g_wspolne = len(set(self.g_zb.tolist())) < len(grzalki)
+
+    def _kompiluj_skalarny(self) -> None:
+        """Te same tablice indeksów jako krotki zwykłych liczb - dla krok_listy()."""
+        n, n_p, n_g = self.n, len(self.p_zrodlo), len(self.g_zb)
+        p_rury = self.p_rury.tolist()
+        # pompy: (wejście "włączona", wejście prędkości, źródło, wydatek bazowy, próg pustego,
+        #         rura ssawna, rura tłoczna) - numery w liście wejść krok_listy()
+        self._s_pompy = tuple(zip(range(n, n + n_p), range(n + n_p, n + 2 * n_p), self.p_zrodlo.tolist(),
+                                  self.p_baza.tolist(), self.p_pusty.tolist(), p_rury[:n_p], p_rury[n_p:]))
+        # tłoczenie wprost: (cel, pojemność, rury tłoczne) - dopływy czytane z przeplyw
+        bezp, odw = self.p_bezp.tolist(), self.p_bezp_cel_odw.tolist()
+        self._s_bezp = tuple(
+            (cel, poj, tuple(p_rury[n_p + k] for k, o in zip(bezp, odw) if o == c))
+            for c, (cel, poj) in enumerate(zip(self.p_bezp_cel.tolist(), self.p_bezp_poj.tolist())))
+        # węzły: (rury tłoczne, wyjścia (cel, pojemność, rura), wyjścia bez ostatniego, ostatnie)
+        do_wezla, wezel = self.p_do_wezla.tolist(), self.p_wezel.tolist()
+        wyjscia = list(zip(self.w_wezel.tolist(), self.w_cel.tolist(), self.w_poj.tolist(),
+                           self.w_rury.tolist()))
+        wezly = []
+        for w in range(self.n_wezlow if n_p else 0):
+            wy = tuple((cel, poj, j) for wz, cel, poj, j in wyjscia if wz == w)
+            if len({cel for cel, _, _ in wy}) < len(wy):
+                # dwa wyjścia węzła do jednego zbiornika - tylko krok wektorowy
+                self.skalarny = False
+                return
+            if wy:
+                wezly.append((tuple(p_rury[n_p + k] for k, wz in zip(do_wezla, wezel) if wz == w),
+                              wy, wy[:-1], wy[-1]))
+        self._s_wezly = tuple(wezly)
+        # spływy: (rury (źródło, wydatek, wsp. poziomu, minimum, pojemność, rura),
+        #          wspólne źródła, dostawy (cel, pojemność, rury))
+        self._s_etapy = tuple(
+            (tuple(zip(e.zrodlo.tolist(), e.wydatek.tolist(), e.wsp_poziomu.tolist(), e.minimum.tolist(),
+                       e.pojemnosc.tolist(), e.rury.tolist())),
+             e.wspolne_zrodla,
+             tuple((cel, poj, tuple(r for r, o in zip(e.rury.tolist(), e.cel_odw.tolist()) if o == c))
+                   for c, (cel, poj) in enumerate(zip(e.cel.tolist(), e.pojemnosc_celu.tolist()))))
+            for e in self.etapy)
+        self._s_przelewy = tuple(zip(self.pr_zb.tolist(), self.pr_poj.tolist(), self.pr_prog.tolist(),
+                                     self.pr_wydatek.tolist()))
+        # grzałki: (wejście "włączona", wejście mocy, zbiornik, pojemność, wsp., minimum)
+        k = n + 2 * n_p
+        self._s_grzalki = tuple(zip(range(k, k + n_g), range(k + n_g, k + 2 * n_g), self.g_zb.tolist(),
+                                    self.g_poj.tolist(), self.g_wsp.tolist(), self.g_min.tolist()))
+        # chłodzenie: (zbiornik, wsp.)
+        self._s_chlodzenie = tuple(enumerate(self.chlodzenie.tolist()))
+        self._s_plynie = [0.0] * len(self.id_rur)
+
+    def _poziomy_topologiczne(self, krawedzie: Sequence[Tuple[int, int]],
+                              korzenie: Sequence[int]) -> List[int]:
+        """Najdłuższa ścieżka od korzeni po usunięciu krawędzi wstecznych (pętla powrotu)."""
+        n = self.n
+        sasiedzi: List[List[int]] = [[] for _ in range(n)]
+        for a, b in krawedzie:
+            sasiedzi[a].append(b)
+
+        # DFS: krawędź do wierzchołka na stosie zamyka cykl i jest pomijana
+        kolor = [0] * n       # 0 - nieodwiedzony, 1 - na stosie, 2 - gotowy
+        kolejnosc: List[int] = []
+        dag: List[List[int]] = [[] for _ in range(n)]
+        for start in list(dict.fromkeys(korzenie)) + list(range(n)):
+            if kolor[start]:
+                continue
+            stos = [(start, iter(sasiedzi[start]))]
+            kolor[start] = 1
+            while stos:
+                v, it = stos[-1]
+                for u in it:
+                    if kolor[u] == 1:
+                        continue
+                    dag[v].append(u)
+                    if kolor[u] == 0:
+                        kolor[u] = 1
+                        stos.append((u, iter(sasiedzi[u])))
+                        break
+                else:
+                    kolor[v] = 2
+                    kolejnosc.append(v)
+                    stos.pop()
+
+        poziom = [0] * n
+        for v in reversed(kolejnosc):
+            for u in dag[v]:
+                poziom[u] = max(poziom[u], poziom[v] + 1)
+        return poziom
+
+    # --- stan ---
+    def ustaw_ilosci(self, ilosci: Sequence[float]) -> None:
+        np.clip(np.asarray(ilosci, dtype=float), 0.0, self.pojemnosc, out=self.ilosc)
+
+    def poziomy(self) -> np.ndarray:
+        return self.ilosc / self.pojemnosc
+
+    def plynie(self) -> np.ndarray:
+        return self.hold > 0.0
+
+    def wyczysc_przeplywy(self) -> None:
+        self.hold[:] = 0.0
+        self.przeplyw_rur[:] = 0.0
+
+    # --- krok ---
+    def _zabierz(self, zrodlo: np.ndarray, dostepne: np.ndarray, zadane: np.ndarray,
+                 wspolne: bool) -> np.ndarray:
+        """Ilości zabrane ze źródeł (nie więcej niż jest); kilka rur z jednego źródła - po równo wg żądań."""
+        il = self.ilosc
+        if not wspolne:
+            wziete = np.minimum(zadane, dostepne)
+            il[zrodlo] = dostepne - wziete
+            return wziete
+        suma = np.bincount(zrodlo, zadane, minlength=self.n)[zrodlo]
+        wziete = np.where(suma > dostepne, zadane * (dostepne / np.where(suma > 0, suma, 1.0)), zadane)
+        np.subtract.at(il, zrodlo, wziete)
+        return wziete
+
+    def _dodaj(self, cel: np.ndarray, pojemnosc: np.ndarray, ilosci: np.ndarray) -> None:
+        """Dolewa do (unikalnych) zbiorników, nadmiar ponad pojemność przepada."""
+        il = self.ilosc
+        jest = il[cel]
+        il[cel] = jest + np.minimum(ilosci, pojemnosc - jest)
+
+    def krok(self, dt: float) -> None:
+        if not self.skalarny:
+            self._krok_wektorowy(dt)
+            return
+        il = self.ilosc.tolist()
+        we = (self.temperatura.tolist() + self.pompa_on.tolist() + self.predkosc.tolist()
+              + self.grzalka_on.tolist() + self.moc.tolist())
+        self.krok_listy(dt, il, we)
+        self.ilosc[:] = il
+        self.temperatura[:] = we[:self.n]
+
+    @staticmethod
+    def _zabierz_listy(il: List[float], zrodla: List[int], jest: List[float],
+                       zadane: List[float]) -> List[float]:
+        """_zabierz() na listach, dla rur ze wspólnym źródłem."""
+        suma: Dict[int, float] = {}
+        for z, zad in zip(zrodla, zadane):
+            suma[z] = suma.get(z, 0.0) + zad
+        wziete = []
+        for z, j, zad in zip(zrodla, jest, zadane):
+            s = suma[z]
+            wziete.append(zad * (j / (s if s > 0 else 1.0)) if s > j else zad)
+        for z, wz in zip(zrodla, wziete):
+            il[z] -= wz
+        return wziete
+
+    def krok_listy(self, dt: float, il: List[float],
+                   we: List[float]) -> Tuple[List[float], List[float]]:
+        """Krok małej instalacji na listach - te same działania w tej samej kolejności co
+        krok wektorowy, więc wynik jest identyczny.
+
+        il - ilości w zbiornikach, we - wejścia: temperatury zbiorników, pompy
+        (włączona, potem prędkość), grzałki (włączona, potem moc); ilości
+        i temperatury (początek we) są zmieniane w miejscu. Zwraca (ilości
+        przeniesione w rurach, płynie: 1.0 / 0.0 = hold > 0); ilości i podtrzymanie
+        trafiają też do przeplyw_rur / hold. Lista "płynie" jest używana
+        w kolejnych krokach ponownie."""
+        przeplyw = [0.0] * len(self.id_rur)
+
+        # 1) pompy: ssanie ze źródeł
+        if self.p_wspolne_zrodla:
+            jest = [il[p[2]] for p in self._s_pompy]
+            zadane = []
+            for (k_on, k_v, _, baza, pusty, _, _), j in zip(self._s_pompy, jest):
+                w = baza * we[k_v] if we[k_on] and j > pusty else 0.0
+                zadane.append(w * dt if w > 0 else 0.0)
+            wziete = self._zabierz_listy(il, [p[2] for p in self._s_pompy], jest, zadane)
+            for (_, _, _, _, _, ssanie, tloczenie), wz in zip(self._s_pompy, wziete):
+                przeplyw[ssanie] = przeplyw[tloczenie] = wz
+        else:
+            for k_on, k_v, z, baza, pusty, ssanie, tloczenie in self._s_pompy:
+                j = il[z]
+                w = baza * we[k_v] if we[k_on] and j > pusty else 0.0
+                zad = w * dt if w > 0 else 0.0
+                wz = zad if zad < j else j
+                il[z] = j - wz
+                przeplyw[ssanie] = przeplyw[tloczenie] = wz
+
+        # tłoczenie wprost do zbiornika
+        for cel, poj, rury in self._s_bezp:
+            d = 0.0
+            for r in rury:
+                d += przeplyw[r]
+            j = il[cel]
+            v = poj - j
+            il[cel] = j + (d if d < v else v)
+
+        # rozdział w węzłach wg wolnego miejsca (ostatnie wyjście dostaje resztę)
+        # (cele wyjść węzła są różne, więc poziom można czytać w miejscu)
+        for rury, wyjscia, pozostale, (cel, poj, rura) in self._s_wezly:
+            x = 0.0
+            for r in rury:
+                x += przeplyw[r]
+            s = 0.0
+            for c, p, _ in wyjscia:
+                v = p - il[c]
+                if v > 0.0:
+                    s += v
+            if x > 0 and s > 0:
+                oddane = 0.0
+                for c, p, r in pozostale:
+                    j = il[c]
+                    v = p - j
+                    d = x * ((v if v > 0.0 else 0.0) / s)
+                    oddane += d
+                    d = d if d < v else v
+                    il[c] = j + d
+                    przeplyw[r] = d
+                j = il[cel]
+                v = poj - j
+                d = x - oddane
+                d = d if d < v else v
+                il[cel] = j + d
+                przeplyw[rura] = d
+            else:
+                # nic nie dopływa: zostaje tylko przycięcie przepełnionego zbiornika
+                for c, p, r in wyjscia:
+                    j = il[c]
+                    if p - j < 0.0:
+                        il[c] = j + (p - j)
+                        przeplyw[r] = p - j
+
+        # 2) spływy: etapy wg poziomu topologicznego źródła
+        for rury, wspolne, dostawy in self._s_etapy:
+            if wspolne:
+                jest = [il[r[0]] for r in rury]
+                zadane = [(wyd + wsp * (j / poj)) * dt if j > mn else 0.0
+                          for (_, wyd, wsp, mn, poj, _), j in zip(rury, jest)]
+                wziete = self._zabierz_listy(il, [r[0] for r in rury], jest, zadane)
+                for r, wz in zip(rury, wziete):
+                    przeplyw[r[5]] = wz
+            else:
+                for z, wyd, wsp, mn, poj, rura in rury:
+                    j = il[z]
+                    zad = (wyd + wsp * (j / poj)) * dt if j > mn else 0.0
+                    wz = zad if zad < j else j
+                    il[z] = j - wz
+                    przeplyw[rura] = wz
+            for cel, poj, doplywy in dostawy:
+                d = 0.0
+                for r in doplywy:
+                    d += przeplyw[r]
+                j = il[cel]
+                v = poj - j
+                il[cel] = j + (d if d < v else v)
+
+        # 3) przelewy awaryjne (do kanalizacji)
+        for z, poj, prog, wyd in self._s_przelewy:
+            j = il[z]
+            if j / poj > prog:
+                m = wyd * dt
+                il[z] = j - (m if m < j else j)
+
+        # 4) grzanie + chłodzenie do otoczenia
+        for k_on, k_moc, z, poj, wsp, mn in self._s_grzalki:
+            if we[k_on] and il[z] / poj > mn:
+                we[z] += (wsp * we[k_moc]) * dt
+        t_ot = self.temp_otoczenia
+        for z, c in self._s_chlodzenie:
+            t = we[z]
+            we[z] = t + (t_ot - t) * (c * dt)
+
+        # 5) anty-miganie rur (podtrzymanie) - w miejscu, na liście z poprzedniego kroku
+        hold = self._hold_lista
+        if hold is None:
+            hold = self._hold_lista = self._hold.tolist()
+        plynie = self._s_plynie
+        for r, q in enumerate(przeplyw):
+            if q > PROG:
+                hold[r] = HOLD
+                plynie[r] = 1.0
+            elif hold[r] > dt:
+                hold[r] -= dt           # h > dt, więc h - dt > 0
+                plynie[r] = 1.0
+            else:
+                hold[r] = 0.0
+                plynie[r] = 0.0
+        self._przeplyw_lista = przeplyw
+        return przeplyw, plynie
+
+    def _krok_wektorowy(self, dt: float) -> None:
+        il = self.ilosc
+        przeplyw = self.przeplyw_rur
+
+        # 1) pompy: ssanie ze źródeł
+        n_p = len(self.p_zrodlo)
+        if n_p:
+            src = self.p_zrodlo
+            jest = il[src]
+            wydatek = (self.pompa_on & (jest > self.p_pusty)) * (self.p_baza * self.predkosc)
+            zadane = (wydatek > 0) * (wydatek * dt)
+            wziete = self._zabierz(src, jest, zadane, self.p_wspolne_zrodla)
+            przeplyw[self.p_rury] = np.concatenate((wziete, wziete))
+
+            # tłoczenie wprost do zbiornika
+            if len(self.p_bezp):
+                dostawa = np.bincount(self.p_bezp_cel_odw, wziete[self.p_bezp], minlength=len(self.p_bezp_cel))
+                self._dodaj(self.p_bezp_cel, self.p_bezp_poj, dostawa)
+
+            # rozdział w węzłach wg wolnego miejsca (ostatnie wyjście dostaje resztę)
+            if len(self.w_cel):
+                x = np.bincount(self.p_wezel, wziete[self.p_do_wezla], minlength=self.n_wezlow)
+                cel = self.w_cel
+                jest = il[cel]
+                wolne = self.w_poj - jest
+                wolne_dod = np.maximum(0.0, wolne)
+                suma = np.bincount(self.w_wezel, wolne_dod, minlength=self.n_wezlow)
+                x = ((x > 0) & (suma > 0)) * x
+                xw = x[self.w_wezel]
+                do = np.minimum(xw * (wolne_dod / np.where(suma > 0, suma, 1.0)[self.w_wezel]), wolne)
+                ost = self.w_ostatnie
+                if len(self.w_pozostale):
+                    pozostale = self.w_pozostale
+                    reszta = x - np.bincount(self.w_wezel_pozostalych, do[pozostale], minlength=self.n_wezlow)
+                    do[ost] = np.minimum(reszta[self.w_wezel_ostatnich], wolne[ost])
+                else:
+                    do[ost] = np.minimum(xw, wolne)
+                il[cel] = jest + do
+                przeplyw[self.w_rury] = do
+
+        # 2) spływy: etapy wg poziomu topologicznego źródła
+        for e in self.etapy:
+            src = e.zrodlo
+            jest = il[src]
+            zadane = (jest > e.minimum) * ((e.wydatek + e.wsp_poziomu * (jest / e.pojemnosc)) * dt)
+            wziete = self._zabierz(src, jest, zadane, e.wspolne_zrodla)
+            self._dodaj(e.cel, e.pojemnosc_celu, np.bincount(e.cel_odw, wziete, minlength=len(e.cel)))
+            przeplyw[e.rury] = wziete
+
+        # 3) przelewy awaryjne (do kanalizacji)
+        if len(self.pr_zb):
+            z = self.pr_zb
+            jest = il[z]
+            il[z] = jest - (jest / self.pr_poj > self.pr_prog) * np.minimum(self.pr_wydatek * dt, jest)
+
+        # 4) grzanie + chłodzenie do otoczenia
+        T = self.temperatura
+        if len(self.g_zb):
+            z = self.g_zb
+            grzanie = (self.grzalka_on & (il[z] / self.g_poj > self.g_min)) * ((self.g_wsp * self.moc) * dt)
+            if self.g_wspolne:
+                np.add.at(T, z, grzanie)
+            else:
+                T[z] += grzanie
+        T += (self.temp_otoczenia - T) * (self.chlodzenie * dt)
+
+        # 5) anty-miganie rur (podtrzymanie)
+        self.hold = np.where(przeplyw > PROG, HOLD, np.maximum(0.0, self.hold - dt))
+
+    def symuluj(self, n: int, dt: float) -> None:
+        for _ in range(n):
+            self.krok(dt)
+
+
+# -------------------------
+# Postać ciągła (do calkowanie.py)
+# -------------------------
+
+WYL, WL, POSLIZG = 0, 1, 2     # tryby "bramek" (odpływów z progiem)
+
+
+class UkladCiagly:
+    """Bilans GrafInstalacji jako równania różniczkowe: strumienie [/s] zamiast ilości na krok.
+
+    Odpływy z progiem (pompa nad "pustym" źródłem, spływ ponad minimum,
+    przelew) mają tryb: wyłączony, włączony albo poślizg - poziom stoi na
+    progu, a odpływ równa się dopływowi (zamiast migania co krok). Pełny
+    zbiornik przyjmuje tylko tyle, ile z niego odpływa. Tryby zmieniają się
+    wyłącznie w zdarzeniach, więc między nimi prawa strona jest gładka.
+
+    Stan y = [ilości (n), temperatury (n)].
+    progi: (sygnał, granica) dodatkowych zdarzeń, np. ("Z2.poziom", 0.95) z alarmów.
+    """
+
+    def __init__(self, graf: GrafInstalacji, progi: Sequence[Tuple[str, float]] = ()):
+        self.graf = g = graf
+        n = g.n
+        self.n = n
+        n_p = len(g.p_zrodlo)
+        self.n_p = n_p
+
+        # bramki: pompy, spływy (wszystkie etapy), przelewy
+        zrodlo = [g.p_zrodlo] + [e.zrodlo for e in g.etapy] + [g.pr_zb]
+        self.b_zrodlo = np.concatenate(zrodlo).astype(np.intp)
+        self.b_prog = np.concatenate([g.p_pusty] + [e.minimum for e in g.etapy] + [g.pr_prog * g.pr_poj])
+        self.b_a = np.concatenate([np.zeros(n_p)] + [e.wydatek for e in g.etapy] + [g.pr_wydatek])
+        self.b_b = np.concatenate([np.zeros(n_p)] + [e.wsp_poziomu for e in g.etapy] + [np.zeros(len(g.pr_zb))])
+        cel = np.full(len(self.b_zrodlo), -1, dtype=np.intp)
+        cel[g.p_bezp] = g.p_bezp_cel[g.p_bezp_cel_odw]
+        k = n_p
+        for e in g.etapy:
+            cel[k:k + len(e.zrodlo)] = e.cel[e.cel_odw]
+            k += len(e.zrodlo)
+        self.b_z_celem = np.flatnonzero(cel >= 0)
+        self.b_cel = cel[self.b_z_celem]
+        self.n_b = len(self.b_zrodlo)
+        rury_splywow = np.concatenate([e.rury for e in g.etapy]) if g.etapy else _idx([])
+        self.b_rury_splywow = rury_splywow
+        self.b_splywy = np.arange(n_p, n_p + len(rury_splywow))
+
+        # progi dodatkowe (alarmy)
+        self.progi_zb: List[int] = []
+        self.progi_temp: List[bool] = []
+        self.progi_granica: List[float] = []
+        nazwy_progow = []
+        for sygnal, granica in progi:
+            nazwa, _, atrybut = sygnal.partition(".")
+            if nazwa not in g.zbiornik or atrybut not in ("poziom", "temperatura"):
+                continue
+            self.progi_zb.append(g.zbiornik[nazwa])
+            self.progi_temp.append(atrybut == "temperatura")
+            self.progi_granica.append(float(granica))
+            nazwy_progow.append(f"{sygnal}={granica:g}")
+        self.pr_zb = _idx(self.progi_zb)
+        self.pr_temp = np.array(self.progi_temp, dtype=bool)
+        self.pr_granica = np.array(self.progi_granica)
+
+        nazwy_bramek = [f"{p}.ssanie" for p in g.nazwy_pomp]
+        nazwy_bramek += [f"{g.id_rur[j]}.minimum" for j in rury_splywow]
+        nazwy_bramek += [f"{g.nazwy_zbiornikow[i]}.przelew" for i in g.pr_zb]
+        self.nazwy_zdarzen = (nazwy_bramek + [f"{z}.pelny" for z in g.nazwy_zbiornikow]
+                              + [f"{h}.blokada" for h in g.nazwy_grzalek] + nazwy_progow)
+
+        # tryby
+        self.tryb = np.zeros(self.n_b, dtype=np.int8)
+        self.pelny = np.zeros(n, dtype=bool)
+        self.grzeje = np.zeros(len(g.g_zb), dtype=bool)
+        self.nad_progiem = np.zeros(len(self.pr_zb), dtype=bool)
+        self.kierunki = np.zeros(len(self.nazwy_zdarzen))
+        self._grzanie = np.zeros(len(g.g_zb))
+        # (ilości, wynik _strumienie) - ten sam stan liczą pochodne, zdarzenia i przeplyw_rur;
+        # ważne do zmiany trybów (przelacz)
+        self._pamiec: Optional[Tuple[np.ndarray, tuple]] = None
+
+    # --- strumienie ---
+    def _doplywy(self, q: np.ndarray, il: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(dopływ, strumienie wyjść węzłów, nadwyżka węzła dla pełnych wyjść)."""
+        g = self.graf
+        n = self.n
+        dop = np.bincount(self.b_cel, q[self.b_z_celem], minlength=n)
+        qw = np.zeros(0)
+        nadwyzka = np.zeros(n)
+        if len(g.w_cel):
+            # pełne wyjście trzyma poziom: najpierw dostaje tyle, ile z niego odpływa,
+            # reszta idzie do pozostałych wg wolnego miejsca (w granicy dt -> 0 tak
+            # samo jak w krok(): pełne wyjścia zapełniają się naraz z węzłem)
+            x = np.bincount(g.p_wezel, q[g.p_do_wezla], minlength=g.n_wezlow)
+            pelne = self.pelny[g.w_cel]
+            zadanie = pelne * np.bincount(self.b_zrodlo, q, minlength=n)[g.w_cel]
+            suma_zadan = np.bincount(g.w_wezel, zadanie, minlength=g.n_wezlow)
+            udzial = np.minimum(1.0, x / np.where(suma_zadan > 0, suma_zadan, 1.0))
+            reszta = x - udzial * suma_zadan
+            # bez obcinania wolnego miejsca do 0: w danym trybie prawa strona ma być
+            # gładka (przekroczenie pojemności łapie zdarzenie ".pelny")
+            wolne = (g.w_poj - il[g.w_cel]) * ~pelne
+            suma = np.bincount(g.w_wezel, wolne, minlength=g.n_wezlow)
+            otwarte = np.bincount(g.w_wezel, ~pelne, minlength=g.n_wezlow)
+            rowno = suma == 0
+            czesc = np.where(rowno[g.w_wezel], ~pelne / np.maximum(otwarte, 1)[g.w_wezel],
+                             wolne / np.where(rowno, 1.0, suma)[g.w_wezel])
+            qw = udzial[g.w_wezel] * zadanie + reszta[g.w_wezel] * czesc
+            dop += np.bincount(g.w_cel, qw, minlength=n)
+            nadwyzka = np.bincount(g.w_cel, pelne * reszta[g.w_wezel], minlength=n)
+        return dop, qw, nadwyzka
+
+    def _strumienie(self, il: np.ndarray):
+        """(q bramek, q wyjść węzłów, dopływ, odpływ, r, Qs, nadwyżka) przy bieżących trybach."""
+        p = self._pamiec
+        if p is not None and np.array_equal(p[0], il):
+            return p[1]
+        n = self.n
+        src = self.b_zrodlo
+        q_on = self.b_a + self.b_b * (il[src] / self.graf.pojemnosc[src])
+        poslizg = self.tryb == POSLIZG
+        q = q_on * (self.tryb == WL)
+        dop, qw, nadwyzka = self._doplywy(q, il)
+        r = Qs = None
+        if poslizg.any():
+            # odpływ w poślizgu = dopływ - pozostałe odpływy (w granicach 0..Qs);
+            # dopływ zależy od poślizgów wyżej w grafie - kilka przejść Gaussa-Seidla
+            Qs = np.bincount(src[poslizg], q_on[poslizg], minlength=n)
+            staly = np.bincount(src, q, minlength=n)
+            for _ in range(2 + int(poslizg.sum())):
+                r = dop - staly
+                udzial = np.clip(r, 0.0, Qs) / np.where(Qs > 0, Qs, 1.0)
+                q = np.where(poslizg, q_on * udzial[src], q)
+                dop, qw, nadwyzka = self._doplywy(q, il)
+        odp = np.bincount(src, q, minlength=n)
+        wynik = (q, qw, dop, odp, r, Qs, nadwyzka)
+        self._pamiec = (il.copy(), wynik)
+        return wynik
+
+    def pochodne(self, t: float, y: np.ndarray) -> np.ndarray:
+        g = self.graf
+        n = self.n
+        il, T = y[:n], y[n:]
+        _, _, dop, odp, _, _, _ = self._strumienie(il)
+        dil = np.where(self.pelny, 0.0, dop - odp)
+        dT = g.chlodzenie * (g.temp_otoczenia - T)
+        if len(g.g_zb):
+            dT = dT + np.bincount(g.g_zb, self._grzanie * self.grzeje, minlength=n)
+        return np.concatenate((dil, dT))
+
+    def przeplyw_rur(self, y: np.ndarray) -> np.ndarray:
+        """Strumienie [/s] w rurach (do wizualizacji)."""
+        g = self.graf
+        q, qw, _, _, _, _, _ = self._strumienie(y[:self.n])
+        wynik = np.zeros(len(g.id_rur))
+        wynik[g.p_rury] = np.concatenate((q[:self.n_p], q[:self.n_p]))
+        wynik[self.b_rury_splywow] = q[self.b_splywy]
+        if len(qw):
+            wynik[g.w_rury] = qw
+        return wynik
+
+    # --- zdarzenia ---
+    def zdarzenia(self, t: float, y: np.ndarray) -> np.ndarray:
+        g = self.graf
+        n = self.n
+        il, T = y[:n], y[n:]
+        _, _, dop, odp, r, Qs, nadwyzka = self._strumienie(il)
+        src = self.b_zrodlo
+        e_b = il[src] - self.b_prog
+        if r is not None:
+            e_b = np.where(self.tryb == POSLIZG, np.minimum(r, Qs - r)[src], e_b)
+        # pełny przestaje być pełnym, gdy dopływ (z nadwyżką węzła) spadnie poniżej odpływu
+        e_z = np.where(self.pelny, dop + nadwyzka - odp, g.pojemnosc - il)
+        e_g = il[g.g_zb] / g.g_poj - g.g_min
+        wartosc = np.where(self.pr_temp, T[self.pr_zb], il[self.pr_zb] / g.pojemnosc[self.pr_zb])
+        return np.concatenate((e_b, e_z, e_g, wartosc - self.pr_granica))
+
+    def przelacz(self, t: float, y: np.ndarray, indeksy: Optional[Sequence[int]]) -> None:
+        g = self.graf
+        n, n_b = self.n, self.n_b
+        il = y[:n]
+        src = self.b_zrodlo
+        e_b = il[src] - self.b_prog
+        self._pamiec = None
+
+        if indeksy is None:
+            # start: nastawy pomp i grzałek są stałe do końca całkowania
+            self.b_a[:self.n_p] = g.pompa_on * g.p_baza * np.maximum(0.0, g.predkosc)
+            self._grzanie = g.grzalka_on * g.g_wsp * g.moc
+            self.tryb = np.where(e_b > 0, WL, WYL).astype(np.int8)
+            # po lądowaniu na zdarzeniu poziom jest tuż za progiem - tryb i tak
+            # rozstrzyga bilans (r vs Qs), więc tolerancja może być szeroka
+            blisko = np.abs(e_b) <= 1e-6 * (1.0 + np.abs(self.b_prog))
+            self.pelny = il >= g.pojemnosc
+            self.grzeje = il[g.g_zb] / g.g_poj > g.g_min
+            wartosc = np.where(self.pr_temp, y[n:][self.pr_zb], il[self.pr_zb] / g.pojemnosc[self.pr_zb])
+            self.nad_progiem = wartosc > self.pr_granica
+            zbiorniki = np.arange(n)
+        else:
+            idx = np.asarray(indeksy, dtype=np.intp)
+            blisko = np.zeros(n_b, dtype=bool)
+            for c in idx[idx < n_b]:
+                blisko |= (src == src[c]) & (np.abs(self.b_prog - self.b_prog[c]) <= 1e-12 * (1.0 + abs(self.b_prog[c])))
+                blisko[c] = True
+            zbiorniki = idx[(idx >= n_b) & (idx < n_b + n)] - n_b
+            self.pelny[zbiorniki] = ~self.pelny[zbiorniki]
+            k = n_b + n
+            grz = idx[(idx >= k) & (idx < k + len(g.g_zb))] - k
+            self.grzeje[grz] = ~self.grzeje[grz]
+            k += len(g.g_zb)
+            pr = idx[idx >= k] - k
+            self.nad_progiem[pr] = ~self.nad_progiem[pr]
+
+        if blisko.any():
+            # bramki na progu: kierunek zmian poziomu rozstrzyga tryb
+            self.tryb[blisko] = POSLIZG
+            _, _, _, _, r, Qs, _ = self._strumienie(il)
+            r_b, Qs_b = r[src], Qs[src]
+            self.tryb[blisko & (r_b >= Qs_b)] = WL
+            self.tryb[blisko & (r_b <= 0)] = WYL
+            self._pamiec = None
+
+        if len(zbiorniki):
+            # pełny zostaje pełnym tylko przy dopływie >= odpływ
+            _, _, dop, odp, _, _, nadwyzka = self._strumienie(il)
+            self.pelny[zbiorniki] &= ((dop + nadwyzka >= odp) & (il >= g.pojemnosc * (1 - 1e-9)))[zbiorniki]
+            # pełny = dokładnie pojemność (jak obcinanie nadmiaru w krok())
+            pelne = zbiorniki[self.pelny[zbiorniki]]
+            il[pelne] = g.pojemnosc[pelne]
+            self._pamiec = None
+
+        self.kierunki = np.concatenate((
+            np.where(self.tryb == WYL, 1.0, -1.0),
+            -np.ones(n),
+            np.where(self.grzeje, -1.0, 1.0),
+            np.where(self.nad_progiem, -1.0, 1.0),
+        ))
@@ -0,0 +1,271 @@
+"""
+historia.py
+Historia trendów: preallokowane bufory kołowe (NumPy) zamiast listy krotek.
+
+Każdy sygnał ma swój wiersz w tablicy o stałym rozmiarze, dopisanie próbki
+to kilka przypisań w miejscu (O(1), bez kopiowania listy). Obok danych
+surowych automatycznie liczone są agregaty min/max/średnia w rzadszych
+rozdzielczościach, więc zapytanie o długie okno czasu czyta ograniczoną
+liczbę punktów.
+"""
+
+from __future__ import annotations
+import math
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+SYGNALY = ("z1", "z2", "z3", "z4", "T3")
+
+
+class Przebieg(NamedTuple):
+    """Wynik zapytania: czas [m] i wartości [k, m] (k = liczba sygnałów)."""
+    t: np.ndarray
+    srednia: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+
+# -------------------------
+# Bufor kołowy
+# -------------------------
+
+class BuforCykliczny:
+    """Kolumna czasu + k sygnałów w preallokowanych tablicach."""
+
+    def __init__(self, pojemnosc: int, sygnaly: int, statystyki: bool = False):
+        if pojemnosc < 1:
+            raise ValueError("pojemność bufora musi być dodatnia")
+        self.pojemnosc = int(pojemnosc)
+        self.t = np.zeros(self.pojemnosc)
+        self.srednia = np.zeros((sygnaly, self.pojemnosc))
+        if statystyki:
+            self.min = np.zeros((sygnaly, self.pojemnosc))
+            self.max = np.zeros((sygnaly, self.pojemnosc))
+        else:
+            # dane surowe: min = max = wartość
+            self.min = self.max = self.srednia
+        self.n = 0        # liczba zapisanych próbek (<= pojemnosc)
+        self.glowa = 0    # indeks następnego zapisu
+
+    def wyczysc(self) -> None:
+        self.n = 0
+        self.glowa = 0
+
+    def dopisz(self, t: float, srednia: np.ndarray,
+               mn: Optional[np.ndarray] = None, mx: Optional[np.ndarray] = None) -> None:
+        i = self.glowa
+        self.t[i] = t
+        self.srednia[:, i] = srednia
+        if mn is not None and self.min is not self.srednia:
+            self.min[:, i] = mn
+            self.max[:, i] = mx
+        i += 1
+        self.glowa = i if i < self.pojemnosc else 0
+        if self.n < self.pojemnosc:
+            self.n += 1
+
+    def ostatnie(self, k: int) -> Przebieg:
+        """k najnowszych próbek (k <= n) w kolejności czasu."""
+        g = self.glowa
+        if k <= g:
+            i = slice(g - k, g)
+        else:
+            i = np.r_[self.pojemnosc - (k - g):self.pojemnosc, 0:g]
+        return Przebieg(self.t[i], self.srednia[:, i], self.min[:, i], self.max[:, i])
+
+    def najstarszy(self) -> float:
+        if self.n == 0:
+            return math.inf
+        return float(self.t[self.glowa if self.n == self.pojemnosc else 0])
+
+    def najnowszy(self) -> float:
+        if self.n == 0:
+            return -math.inf
+        return float(self.t[self.glowa - 1])
+
+    def _odcinki(self) -> Sequence[Tuple[int, int]]:
+        """Zakresy indeksów od najstarszej do najnowszej próbki."""
+        if self.n < self.pojemnosc:
+            return ((0, self.n),)
+        return ((self.glowa, self.pojemnosc), (0, self.glowa))
+
+    def zakres(self, t0: float, t1: float) -> Przebieg:
+        """Próbki z t0 <= t <= t1 (w kolejności czasu)."""
+        wybrane = []
+        for a, b in self._odcinki():
+            # każdy odcinek jest posortowany po czasie
+            i0 = a + int(np.searchsorted(self.t[a:b], t0, side="left"))
+            i1 = a + int(np.searchsorted(self.t[a:b], t1, side="right"))
+            if i1 > i0:
+                wybrane.append((i0, i1))
+
+        if len(wybrane) == 1:
+            i0, i1 = wybrane[0]
+            return Przebieg(self.t[i0:i1].copy(), self.srednia[:, i0:i1].copy(),
+                            self.min[:, i0:i1].copy(), self.max[:, i0:i1].copy())
+
+        idx = np.concatenate([np.arange(i0, i1) for i0, i1 in wybrane]) if wybrane \
+            else np.zeros(0, dtype=np.intp)
+        return Przebieg(self.t[idx], self.srednia[:, idx], self.min[:, idx], self.max[:, idx])
+
+    # --- migawka (migawka.py) ---
+    def zapisz_stan(self, m, prefiks: str) -> None:
+        """Tylko zapisane próbki: przed zapełnieniem leżą w [0, n), potem cały bufor."""
+        n = self.n
+        m.opis[prefiks] = dict(n=n, glowa=self.glowa, pojemnosc=self.pojemnosc)
+        m[f"{prefiks}.t"] = self.t[:n]
+        m[f"{prefiks}.srednia"] = self.srednia[:, :n]
+        if self.min is not self.srednia:
+            m[f"{prefiks}.min"] = self.min[:, :n]
+            m[f"{prefiks}.max"] = self.max[:, :n]
+
+    def wczytaj_stan(self, m, prefiks: str) -> None:
+        opis = m.opis[prefiks]
+        srednia = m[f"{prefiks}.srednia"]
+        if opis["pojemnosc"] != self.pojemnosc or srednia.shape[0] != self.srednia.shape[0]:
+            raise ValueError(f"migawka historii ({prefiks}) o innym rozmiarze bufora")
+        n = self.n = opis["n"]
+        self.glowa = opis["glowa"]
+        self.t[:n] = m[f"{prefiks}.t"]
+        self.srednia[:, :n] = srednia
+        if self.min is not self.srednia:
+            self.min[:, :n] = m[f"{prefiks}.min"]
+            self.max[:, :n] = m[f"{prefiks}.max"]
+
+
+# -------------------------
+# Agregaty (rollupy)
+# -------------------------
+
+class PoziomAgregacji:
+    """Zbiera `krok` kolejnych próbek poziomu niżej w jedną (min/max/średnia).
+
+    Próbki otwartego przedziału leżą w buforze poziomu niżej - agregat liczy
+    się raz, przy zamknięciu przedziału, a nie przy każdej próbce."""
+
+    def __init__(self, krok: int, co_ile_bazowych: int, pojemnosc: int, sygnaly: int):
+        self.krok = krok                          # względem poziomu niżej
+        self.co_ile_bazowych = co_ile_bazowych    # względem danych surowych
+        self.bufor = BuforCykliczny(pojemnosc, sygnaly, statystyki=True)
+        self._ile = 0                             # próbek w otwartym przedziale
+
+    def wyczysc(self) -> None:
+        self.bufor.wyczysc()
+        self._ile = 0
+
+    def dodaj(self, nizej: BuforCykliczny) -> bool:
+        """Poziom niżej dostał próbkę; zwraca True, gdy przedział się zamknął (trafił do bufora)."""
+        self._ile += 1
+        if self._ile < self.krok:
+            return False
+
+        p = nizej.ostatnie(self.krok)
+        self.bufor.dopisz(0.5 * (p.t[0] + p.t[-1]), p.srednia.sum(axis=1) / self.krok,
+                          p.min.min(axis=1), p.max.max(axis=1))
+        self._ile = 0
+        return True
+
+    def zapisz_stan(self, m, prefiks: str) -> None:
+        self.bufor.zapisz_stan(m, prefiks)
+        m.opis[prefiks].update(ile=self._ile)
+
+    def wczytaj_stan(self, m, prefiks: str) -> None:
+        self.bufor.wczytaj_stan(m, prefiks)
+        self._ile = m.opis[prefiks]["ile"]
+
+
+# -------------------------
+# Historia modelu
+# -------------------------
+
+class Historia:
+    """Dane surowe (okres próbkowania) + kolejne poziomy agregacji.
+
+    poziomy: ((co_ile_probek, retencja_s), ...) - krotności rosnące,
+    każda podzielna przez poprzednią.
+    """
+
+    def __init__(self, okres: float = 0.2, retencja: float = 2 * 3600.0,
+                 poziomy: Sequence[Tuple[int, float]] = ((10, 24 * 3600.0), (100, 7 * 24 * 3600.0)),
+                 sygnaly: Sequence[str] = SYGNALY):
+        self.okres = okres
+        self.sygnaly = tuple(sygnaly)
+        k = len(self.sygnaly)
+
+        # każdy bufor mieści co najmniej otwarty przedział poziomu wyżej
+        krotnosci = [co_ile for co_ile, _ in poziomy]
+        kroki = [b // a for a, b in zip([1] + krotnosci, krotnosci)] + [1]
+        self.surowe = BuforCykliczny(max(math.ceil(retencja / okres), kroki[0]), k)
+        self.poziomy = []
+        poprzedni = 1
+        for i, (co_ile, ret) in enumerate(poziomy):
+            if co_ile <= poprzedni or co_ile % poprzedni:
+                raise ValueError("krotności agregacji muszą rosnąć i dzielić się przez poprzednie")
+            pojemnosc = max(math.ceil(ret / (okres * co_ile)), kroki[i + 1])
+            self.poziomy.append(PoziomAgregacji(co_ile // poprzedni, co_ile, pojemnosc, k))
+            poprzedni = co_ile
+
+    # --- zapis ---
+    def dopisz(self, t: float, *wartosci: float) -> None:
+        self.surowe.dopisz(t, wartosci)
+
+        # kaskada: poziom wyżej dostaje próbkę tylko gdy niższy zamknie przedział
+        nizej = self.surowe
+        for poz in self.poziomy:
+            if not poz.dodaj(nizej):
+                break
+            nizej = poz.bufor
+
+    def wyczysc(self) -> None:
+        self.surowe.wyczysc()
+        for poz in self.poziomy:
+            poz.wyczysc()
+
+    def zapisz_stan(self, m, prefiks: str = "historia") -> None:
+        """Bufory i niedomknięte przedziały agregatów do migawki (migawka.py)."""
+        m.opis[prefiks] = dict(sygnaly=list(self.sygnaly), poziomy=len(self.poziomy))
+        self.surowe.zapisz_stan(m, f"{prefiks}.surowe")
+        for i, poz in enumerate(self.poziomy):
+            poz.zapisz_stan(m, f"{prefiks}.poziom{i}")
+
+    def wczytaj_stan(self, m, prefiks: str = "historia") -> None:
+        opis = m.opis[prefiks]
+        if tuple(opis["sygnaly"]) != self.sygnaly or opis["poziomy"] != len(self.poziomy):
+            raise ValueError(f"migawka historii z innymi sygnałami: {opis['sygnaly']}")
+        self.surowe.wczytaj_stan(m, f"{prefiks}.surowe")
+        for i, poz in enumerate(self.poziomy):
+            poz.wczytaj_stan(m, f"{prefiks}.poziom{i}")
+
+    # --- odczyt ---
+    def __len__(self) -> int:
+        return self.surowe.n
+
+    def __bool__(self) -> bool:
+        return self.surowe.n > 0
+
+    def najnowszy(self) -> float:
+        return self.surowe.najnowszy()
+
+    def zapytaj(self, t0: float, t1: float, maks_punktow: int = 2000) -> Przebieg:
+        """Przebieg w [t0, t1] z najdokładniejszego poziomu, który pokrywa okno
+        i mieści się w maks_punktow."""
+        bufory = [(1, self.surowe)] + [(p.co_ile_bazowych, p.bufor) for p in self.poziomy]
+        wybrany = None
+        for co_ile, bufor in bufory:
+            if bufor.n == 0:
+                continue
+            wybrany = bufor
+            pokrywa = bufor.najstarszy() <= t0 or bufor.n < bufor.pojemnosc
+            punkty = (t1 - t0) / (self.okres * co_ile)
+            if pokrywa and punkty <= maks_punktow:
+                break
+        if wybrany is None:
+            pusty = np.zeros((len(self.sygnaly), 0))
+            return Przebieg(np.zeros(0), pusty, pusty, pusty)
+        return wybrany.zakres(t0, t1)
+
+    def ostatnie(self, okno: float, maks_punktow: int = 2000) -> Przebieg:
+        t1 = self.najnowszy()
+        return self.zapytaj(t1 - okno, t1, maks_punktow)
@@ -0,0 +1,297 @@
+"""
+historian.py
+Trwałe archiwum trendów na dysku (tylko dopisywanie, układ kolumnowy).
+
+Archiwum to katalog:
+    meta.json        - nazwy sygnałów, typy kolumn, okres próbkowania
+    t.f8             - czas (float64), rosnący
+    <sygnal>.f4      - wartości (float32), po jednym pliku na sygnał
+    czas.idx         - rzadki indeks czasu: pary (t, wiersz) co BLOK_INDEKSU wierszy
+
+Z martwą strefą wiersz, w którym żaden sygnał nie zmienił się o więcej niż
+martwa_strefa, nie jest zapisywany (najwyżej maks_przerwa sekund - potem
+wiersz kontrolny). Przed pierwszym wierszem ze zmianą dopisywana jest
+ostatnia pominięta próbka, więc płaski odcinek kończy się we właściwym
+miejscu, a nie rampą do nowej wartości.
+
+Zapis idzie paczkami (bufor w pamięci), fsync co zadany czas. Odczyt przez
+numpy.memmap - tygodnie danych bez wczytywania wszystkiego do RAM, a zakres
+czasu znajdowany jest przez indeks + wyszukiwanie binarne w jednym bloku.
+Redukcja do maks_punktow idzie blokami całych przedziałów prosto z memmap
+(w pamięci najwyżej jeden blok jednej kolumny).
+
+Narzędzie offline:
+    python historian.py archiwum/20260101_120000 [t0 t1]
+"""
+
+from __future__ import annotations
+import json
+import os
+import sys
+import time
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from historia import SYGNALY, Przebieg
+
+WERSJA = 1
+BLOK_INDEKSU = 4096
+BLOK_REDUKCJI = 1 << 16     # najwięcej wierszy czytanych naraz przy redukcji w zakres()
+TYP_CZASU = np.dtype("<f8")
+TYP_WARTOSCI = np.dtype("<f4")
+
+
+def _plik_czasu(katalog: str) -> str:
+    return os.path.join(katalog, "t.f8")
+
+
+def _plik_sygnalu(katalog: str, nazwa: str) -> str:
+    return os.path.join(katalog, f"{nazwa}.f4")
+
+
+def _plik_indeksu(katalog: str) -> str:
+    return os.path.join(katalog, "czas.idx")
+
+
+def _liczba_wierszy(katalog: str, sygnaly: Sequence[str]) -> int:
+    """Pełne wiersze - po awarii kolumny mogą mieć różne długości."""
+    n = os.path.getsize(_plik_czasu(katalog)) // TYP_CZASU.itemsize
+    for s in sygnaly:
+        n = min(n, os.path.getsize(_plik_sygnalu(katalog, s)) // TYP_WARTOSCI.itemsize)
+    return n
+
+
+# -------------------------
+# Zapis
+# -------------------------
+
+class Historian:
+    """Strumieniowy zapis próbek (t, *wartosci) do archiwum kolumnowego.
+
+    martwa_strefa - None: każda próbka; liczba albo sekwencja (po jednej na
+    sygnał): zapis tylko przy zmianie większej niż strefa, ale co najmniej
+    co maks_przerwa sekund. Przed zmianą dopisywana jest też ostatnia
+    pominięta próbka (schodek zamiast rampy w zapisie); wiersz podtrzymania
+    po maks_przerwa jej nie potrzebuje - stały sygnał to jeden wiersz na przerwę."""
+
+    def __init__(self, katalog: str, sygnaly: Sequence[str] = SYGNALY, okres: float = 0.2,
+                 paczka: int = 512, fsync_co: float = 5.0,
+                 martwa_strefa: Optional[Union[float, Sequence[float]]] = None,
+                 maks_przerwa: float = 10.0):
+        self.katalog = katalog
+        self.sygnaly = tuple(sygnaly)
+        self.paczka = paczka
+        self.fsync_co = fsync_co
+        if martwa_strefa is None or isinstance(martwa_strefa, (int, float)):
+            self.martwa_strefa = None if martwa_strefa is None else (float(martwa_strefa),) * len(self.sygnaly)
+        else:
+            self.martwa_strefa = tuple(float(m) for m in martwa_strefa)
+            if len(self.martwa_strefa) != len(self.sygnaly):
+                raise ValueError("martwa_strefa: po jednej wartości na sygnał")
+        self.maks_przerwa = maks_przerwa
+        self._zapisany: Optional[tuple] = None      # (t, wartości) ostatniego zapisanego wiersza
+        self._wstrzymany: Optional[tuple] = None    # ostatnia pominięta próbka
+        self.pominiete = 0
+
+        os.makedirs(katalog, exist_ok=True)
+        sciezka_meta = os.path.join(katalog, "meta.json")
+        if os.path.exists(sciezka_meta):
+            with open(sciezka_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            if tuple(meta["sygnaly"]) != self.sygnaly:
+                raise ValueError(f"archiwum {katalog} ma inne sygnały: {meta['sygnaly']}")
+        else:
+            with open(sciezka_meta, "w", encoding="utf-8") as f:
+                json.dump(dict(wersja=WERSJA, sygnaly=list(self.sygnaly), okres=okres,
+                               czas=TYP_CZASU.str, wartosci=TYP_WARTOSCI.str,
+                               blok_indeksu=BLOK_INDEKSU, martwa_strefa=self.martwa_strefa,
+                               maks_przerwa=maks_przerwa if self.martwa_strefa else None), f, indent=2)
+
+        sciezki = [_plik_czasu(katalog)] + [_plik_sygnalu(katalog, s) for s in self.sygnaly]
+        for p in sciezki + [_plik_indeksu(katalog)]:
+            open(p, "ab").close()
+
+        # po przerwanym zapisie: obcięcie do pełnych wierszy
+        self._wiersze = _liczba_wierszy(katalog, self.sygnaly)
+        os.truncate(sciezki[0], self._wiersze * TYP_CZASU.itemsize)
+        for p in sciezki[1:]:
+            os.truncate(p, self._wiersze * TYP_WARTOSCI.itemsize)
+
+        self._pliki = [open(p, "ab") for p in sciezki]
+        self._indeks = open(_plik_indeksu(katalog), "ab")
+
+        self._bufor = np.zeros((1 + len(self.sygnaly), paczka))
+        self._n = 0
+        self._ostatni_fsync = time.monotonic()
+
+    def dopisz(self, t: float, *wartosci: float) -> None:
+        strefa = self.martwa_strefa
+        if strefa is not None:
+            zapisany = self._zapisany
+            zmiana = zapisany is None or not all(abs(v - z) <= d for v, z, d in zip(wartosci, zapisany[1], strefa))
+            if not zmiana and t - zapisany[0] < self.maks_przerwa:
+                self._wstrzymany = (t, wartosci)
+                self.pominiete += 1
+                return
+            if zmiana and self._wstrzymany is not None:
+                self.pominiete -= 1
+                self._dopisz_wiersz(*self._wstrzymany)
+            self._wstrzymany = None
+            self._zapisany = (t, wartosci)
+        self._dopisz_wiersz(t, wartosci)
+
+    def _dopisz_wiersz(self, t: float, wartosci: Sequence[float]) -> None:
+        b = self._bufor
+        i = self._n
+        b[0, i] = t
+        for k in range(len(wartosci)):
+            b[k + 1, i] = wartosci[k]
+        self._n = i + 1
+        if self._n == self.paczka:
+            self.zapisz()
+
+    def zapisz(self, fsync: bool = False) -> None:
+        """Zapisuje bufor do plików; fsync gdy minął okres albo na żądanie."""
+        n = self._n
+        if n:
+            b = self._bufor
+            self._pliki[0].write(b[0, :n].astype(TYP_CZASU).tobytes())
+            for k, f in enumerate(self._pliki[1:], start=1):
+                f.write(b[k, :n].astype(TYP_WARTOSCI).tobytes())
+
+            # wpisy indeksu dla wierszy będących początkiem bloku
+            pierwszy = -(-self._wiersze // BLOK_INDEKSU) * BLOK_INDEKSU
+            wiersze = np.arange(pierwszy, self._wiersze + n, BLOK_INDEKSU)
+            if len(wiersze):
+                wpisy = np.column_stack([b[0, wiersze - self._wiersze], wiersze.astype(np.float64)])
+                self._indeks.write(wpisy.astype(TYP_CZASU).tobytes())
+
+            self._wiersze += n
+            self._n = 0
+
+        # flush co paczkę (czytnik widzi dane), fsync co fsync_co sekund
+        pliki = self._pliki + [self._indeks]
+        for f in pliki:
+            f.flush()
+        if fsync or time.monotonic() - self._ostatni_fsync >= self.fsync_co:
+            for f in pliki:
+                os.fsync(f.fileno())
+            self._ostatni_fsync = time.monotonic()
+
+    def zamknij(self) -> None:
+        if not self._pliki:
+            return
+        if self._wstrzymany is not None:
+            # archiwum kończy się na ostatniej próbce, nie na ostatniej zmianie
+            self.pominiete -= 1
+            self._dopisz_wiersz(*self._wstrzymany)
+            self._wstrzymany = None
+        self.zapisz(fsync=True)
+        for f in self._pliki + [self._indeks]:
+            f.close()
+        self._pliki = []
+
+    def __len__(self) -> int:
+        return self._wiersze + self._n
+
+
+# -------------------------
+# Odczyt
+# -------------------------
+
+class CzytnikArchiwum:
+    """Odczyt archiwum przez numpy.memmap z indeksem czasu."""
+
+    def __init__(self, katalog: str):
+        self.katalog = katalog
+        with open(os.path.join(katalog, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.sygnaly = tuple(self.meta["sygnaly"])
+        self.odswiez()
+
+    def odswiez(self) -> None:
+        """Ponowne otwarcie plików - widać próbki dopisane od ostatniego razu."""
+        n = _liczba_wierszy(self.katalog, self.sygnaly)
+        self.n = n
+        if n == 0:
+            self.t = np.zeros(0, dtype=TYP_CZASU)
+            self.kolumny: List[np.ndarray] = [np.zeros(0, dtype=TYP_WARTOSCI) for _ in self.sygnaly]
+        else:
+            self.t = np.memmap(_plik_czasu(self.katalog), dtype=TYP_CZASU, mode="r", shape=(n,))
+            self.kolumny = [
+                np.memmap(_plik_sygnalu(self.katalog, s), dtype=TYP_WARTOSCI, mode="r", shape=(n,))
+                for s in self.sygnaly
+            ]
+
+        indeks = np.fromfile(_plik_indeksu(self.katalog), dtype=TYP_CZASU).reshape(-1, 2)
+        indeks = indeks[indeks[:, 1] < n]
+        self._indeks_t = indeks[:, 0].copy()
+        self._indeks_wiersz = indeks[:, 1].astype(np.intp)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def poczatek(self) -> float:
+        return float(self.t[0]) if self.n else 0.0
+
+    def koniec(self) -> float:
+        return float(self.t[-1]) if self.n else 0.0
+
+    def wiersz(self, t: float, strona: str = "left") -> int:
+        """Indeks wiersza dla czasu t: indeks wybiera blok, w bloku wyszukiwanie binarne."""
+        j = int(np.searchsorted(self._indeks_t, t, side="right")) - 1
+        a = int(self._indeks_wiersz[j]) if j >= 0 else 0
+        b = int(self._indeks_wiersz[j + 1]) + 1 if j + 1 < len(self._indeks_wiersz) else self.n
+        return a + int(np.searchsorted(self.t[a:b], t, side=strona))
+
+    def zakres(self, t0: float, t1: float, maks_punktow: Optional[int] = None) -> Przebieg:
+        """Próbki z [t0, t1]; przy maks_punktow redukcja do przedziałów min/max/średnia."""
+        i0 = self.wiersz(t0, "left")
+        i1 = self.wiersz(t1, "right")
+        n = i1 - i0
+        if maks_punktow is None or n <= maks_punktow:
+            wartosci = np.array([k[i0:i1] for k in self.kolumny], dtype=np.float64)
+            return Przebieg(np.asarray(self.t[i0:i1]), wartosci, wartosci, wartosci)
+
+        krok = -(-n // maks_punktow)
+        starty = np.arange(0, n, krok)
+        ile = np.diff(np.append(starty, n))
+        t = np.empty(len(starty))
+        srednia, mn, mx = (np.empty((len(self.kolumny), len(starty))) for _ in range(3))
+
+        # bloki całych przedziałów: z każdej kolumny naraz tylko jej wycinek z memmap
+        na_blok = max(1, BLOK_REDUKCJI // krok)
+        for p in range(0, len(starty), na_blok):
+            q = min(p + na_blok, len(starty))
+            a = i0 + int(starty[p])
+            b = i0 + int(starty[q]) if q < len(starty) else i1
+            lokalne = starty[p:q] - starty[p]
+            t[p:q] = np.add.reduceat(self.t[a:b], lokalne)
+            for c, k in enumerate(self.kolumny):
+                blok = k[a:b]
+                srednia[c, p:q] = np.add.reduceat(blok, lokalne, dtype=np.float64)
+                mn[c, p:q] = np.minimum.reduceat(blok, lokalne)
+                mx[c, p:q] = np.maximum.reduceat(blok, lokalne)
+        return Przebieg(t / ile, srednia / ile, mn, mx)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("użycie: python historian.py <katalog> [t0 t1]", file=sys.stderr)
+        return 2
+    cz = CzytnikArchiwum(argv[0])
+    if len(argv) < 3:
+        print(f"{cz.katalog}: {len(cz)} próbek, t = {cz.poczatek():.1f} .. {cz.koniec():.1f} s, "
+              f"sygnały: {', '.join(cz.sygnaly)}")
+        return 0
+    p = cz.zakres(float(argv[1]), float(argv[2]))
+    print("t," + ",".join(cz.sygnaly))
+    for j in range(len(p.t)):
+        print(f"{p.t[j]:.3f}," + ",".join(f"{v:.6g}" for v in p.srednia[:, j]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,28 @@
+import time
+
+T0 = time.perf_counter()        # początek startu - przed importami PyQt5 i modelu
+
 import sys
-from PyQt5.QtWidgets import QApplication
-from okno_glowne import OknoGlowne
+
+from profilowanie import START
+
+START.od(T0)
+
+with START.faza("import PyQt5"):
+    from PyQt5.QtWidgets import QApplication
+
+with START.faza("import okno_glowne"):
+    from okno_glowne import OknoGlowne
+
 
 def main():
-    app = QApplication(sys.argv)
-    okno = OknoGlowne()
+    with START.faza("QApplication"):
+        app = QApplication(sys.argv)
+    with START.faza("OknoGlowne"):
+        okno = OknoGlowne()
     okno.show()
     sys.exit(app.exec_())
 
+
 if __name__ == "__main__":
     main()
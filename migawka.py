@@ -0,0 +1,126 @@
+"""
+migawka.py
+Binarne migawki stanu symulacji (zapis / odtworzenie / rozgałęzianie).
+
+Migawka to opis (słownik JSON: czas, stany alarmów, nastawy...) i nazwane
+tablice NumPy (ilości, temperatury, bufory historii...). Format pliku:
+
+    nagłówek   MAGIA, wersja, długość opisu     (struct "<8sHHI")
+    opis       JSON w UTF-8, dopełniony do 8 bajtów; zawiera też listę tablic
+               (nazwa, typ, kształt)
+    tablice    surowe bajty kolejnych tablic, każda dopełniona do 8 bajtów
+
+Odczyt nie kopiuje danych - tablice są widokami (tylko do odczytu) na bufor
+pliku, a przywroc() przepisuje je do stanu obiektu. Ten sam stan daje
+zawsze te same bajty, a symulacja wznowiona z migawki idzie dokładnie tak
+samo jak bez przerwy.
+
+Migawki robią i przyjmują: ModelInstalacji.migawka() / przywroc(),
+SilnikInstalacji.migawka() / przywroc() / z_migawki() oraz
+SilnikWsadowy.migawka() / przywroc() / rozgalez() (N scenariuszy z jednego
+rozgrzanego stanu).
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import struct
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+MAGIA = b"SCADAMIG"
+WERSJA = 1
+ROZSZERZENIE = ".mig"
+
+_NAGLOWEK = struct.Struct("<8sHHI")     # magia, wersja, zarezerwowane, długość opisu
+_WYROWNANIE = 8
+
+
+def _dopelnienie(n: int) -> int:
+    return -n % _WYROWNANIE
+
+
+def odcisk(konfiguracja: Mapping) -> str:
+    """Skrót konfiguracji instalacji - migawka pasuje tylko do tej samej instalacji."""
+    tekst = json.dumps(konfiguracja, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(tekst.encode("utf-8")).hexdigest()
+
+
+class Migawka:
+    """Stan jednego obiektu: rodzaj ("model", "silnik", "wsadowy"), opis i tablice.
+
+    m["ilosc"] = tablica zapisuje kopię (stan żywego obiektu może się dalej
+    zmieniać), m["ilosc"] zwraca tablicę z migawki.
+    """
+
+    __slots__ = ("rodzaj", "opis", "tablice")
+
+    def __init__(self, rodzaj: str, opis: Optional[Dict[str, Any]] = None,
+                 tablice: Optional[Dict[str, np.ndarray]] = None):
+        self.rodzaj = rodzaj
+        self.opis: Dict[str, Any] = opis if opis is not None else {}
+        self.tablice: Dict[str, np.ndarray] = tablice if tablice is not None else {}
+
+    def __getitem__(self, nazwa: str) -> np.ndarray:
+        return self.tablice[nazwa]
+
+    def __setitem__(self, nazwa: str, tablica) -> None:
+        self.tablice[nazwa] = np.array(tablica)
+
+    def __contains__(self, nazwa: str) -> bool:
+        return nazwa in self.tablice
+
+    def __repr__(self) -> str:
+        return f"Migawka({self.rodzaj}, t={self.opis.get('t')}, tablice={len(self.tablice)})"
+
+    def sprawdz_rodzaj(self, *rodzaje: str) -> None:
+        if self.rodzaj not in rodzaje:
+            raise ValueError(f"migawka rodzaju {self.rodzaj!r}, oczekiwano: {', '.join(rodzaje)}")
+
+    # --- format binarny ---
+    def do_bajtow(self) -> bytes:
+        spis = [[n, t.dtype.str, list(t.shape)] for n, t in self.tablice.items()]
+        opis = json.dumps(dict(rodzaj=self.rodzaj, opis=self.opis, tablice=spis),
+                          ensure_ascii=False).encode("utf-8")
+        czesci = [_NAGLOWEK.pack(MAGIA, WERSJA, 0, len(opis)), opis,
+                  bytes(_dopelnienie(_NAGLOWEK.size + len(opis)))]
+        for t in self.tablice.values():
+            dane = np.ascontiguousarray(t).tobytes()
+            czesci.append(dane)
+            czesci.append(bytes(_dopelnienie(len(dane))))
+        return b"".join(czesci)
+
+    @classmethod
+    def z_bajtow(cls, dane) -> "Migawka":
+        bufor = memoryview(dane)
+        if len(bufor) < _NAGLOWEK.size:
+            raise ValueError("to nie jest migawka (za krótki plik)")
+        magia, wersja, _, dlugosc = _NAGLOWEK.unpack_from(bufor)
+        if magia != MAGIA:
+            raise ValueError("to nie jest migawka (zły nagłówek)")
+        if wersja != WERSJA:
+            raise ValueError(f"nieobsługiwana wersja migawki: {wersja}")
+        poz = _NAGLOWEK.size
+        meta = json.loads(bytes(bufor[poz:poz + dlugosc]).decode("utf-8"))
+        poz += dlugosc + _dopelnienie(poz + dlugosc)
+
+        tablice = {}
+        for nazwa, typ, ksztalt in meta["tablice"]:
+            typ = np.dtype(typ)
+            ile = int(np.prod(ksztalt, dtype=np.int64))
+            if poz + ile * typ.itemsize > len(bufor):
+                raise ValueError(f"migawka ucięta (tablica {nazwa})")
+            tablice[nazwa] = np.frombuffer(bufor, typ, ile, poz).reshape(ksztalt)
+            poz += ile * typ.itemsize
+            poz += _dopelnienie(ile * typ.itemsize)
+        return cls(meta["rodzaj"], meta["opis"], tablice)
+
+    def zapisz(self, plik: str) -> None:
+        with open(plik, "wb") as f:
+            f.write(self.do_bajtow())
+
+    @classmethod
+    def wczytaj(cls, plik: str) -> "Migawka":
+        with open(plik, "rb") as f:
+            return cls.z_bajtow(f.read())
@@ -2,47 +2,34 @@
 model.py
 Logika procesu + obiekty (zbiorniki, rury, pompa, grzałka) + alarmy.
 Minimalnie, ale czytelnie - w stylu 2 rok automatyki.
-"""
-
-from __future__ import annotations
-from dataclasses import dataclass
-from typing import Callable, List, Tuple
-import math
-
-from PyQt5.QtCore import Qt, QPointF
-from PyQt5.QtGui import QPainter, QColor, QPen, QPainterPath
-
-
-# -------------------------
-# Sygnały (jak w automatyce)
-# -------------------------
-
-class Sygnal:
-    def __init__(self, wartosc):
-        self.wartosc = wartosc
-
-
-class SygnalFloat(Sygnal):
-    wartosc: float
 
+Bez Qt: obiekty trzymają tylko stan i geometrię, rysowaniem zajmuje się
+rysowanie.py (czyta stan z tych obiektów).
 
-class SygnalBool(Sygnal):
-    wartosc: bool
+Układ instalacji (zbiorniki, pompy, grzałki, rury, alarmy, trendy) pochodzi
+z konfiguracji grafu (graf.py), a bilans masy i ciepła liczy GrafInstalacji.
+krok(dt) to dyskretny krok Eulera; z ustawionym `calkowanie` (calkowanie.py)
+model całkuje postać ciągłą wybraną metodą, z lądowaniem na progach.
+migawka() / przywroc() zapisują i odtwarzają cały stan (migawka.py).
 
+Sygnały elementów (poziom, temperatura, nastawy) to widoki na wspólną bazę
+sygnałów modelu (sygnaly.py); krok zapisuje i czyta je zbiorczo, a alarmy
+dostają tylko sygnały zmienione w danym skanie.
+"""
 
-# -------------------------
-# Alarm
-# -------------------------
+from __future__ import annotations
+import math
+from operator import itemgetter, truediv
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
-@dataclass
-class Alarm:
-    tag: str
-    opis: str
-    warunek: Callable[[], bool]
-    aktywny: bool = False
+import numpy as np
 
-    def aktualizuj(self) -> None:
-        self.aktywny = bool(self.warunek())
+from alarmy import Alarm, SilnikAlarmow
+from calkowanie import METODY, Calkowanie, StatystykiCalkowania
+from graf import GrafInstalacji, UkladCiagly, sciezka_L
+from historia import Historia
+from migawka import Migawka, odcisk
+from sygnaly import BazaSygnalow, Sygnal, SygnalBool, SygnalFloat
 
 
 # -------------------------
@@ -50,17 +37,28 @@ class Alarm:
 # -------------------------
 
 class Zbiornik:
-    def __init__(self, x: int, y: int, w: int, h: int, nazwa: str):
+    def __init__(self, x: int, y: int, w: int, h: int, nazwa: str, pojemnosc: float = 100.0,
+                 baza: Optional[BazaSygnalow] = None, ilosci: Optional[List[float]] = None):
         self.x, self.y, self.w, self.h = x, y, w, h
         self.nazwa = nazwa
 
-        self.pojemnosc = 100.0
-        self.ilosc = 0.0
+        self.pojemnosc = float(pojemnosc)
+        # ilość - pozycja we wspólnej liście modelu (jak sygnał w bazie), krok liczy na niej w miejscu
+        self._ilosci = ilosci if ilosci is not None else []
+        self._indeks = len(self._ilosci)
+        self._ilosci.append(0.0)
+
+        baza = baza if baza is not None else BazaSygnalow()
+        self.poziom = SygnalFloat(0.0, baza, f"{nazwa}.poziom")              # 0..1
+        self.temperatura = SygnalFloat(20.0, baza, f"{nazwa}.temperatura")   # °C
 
-        self.poziom = SygnalFloat(0.0)        # 0..1
-        self.temperatura = SygnalFloat(20.0)  # °C
+    @property
+    def ilosc(self) -> float:
+        return self._ilosci[self._indeks]
 
-        self._kolor_cieczy = QColor(0, 140, 255, 190)
+    @ilosc.setter
+    def ilosc(self, v: float) -> None:
+        self._ilosci[self._indeks] = v
 
     # --- wygodne metody do bilansu masy ---
     def ustaw_ilosc(self, ilosc: float) -> None:
@@ -93,179 +91,196 @@ class Zbiornik:
     def punkt_dol(self) -> Tuple[float, float]:
         return (self.x + self.w / 2, self.y + self.h)
 
-    # --- rysowanie ---
-    def rysuj(self, p: QPainter) -> None:
-        # ciecz
-        if self.poziom.wartosc > 0:
-            hh = self.h * self.poziom.wartosc
-            y0 = self.y + self.h - hh
-            p.setPen(Qt.NoPen)
-            p.setBrush(self._kolor_cieczy)
-            p.drawRect(int(self.x + 3), int(y0 + 2), int(self.w - 6), int(hh - 4))
-
-        # obrys
-        pen = QPen(Qt.white, 3)
-        p.setPen(pen)
-        p.setBrush(Qt.NoBrush)
-        p.drawRect(self.x, self.y, self.w, self.h)
-
-        # opisy
-        p.setPen(Qt.white)
-        p.drawText(self.x, self.y - 8, f"{self.nazwa}")
-        p.drawText(self.x, self.y + self.h + 16, f"{self.poziom.wartosc*100:5.1f}%")
-        p.drawText(self.x, self.y + self.h + 32, f"T={self.temperatura.wartosc:4.1f}°C")
-
 
 class Rura:
-    def __init__(self, punkty: List[Tuple[float, float]], grubosc: int = 12):
-        self.punkty = [QPointF(float(x), float(y)) for x, y in punkty]
+    def __init__(self, punkty: List[Tuple[float, float]], grubosc: int = 12, id: str = "",
+                 baza: Optional[BazaSygnalow] = None):
+        self.id = id
+        self.punkty = [(float(x), float(y)) for x, y in punkty]
         self.grubosc = grubosc
-        self.kolor_rury = QColor(140, 140, 140)
-        self.kolor_cieczy = QColor(0, 180, 255)
-        self.czy_plynie = False
-
-    def ustaw_przeplyw(self, plynie: bool) -> None:
-        self.czy_plynie = bool(plynie)
+        baza = baza if baza is not None else BazaSygnalow()
+        self.plynie = SygnalBool(False, baza, f"{id}.plynie" if id else "")
+        # strumień [/s] w kierunku trasy (od "z" do "do") - szybkość animacji przepływu
+        self.przeplyw = SygnalFloat(0.0, baza, f"{id}.przeplyw" if id else "")
 
-    def rysuj(self, p: QPainter) -> None:
-        if len(self.punkty) < 2:
-            return
-
-        sciezka = QPainterPath()
-        sciezka.moveTo(self.punkty[0])
-        for pt in self.punkty[1:]:
-            sciezka.lineTo(pt)
+    @property
+    def czy_plynie(self) -> bool:
+        return self.plynie.wartosc
 
-        # obudowa
-        p.setBrush(Qt.NoBrush)
-        p.setPen(QPen(self.kolor_rury, self.grubosc, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        p.drawPath(sciezka)
+    @czy_plynie.setter
+    def czy_plynie(self, v: bool) -> None:
+        self.plynie.wartosc = v
 
-        # "ciecz"
-        if self.czy_plynie:
-            p.setPen(QPen(self.kolor_cieczy, self.grubosc - 4, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-            p.drawPath(sciezka)
+    def ustaw_przeplyw(self, plynie: bool, strumien: float = 0.0) -> None:
+        self.plynie.wartosc = bool(plynie)
+        self.przeplyw.wartosc = float(strumien)
 
 
 class Pompa:
-    def __init__(self, x: int, y: int, nazwa: str):
+    def __init__(self, x: int, y: int, nazwa: str, obroty: float = 8.0,
+                 baza: Optional[BazaSygnalow] = None):
         self.x, self.y = x, y
         self.nazwa = nazwa
-        self.wlaczona = SygnalBool(True)
-        self.predkosc = SygnalFloat(1.0)
+        self.obroty = obroty
+        baza = baza if baza is not None else BazaSygnalow()
+        self.wlaczona = SygnalBool(True, baza, f"{nazwa}.wlaczona")
+        self.predkosc = SygnalFloat(1.0, baza, f"{nazwa}.predkosc")
         self._kat = 0.0
 
     def krok_animacji(self, dt: float) -> None:
         if self.wlaczona.wartosc:
-            self._kat += (8.0 * self.predkosc.wartosc) * dt
-
-    def rysuj(self, p: QPainter) -> None:
-        r = 22
-        cx, cy = self.x, self.y
-
-        p.setPen(QPen(Qt.white, 2))
-        p.setBrush(QColor(50, 50, 50))
-        p.drawEllipse(cx - r, cy - r, 2 * r, 2 * r)
+            self._kat += (self.obroty * self.predkosc.wartosc) * dt
 
-        # wirnik
-        if self.wlaczona.wartosc:
-            p.setPen(QPen(QColor(0, 220, 255), 2))
-            for i in range(4):
-                a = self._kat + i * (math.pi / 2)
-                x2 = cx + 16 * math.cos(a)
-                y2 = cy + 16 * math.sin(a)
-                p.drawLine(QPointF(cx, cy), QPointF(x2, y2))
-        else:
-            p.setPen(QPen(QColor(255, 120, 120), 2))
-            p.drawLine(cx - 10, cy - 10, cx + 10, cy + 10)
+    # --- punkty zaczepienia rur ---
+    def punkt_wlot(self) -> Tuple[float, float]:
+        return (self.x - 25, self.y)
 
-        p.setPen(Qt.white)
-        p.drawText(cx - 18, cy + 38, self.nazwa)
+    def punkt_wylot(self) -> Tuple[float, float]:
+        return (self.x + 25, self.y)
 
 
 class Grzalka:
-    def __init__(self, x: int, y: int, nazwa: str):
+    def __init__(self, x: int, y: int, nazwa: str, moc: float = 3.0,
+                 baza: Optional[BazaSygnalow] = None):
         self.x, self.y = x, y
         self.nazwa = nazwa
-        self.wlaczona = SygnalBool(True)
-        self.moc = SygnalFloat(3.0)
-
-    def rysuj(self, p: QPainter) -> None:
-        x, y = self.x, self.y
-        w, h = 60, 18
-
-        p.setPen(QPen(Qt.white, 2))
-        if self.wlaczona.wartosc:
-            p.setBrush(QColor(255, 140, 0))
-        else:
-            p.setBrush(QColor(80, 80, 80))
-
-        p.drawRoundedRect(x, y, w, h, 6, 6)
-        p.setPen(Qt.white)
-        p.drawText(x, y - 6, f"{self.nazwa}  {self.moc.wartosc:.1f}")
+        baza = baza if baza is not None else BazaSygnalow()
+        self.wlaczona = SygnalBool(True, baza, f"{nazwa}.wlaczona")
+        self.moc = SygnalFloat(moc, baza, f"{nazwa}.moc")
 
 
 # -------------------------
 # Model procesu
 # -------------------------
 
-class ModelInstalacji:
-    def __init__(self):
-        # elementy
-        self.z1 = Zbiornik(60, 70, 110, 150, "Z1")
-        self.z2 = Zbiornik(270, 70, 110, 150, "Z2")
-        self.z3 = Zbiornik(480, 70, 110, 150, "Z3")
-        self.z4 = Zbiornik(270, 320, 110, 150, "Z4")
-        self.zbiorniki = [self.z1, self.z2, self.z3, self.z4]
-
-        self.pompa = Pompa(200, 300, "P1")
-        self.grzalka = Grzalka(535, 255, "H1")
-
-        self.wezel_T = (400, 250)
-
-        self.bazowy_przeplyw = 18.0
-        self.temp_otoczenia = 20.0
-
-        # rury (90° + rozgałęzienie)
-        self.rura_z1_do_pompy = Rura(self.sciezka_L(self.z1.punkt_dol(), (self.pompa.x - 25, self.pompa.y)))
-        self.rura_pompa_do_T = Rura(self.sciezka_L((self.pompa.x + 25, self.pompa.y), self.wezel_T))
-        self.rura_T_do_z2 = Rura(self.sciezka_L(self.wezel_T, self.z2.punkt_dol()))
-        self.rura_T_do_z3 = Rura(self.sciezka_L(self.wezel_T, self.z3.punkt_dol()))
-        self.rura_z2_do_z4 = Rura(self.sciezka_L(self.z2.punkt_dol(), self.z4.punkt_gora()))
-        self.rura_z3_do_z4 = Rura(self.sciezka_L(self.z3.punkt_dol(), self.z4.punkt_gora()))
-        self.rura_z4_do_z1 = Rura(self.sciezka_L(self.z4.punkt_dol(), self.z1.punkt_gora()))
+_BEZ_PRZEDZIALU = (math.inf, -math.inf)
+
+
+def _przedzial(v: float, progi: Sequence[float]) -> Tuple[float, float]:
+    """Przedział otwarty między posortowanymi progami, w którym leży v (na progu - pusty)."""
+    dolny, gorny = -math.inf, math.inf
+    for g in progi:
+        if g < v:
+            dolny = g
+        elif g > v:
+            gorny = g
+            break
+        else:
+            return _BEZ_PRZEDZIALU
+    return (dolny, gorny)
 
+
+class ModelInstalacji:
+    def __init__(self, historia: Optional[Historia] = None, konfiguracja: Optional[Mapping] = None):
+        # graf procesu (bilans) + elementy z tej samej konfiguracji
+        self.graf = GrafInstalacji(konfiguracja)
+        k = self.graf.konfiguracja
+
+        # wszystkie sygnały elementów w jednej bazie (sloty w kolejności elementów)
+        self.sygnaly = baza = BazaSygnalow()
+        # ilości zbiorników (kolejność jak w grafie) - krok skalarny liczy wprost na tej liście
+        self.ilosci: List[float] = []
+        self.zbiorniki = [Zbiornik(z["x"], z["y"], z["w"], z["h"], z["nazwa"], self.graf.pojemnosc[i], baza,
+                                   self.ilosci)
+                          for i, z in enumerate(k["zbiorniki"])]
+        self.pompy = [Pompa(p["x"], p["y"], p["nazwa"], float(self.graf.p_obroty[i]), baza)
+                      for i, p in enumerate(k.get("pompy", []))]
+        self.grzalki = [Grzalka(g["x"], g["y"], g["nazwa"], float(self.graf.moc[i]), baza)
+                        for i, g in enumerate(k.get("grzalki", []))]
+        self._sloty_poziomu = [z.poziom.slot for z in self.zbiorniki]
+        self._sloty_temperatury = [z.temperatura.slot for z in self.zbiorniki]
+        self._sloty_pomp = [p.wlaczona.slot for p in self.pompy]
+        self._sloty_predkosci = [p.predkosc.slot for p in self.pompy]
+        self._sloty_grzalek = [h.wlaczona.slot for h in self.grzalki]
+        self._sloty_mocy = [h.moc.slot for h in self.grzalki]
+        self.wezly: Dict[str, Tuple[float, float]] = {w["nazwa"]: (w["x"], w["y"]) for w in k.get("wezly", [])}
+
+        self.elementy: Dict[str, object] = {e.nazwa: e for e in self.zbiorniki + self.pompy + self.grzalki}
+
+        # rury (90° + rozgałęzienia) - trasa z końców opisanych w konfiguracji
         self.rury = [
-            self.rura_z1_do_pompy, self.rura_pompa_do_T,
-            self.rura_T_do_z2, self.rura_T_do_z3,
-            self.rura_z2_do_z4, self.rura_z3_do_z4,
-            self.rura_z4_do_z1
+            Rura(r.get("punkty") or sciezka_L(self.punkt(r["z"]), self.punkt(r["do"])),
+                 r.get("grubosc", 12), r["id"], self.sygnaly)
+            for r in k.get("rury", [])
         ]
+        self._sloty_rur = [r.plynie.slot for r in self.rury]
+        self._sloty_przeplywu = [r.przeplyw.slot for r in self.rury]
+        # wejścia kroku (kolejność jak w GrafInstalacji.krok_listy) i wyniki - jednym odczytem / zapisem bazy
+        self._sloty_wejsc = (self._sloty_temperatury + self._sloty_pomp + self._sloty_predkosci
+                             + self._sloty_grzalek + self._sloty_mocy)
+        self._wejscia = (itemgetter(*self._sloty_wejsc) if len(self._sloty_wejsc) > 1
+                         else lambda w, i=self._sloty_wejsc[0]: (w[i],))
+        # (pusty zbiornik bez pojemności: ilość / inf = 0.0)
+        self._pojemnosci = [z.pojemnosc if z.pojemnosc > 0 else math.inf for z in self.zbiorniki]
+        self._sloty_wyniku = (self._sloty_poziomu + self._sloty_temperatury + self._sloty_rur
+                              + self._sloty_przeplywu)
 
         # alarmy
-        self.alarmy: List[Alarm] = [
-            Alarm("Z2.HH", "Przepełnienie Z2 (>95%)", lambda: self.z2.poziom.wartosc > 0.95),
-            Alarm("Z3.HH", "Przepełnienie Z3 (>95%)", lambda: self.z3.poziom.wartosc > 0.95),
-            Alarm("Z4.HH", "Przepełnienie Z4 (>95%)", lambda: self.z4.poziom.wartosc > 0.95),
-            Alarm("T3.HI", "Wysoka temperatura Z3 (>80°C)", lambda: self.z3.temperatura.wartosc > 80.0),
-            Alarm("P1.TRIP", "Pompa wyłączona przy zapotrzebowaniu",
-                  lambda: (not self.pompa.wlaczona.wartosc) and (self.z1.poziom.wartosc > 0.2)),
-        ]
+        # (strefa martwa + opóźnienie wyłączenia: bez migania na progu)
+        self.progi_alarmowe: List[Tuple[str, float]] = []     # (sygnał, próg) - zdarzenia całkowania
+        self.alarmy: List[Alarm] = [self._alarm(a) for a in k.get("alarmy", [])]
+        self.silnik_alarmow = SilnikAlarmow(self.alarmy)
+        self._sygnaly_alarmowe = {s: self.sygnal(s) for a in self.alarmy for s in a.sygnaly}
+        # sygnały analogowe: (slot, nazwa, posortowane progi, indeks przedziału), dwustanowe: (slot, nazwa)
+        progi: Dict[str, List[float]] = {}
+        for s, granica in self.progi_alarmowe:
+            progi.setdefault(s, []).append(granica)
+        analogowe = [(s.slot, n) for n, s in self._sygnaly_alarmowe.items() if not isinstance(s, SygnalBool)]
+        self._alarmowe_analogowe = tuple((i, n, tuple(sorted(progi.get(n, ()))), k)
+                                         for k, (i, n) in enumerate(analogowe))
+        self._alarmowe_logiczne = tuple((s.slot, n) for n, s in self._sygnaly_alarmowe.items()
+                                        if isinstance(s, SygnalBool))
+        # przedział między progami z ostatnio przekazaną wartością (dla słownika wartości silnika)
+        self._przedzialy: List[Tuple[float, float]] = [_BEZ_PRZEDZIALU] * len(analogowe)
+        self._znane: Optional[Dict[str, float]] = None
 
         # trendy
         self.t = 0.0
         self._akum_probki = 0.0
-        self.historia = []  # (t, z1, z2, z3, z4, tempZ3)
-
-        # anty-miganie rur
-        self._hold = {name: 0.0 for name in ["z1p", "pT", "Tz2", "Tz3", "z2z4", "z3z4", "z4z1"]}
-
-    @staticmethod
-    def sciezka_L(p1: Tuple[float, float], p2: Tuple[float, float]) -> List[Tuple[float, float]]:
-        x1, y1 = p1
-        x2, y2 = p2
-        mid_y = (y1 + y2) / 2
-        return [(x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2)]
+        trendy = k.get("trendy", {})
+        self._sloty_trendow = [self.sygnal(s).slot for s in trendy.values()]
+        # (t, *sygnały trendów) w buforach kołowych + agregaty
+        self.historia = historia if historia is not None else Historia(okres=0.2, sygnaly=tuple(trendy))
+        # dodatkowi odbiorcy próbek trendów (np. historian na dysku): dopisz(t, *wartosci)
+        self.rejestratory: List = []
+
+        # None = dyskretny krok Eulera w krok(dt); inaczej krok(dt) = symuluj_do(t + dt)
+        self.calkowanie: Optional[Calkowanie] = None
+        self._uklad: Optional[UkladCiagly] = None
+
+    def __getitem__(self, nazwa: str):
+        return self.elementy[nazwa]
+
+    def punkt(self, koniec: str) -> Tuple[float, float]:
+        """Punkt zaczepienia rury: "Z1.dol", "P1.wylot", "T"..."""
+        if koniec in self.wezly:
+            return self.wezly[koniec]
+        nazwa, _, kotwica = koniec.partition(".")
+        return getattr(self.elementy[nazwa], f"punkt_{kotwica}")()
+
+    def sygnal(self, nazwa: str) -> Sygnal:
+        """"Z1.poziom" -> widok sygnału w bazie modelu."""
+        return self.sygnaly[nazwa]
+
+    def _alarm(self, opis: Mapping) -> Alarm:
+        opcje = {k: opis[k] for k in ("opoznienie_zal", "opoznienie_wyl") if k in opis}
+        if "pompa" in opis:
+            # pompa stoi, a zbiornik, z którego ssie, jest pełniejszy niż granica
+            g = self.graf
+            zrodlo = g.nazwy_zbiornikow[g.p_zrodlo[g.pompa[opis["pompa"]]]]
+            s_pompa, s_poziom = f"{opis['pompa']}.wlaczona", f"{zrodlo}.poziom"
+            granica = opis["granica"]
+            self.progi_alarmowe.append((s_poziom, granica))
+            return Alarm(opis["tag"], opis["opis"], (s_pompa, s_poziom),
+                         lambda w, aktywny: (not w[s_pompa]) and (w[s_poziom] > granica), **opcje)
+        kierunek = opis.get("kierunek", ">")
+        self.progi_alarmowe.append((opis["sygnal"], opis["granica"]))
+        if "martwa_strefa" in opis:
+            opcje["martwa_strefa"] = opis["martwa_strefa"]
+            ms = opis["martwa_strefa"] if kierunek == ">" else -opis["martwa_strefa"]
+            self.progi_alarmowe.append((opis["sygnal"], opis["granica"] - ms))
+        return Alarm.prog(opis["tag"], opis["opis"], opis["sygnal"], opis["granica"],
+                          kierunek, **opcje)
 
     def ustaw_parametry_startowe(
         self,
@@ -274,113 +289,250 @@ class ModelInstalacji:
         pompa_on: bool, grzalka_on: bool,
         temp_start: float
     ) -> None:
-        self.z1.ustaw_ilosc(self.z1.pojemnosc * z1_proc / 100.0)
-        self.z2.ustaw_ilosc(self.z2.pojemnosc * z2_proc / 100.0)
-        self.z3.ustaw_ilosc(self.z3.pojemnosc * z3_proc / 100.0)
-        self.z4.ustaw_ilosc(self.z4.pojemnosc * z4_proc / 100.0)
+        """Parametry z dialogu startowego (Z1..Z4 = kolejne zbiorniki z konfiguracji)."""
+        self.ustaw_stan_poczatkowy(
+            [z1_proc, z2_proc, z3_proc, z4_proc],
+            predkosc_pompy, moc_grzalki, pompa_on, grzalka_on, temp_start,
+        )
+
+    def ustaw_stan_poczatkowy(
+        self,
+        poziomy_proc: Sequence[float],
+        predkosc_pompy: float, moc_grzalki: float,
+        pompa_on: bool, grzalka_on: bool,
+        temp_start: float
+    ) -> None:
+        """Poziomy [%] kolejnych zbiorników (brakujące bez zmian), ustawienia wszystkich pomp i grzałek."""
+        self.sygnaly.teraz = 0.0
+        for z, proc in zip(self.zbiorniki, poziomy_proc):
+            z.ustaw_ilosc(z.pojemnosc * proc / 100.0)
 
         for z in self.zbiorniki:
             z.temperatura.wartosc = float(temp_start)
 
-        self.pompa.predkosc.wartosc = float(predkosc_pompy)
-        self.pompa.wlaczona.wartosc = bool(pompa_on)
+        for p in self.pompy:
+            p.predkosc.wartosc = float(predkosc_pompy)
+            p.wlaczona.wartosc = bool(pompa_on)
 
-        self.grzalka.moc.wartosc = float(moc_grzalki)
-        self.grzalka.wlaczona.wartosc = bool(grzalka_on)
+        for g in self.grzalki:
+            g.moc.wartosc = float(moc_grzalki)
+            g.wlaczona.wartosc = bool(grzalka_on)
 
         self.t = 0.0
         self._akum_probki = 0.0
-        self.historia.clear()
-        for k in self._hold:
-            self._hold[k] = 0.0
-
-    def krok(self, dt: float) -> None:
-        self.t += dt
-        self.pompa.krok_animacji(dt)
-
-        # przepływ z pompy
-        przeplyw = 0.0
-        if self.pompa.wlaczona.wartosc and (not self.z1.czy_pusty()):
-            przeplyw = self.bazowy_przeplyw * self.pompa.predkosc.wartosc
-
-        # Z1 -> pompa -> T
-        ile_z_z1 = self.z1.zabierz(przeplyw * dt) if przeplyw > 0 else 0.0
-
-        # rozdział w T na Z2 i Z3 wg wolnego miejsca
-        wolne_z2 = max(0.0, self.z2.pojemnosc - self.z2.ilosc)
-        wolne_z3 = max(0.0, self.z3.pojemnosc - self.z3.ilosc)
-        suma = wolne_z2 + wolne_z3
-
-        do_z2 = do_z3 = 0.0
-        if ile_z_z1 > 0 and suma > 0:
-            udzial_z2 = wolne_z2 / suma
-            do_z2 = self.z2.dodaj(ile_z_z1 * udzial_z2)
-            do_z3 = self.z3.dodaj(ile_z_z1 - do_z2)
-
-        # spływ do Z4
-        graw = 7.0 * dt
-        z2_do_z4 = self.z2.zabierz(graw) if self.z2.ilosc > 2.0 else 0.0
-        z3_do_z4 = self.z3.zabierz(graw) if self.z3.ilosc > 2.0 else 0.0
-        self.z4.dodaj(z2_do_z4 + z3_do_z4)
-
-        # powrót zależny od poziomu Z4 (stabilizacja bilansu)
-        powrot_na_s = 8.0 + 20.0 * self.z4.poziom.wartosc
-        z4_do_z1 = self.z4.zabierz(powrot_na_s * dt) if self.z4.ilosc > 1.0 else 0.0
-        self.z1.dodaj(z4_do_z1)
-
-        # przelew awaryjny (żeby nie dobijać do 100%)
-        if self.z4.poziom.wartosc > 0.97:
-            self.z4.zabierz(25.0 * dt)
-
-        # grzanie Z3 + chłodzenie do otoczenia
-        if self.grzalka.wlaczona.wartosc and self.z3.poziom.wartosc > 0.10:
-            self.z3.temperatura.wartosc += (2.5 * self.grzalka.moc.wartosc) * dt
-
-        for z in self.zbiorniki:
-            z.temperatura.wartosc += (self.temp_otoczenia - z.temperatura.wartosc) * (0.08 * dt)
-
-        # anty-miganie rur (podtrzymanie)
-        HOLD = 0.30
-        PROG = 0.05
-
-        def podtrzymaj(key: str, warunek: bool) -> bool:
-            if warunek:
-                self._hold[key] = HOLD
-            else:
-                self._hold[key] = max(0.0, self._hold[key] - dt)
-            return self._hold[key] > 0.0
-
-        plynie_z1p = podtrzymaj("z1p", ile_z_z1 > PROG)
-        plynie_pT = podtrzymaj("pT", ile_z_z1 > PROG)
-        plynie_Tz2 = podtrzymaj("Tz2", do_z2 > PROG)
-        plynie_Tz3 = podtrzymaj("Tz3", do_z3 > PROG)
-        plynie_z2z4 = podtrzymaj("z2z4", z2_do_z4 > PROG)
-        plynie_z3z4 = podtrzymaj("z3z4", z3_do_z4 > PROG)
-        plynie_z4z1 = podtrzymaj("z4z1", z4_do_z1 > PROG)
-
-        self.rura_z1_do_pompy.ustaw_przeplyw(plynie_z1p)
-        self.rura_pompa_do_T.ustaw_przeplyw(plynie_pT)
-        self.rura_T_do_z2.ustaw_przeplyw(plynie_Tz2)
-        self.rura_T_do_z3.ustaw_przeplyw(plynie_Tz3)
-        self.rura_z2_do_z4.ustaw_przeplyw(plynie_z2z4)
-        self.rura_z3_do_z4.ustaw_przeplyw(plynie_z3z4)
-        self.rura_z4_do_z1.ustaw_przeplyw(plynie_z4z1)
-
-        # alarmy
-        for a in self.alarmy:
-            a.aktualizuj()
-
+        self.historia.wyczysc()
+        self.graf.wyczysc_przeplywy()
+        for r in self.rury:
+            r.ustaw_przeplyw(False)
+        self.silnik_alarmow.resetuj()
+        self.sygnaly.oznacz_wszystkie()     # silnik alarmów zapomniał wartości
+
+    def sygnaly_alarmowe(self) -> Dict[str, float]:
+        return {nazwa: s.wartosc for nazwa, s in self._sygnaly_alarmowe.items()}
+
+    def aktualizuj_alarmy(self) -> None:
+        """Alarmy dostają sygnały, które mogły przełączyć warunek (timery - zawsze).
+
+        Sygnał analogowy idzie do silnika tylko wtedy, gdy wyszedł z przedziału
+        między progami, w którym leżała ostatnio przekazana wartość - inaczej
+        żaden warunek się nie przełączy (każdy alarm modelu porównuje sygnał
+        z progami z progi_alarmowe). Przedziały są ważne dla jednego słownika
+        wartości silnika - po resetuj() / wczytaj_stan() liczą się od nowa.
+        Dwustanowe - gdy zmieniły się w tym skanie."""
+        b = self.sygnaly
+        w = b.wartosci
+        przedzialy = self._przedzialy
+        if self.silnik_alarmow.wartosci is not self._znane:
+            self._znane = self.silnik_alarmow.wartosci
+            przedzialy[:] = [_BEZ_PRZEDZIALU] * len(przedzialy)
+        odczyty = {}
+        for i, nazwa, progi, k in self._alarmowe_analogowe:
+            v = w[i]
+            dolny, gorny = przedzialy[k]
+            if dolny < v < gorny:
+                continue
+            odczyty[nazwa] = v
+            przedzialy[k] = _przedzial(v, progi)
+        sk, n = b.skan_zmiany, b.skan
+        for i, nazwa in self._alarmowe_logiczne:
+            if sk[i] == n:
+                odczyty[nazwa] = w[i] != 0.0
+        self.silnik_alarmow.aktualizuj(self.t, odczyty)
+
+    def _do_grafu(self) -> None:
+        """Stan obiektów -> tablice grafu (nastawy mogły się zmienić z GUI)."""
+        g = self.graf
+        b = self.sygnaly
+        g.pompa_on[:] = b.odczytaj(self._sloty_pomp)
+        g.predkosc[:] = b.odczytaj(self._sloty_predkosci)
+        g.grzalka_on[:] = b.odczytaj(self._sloty_grzalek)
+        g.moc[:] = b.odczytaj(self._sloty_mocy)
+        g.ilosc[:] = self.ilosci
+        g.temperatura[:] = b.odczytaj(self._sloty_temperatury)
+
+    def _zapisz_wynik(self, temperatury: List[float], plynie: List[float], przeplyw: List[float]) -> None:
+        """Wynik kroku -> baza sygnałów (poziomy z self.ilosci, temperatury, rury) jednym zapisem."""
+        wynik = list(map(truediv, self.ilosci, self._pojemnosci))
+        wynik += temperatury
+        wynik += plynie
+        wynik += przeplyw
+        self.sygnaly.zapisz(self._sloty_wyniku, wynik)
+
+    def _probkuj(self, dt: float) -> None:
         # trendy (co 0.2 s)
         self._akum_probki += dt
         if self._akum_probki >= 0.2:
             self._akum_probki = 0.0
-            self.historia.append((
-                self.t,
-                self.z1.poziom.wartosc,
-                self.z2.poziom.wartosc,
-                self.z3.poziom.wartosc,
-                self.z4.poziom.wartosc,
-                self.z3.temperatura.wartosc
-            ))
-            if len(self.historia) > 600:
-                self.historia = self.historia[-600:]
+            self.dopisz_probke(self.t, *self.probka())
+
+    def probka(self) -> List[float]:
+        """Bieżące wartości sygnałów trendów (kolejność jak w historii)."""
+        return self.sygnaly.odczytaj(self._sloty_trendow)
+
+    def dopisz_probke(self, t: float, *probka: float) -> None:
+        """Próbka trendów do historii i rejestratorów (też próbki z symulacji w tle)."""
+        self.historia.dopisz(t, *probka)
+        for r in self.rejestratory:
+            r.dopisz(t, *probka)
+
+    def krok(self, dt: float) -> None:
+        if self.calkowanie is not None:
+            self.symuluj_do(self.t + dt)
+            return
+
+        self.t += dt
+        self.sygnaly.teraz = self.t
+        g = self.graf
+        for p in self.pompy:
+            p.krok_animacji(dt)
+
+        # bilans masy i ciepła na grafie
+        if g.skalarny:
+            # mała instalacja: listy prosto z modelu i bazy sygnałów, bez tablic NumPy
+            # (tablice ilosc / temperatura grafu odświeża dopiero _do_grafu())
+            we = list(self._wejscia(self.sygnaly.wartosci))
+            przeplyw, plynie = g.krok_listy(dt, self.ilosci, we)
+            T = we[:g.n]
+        else:
+            self._do_grafu()
+            g.krok(dt)
+            self.ilosci[:] = g.ilosc.tolist()
+            T = g.temperatura.tolist()
+            przeplyw = g.przeplyw_rur.tolist()
+            plynie = [1.0 if h > 0.0 else 0.0 for h in g.hold.tolist()]
+
+        # wynik -> baza (rysowanie, alarmy, trendy)
+        self._zapisz_wynik(T, plynie, [q / dt for q in przeplyw])
+
+        # alarmy (silnik sprawdza tylko te, których sygnały się zmieniły)
+        self.aktualizuj_alarmy()
+        self._probkuj(dt)
+        self.sygnaly.koniec_skanu()
+
+    def symuluj_do(self, t_koniec: float, calkowanie: Optional[Calkowanie] = None) -> StatystykiCalkowania:
+        """Całkowanie postaci ciągłej do t_koniec (metoda: argument, self.calkowanie albo "auto").
+
+        Krok może mieć minuty, a mimo to progi (przelew, blokada grzałki, progi
+        i strefy martwe alarmów) są trafiane z dokładnością tol_czasu, krok nie
+        przeskakuje też timerów alarmów - czasy w dzienniku alarmów są dokładne.
+        Trendy dostają co najwyżej jedną próbkę na krok całkowania.
+
+        Wynik różni się od kroków krok(dt) o błąd Eulera O(dt): na progach
+        (pompa nad pustym źródłem, spływ ponad minimum) krok dyskretny zabiera
+        co krok całą porcję i poziom "miga" nad progiem, a tu stoi na progu -
+        w domyślnym scenariuszu Z1 ustala się na 0.001 zamiast ~0.003 (dt = 0.02),
+        Z4 na 0.300 zamiast 0.297. Przy mniejszym dt krok(dt) zbiega do tego
+        wyniku (test_calkowanie.py). Doba domyślnej instalacji ("auto") to
+        ~1500 kroków i ~3600 wywołań pochodnych, rzędu 0.3 s."""
+        c = calkowanie or self.calkowanie or Calkowanie()
+        g = self.graf
+        self._do_grafu()
+        if self._uklad is None:
+            self._uklad = UkladCiagly(g, self.progi_alarmowe)
+        uklad = self._uklad
+        n = g.n
+
+        def po_kroku(t, y, zdarzenia):
+            dt = t - self.t
+            self.t = t
+            self.sygnaly.teraz = t
+            for p in self.pompy:
+                p.krok_animacji(dt)
+            strumienie = uklad.przeplyw_rur(y).tolist()
+            self.ilosci[:] = y[:n].tolist()
+            self._zapisz_wynik(y[n:].tolist(), [1.0 if q > 0.0 else 0.0 for q in strumienie],
+                               strumienie)
+            self.aktualizuj_alarmy()
+            self._probkuj(dt)
+            self.sygnaly.koniec_skanu()
+
+        y, stat = c.calkuj(uklad, self.t, t_koniec, np.concatenate((g.ilosc, g.temperatura)),
+                           po_kroku, self.silnik_alarmow.najblizszy_termin)
+        g.ilosc[:] = y[:n]
+        g.temperatura[:] = y[n:]
+        return stat
+
+    # --- migawka (migawka.py) ---
+    def migawka(self, historia: bool = True) -> Migawka:
+        """Pełny stan: ilości, temperatury, nastawy, kąt pomp, timery rur, alarmy,
+        czas i (opcjonalnie) historia trendów. Wznowienie z migawki daje ten sam
+        przebieg co symulacja bez przerwy."""
+        g = self.graf
+        self._do_grafu()
+        m = Migawka("model", dict(
+            konfiguracja=odcisk(g.konfiguracja),
+            t=self.t,
+            akum_probki=self._akum_probki,
+            zbiorniki=g.nazwy_zbiornikow,
+            rury=g.id_rur,
+        ))
+        for nazwa in ("ilosc", "temperatura", "pompa_on", "predkosc", "grzalka_on", "moc",
+                      "hold", "przeplyw_rur", "pojemnosc"):
+            m[nazwa] = getattr(g, nazwa)
+        m["kat"] = [p._kat for p in self.pompy]
+        m["plynie"] = np.array([r.czy_plynie for r in self.rury], dtype=bool)
+        if self.calkowanie is not None:
+            # krok adaptacyjny i metoda "auto" przechodzą na kolejne wywołania
+            m.opis["calkowanie"] = dict(metoda=self.calkowanie.metoda.nazwa, h=self.calkowanie._h_adapt)
+        self.sygnaly.zapisz_stan(m)
+        self.silnik_alarmow.zapisz_stan(m)
+        if historia:
+            self.historia.zapisz_stan(m)
+        return m
+
+    def przywroc(self, m: Migawka) -> None:
+        """Stan z migawki (tej samej instalacji). Bez historii w migawce historia jest czyszczona."""
+        m.sprawdz_rodzaj("model")
+        g = self.graf
+        if m.opis["konfiguracja"] != odcisk(g.konfiguracja):
+            raise ValueError("migawka z innej konfiguracji instalacji")
+        for nazwa in ("ilosc", "temperatura", "pompa_on", "predkosc", "grzalka_on", "moc",
+                      "hold", "przeplyw_rur"):
+            getattr(g, nazwa)[:] = m[nazwa]
+        self.ilosci[:] = g.ilosc.tolist()   # poziomy i temperatury - z bazy sygnałów niżej
+        for p, wlaczona, predkosc, kat in zip(self.pompy, g.pompa_on.tolist(), g.predkosc.tolist(),
+                                              m["kat"].tolist()):
+            p.wlaczona.wartosc = wlaczona
+            p.predkosc.wartosc = predkosc
+            p._kat = kat
+        for h, wlaczona, moc in zip(self.grzalki, g.grzalka_on.tolist(), g.moc.tolist()):
+            h.wlaczona.wartosc = wlaczona
+            h.moc.wartosc = moc
+        for r, plynie in zip(self.rury, m["plynie"].tolist()):
+            r.czy_plynie = plynie
+
+        self.t = m.opis["t"]
+        self._akum_probki = m.opis["akum_probki"]
+        stan = m.opis.get("calkowanie")
+        if stan is not None and self.calkowanie is not None:
+            c = self.calkowanie
+            c._h_adapt = stan["h"]
+            if c.auto:
+                c.metoda = METODY[stan["metoda"]]()
+
+        self.sygnaly.wczytaj_stan(m)
+        self.silnik_alarmow.wczytaj_stan(m)
+        if "historia" in m.opis:
+            self.historia.wczytaj_stan(m)
+        else:
+            self.historia.wyczysc()
@@ -0,0 +1,161 @@
+"""
+odtwarzanie.py
+Zapis pełnego stanu instalacji do archiwum i jego odtwarzanie (tempo, przewijanie).
+
+RejestratorStanu dopisuje przy każdej próbce trendów wszystkie nazwane
+sygnały bazy (poziomy, temperatury, pompy, grzałki, przepływy w rurach)
+do archiwum historian.py - w podkatalogu KATALOG_STANU archiwum trendów.
+
+Odtwarzanie wczytuje taki zapis do osobnego modelu tej samej instalacji:
+postep(dt) przesuwa czas z zadanym tempem, przewin(t) skacze w dowolne
+miejsce. Wiersz dla czasu t znajduje indeks czasu archiwum (rzadki indeks
++ wyszukiwanie binarne w jednym bloku), a memmap czyta tylko potrzebne
+strony - przewijanie wielogodzinnego zapisu jest natychmiastowe. Trendy
+dostają próbki odtwarzanego zakresu (po przewinięciu: ostatnie
+OKNO_HISTORII sekund), alarmy są liczone od nowa z odtwarzanych sygnałów.
+
+    python odtwarzanie.py archiwum/20260101_120000
+"""
+
+from __future__ import annotations
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+
+from historian import CzytnikArchiwum, Historian
+
+KATALOG_STANU = "stan"
+OKNO_HISTORII = 300.0        # [s] trendy odbudowywane przy przewinięciu
+BLOK_TRENDOW = 4096          # wierszy czytanych naraz przy dopisywaniu trendów
+
+
+class RejestratorStanu:
+    """Rejestrator modelu: przy każdej próbce trendów wszystkie nazwane sygnały do archiwum."""
+
+    def __init__(self, model, katalog: str, **kwargs):
+        self.baza = model.sygnaly
+        self.sloty = [i for i, n in enumerate(self.baza.nazwy) if n]
+        self.historian = Historian(katalog, sygnaly=[self.baza.nazwy[i] for i in self.sloty], **kwargs)
+        self.katalog = katalog
+
+    def dopisz(self, t: float, *probka: float) -> None:
+        self.historian.dopisz(t, *self.baza.odczytaj(self.sloty))
+
+    def zamknij(self) -> None:
+        self.historian.zamknij()
+
+
+def katalog_stanu(katalog: str) -> str:
+    """Archiwum stanu: <katalog>/stan albo sam katalog."""
+    stan = os.path.join(katalog, KATALOG_STANU)
+    return stan if os.path.isdir(stan) else katalog
+
+
+class Odtwarzanie:
+    """Zapis stanu odtwarzany do modelu (ModelInstalacji tej samej instalacji)."""
+
+    def __init__(self, model, katalog: str):
+        self.model = model
+        self.czytnik = CzytnikArchiwum(katalog_stanu(katalog))
+        if not len(self.czytnik):
+            raise ValueError(f"{self.czytnik.katalog}: pusty zapis")
+        baza = model.sygnaly
+        brak = [s for s in self.czytnik.sygnaly if s not in baza]
+        if brak:
+            raise ValueError(f"zapis innej instalacji (brak sygnałów: {', '.join(brak)})")
+        self.sloty = [baza.slot(s) for s in self.czytnik.sygnaly]
+        kolumna = {s: j for j, s in enumerate(self.czytnik.sygnaly)}
+        zrodla = model.graf.konfiguracja.get("trendy", {}).values()
+        # trendy tylko gdy zapis ma wszystkie ich sygnały
+        self._kolumny_trendow = [kolumna[s] for s in zrodla] if all(s in kolumna for s in zrodla) else []
+
+        self.tempo = 1.0
+        self.gra = False
+        self.t = self.poczatek
+        self._wiersz = 0            # pierwszy wiersz jeszcze nieodtworzony
+        self.przewin(self.poczatek)
+
+    @property
+    def poczatek(self) -> float:
+        return self.czytnik.poczatek()
+
+    @property
+    def koniec(self) -> float:
+        return self.czytnik.koniec()
+
+    def przewin(self, t: float) -> None:
+        """Stan z chwili t (ostatni zapisany wiersz <= t), trendy z OKNO_HISTORII przed t."""
+        cz = self.czytnik
+        m = self.model
+        self.t = min(max(t, self.poczatek), self.koniec)
+        i = cz.wiersz(self.t, "right")
+        m.historia.wyczysc()
+        self._dopisz_trendy(cz.wiersz(self.t - OKNO_HISTORII, "left"), i)
+        m.silnik_alarmow.resetuj()
+        m.sygnaly.oznacz_wszystkie()     # silnik alarmów zapomniał wartości
+        self._wiersz = i
+        self._ustaw(i - 1, 0.0)
+
+    def postep(self, dt: float) -> bool:
+        """dt [s] czasu ściennego razy tempo; zwraca True, gdy stan się zmienił."""
+        if not self.gra:
+            return False
+        cz = self.czytnik
+        t = min(self.t + dt * self.tempo, self.koniec)
+        krok = t - self.t
+        self.t = t
+        i = cz.wiersz(t, "right")
+        if i > self._wiersz:
+            self._dopisz_trendy(max(self._wiersz, cz.wiersz(t - OKNO_HISTORII, "left")), i)
+            self._wiersz = i
+        self._ustaw(i - 1, krok)
+        if t >= self.koniec:
+            self.gra = False
+        return True
+
+    def _dopisz_trendy(self, a: int, b: int) -> None:
+        if not self._kolumny_trendow:
+            return
+        cz = self.czytnik
+        dopisz = self.model.historia.dopisz
+        for p in range(a, b, BLOK_TRENDOW):
+            k = min(p + BLOK_TRENDOW, b)
+            t = np.asarray(cz.t[p:k]).tolist()
+            kolumny = [np.asarray(cz.kolumny[j][p:k], dtype=np.float64).tolist() for j in self._kolumny_trendow]
+            for wiersz in zip(t, *kolumny):
+                dopisz(*wiersz)
+
+    def _ustaw(self, i: int, dt: float) -> None:
+        m = self.model
+        m.t = self.t
+        m.sygnaly.teraz = self.t
+        if i >= 0:
+            m.sygnaly.zapisz(self.sloty, [float(k[i]) for k in self.czytnik.kolumny])
+        for p in m.pompy:
+            p.krok_animacji(dt)
+        m.aktualizuj_alarmy()
+        m.sygnaly.koniec_skanu()
+
+
+def main(argv: Optional[list] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("użycie: python odtwarzanie.py <katalog archiwum>", file=sys.stderr)
+        return 2
+    from PyQt5.QtWidgets import QApplication
+    from okno_glowne import OknoOdtwarzania
+
+    app = QApplication(sys.argv[:1])
+    try:
+        okno = OknoOdtwarzania(argv[0])
+    except (OSError, ValueError) as blad:
+        print(f"błąd: {blad}", file=sys.stderr)
+        return 1
+    okno.show()
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,23 +4,92 @@ GUI: ekran instalacji + alarmy + trendy (matplotlib) + dialog startowy.
 
 Poprawka: zakładki (Instalacja/Alarmy/Trendy) i tabela alarmów mają jasne tło
 oraz czarny tekst, żeby wszystko było czytelne.
+
+Szybki start: synoptyka (Instalacja) jest budowana od razu, zakładki Alarmy
+i Trendy dopiero przy pierwszym otwarciu (ZakladkaLeniwa); matplotlib,
+flota, serwer tagów i symulacja w tle są importowane dopiero, gdy są
+potrzebne. Fazy startu (profilowanie.START) trafiają do start.json
+w katalogu archiwum po pierwszym narysowaniu synoptyki i przy zamknięciu.
 """
 
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex, QRect, QStandardPaths
+from PyQt5.QtGui import QPainter, QColor, QFontDatabase, QFontMetrics, QKeySequence
 from PyQt5.QtWidgets import (
     QWidget, QMainWindow, QTabWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFormLayout, QDialog, QDialogButtonBox,
-    QDoubleSpinBox, QCheckBox, QTableWidget, QTableWidgetItem
+    QDoubleSpinBox, QCheckBox, QTableView, QHeaderView, QAbstractItemView,
+    QComboBox, QLabel, QFileDialog, QShortcut, QSlider
 )
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from functools import reduce
+from typing import Sequence, Tuple
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as Canvas
-from matplotlib.figure import Figure
-
+from alarmy import OPISY_STANOW, SilnikAlarmow, StanAlarmu
+from historian import CzytnikArchiwum, Historian
+from migawka import ROZSZERZENIE, Migawka
 from model import ModelInstalacji
+from odtwarzanie import KATALOG_STANU, Odtwarzanie, RejestratorStanu
+from pamiec import PamiecPrzebiegow
+from profilowanie import PROFILER, START, ProbkowanieStosu, PrzechwytywanieCProfile
+from rysowanie import ScenaFloty, ScenaInstalacji
+from zegar import ZegarSymulacji
+
+
+# tempo symulacji względem czasu rzeczywistego (None = najszybciej)
+TEMPA = [("x1", 1.0), ("x10", 10.0), ("x100", 100.0), ("max", None)]
+
+# odświeżanie widoków [Hz] - niezależne od kroku fizyki
+OKRES_RAMKI_MS = 16
+HZ_INSTALACJA = 60.0          # animacja przepływu w rurach - co ramkę
+HZ_ALARMY = 5.0
+HZ_TRENDY = 10.0
+
+# więcej brudnych prostokątów naraz -> jeden otaczający (łączenie regionu w Qt rośnie kwadratowo)
+MAKS_PROSTOKATOW = 64
+
+# archiwum trendów na dysku (każde uruchomienie w osobnym podkatalogu): SCADA_ARCHIWUM
+# albo katalog danych użytkownika (~/.local/share, %LOCALAPPDATA%...), nie katalog bieżący
+KATALOG_ARCHIWUM = os.environ.get("SCADA_ARCHIWUM") or os.path.join(
+    QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation) or os.path.expanduser("~"),
+    "mini_scada", "archiwum")
+# zapis przy zmianie: poziomy (0..1) i temperatura - poniżej rozdzielczości wykresów
+MARTWA_STREFA_ARCHIWUM = 1e-4
+
+# trendy: szerokość okna czasu i skok przesuwania osi [s]
+TRENDY_OKNO_X = 120.0
+TRENDY_SKOK_X = 20.0
+
+# profiler: SCADA_PROFIL=1 włącza pomiary i zrzut do archiwum od startu;
+# F2 pomiary, F3 nakładka, F5 zrzut co OKRES_ZRZUTU s, F9 cProfile, F10 próbkowanie stosu
+PROFIL_OD_STARTU = os.environ.get("SCADA_PROFIL", "") not in ("", "0")
+
+# fazy startu (profilowanie.START) w katalogu archiwum; przy SCADA_PROFIL=1 także na stderr
+PLIK_STARTU = "start.json"
+
+# gdzie liczy się model: "gui" (w pętli zdarzeń), "watek" albo "proces" (symulacja_w_tle.py)
+TRYB_SYMULACJI = os.environ.get("SCADA_TRYB", "gui")
+
+# serwer tagów (serwer_tagow.py) na tym porcie; puste = wyłączony
+PORT_SERWERA = os.environ.get("SCADA_SERWER", "")
+HZ_NAKLADKA = 2.0
+OKRES_ZRZUTU = 5.0
+
+# podgląd w dialogu startowym: pamięć przebiegów (pamiec.py) w RAM i w tym katalogu archiwum
+KATALOG_PAMIECI = "pamiec"
+OPOZNIENIE_PODGLADU_MS = 150
+
+# migawki stanu: Ctrl+S zapis do katalogu archiwum, Ctrl+O wczytanie (też z dialogu startowego)
+FILTR_MIGAWEK = f"Migawki (*{ROZSZERZENIE})"
 
 
 class DialogStartowy(QDialog):
+    # pamięć wspólna dla kolejnych dialogów (np. po wczytaniu migawki)
+    _pamiec = None
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Parametry startowe")
@@ -52,15 +121,57 @@ class DialogStartowy(QDialog):
         form.addRow(self.pompa_on)
         form.addRow(self.grzalka_on)
 
+        # podgląd przebiegu dla bieżących parametrów (pamięć / interpolacja / symulacja) -
+        # dopiero po zmianie pola: otwarcie dialogu nie liczy i nie zakłada <archiwum>/pamiec
+        self.lbl_podglad = QLabel("Podgląd przebiegu po zmianie parametrów.")
+        self._opoznienie = QTimer(self)
+        self._opoznienie.setSingleShot(True)
+        self._opoznienie.timeout.connect(self.odswiez_podglad)
+        for pole in (self.z1, self.z2, self.z3, self.z4, self.predkosc, self.moc, self.temp):
+            pole.valueChanged.connect(lambda _: self._opoznienie.start(OPOZNIENIE_PODGLADU_MS))
+        for pole in (self.pompa_on, self.grzalka_on):
+            pole.toggled.connect(lambda _: self._opoznienie.start(OPOZNIENIE_PODGLADU_MS))
+
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)
         buttons.rejected.connect(self.reject)
 
+        # start z zapisanego stanu zamiast z parametrów
+        self.plik_migawki = ""
+        btn_migawka = buttons.addButton("Z migawki...", QDialogButtonBox.ActionRole)
+        btn_migawka.clicked.connect(self.wybierz_migawke)
+
         lay = QVBoxLayout()
         lay.addLayout(form)
+        lay.addWidget(self.lbl_podglad)
         lay.addWidget(buttons)
         self.setLayout(lay)
 
+    @classmethod
+    def pamiec(cls) -> PamiecPrzebiegow:
+        if cls._pamiec is None:
+            cls._pamiec = PamiecPrzebiegow(katalog=os.path.join(KATALOG_ARCHIWUM, KATALOG_PAMIECI))
+        return cls._pamiec
+
+    def odswiez_podglad(self):
+        wynik, zrodlo = self.pamiec().podglad(self.pobierz())
+        poziomy, temperatury = wynik.koncowe()
+        ustalenie = wynik.czas_ustalenia()
+        alarmy = wynik.pierwsze_alarmy()
+        self.lbl_podglad.setText(
+            f"Po {wynik.t[-1]:.0f} s ({zrodlo}): "
+            + "  ".join(f"Z{i + 1} {p * 100:.0f}%" for i, p in enumerate(poziomy))
+            + f"\nT3 maks. {wynik.temperatury[2].max():.1f}°C, końcowa {temperatury[2]:.1f}°C; "
+            + ("nie ustala się" if math.isnan(ustalenie) else f"ustalony po {ustalenie:.0f} s")
+            + "\nAlarmy: " + (", ".join(f"{tag} po {t:.0f} s" for tag, t in alarmy.items()) or "brak")
+        )
+
+    def wybierz_migawke(self):
+        plik, _ = QFileDialog.getOpenFileName(self, "Migawka stanu", KATALOG_ARCHIWUM, FILTR_MIGAWEK)
+        if plik:
+            self.plik_migawki = plik
+            self.accept()
+
     def pobierz(self):
         return dict(
             z1_proc=self.z1.value(),
@@ -79,37 +190,158 @@ class EkranInstalacji(QWidget):
     def __init__(self, model: ModelInstalacji):
         super().__init__()
         self.model = model
+        self.scena = ScenaInstalacji(model)
+        # wywoływane raz, po pierwszym narysowaniu (koniec startu okna)
+        self.po_pierwszym_rysowaniu = None
         self.setMinimumSize(760, 520)
+        # całe tło rysuje scena - Qt nie musi czyścić widżetu
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def odswiez(self):
+        """Zgłasza do przerysowania tylko prostokąty, w których coś się zmieniło."""
+        brudne = self.scena.brudne()
+        if len(brudne) > MAKS_PROSTOKATOW:
+            self.update(reduce(QRect.united, brudne))
+            return
+        for r in brudne:
+            self.update(r)
+
+    def resizeEvent(self, e):
+        self.scena.uniewaznij()
+        super().resizeEvent(e)
 
     def paintEvent(self, e):
-        p = QPainter(self)
-        p.setRenderHint(QPainter.Antialiasing)
-        p.fillRect(self.rect(), QColor(34, 34, 34))
+        with PROFILER.etap("instalacja.paint"):
+            p = QPainter(self)
+            p.setRenderHint(QPainter.Antialiasing)
+            self.scena.rysuj(p, e.rect(), self.size(), self.devicePixelRatioF())
+            p.end()
+        if self.po_pierwszym_rysowaniu is not None:
+            wywolaj, self.po_pierwszym_rysowaniu = self.po_pierwszym_rysowaniu, None
+            wywolaj()
+
 
-        # rury pod spodem
-        for r in self.model.rury:
-            r.rysuj(p)
+class ZakladkaLeniwa(QWidget):
+    """Zakładka, której ekran powstaje dopiero przy pierwszym pokazaniu (fabryka())."""
 
-        # elementy
-        for z in self.model.zbiorniki:
-            z.rysuj(p)
+    def __init__(self, nazwa: str, fabryka):
+        super().__init__()
+        self.nazwa = nazwa
+        self.fabryka = fabryka
+        self.ekran = None
+        lay = QVBoxLayout(self)
+        lay.setContentsMargins(0, 0, 0, 0)
 
-        self.model.pompa.rysuj(p)
-        self.model.grzalka.rysuj(p)
+    def zbuduj(self) -> QWidget:
+        if self.ekran is None:
+            with START.faza(f"zakładka {self.nazwa}"):
+                self.ekran = self.fabryka()
+                self.layout().addWidget(self.ekran)
+        return self.ekran
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self.zbuduj()
+
+
+class ModelTabeliAlarmow(QAbstractTableModel):
+    """Tabela alarmów jako model Qt - widok pyta tylko o widoczne komórki,
+    a po zmianie stanu sygnalizowane są tylko zmienione wiersze."""
+
+    KOLUMNY = ["Tag", "Opis", "Stan", "Zmiana [s]"]
+    KOLOR_AKTYWNY = QColor(255, 200, 200)
+    KOLOR_NIEPOTW = QColor(255, 240, 190)
+    KOLOR_ZAWIESZONY = QColor(220, 220, 220)
+
+    def __init__(self, silnik: SilnikAlarmow, parent=None):
+        super().__init__(parent)
+        self.silnik = silnik
+        self._wiersz = {}         # tag -> numer wiersza
+        self._wersja = 0
+        self._resety = 0
+        self._przebuduj()
+
+    def _przebuduj(self):
+        self._wiersz = {a.tag: i for i, a in enumerate(self.silnik.alarmy)}
+        self._wersja = self.silnik.wersja
+        self._resety = self.silnik.resety
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.silnik.alarmy)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.KOLUMNY)
+
+    def headerData(self, sekcja, orientacja, rola=Qt.DisplayRole):
+        if rola == Qt.DisplayRole and orientacja == Qt.Horizontal:
+            return self.KOLUMNY[sekcja]
+        return None
+
+    def data(self, indeks, rola=Qt.DisplayRole):
+        a = self.silnik.alarmy[indeks.row()]
+        k = indeks.column()
+        if rola == Qt.DisplayRole:
+            if k == 0:
+                return a.tag
+            if k == 1:
+                return a.opis
+            if k == 2:
+                return a.opis_stanu()
+            return f"{a.czas_zmiany:.1f}" if a.stan != StanAlarmu.NORMALNY or a.zawieszony else ""
+        if rola == Qt.BackgroundRole:
+            if a.zawieszony:
+                return self.KOLOR_ZAWIESZONY
+            if a.aktywny:
+                return self.KOLOR_AKTYWNY
+            if not a.potwierdzony:
+                return self.KOLOR_NIEPOTW
+        return None
+
+    # --- aktualizacja ---
+    def odswiez(self) -> bool:
+        """Sygnalizuje zmienione wiersze; zwraca True, gdy przebudowano cały model."""
+        s = self.silnik
+        if len(s.alarmy) != len(self._wiersz):
+            self.beginResetModel()
+            self._przebuduj()
+            self.endResetModel()
+            return True
+        if s.wersja == self._wersja and s.resety == self._resety:
+            return False
+
+        tagi = s.tagi_zmienione_od(self._wersja) if s.resety == self._resety else None
+        self._wersja = s.wersja
+        self._resety = s.resety
+        ost = len(self.KOLUMNY) - 1
+        if tagi is None:
+            self.dataChanged.emit(self.index(0, 2), self.index(len(s.alarmy) - 1, ost))
+            return False
+        for tag in tagi:
+            w = self._wiersz[tag]
+            self.dataChanged.emit(self.index(w, 0), self.index(w, ost))
+        return False
 
 
 class EkranAlarmow(QWidget):
     def __init__(self, model: ModelInstalacji):
         super().__init__()
         self.model = model
+        # polecenie(nazwa, ...) symulacji w tle - akcje idą do niej, stan wraca klatkami
+        self.polecenie = None
 
-        self.tabela = QTableWidget(0, 3)
-        self.tabela.setHorizontalHeaderLabels(["Tag", "Opis", "Stan"])
+        self.model_tabeli = ModelTabeliAlarmow(model.silnik_alarmow, self)
+        self.tabela = QTableView()
+        self.tabela.setModel(self.model_tabeli)
         self.tabela.verticalHeader().setVisible(False)
+        self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # stała wysokość wierszy - przy tysiącach alarmów Qt nie mierzy każdego wiersza
+        self.tabela.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tabela.horizontalHeader().setStretchLastSection(True)
 
         # Czytelność: czarny tekst na białym tle + jasne nagłówki
         self.tabela.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 color: black;
                 gridline-color: #aaa;
@@ -122,69 +354,501 @@ class EkranAlarmow(QWidget):
             }
         """)
 
+        self.btn_potwierdz = QPushButton("Potwierdź")
+        self.btn_potwierdz.clicked.connect(self.potwierdz)
+        self.btn_potwierdz_wsz = QPushButton("Potwierdź wszystkie")
+        self.btn_potwierdz_wsz.clicked.connect(self.potwierdz_wszystkie)
+        self.btn_zawies = QPushButton("Zawieś / odwieś")
+        self.btn_zawies.clicked.connect(self.zawies)
+
+        bar = QHBoxLayout()
+        bar.addWidget(self.btn_potwierdz)
+        bar.addWidget(self.btn_potwierdz_wsz)
+        bar.addWidget(self.btn_zawies)
+        bar.addStretch(1)
+
         lay = QVBoxLayout()
+        lay.addLayout(bar)
         lay.addWidget(self.tabela)
         self.setLayout(lay)
 
+        self._dopasuj_kolumny()
+
+    def _dopasuj_kolumny(self):
+        # Tag/Opis zmieniają się tylko z listą alarmów; Stan ma stałą szerokość
+        # na najdłuższy możliwy opis, więc zmiany stanu nie wymagają mierzenia
+        self.tabela.resizeColumnToContents(0)
+        self.tabela.resizeColumnToContents(1)
+        fm = self.tabela.fontMetrics()
+        najdluzszy = max(list(OPISY_STANOW.values()) + ["ZAWIESZONY"], key=fm.horizontalAdvance)
+        self.tabela.setColumnWidth(2, fm.horizontalAdvance(najdluzszy) + 24)
+
+    def _zaznaczone(self):
+        wiersze = sorted({i.row() for i in self.tabela.selectionModel().selectedRows()})
+        return [self.model.silnik_alarmow.alarmy[w] for w in wiersze]
+
+    def _akcja(self, metoda: str, *tag):
+        if self.polecenie is not None:
+            self.polecenie("alarm", metoda, *tag)
+        else:
+            getattr(self.model.silnik_alarmow, metoda)(*tag, self.model.t)
+
+    def potwierdz(self):
+        for a in self._zaznaczone():
+            self._akcja("potwierdz", a.tag)
+        self.odswiez()
+
+    def potwierdz_wszystkie(self):
+        self._akcja("potwierdz_wszystkie")
+        self.odswiez()
+
+    def zawies(self):
+        for a in self._zaznaczone():
+            self._akcja("odwies" if a.zawieszony else "zawies", a.tag)
+        self.odswiez()
+
     def odswiez(self):
-        self.tabela.setRowCount(len(self.model.alarmy))
-        for i, a in enumerate(self.model.alarmy):
-            self.tabela.setItem(i, 0, QTableWidgetItem(a.tag))
-            self.tabela.setItem(i, 1, QTableWidgetItem(a.opis))
-            stan = "AKTYWNY" if a.aktywny else "OK"
-            self.tabela.setItem(i, 2, QTableWidgetItem(stan))
+        if self.model_tabeli.odswiez():
+            self._dopasuj_kolumny()
+
 
-        self.tabela.resizeColumnsToContents()
+def _opis_trendu(nazwa: str, sygnal: str) -> Tuple[str, float]:
+    """(etykieta, skala) linii trendu: poziom 0..1 w procentach, temperatura w °C."""
+    element, _, atrybut = sygnal.partition(".")
+    if atrybut == "poziom":
+        return f"{element} [%]", 100.0
+    if atrybut == "temperatura":
+        return f"{nazwa} [°C]", 1.0
+    return nazwa, 1.0
 
 
 class EkranTrendy(QWidget):
+    """Trendy: stałe obiekty Line2D, zmieniane są tylko ich dane.
+
+    Linie - po jednej na sygnał historii modelu (konfiguracja["trendy"]).
+    Osie przesuwają się skokowo, więc pełne rysowanie (osie, siatka, legenda)
+    jest potrzebne tylko przy zmianie zakresu - w pozostałych ramkach
+    przywracane jest zapamiętane tło i dorysowywane same linie (blitting).
+    """
+
     def __init__(self, model: ModelInstalacji):
         super().__init__()
         self.model = model
+        trendy = model.graf.konfiguracja.get("trendy", {})
+        self.sygnaly = model.historia.sygnaly
+        opisy = [_opis_trendu(n, trendy.get(n, n)) for n in self.sygnaly]
+        self.skale = [skala for _, skala in opisy]
+
+        # matplotlib dopiero przy pierwszym ekranie trendów - import trwa dłużej niż cały start okna
+        with START.faza("import matplotlib"):
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as Canvas
+            from matplotlib.figure import Figure
 
         self.fig = Figure()
         self.canvas = Canvas(self.fig)
         self.ax = self.fig.add_subplot(111)
 
+        self.ax.set_xlabel("t [s]")
+        self.ax.grid(True)
+        self.linie = [self.ax.plot([], [], label=e, animated=True)[0] for e, _ in opisy]
+        if self.linie:
+            self.ax.legend(loc="upper right")
+
+        self._tlo = None          # tło bez linii (do blittingu)
+        self._granice = None      # aktualne (xmin, xmax, ymax)
+        self._ostatnio = 0.0
+        self._narysowana = None   # (czas, liczba) najnowszej narysowanej próbki
+        self.canvas.mpl_connect("draw_event", self._po_rysowaniu)
+
+        # podgląd archiwum z dysku (historian) zamiast danych na żywo
+        self.archiwum = None
+        self.btn_archiwum = QPushButton("Archiwum...")
+        self.btn_archiwum.clicked.connect(self.wybierz_archiwum)
+        self.btn_na_zywo = QPushButton("Na żywo")
+        self.btn_na_zywo.clicked.connect(self.na_zywo)
+        self.btn_na_zywo.setEnabled(False)
+
+        bar = QHBoxLayout()
+        bar.addWidget(self.btn_archiwum)
+        bar.addWidget(self.btn_na_zywo)
+        bar.addStretch(1)
+
         lay = QVBoxLayout()
+        lay.addLayout(bar)
         lay.addWidget(self.canvas)
         self.setLayout(lay)
 
+    def _po_rysowaniu(self, event):
+        self._tlo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._rysuj_linie()
+
+    def _rysuj_linie(self):
+        for linia in self.linie:
+            self.ax.draw_artist(linia)
+
+    @staticmethod
+    def _granice_osi(t_ost: float, t_pierwszy: float, maks_y: float):
+        # oś czasu przesuwana co TRENDY_SKOK_X, oś Y (procenty, °C) rozszerzana co 20
+        xmax = (math.floor(t_ost / TRENDY_SKOK_X) + 1) * TRENDY_SKOK_X
+        xmin = max(min(t_pierwszy, xmax - TRENDY_SKOK_X), xmax - TRENDY_OKNO_X)
+        return (xmin, xmax, EkranTrendy._gorna_granica(maks_y))
+
+    @staticmethod
+    def _gorna_granica(maks_y: float) -> float:
+        return max(105.0, math.ceil((maks_y + 5.0) / 20.0) * 20.0)
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._ostatnio = 0.0
+        self._granice = None
+        self._narysowana = None
+        self.odswiez()
+
     def odswiez(self):
-        if not self.model.historia:
+        # zakładka niewidoczna, podgląd archiwum albo za wcześnie - nic nie rób
+        if not self.isVisible() or self.archiwum is not None or not self.model.historia:
+            return
+        teraz = time.perf_counter()
+        if teraz - self._ostatnio < 1.0 / HZ_TRENDY:
             return
+        self._ostatnio = teraz
+        # bez nowej próbki obraz byłby ten sam
+        historia = self.model.historia
+        najnowsza = (historia.najnowszy(), len(historia))
+        if najnowsza == self._narysowana:
+            return
+        self._narysowana = najnowsza
 
-        t = [x[0] for x in self.model.historia]
-        z1 = [x[1] * 100 for x in self.model.historia]
-        z2 = [x[2] * 100 for x in self.model.historia]
-        z3 = [x[3] * 100 for x in self.model.historia]
-        z4 = [x[4] * 100 for x in self.model.historia]
-        T3 = [x[5] for x in self.model.historia]
-
-        self.ax.clear()
-        self.ax.plot(t, z1, label="Z1 [%]")
-        self.ax.plot(t, z2, label="Z2 [%]")
-        self.ax.plot(t, z3, label="Z3 [%]")
-        self.ax.plot(t, z4, label="Z4 [%]")
-        self.ax.plot(t, T3, label="T3 [°C]")
-        self.ax.set_xlabel("t [s]")
-        self.ax.grid(True)
-        self.ax.legend(loc="upper right")
-        self.canvas.draw_idle()
+        dane = historia.ostatnie(TRENDY_OKNO_X)
+        if len(dane.t) == 0:
+            return
+        maks_y = self._ustaw_dane(dane, historia.sygnaly)
+        self._rysuj(self._granice_osi(dane.t[-1], dane.t[0], maks_y))
+
+    def _ustaw_dane(self, dane, sygnaly: Sequence[str]) -> float:
+        """Dane linii z wierszy przebiegu (w kolejności sygnaly, dopasowanie po nazwie);
+        zwraca największą wartość na wykresie - do granicy osi Y."""
+        wiersze = {n: i for i, n in enumerate(sygnaly)}
+        maks_y = 0.0
+        for nazwa, skala, linia in zip(self.sygnaly, self.skale, self.linie):
+            i = wiersze.get(nazwa)
+            if i is None:
+                linia.set_data([], [])
+                continue
+            linia.set_data(dane.t, dane.srednia[i] * skala)
+            maks_y = max(maks_y, float(dane.max[i].max()) * skala)
+        return maks_y
+
+    def _rysuj(self, granice):
+        if granice != self._granice or self._tlo is None:
+            self._granice = granice
+            xmin, xmax, ymax = granice
+            self.ax.set_xlim(xmin, xmax)
+            self.ax.set_ylim(-5.0, ymax)
+            with PROFILER.etap("trendy.rysuj"):
+                self.canvas.draw()      # pełne rysowanie -> _po_rysowaniu
+        else:
+            with PROFILER.etap("trendy.blit"):
+                self.canvas.restore_region(self._tlo)
+                self._rysuj_linie()
+                self.canvas.blit(self.fig.bbox)
+
+    # --- archiwum ---
+    def wybierz_archiwum(self):
+        katalog = QFileDialog.getExistingDirectory(self, "Archiwum trendów", KATALOG_ARCHIWUM)
+        if katalog:
+            self.pokaz_archiwum(CzytnikArchiwum(katalog))
+
+    def pokaz_archiwum(self, czytnik: CzytnikArchiwum):
+        """Cały zapis z archiwum (zredukowany do ~2000 punktów)."""
+        self.archiwum = czytnik
+        self.btn_na_zywo.setEnabled(True)
+        if len(czytnik) == 0:
+            return
+        dane = czytnik.zakres(czytnik.poczatek(), czytnik.koniec(), maks_punktow=2000)
+        ymax = self._gorna_granica(self._ustaw_dane(dane, czytnik.sygnaly))
+        self._rysuj((dane.t[0], max(dane.t[-1], dane.t[0] + 1.0), ymax))
+
+    def na_zywo(self):
+        self.archiwum = None
+        self.btn_na_zywo.setEnabled(False)
+        self._granice = None
+        self._ostatnio = 0.0
+        self._narysowana = None
+        self.odswiez()
+
+
+class NakladkaProfilera(QWidget):
+    """Półprzezroczysta tabelka z profilera w rogu okna (nie łapie myszy)."""
+
+    def __init__(self, parent: QWidget):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.czcionka = QFontDatabase.systemFont(QFontDatabase.FixedFont)
+        self.czcionka.setPointSize(9)
+        self.linie = []
+        self.hide()
+
+    def odswiez(self, linie):
+        self.linie = linie
+        fm = QFontMetrics(self.czcionka)
+        self.resize(max(fm.horizontalAdvance(l) for l in linie) + 16, fm.height() * len(linie) + 12)
+        self._ustaw()
+        self.update()
+
+    def _ustaw(self):
+        rodzic = self.parentWidget()
+        self.move(rodzic.width() - self.width() - 8, 40)
+        self.raise_()
+
+    def paintEvent(self, e):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor(0, 0, 0, 190))
+        p.setFont(self.czcionka)
+        p.setPen(QColor(120, 255, 120))
+        fm = p.fontMetrics()
+        for i, linia in enumerate(self.linie):
+            p.drawText(8, 6 + fm.height() * (i + 1) - fm.descent(), linia)
+        p.end()
+
+
+class OknoOdtwarzania(QWidget):
+    """Odtwarzanie zapisu stanu (odtwarzanie.py) w osobnym oknie: instalacja,
+    alarmy i trendy jak na żywo, tempo i suwak przewijania."""
+
+    TEMPA = [("x1", 1.0), ("x10", 10.0), ("x100", 100.0), ("x1000", 1000.0)]
+    PODZIALKA = 1000
+
+    def __init__(self, katalog: str, konfiguracja=None, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle(f"Odtwarzanie - {katalog}")
+        self.setStyleSheet("background-color: #222; color: white;")
+        self.model = ModelInstalacji(konfiguracja=konfiguracja)
+        self.odtwarzanie = Odtwarzanie(self.model, katalog)
+
+        self.ekran_inst = EkranInstalacji(self.model)
+        self.ekran_alarm = EkranAlarmow(self.model)
+        self.ekran_trend = EkranTrendy(self.model)
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.ekran_inst, "Instalacja")
+        self.tabs.addTab(self.ekran_alarm, "Alarmy")
+        self.tabs.addTab(self.ekran_trend, "Trendy")
+
+        self.btn_graj = QPushButton("Odtwarzaj / pauza")
+        self.btn_graj.clicked.connect(self.przelacz)
+        self.cb_tempo = QComboBox()
+        for nazwa, _ in self.TEMPA:
+            self.cb_tempo.addItem(nazwa)
+        self.cb_tempo.currentIndexChanged.connect(
+            lambda i: setattr(self.odtwarzanie, "tempo", self.TEMPA[i][1]))
+        self.suwak = QSlider(Qt.Horizontal)
+        self.suwak.setRange(0, self.PODZIALKA)
+        self.suwak.valueChanged.connect(self.przewin)
+        self.lbl_czas = QLabel()
+
+        bar = QHBoxLayout()
+        bar.addWidget(self.btn_graj)
+        bar.addWidget(QLabel("Tempo:"))
+        bar.addWidget(self.cb_tempo)
+        bar.addWidget(self.suwak, 1)
+        bar.addWidget(self.lbl_czas)
+        lay = QVBoxLayout(self)
+        lay.addLayout(bar)
+        lay.addWidget(self.tabs)
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.ramka)
+        self._ostatnia = time.perf_counter()
+        self._odswiez()
+
+    def przelacz(self):
+        o = self.odtwarzanie
+        if not o.gra and o.t >= o.koniec:
+            o.przewin(o.poczatek)
+        o.gra = not o.gra
+        self._ostatnia = time.perf_counter()
+        if o.gra:
+            self.timer.start(OKRES_RAMKI_MS)
+        else:
+            self.timer.stop()
+
+    def przewin(self, pozycja: int):
+        o = self.odtwarzanie
+        o.przewin(o.poczatek + (o.koniec - o.poczatek) * pozycja / self.PODZIALKA)
+        self._odswiez()
+
+    def ramka(self):
+        teraz = time.perf_counter()
+        dt, self._ostatnia = teraz - self._ostatnia, teraz
+        if self.odtwarzanie.postep(dt):
+            self._odswiez()
+        if not self.odtwarzanie.gra:
+            self.timer.stop()
+
+    def _odswiez(self):
+        o = self.odtwarzanie
+        self.ekran_inst.odswiez()
+        self.ekran_alarm.odswiez()
+        self.ekran_trend.odswiez()
+        self.lbl_czas.setText(f"t = {o.t:8.1f} / {o.koniec:.1f} s")
+        if not self.suwak.isSliderDown():
+            self.suwak.blockSignals(True)
+            dlugosc = max(o.koniec - o.poczatek, 1e-9)
+            self.suwak.setValue(round((o.t - o.poczatek) / dlugosc * self.PODZIALKA))
+            self.suwak.blockSignals(False)
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        super().closeEvent(e)
+
+
+class EkranFloty(QWidget):
+    """Flota instalacji (ScenaFloty): kółko myszy - skala, przeciąganie - przesuwanie,
+    podwójne kliknięcie - kafel w pełnych szczegółach albo z powrotem cała flota."""
+
+    def __init__(self, flota: "Flota"):
+        super().__init__()
+        self.scena = ScenaFloty(flota, ModelInstalacji())
+        self.setMinimumSize(760, 520)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self._chwyt = None
+        self._dopasowana = True
+
+    def odswiez(self):
+        """Do przerysowania tylko widoczne kafle, które się zmieniły."""
+        for r in self.scena.brudne(self.size()):
+            self.update(r)
+
+    def _widok_zmieniony(self):
+        self.scena.uniewaznij()
+        self.update()
+
+    def resizeEvent(self, e):
+        if self._dopasowana:
+            self.scena.dopasuj(self.size())
+        self._widok_zmieniony()
+        super().resizeEvent(e)
+
+    def wheelEvent(self, e):
+        self._dopasowana = False
+        self.scena.powieksz(1.25 ** (e.angleDelta().y() / 120.0), e.pos(), self.size())
+        self._widok_zmieniony()
+
+    def mousePressEvent(self, e):
+        self._chwyt = e.pos()
+
+    def mouseMoveEvent(self, e):
+        if self._chwyt is not None:
+            d = e.pos() - self._chwyt
+            self._chwyt = e.pos()
+            self.scena.przesun(d.x(), d.y(), self.size())
+            self._widok_zmieniony()
+
+    def mouseReleaseEvent(self, e):
+        self._chwyt = None
+
+    def mouseDoubleClickEvent(self, e):
+        i = self.scena.kafel_w(e.pos())
+        if i is None or self.scena.szczegoly:
+            self._dopasowana = True
+            self.scena.dopasuj(self.size())
+        else:
+            self._dopasowana = False
+            self.scena.pokaz(i, self.size())
+        self._widok_zmieniony()
+
+    def paintEvent(self, e):
+        with PROFILER.etap("flota.paint"):
+            p = QPainter(self)
+            self.scena.rysuj(p, e.rect())
+            p.end()
+
+
+class OknoFloty(QWidget):
+    """Przegląd floty (flota.py): wszystkie instalacje liczone razem, każda
+    z własnymi parametrami startowymi; start/stop i tempo jak w oknie głównym."""
+
+    def __init__(self, flota: "Flota", parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle(f"Flota - {flota.n} instalacji")
+        self.setStyleSheet("background-color: #222; color: white;")
+        self.flota = flota
+        self.ekran = EkranFloty(flota)
+
+        self.btn_start = QPushButton("Start/Stop")
+        self.btn_start.clicked.connect(self.przelacz)
+        self.cb_tempo = QComboBox()
+        for nazwa, _ in TEMPA:
+            self.cb_tempo.addItem(nazwa)
+        self.cb_tempo.currentIndexChanged.connect(lambda i: self.zegar.ustaw_tempo(TEMPA[i][1]))
+        self.lbl_czas = QLabel()
+
+        bar = QHBoxLayout()
+        bar.addWidget(self.btn_start)
+        bar.addWidget(QLabel("Tempo:"))
+        bar.addWidget(self.cb_tempo)
+        bar.addWidget(self.lbl_czas)
+        bar.addStretch(1)
+        bar.addWidget(QLabel("kółko: skala, przeciąganie: przesuwanie, 2x klik: instalacja / flota"))
+        lay = QVBoxLayout(self)
+        lay.addLayout(bar)
+        lay.addWidget(self.ekran)
+
+        self.zegar = ZegarSymulacji(0.02)
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.ramka)
+        self._odswiez_czas()
+
+    def przelacz(self):
+        if self.timer.isActive():
+            self.timer.stop()
+        else:
+            self.zegar.start()
+            self.timer.start(OKRES_RAMKI_MS)
+
+    def ramka(self):
+        with PROFILER.etap("flota.krok"):
+            n = self.zegar.tik(self.flota.krok)
+        if n:
+            with PROFILER.etap("flota.odswiez"):
+                self.ekran.odswiez()
+            self._odswiez_czas()
+
+    def _odswiez_czas(self):
+        self.lbl_czas.setText(f"t = {self.flota.t:8.1f} s   alarmy: "
+                              f"{int(self.flota.alarm().sum())} / {self.flota.n}")
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        super().closeEvent(e)
 
 
 class OknoGlowne(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("Mini SCADA - instalacja 4 zbiorniki")
         self.setStyleSheet("background-color: #222; color: white;")
 
         self.model = ModelInstalacji()
+        nazwy = [z.nazwa for z in self.model.zbiorniki]
+        opis = ", ".join(nazwy[:6]) + (f" (+{len(nazwy) - 6})" if len(nazwy) > 6 else "")
+        self.setWindowTitle(f"Mini SCADA - instalacja {opis}")
+        self.symulacja = None
+
+        # historian: próbki trendów trafiają też do archiwum na dysku
+        # (katalog sesji powstaje dopiero przy starcie symulacji - _archiwum())
+        self.historian = None
+        self.zapis_stanu = None
 
-        # dialog startowy
-        dlg = DialogStartowy(self)
-        if dlg.exec_() == QDialog.Accepted:
+        # dialog startowy (parametry albo migawka stanu); czekanie na operatora to osobna faza
+        with START.faza("dialog startowy"):
+            dlg = DialogStartowy(self)
+            przyjety = dlg.exec_() == QDialog.Accepted
+        if przyjety:
             self.model.ustaw_parametry_startowe(**dlg.pobierz())
+            if dlg.plik_migawki:
+                self._przywroc(dlg.plik_migawki)
 
         self.tabs = QTabWidget()
 
@@ -208,42 +872,348 @@ class OknoGlowne(QMainWindow):
             }
         """)
 
+        # synoptyka od razu, alarmy i trendy przy pierwszym otwarciu zakładki
         self.ekran_inst = EkranInstalacji(self.model)
-        self.ekran_alarm = EkranAlarmow(self.model)
-        self.ekran_trend = EkranTrendy(self.model)
+        self.ekran_inst.po_pierwszym_rysowaniu = self._koniec_startu
+        self.ekran_alarm = None
+        self.ekran_trend = None
 
         self.tabs.addTab(self.ekran_inst, "Instalacja")
-        self.tabs.addTab(self.ekran_alarm, "Alarmy")
-        self.tabs.addTab(self.ekran_trend, "Trendy")
+        self.tabs.addTab(ZakladkaLeniwa("Alarmy", self._zbuduj_alarmy), "Alarmy")
+        self.tabs.addTab(ZakladkaLeniwa("Trendy", self._zbuduj_trendy), "Trendy")
 
         # sterowanie
         self.btn_start = QPushButton("Start/Stop")
         self.btn_start.clicked.connect(self.przelacz)
 
+        self.cb_tempo = QComboBox()
+        for nazwa, _ in TEMPA:
+            self.cb_tempo.addItem(nazwa)
+        self.cb_tempo.currentIndexChanged.connect(self.zmien_tempo)
+
+        self.lbl_czas = QLabel()
+
+        self.btn_odtworz = QPushButton("Odtwarzanie...")
+        self.btn_odtworz.clicked.connect(self.otworz_odtwarzanie)
+        self.btn_flota = QPushButton("Flota...")
+        self.btn_flota.clicked.connect(self.otworz_flote)
+        self._okna = []
+
         top = QWidget()
         lay = QVBoxLayout(top)
         bar = QHBoxLayout()
         bar.addWidget(self.btn_start)
+        bar.addWidget(QLabel("Tempo:"))
+        bar.addWidget(self.cb_tempo)
+        bar.addWidget(self.lbl_czas)
         bar.addStretch(1)
+        bar.addWidget(self.btn_odtworz)
+        bar.addWidget(self.btn_flota)
         lay.addLayout(bar)
         lay.addWidget(self.tabs)
         self.setCentralWidget(top)
 
-        # timer symulacji
+        # timer ramek + zegar symulacji (stały krok fizyki, niezależny od GUI)
         self.dt = 0.02
+        self.zegar = ZegarSymulacji(self.dt)
         self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.krok)
         self._run = False
+        if TRYB_SYMULACJI != "gui":
+            # model liczy się w tle, self.model jest jego lustrem do wyświetlania
+            from symulacja_w_tle import SymulacjaWTle
+            self.symulacja = SymulacjaWTle(self.model, self.dt, self.zegar.tempo, tryb=TRYB_SYMULACJI)
+            # ramki GUI idą też w przerwie - odpowiedzi (migawka, akcje alarmów) przychodzą klatkami
+            self.timer.start(OKRES_RAMKI_MS)
+
+        # serwer tagów: klienci czytają obraz publikowany po każdej ramce z nowym stanem
+        self.serwer = None
+        if PORT_SERWERA:
+            from serwer_tagow import SerwerTagow
+            self.serwer = SerwerTagow(self.model, port=int(PORT_SERWERA))
+            try:
+                self.serwer.start()
+            except OSError as blad:
+                self.serwer = None
+                self.statusBar().showMessage(f"serwer tagów nie wystartował: {blad}", 5000)
+
+        # ostatnie odświeżenie każdego widoku (time.perf_counter)
+        self._odswiezono = {"inst": 0.0, "alarm": 0.0, "czas": 0.0, "profil": 0.0, "zrzut": 0.0}
+
+        # profiler: pomiary etapów ramki, nakładka, zrzuty i przechwytywanie do katalogu archiwum
+        PROFILER.okres_ramki = OKRES_RAMKI_MS / 1000.0
+        self.nakladka = NakladkaProfilera(top)
+        self.zrzut_profilu = False
+        self.cprofile = PrzechwytywanieCProfile()
+        self.probkowanie = ProbkowanieStosu()
+        for klawisz, akcja in (("F2", self.przelacz_profiler), ("F3", self.przelacz_nakladke),
+                               ("F5", self.przelacz_zrzut), ("F9", self.przelacz_cprofile),
+                               ("F10", self.przelacz_probkowanie),
+                               ("Ctrl+S", self.zapisz_migawke), ("Ctrl+O", self.wczytaj_migawke)):
+            QShortcut(QKeySequence(klawisz), self, activated=akcja)
+        if PROFIL_OD_STARTU:
+            PROFILER.wlacz()
+            self.zrzut_profilu = True
+
+    # --- start ---
+    def _zbuduj_alarmy(self) -> QWidget:
+        self.ekran_alarm = EkranAlarmow(self.model)
+        if self.symulacja is not None:
+            self.ekran_alarm.polecenie = self.symulacja.polecenie
+        return self.ekran_alarm
+
+    def _zbuduj_trendy(self) -> QWidget:
+        self.ekran_trend = EkranTrendy(self.model)
+        return self.ekran_trend
+
+    def _koniec_startu(self):
+        """Synoptyka narysowana pierwszy raz - raport faz startu."""
+        START.znacznik("synoptyka")
+        self._zapisz_start()
+        if PROFIL_OD_STARTU:
+            print("\n".join(START.tekst()), file=sys.stderr)
+
+    def _zapisz_start(self):
+        # tylko do istniejącego katalogu sesji - samo otwarcie okna nic nie zapisuje
+        if self.historian is None:
+            return
+        try:
+            START.zapisz(self._plik_w_archiwum(PLIK_STARTU))
+        except OSError:
+            pass
+
+    def _nowy_historian(self):
+        """Następny zapis idzie do nowego podkatalogu archiwum - po wczytaniu migawki
+        czas może się cofnąć."""
+        if self.historian is not None:
+            for r in (self.historian, self.zapis_stanu):
+                self.model.rejestratory.remove(r)
+                r.zamknij()
+            self.historian = self.zapis_stanu = None
+        if self._run:
+            self._archiwum()
+
+    def _archiwum(self) -> str:
+        """Katalog archiwum tej sesji; tworzony (z historianem i zapisem stanu) przy
+        starcie symulacji albo pierwszym zapisie do archiwum."""
+        if self.historian is not None:
+            return self.historian.katalog
+        katalog = os.path.join(KATALOG_ARCHIWUM, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        nr = 1
+        while os.path.exists(katalog + (f"_{nr}" if nr > 1 else "")):
+            nr += 1
+        katalog += f"_{nr}" if nr > 1 else ""
+        self.historian = Historian(katalog, sygnaly=self.model.historia.sygnaly,
+                                   martwa_strefa=MARTWA_STREFA_ARCHIWUM)
+        # pełny stan (wszystkie sygnały) do odtwarzania zapisu
+        self.zapis_stanu = RejestratorStanu(self.model, os.path.join(katalog, KATALOG_STANU),
+                                            martwa_strefa=MARTWA_STREFA_ARCHIWUM)
+        self.model.rejestratory += [self.historian, self.zapis_stanu]
+        self._zapisz_start()
+        return katalog
 
     def przelacz(self):
         self._run = not self._run
+        PROFILER.przerwa()
         if self._run:
-            self.timer.start(int(self.dt * 1000))
-        else:
+            self._archiwum()
+            self.zegar.start()
+            self.timer.start(OKRES_RAMKI_MS)
+        elif self.symulacja is None:
             self.timer.stop()
+        if self.symulacja is not None:
+            (self.symulacja.start if self._run else self.symulacja.stop)()
+
+    def zmien_tempo(self, i: int):
+        self.zegar.ustaw_tempo(TEMPA[i][1])
+        if self.symulacja is not None:
+            self.symulacja.ustaw_tempo(TEMPA[i][1])
+
+    def _czas_na(self, widok: str, hz: float, teraz: float) -> bool:
+        if teraz - self._odswiezono[widok] >= 1.0 / hz:
+            self._odswiezono[widok] = teraz
+            return True
+        return False
 
     def krok(self):
-        self.model.krok(self.dt)
-        self.ekran_inst.update()
-        self.ekran_alarm.odswiez()
-        self.ekran_trend.odswiez()
+        mierz = PROFILER.wlaczony
+        if mierz:
+            poczatek = time.perf_counter()
+            PROFILER.ramka(poczatek)
+        if self.symulacja is not None:
+            # klatka z wątku / procesu symulacji; GUI nie liczy kroków
+            n = self.symulacja.odbierz()
+            if mierz and n:
+                PROFILER.dodaj("symulacja", time.perf_counter() - poczatek)
+                PROFILER.dodaj("model.krok", self.symulacja.klatka.krok_s)
+            tempo = self.symulacja.klatka.tempo
+        else:
+            n = self.zegar.tik(self.model.krok)
+            if mierz and n:
+                symulacja = time.perf_counter() - poczatek
+                PROFILER.dodaj("symulacja", symulacja)
+                PROFILER.dodaj("model.krok", symulacja / n)
+            tempo = self.zegar.tempo_rzeczywiste
+        if not n:
+            return
+        if self.serwer is not None:
+            self.serwer.publikuj()
+
+        teraz = time.perf_counter()
+        if self._czas_na("inst", HZ_INSTALACJA, teraz):
+            with PROFILER.etap("instalacja.odswiez"):
+                self.ekran_inst.odswiez()
+        if self.ekran_alarm is not None and self._czas_na("alarm", HZ_ALARMY, teraz):
+            with PROFILER.etap("alarmy.odswiez"):
+                self.ekran_alarm.odswiez()
+        if self.ekran_trend is not None:
+            with PROFILER.etap("trendy.odswiez"):
+                self.ekran_trend.odswiez()   # sam pilnuje widoczności i częstotliwości
+        if self._czas_na("czas", HZ_ALARMY, teraz):
+            self.lbl_czas.setText(
+                f"t = {self.model.t:8.1f} s   tempo x{tempo:.1f}"
+            )
+
+        if mierz:
+            PROFILER.koniec_ramki(time.perf_counter() - poczatek)
+            if self.nakladka.isVisible() and self._czas_na("profil", HZ_NAKLADKA, teraz):
+                self.nakladka.odswiez(PROFILER.tekst())
+            if self.zrzut_profilu and self._czas_na("zrzut", 1.0 / OKRES_ZRZUTU, teraz):
+                PROFILER.zrzut(self._plik_w_archiwum("profil.jsonl"))
+
+    # --- profiler ---
+    def _plik_w_archiwum(self, nazwa: str) -> str:
+        return os.path.join(self._archiwum(), nazwa)
+
+    def _komunikat(self, tekst: str):
+        self.statusBar().showMessage(tekst, 5000)
+
+    def przelacz_profiler(self):
+        PROFILER.wlacz(not PROFILER.wlaczony)
+        if not PROFILER.wlaczony:
+            self.nakladka.hide()
+        self._komunikat("profiler: " + ("włączony" if PROFILER.wlaczony else "wyłączony"))
+
+    def przelacz_nakladke(self):
+        if self.nakladka.isVisible():
+            self.nakladka.hide()
+            return
+        if not PROFILER.wlaczony:
+            PROFILER.wlacz()
+        self.nakladka.odswiez(PROFILER.tekst())
+        self.nakladka.show()
+
+    def przelacz_zrzut(self):
+        self.zrzut_profilu = not self.zrzut_profilu
+        if self.zrzut_profilu:
+            PROFILER.wlacz()
+            self._komunikat(f"zrzut profilera co {OKRES_ZRZUTU:.0f} s: {self._plik_w_archiwum('profil.jsonl')}")
+        else:
+            PROFILER.zrzut(self._plik_w_archiwum("profil.jsonl"))
+            self._komunikat("zrzut profilera zatrzymany")
+
+    def przelacz_cprofile(self):
+        if not self.cprofile.trwa:
+            self.cprofile.start()
+            self._komunikat("cProfile: nagrywanie (F9 = koniec)")
+            return
+        plik = self._plik_w_archiwum(datetime.now().strftime("cprofile_%H%M%S"))
+        self.cprofile.stop(plik)
+        self._komunikat(f"cProfile zapisany: {plik}.prof / .txt")
+
+    def przelacz_probkowanie(self):
+        if not self.probkowanie.trwa:
+            self.probkowanie.start()
+            self._komunikat("próbkowanie stosu (F10 = koniec)")
+            return
+        plik = self._plik_w_archiwum(datetime.now().strftime("probki_%H%M%S.txt"))
+        n = self.probkowanie.stop(plik)
+        self._komunikat(f"{n} próbek stosu: {plik}")
+
+    # --- migawki ---
+    def _przywroc(self, plik: str) -> bool:
+        try:
+            m = Migawka.wczytaj(plik)
+            if self.symulacja is not None:
+                self.symulacja.przywroc(m)
+            else:
+                self.model.przywroc(m)
+        except (OSError, ValueError) as blad:
+            self._komunikat(f"nie wczytano migawki: {blad}")
+            return False
+        self._komunikat(f"stan z migawki: {plik} (t = {self.model.t:.1f} s)")
+        return True
+
+    def zapisz_migawke(self):
+        plik = self._plik_w_archiwum(datetime.now().strftime("migawka_%H%M%S") + ROZSZERZENIE)
+
+        def zapisz(m: Migawka):
+            m.zapisz(plik)
+            self._komunikat(f"migawka zapisana: {plik}")
+
+        if self.symulacja is not None:
+            self.symulacja.migawka(zapisz)      # przyjdzie z odbierz() w jednej z następnych ramek
+        else:
+            zapisz(self.model.migawka())
+
+    def wczytaj_migawke(self):
+        plik, _ = QFileDialog.getOpenFileName(self, "Migawka stanu", KATALOG_ARCHIWUM, FILTR_MIGAWEK)
+        if not plik or not self._przywroc(plik):
+            return
+        self._nowy_historian()
+        self.zegar.start()
+        PROFILER.przerwa()
+        self.ekran_inst.odswiez()
+        if self.ekran_alarm is not None:
+            self.ekran_alarm.odswiez()
+        if self.ekran_trend is not None:
+            self.ekran_trend.na_zywo()
+        self.lbl_czas.setText(f"t = {self.model.t:8.1f} s")
+
+    # --- odtwarzanie zapisu, flota ---
+    def otworz_odtwarzanie(self):
+        katalog = QFileDialog.getExistingDirectory(self, "Zapis do odtworzenia", KATALOG_ARCHIWUM)
+        if not katalog:
+            return
+        try:
+            okno = OknoOdtwarzania(katalog, self.model.graf.konfiguracja)
+        except (OSError, ValueError) as blad:
+            self._komunikat(f"nie można odtworzyć: {blad}")
+            return
+        self._pokaz_okno(okno)
+
+    def otworz_flote(self):
+        with START.faza("flota"):
+            from flota import domyslna_flota
+            okno = OknoFloty(domyslna_flota())
+        self._pokaz_okno(okno)
+
+    def _pokaz_okno(self, okno: QWidget):
+        self._okna = [o for o in self._okna if o.isVisible()] + [okno]
+        okno.show()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        if self.nakladka.isVisible():
+            self.nakladka._ustaw()
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        if self.symulacja is not None:
+            self.symulacja.zamknij()
+        if self.serwer is not None:
+            self.serwer.zatrzymaj()
+        if self.cprofile.trwa:
+            self.cprofile.stop(self._plik_w_archiwum("cprofile_koniec"))
+        if self.probkowanie.trwa:
+            self.probkowanie.stop(self._plik_w_archiwum("probki_koniec.txt"))
+        if self.zrzut_profilu:
+            PROFILER.zrzut(self._plik_w_archiwum("profil.jsonl"))
+        self._zapisz_start()      # z fazami leniwymi (zakładki, matplotlib, flota)
+        if self.historian is not None:
+            self.historian.zamknij()
+            self.zapis_stanu.zamknij()
+        for okno in self._okna:
+            okno.close()
+        super().closeEvent(e)
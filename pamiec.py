@@ -0,0 +1,283 @@
+"""
+pamiec.py
+Pamięć przebiegów: wyniki symulacji zapamiętane po skwantowanych parametrach startowych.
+
+Klucz to parametry w formacie DialogStartowy.pobierz() zaokrąglone do KWANTY
+(np. prędkość pompy co 0.05, moc grzałki co 0.25) - symulowany jest zawsze
+punkt skwantowany, więc ten sam klucz daje zawsze ten sam wynik. Wynik to
+przebieg poziomów i temperatur co OKRES_PROBKI, stan końcowy z czasem
+ustalenia i czasy pierwszych alarmów. Liczy go SilnikInstalacji - kilkanaście
+ms na CZAS_PRZEBIEGU sekund procesu.
+
+Dwa poziomy pamięci: słownik LRU w RAM (maks_wpisow) i opcjonalny katalog na
+dysku (plik .mig na wpis, format migawka.py). Wpis wypchnięty z RAM zostaje
+na dysku i wraca przy następnym użyciu, także w kolejnym uruchomieniu.
+
+Powierzchnia odpowiedzi: podglad() dla parametrów między węzłami siatki
+SIATKA_POWIERZCHNI (prędkość, moc, temperatura startowa) interpoluje liniowo
+po każdej osi wpisy z narożników komórki - bez symulacji. Błąd interpolacji
+w komórce jest mierzony przy pierwszym podglądzie w niej (interpolacja
+porównana z prawdziwą symulacją); komórka z błędem powyżej tolerancji,
+z brakującym narożnikiem albo z alarmem tylko w części narożników zawsze
+dostaje prawdziwą symulację.
+"""
+
+from __future__ import annotations
+import hashlib
+import itertools
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from migawka import ROZSZERZENIE, Migawka
+from silnik import TAGI_ALARMOW, SilnikInstalacji
+from silnik_wsadowy import PARAMETRY_STARTOWE
+
+# kwant parametrów w kluczu (pompa_on / grzalka_on - dokładnie)
+KWANTY = dict(
+    z1_proc=0.5, z2_proc=0.5, z3_proc=0.5, z4_proc=0.5,
+    predkosc_pompy=0.05, moc_grzalki=0.25, temp_start=0.5,
+)
+# węzły powierzchni odpowiedzi (wielokrotności kwantów)
+SIATKA_POWIERZCHNI = dict(predkosc_pompy=0.2, moc_grzalki=1.0, temp_start=5.0)
+# maks. błąd interpolacji w komórce (poziom 0..1, °C, s czasu alarmu)
+TOLERANCJA = dict(poziom=0.03, temperatura=2.0, czas=2.0)
+
+CZAS_PRZEBIEGU = 300.0      # [s] procesu na wpis
+DT = 0.02
+OKRES_PROBKI = 1.0          # [s] próbki przebiegu
+OKRES_ALARMOW = 0.2         # [s] rozdzielczość czasów alarmów
+PROG_USTALENIA = 0.005      # |x - wartość końcowa| (poziom 0..1; temperatura: x100 w °C)
+
+
+def kwantuj(parametry: Mapping[str, float]) -> Dict[str, float]:
+    """Parametry zaokrąglone do KWANTY - punkt, który jest naprawdę symulowany."""
+    wynik = {}
+    for k in PARAMETRY_STARTOWE:
+        v = parametry[k]
+        wynik[k] = bool(v) if k not in KWANTY else round(round(v / KWANTY[k]) * KWANTY[k], 10)
+    return wynik
+
+
+def klucz(parametry: Mapping[str, float]) -> Tuple:
+    return tuple(bool(parametry[k]) if k not in KWANTY else int(round(parametry[k] / KWANTY[k]))
+                 for k in PARAMETRY_STARTOWE)
+
+
+class WynikPrzebiegu:
+    """Przebieg jednego punktu parametrów: próbki, stan końcowy, czasy alarmów (NaN = brak)."""
+
+    __slots__ = ("parametry", "t", "poziomy", "temperatury", "alarmy")
+
+    def __init__(self, parametry: Dict[str, float], t: np.ndarray, poziomy: np.ndarray,
+                 temperatury: np.ndarray, alarmy: np.ndarray):
+        self.parametry = parametry
+        self.t = t                          # [m]
+        self.poziomy = poziomy              # [4, m], 0..1
+        self.temperatury = temperatury      # [4, m], °C
+        self.alarmy = alarmy                # [len(TAGI_ALARMOW)], czas pierwszej aktywacji
+
+    def koncowe(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.poziomy[:, -1], self.temperatury[:, -1]
+
+    def czas_ustalenia(self) -> float:
+        """Od kiedy wszystkie wielkości są przy wartości końcowej; NaN - nie ustaliło się
+        (zmiana w ostatnich 10% przebiegu)."""
+        odchylka = np.maximum(
+            np.abs(self.poziomy - self.poziomy[:, -1:]).max(axis=0),
+            np.abs(self.temperatury - self.temperatury[:, -1:]).max(axis=0) / 100.0,
+        )
+        poza = np.flatnonzero(odchylka > PROG_USTALENIA)
+        if not len(poza):
+            return float(self.t[0])
+        i = poza[-1] + 1
+        return float(self.t[i]) if i < len(self.t) * 0.9 else math.nan
+
+    def pierwsze_alarmy(self) -> Dict[str, float]:
+        return {tag: float(t) for tag, t in zip(TAGI_ALARMOW, self.alarmy) if not math.isnan(t)}
+
+    # --- zapis (migawka.py) ---
+    def migawka(self, czas: float, dt: float) -> Migawka:
+        m = Migawka("przebieg", dict(parametry=self.parametry, czas=czas, dt=dt))
+        for nazwa in ("t", "poziomy", "temperatury", "alarmy"):
+            m[nazwa] = getattr(self, nazwa)
+        return m
+
+    @classmethod
+    def z_migawki(cls, m: Migawka) -> "WynikPrzebiegu":
+        m.sprawdz_rodzaj("przebieg")
+        return cls(m.opis["parametry"], m["t"], m["poziomy"], m["temperatury"], m["alarmy"])
+
+
+def symuluj_przebieg(parametry: Mapping[str, float], czas: float = CZAS_PRZEBIEGU,
+                     dt: float = DT) -> WynikPrzebiegu:
+    """Prawdziwa symulacja (SilnikInstalacji) z próbkowaniem przebiegu i alarmów."""
+    s = SilnikInstalacji()
+    s.ustaw_parametry_startowe(**parametry)
+    kroki = max(1, int(round(OKRES_ALARMOW / dt)))
+    na_probke = max(1, int(round(OKRES_PROBKI / OKRES_ALARMOW)))
+    probki = int(round(czas / OKRES_PROBKI))
+
+    t = [s.t]
+    poziomy = [s.poziomy()]
+    temperatury = [tuple(s.temperatura)]
+    alarmy = [math.nan] * len(TAGI_ALARMOW)
+    for _ in range(probki):
+        for _ in range(na_probke):
+            s.symuluj(kroki, dt)
+            for k, aktywny in enumerate(s.alarmy().values()):
+                if aktywny and math.isnan(alarmy[k]):
+                    alarmy[k] = s.t
+        t.append(s.t)
+        poziomy.append(s.poziomy())
+        temperatury.append(tuple(s.temperatura))
+    return WynikPrzebiegu(dict(parametry), np.array(t), np.array(poziomy).T,
+                          np.array(temperatury).T, np.array(alarmy))
+
+
+def interpoluj(wyniki, wagi) -> WynikPrzebiegu:
+    """Suma ważona przebiegów (narożniki komórki powierzchni)."""
+    w = np.asarray(wagi, dtype=np.float64)
+    pierwszy = wyniki[0]
+    return WynikPrzebiegu(
+        {}, pierwszy.t,
+        np.tensordot(w, np.array([r.poziomy for r in wyniki]), axes=1),
+        np.tensordot(w, np.array([r.temperatury for r in wyniki]), axes=1),
+        np.tensordot(w, np.array([r.alarmy for r in wyniki]), axes=1),
+    )
+
+
+def _te_same_alarmy(wyniki) -> bool:
+    """Alarm w części narożników - odpowiedź nieciągła, interpolacja bez sensu."""
+    brak = np.isnan(np.array([r.alarmy for r in wyniki]))
+    return not (brak != brak[0]).any()
+
+
+def blad(a: WynikPrzebiegu, b: WynikPrzebiegu) -> Dict[str, float]:
+    """Największe różnice przebiegów (jak TOLERANCJA); różne alarmy - czas nieskończony."""
+    brak_a, brak_b = np.isnan(a.alarmy), np.isnan(b.alarmy)
+    if (brak_a != brak_b).any():
+        czas = math.inf
+    else:
+        czas = float(np.abs(a.alarmy - b.alarmy)[~brak_a].max(initial=0.0))
+    return dict(poziom=float(np.abs(a.poziomy - b.poziomy).max()),
+                temperatura=float(np.abs(a.temperatury - b.temperatury).max()),
+                czas=czas)
+
+
+class PamiecPrzebiegow:
+    """LRU przebiegów w RAM + opcjonalnie katalog na dysku; podglad() z powierzchnią odpowiedzi."""
+
+    def __init__(self, maks_wpisow: int = 256, katalog: Optional[str] = None,
+                 czas: float = CZAS_PRZEBIEGU, dt: float = DT):
+        self.maks_wpisow = maks_wpisow
+        self.katalog = katalog
+        self.czas = czas
+        self.dt = dt
+        self._wpisy: "OrderedDict[Tuple, WynikPrzebiegu]" = OrderedDict()
+        self._bledy_komorek: Dict[Tuple, Dict[str, float]] = {}    # zmierzony błąd interpolacji
+        self.statystyki = dict(trafienia=0, z_dysku=0, symulacje=0, interpolacje=0)
+        if katalog:
+            os.makedirs(katalog, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._wpisy)
+
+    def _plik(self, k: Tuple) -> str:
+        tekst = json.dumps([list(k), self.czas, self.dt])
+        return os.path.join(self.katalog, hashlib.sha1(tekst.encode("utf-8")).hexdigest()[:20] + ROZSZERZENIE)
+
+    def _dodaj(self, k: Tuple, wynik: WynikPrzebiegu) -> None:
+        self._wpisy[k] = wynik
+        self._wpisy.move_to_end(k)
+        while len(self._wpisy) > self.maks_wpisow:
+            self._wpisy.popitem(last=False)
+
+    def znajdz(self, parametry: Mapping[str, float]) -> Optional[WynikPrzebiegu]:
+        """Wpis z RAM albo z dysku; bez symulacji."""
+        k = klucz(parametry)
+        wynik = self._wpisy.get(k)
+        if wynik is not None:
+            self._wpisy.move_to_end(k)
+            self.statystyki["trafienia"] += 1
+            return wynik
+        if self.katalog:
+            plik = self._plik(k)
+            try:
+                m = Migawka.wczytaj(plik)
+                wynik = WynikPrzebiegu.z_migawki(m)
+                if m.opis["czas"] != self.czas or m.opis["dt"] != self.dt or klucz(wynik.parametry) != k:
+                    raise ValueError("wpis dla innych parametrów")
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError, KeyError):
+                return None                  # uszkodzony wpis - zostanie policzony od nowa
+            self._dodaj(k, wynik)
+            self.statystyki["z_dysku"] += 1
+            return wynik
+        return None
+
+    def pobierz(self, parametry: Mapping[str, float]) -> WynikPrzebiegu:
+        """Wpis z pamięci albo symulacja punktu skwantowanego (i zapamiętanie)."""
+        wynik = self.znajdz(parametry)
+        if wynik is None:
+            wynik = symuluj_przebieg(kwantuj(parametry), self.czas, self.dt)
+            self.statystyki["symulacje"] += 1
+            k = klucz(parametry)
+            self._dodaj(k, wynik)
+            if self.katalog:
+                plik = self._plik(k)
+                wynik.migawka(self.czas, self.dt).zapisz(plik + ".tmp")
+                os.replace(plik + ".tmp", plik)
+        return wynik
+
+    def narozniki(self, parametry: Mapping[str, float]) -> Tuple[list, list]:
+        """Narożniki komórki SIATKA_POWIERZCHNI zawierającej parametry i ich wagi."""
+        osie = []
+        for k, krok in SIATKA_POWIERZCHNI.items():
+            x = kwantuj(parametry)[k] / krok
+            a = math.floor(x + 1e-9)
+            u = x - a
+            osie.append([(k, a * krok, 1.0 - u)] + ([(k, (a + 1) * krok, u)] if u > 1e-9 else []))
+        punkty, wagi = [], []
+        for kombinacja in itertools.product(*osie):
+            p = dict(parametry)
+            w = 1.0
+            for k, v, wk in kombinacja:
+                p[k] = round(v, 10)
+                w *= wk
+            punkty.append(p)
+            wagi.append(w)
+        return punkty, wagi
+
+    def podglad(self, parametry: Mapping[str, float], tolerancja: Mapping[str, float] = TOLERANCJA,
+                uzupelnij: bool = True) -> Tuple[WynikPrzebiegu, str]:
+        """Wynik do podglądu i jego źródło: "pamięć", "interpolacja" albo "symulacja".
+
+        uzupelnij: po symulacji liczy też brakujące narożniki komórki i błąd
+        interpolacji w niej - następne podglądy w komórce mogą być interpolowane."""
+        wynik = self.znajdz(parametry)
+        if wynik is not None:
+            return wynik, "pamięć"
+        punkty, wagi = self.narozniki(parametry)
+        komorka = tuple(klucz(p) for p in punkty)
+        bledy = self._bledy_komorek.get(komorka)
+        if bledy is not None and all(bledy[k] <= tolerancja[k] for k in TOLERANCJA):
+            wyniki = [self.znajdz(p) for p in punkty]
+            if all(r is not None for r in wyniki):
+                self.statystyki["interpolacje"] += 1
+                wynik = interpoluj(wyniki, wagi)
+                wynik.parametry = kwantuj(parametry)
+                return wynik, "interpolacja"
+        wynik = self.pobierz(parametry)
+        if uzupelnij and bledy is None:
+            wyniki = [self.pobierz(p) for p in punkty]
+            if _te_same_alarmy(wyniki):
+                self._bledy_komorek[komorka] = blad(interpoluj(wyniki, wagi), wynik)
+            else:
+                self._bledy_komorek[komorka] = dict(poziom=math.inf, temperatura=math.inf, czas=math.inf)
+        return wynik, "symulacja"
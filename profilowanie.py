@@ -0,0 +1,364 @@
+"""
+profilowanie.py
+Lekkie pomiary czasu etapów pętli GUI: krok symulacji, odświeżanie widoków,
+rysowanie. Kroczące percentyle (p50/p95/p99), drgania timera ramek, liczniki
+spóźnionych ramek i ramek ponad budżet, zrzut do pliku JSON Lines oraz
+przechwytywanie cProfile albo próbkowanie stosu wątku GUI.
+
+FazyStartu (START) zapisuje czasy faz startu aplikacji od początku procesu:
+importy, dialog startowy, budowa okna, pierwsze narysowanie synoptyki,
+a później leniwe inicjalizacje (import matplotlib, budowa zakładek) - razem
+z liczbą modułów zaimportowanych w każdej fazie. Zawsze włączone: faz jest
+kilkanaście na całe uruchomienie.
+
+Wyłączony profiler zwraca z etap() wspólny pusty kontekst - koszt to jedno
+wywołanie metody i sprawdzenie flagi na etap, nic nie jest zapisywane.
+"""
+
+from __future__ import annotations
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# próbek w oknie kroczącym każdego licznika
+OKNO = 1024
+
+# ramka spóźniona: odstęp od poprzedniej większy niż tyle okresów timera
+SPOZNIENIE = 1.5
+
+
+# -------------------------
+# Liczniki
+# -------------------------
+
+class Licznik:
+    """Ostatnie OKNO czasów [s] w buforze kołowym + sumy od początku."""
+
+    __slots__ = ("nazwa", "_dane", "_i", "_n", "razem", "suma", "maks")
+
+    def __init__(self, nazwa: str, okno: int = OKNO):
+        self.nazwa = nazwa
+        self._dane = [0.0] * okno
+        self._i = 0
+        self._n = 0
+        self.razem = 0
+        self.suma = 0.0
+        self.maks = 0.0
+
+    def dopisz(self, czas: float) -> None:
+        dane = self._dane
+        dane[self._i] = czas
+        self._i = (self._i + 1) % len(dane)
+        if self._n < len(dane):
+            self._n += 1
+        self.razem += 1
+        self.suma += czas
+        if czas > self.maks:
+            self.maks = czas
+
+    def wyczysc(self) -> None:
+        self._i = self._n = self.razem = 0
+        self.suma = self.maks = 0.0
+
+    def percentyle(self, *p: float) -> List[float]:
+        if self._n == 0:
+            return [0.0] * len(p)
+        return np.percentile(np.asarray(self._dane[:self._n]), p).tolist()
+
+    def opis(self) -> Dict[str, float]:
+        """Statystyki w ms (okno kroczące; maks i średnia od początku)."""
+        p50, p95, p99 = self.percentyle(50, 95, 99)
+        return dict(n=self.razem, p50=p50 * 1e3, p95=p95 * 1e3, p99=p99 * 1e3,
+                    maks=self.maks * 1e3, srednia=self.suma / self.razem * 1e3 if self.razem else 0.0)
+
+
+class _Etap:
+    __slots__ = ("licznik", "_t0")
+
+    def __init__(self, licznik: Licznik):
+        self.licznik = licznik
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *wyjatek):
+        self.licznik.dopisz(time.perf_counter() - self._t0)
+        return False
+
+
+class _Nic:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *wyjatek):
+        return False
+
+
+_NIC = _Nic()
+
+
+# -------------------------
+# Profiler
+# -------------------------
+
+class Profiler:
+    """Etapy ramki + odstępy timera.
+
+    with PROFILER.etap("trendy.odswiez"): ...   - czas etapu
+    PROFILER.ramka(teraz)                       - początek ramki (drgania, spóźnienia)
+    PROFILER.koniec_ramki(czas_pracy)           - praca w ramce vs budżet okresu
+    """
+
+    def __init__(self, okres_ramki: float = 0.016, okno: int = OKNO):
+        self.okres_ramki = okres_ramki
+        self.okno = okno
+        self.wlaczony = False
+        self.liczniki: Dict[str, Licznik] = {}
+        self._etapy: Dict[str, _Etap] = {}
+        self._poprzednia: Optional[float] = None
+        self.ramki = 0
+        self.spoznione = 0
+        self.ponad_budzet = 0
+
+    def wlacz(self, tak: bool = True) -> None:
+        self.wlaczony = tak
+        self._poprzednia = None
+
+    def wyczysc(self) -> None:
+        for licznik in self.liczniki.values():
+            licznik.wyczysc()
+        self._poprzednia = None
+        self.ramki = self.spoznione = self.ponad_budzet = 0
+
+    def __getitem__(self, nazwa: str) -> Licznik:
+        licznik = self.liczniki.get(nazwa)
+        if licznik is None:
+            licznik = self.liczniki[nazwa] = Licznik(nazwa, self.okno)
+        return licznik
+
+    # --- zapis ---
+    def etap(self, nazwa: str):
+        if not self.wlaczony:
+            return _NIC
+        e = self._etapy.get(nazwa)
+        if e is None:
+            e = self._etapy[nazwa] = _Etap(self[nazwa])
+        return e
+
+    def dodaj(self, nazwa: str, czas: float) -> None:
+        if self.wlaczony:
+            self[nazwa].dopisz(czas)
+
+    def ramka(self, teraz: float) -> None:
+        """Początek ramki timera: odstęp od poprzedniej i jego odchyłka od okresu."""
+        if not self.wlaczony:
+            return
+        if self._poprzednia is not None:
+            odstep = teraz - self._poprzednia
+            self["ramka.odstep"].dopisz(odstep)
+            self["ramka.drgania"].dopisz(abs(odstep - self.okres_ramki))
+            self.ramki += 1
+            if odstep > SPOZNIENIE * self.okres_ramki:
+                self.spoznione += 1
+        self._poprzednia = teraz
+
+    def przerwa(self) -> None:
+        """Zatrzymanie timera - następny odstęp nie jest spóźnieniem."""
+        self._poprzednia = None
+
+    def koniec_ramki(self, czas_pracy: float) -> None:
+        if not self.wlaczony:
+            return
+        self["ramka.praca"].dopisz(czas_pracy)
+        if czas_pracy > self.okres_ramki:
+            self.ponad_budzet += 1
+
+    # --- odczyt ---
+    def migawka(self) -> dict:
+        return dict(
+            t=time.time(),
+            ramki=self.ramki, spoznione=self.spoznione, ponad_budzet=self.ponad_budzet,
+            etapy={n: l.opis() for n, l in sorted(self.liczniki.items())},
+        )
+
+    def zrzut(self, plik: str) -> None:
+        """Dopisuje migawkę jako jedną linię JSON."""
+        with open(plik, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.migawka(), ensure_ascii=False) + "\n")
+
+    def tekst(self) -> List[str]:
+        """Tabelka do nakładki na ekranie."""
+        linie = [f"{'etap [ms]':20s}{'p50':>7s}{'p95':>7s}{'p99':>7s}{'maks':>8s}"]
+        for nazwa, licznik in sorted(self.liczniki.items()):
+            o = licznik.opis()
+            linie.append(f"{nazwa:20s}{o['p50']:7.2f}{o['p95']:7.2f}{o['p99']:7.2f}{o['maks']:8.1f}")
+        linie.append(f"ramki {self.ramki}  spóźnione {self.spoznione}  ponad budżet {self.ponad_budzet}")
+        return linie
+
+
+PROFILER = Profiler()
+
+
+# -------------------------
+# Fazy startu
+# -------------------------
+
+class FazyStartu:
+    """Fazy startu i leniwych inicjalizacji: (nazwa, początek od startu, czas, nowe moduły).
+
+    with START.faza("import okno_glowne"): ...   - czas fazy
+    START.znacznik("synoptyka")                   - chwila od startu (tylko pierwsza)
+    """
+
+    def __init__(self):
+        self.poczatek = time.perf_counter()
+        self.fazy: List[tuple] = []
+        self.znaczniki: Dict[str, float] = {}
+
+    def od(self, poczatek: float) -> None:
+        """Start procesu wcześniejszy niż import tego modułu (pierwsza linia main.py)."""
+        self.poczatek = poczatek
+
+    @contextmanager
+    def faza(self, nazwa: str):
+        t0 = time.perf_counter()
+        moduly = len(sys.modules)
+        try:
+            yield
+        finally:
+            self.fazy.append((nazwa, t0 - self.poczatek, time.perf_counter() - t0,
+                              len(sys.modules) - moduly))
+
+    def znacznik(self, nazwa: str) -> bool:
+        """Zapisuje chwilę pierwszego wystąpienia; True, jeśli to było pierwsze."""
+        if nazwa in self.znaczniki:
+            return False
+        self.znaczniki[nazwa] = time.perf_counter() - self.poczatek
+        return True
+
+    def _kolejno(self) -> List[tuple]:
+        """Fazy według początku (zagnieżdżona kończy się przed zewnętrzną)."""
+        return sorted(self.fazy, key=lambda f: f[1])
+
+    def czekanie(self) -> float:
+        """[s] spędzone w fazach czekających na operatora (dialogi)."""
+        return sum(czas for nazwa, _, czas, _ in self.fazy if nazwa.startswith("dialog"))
+
+    def migawka(self) -> dict:
+        return dict(
+            t=time.time(),
+            fazy=[dict(nazwa=n, od_ms=od * 1e3, czas_ms=c * 1e3, moduly=m) for n, od, c, m in self._kolejno()],
+            znaczniki={n: t * 1e3 for n, t in self.znaczniki.items()},
+            czekanie_ms=self.czekanie() * 1e3,
+            moduly=len(sys.modules),
+        )
+
+    def zapisz(self, plik: str) -> None:
+        with open(plik, "w", encoding="utf-8") as f:
+            json.dump(self.migawka(), f, ensure_ascii=False, indent=2)
+
+    def tekst(self) -> List[str]:
+        linie = [f"{'faza startu':28s}{'od [ms]':>9s}{'czas':>8s}{'moduły':>8s}"]
+        for nazwa, od, czas, moduly in self._kolejno():
+            linie.append(f"{nazwa:28s}{od * 1e3:9.0f}{czas * 1e3:8.0f}{moduly:8d}")
+        czekanie = self.czekanie()
+        for nazwa, t in self.znaczniki.items():
+            linie.append(f"{nazwa}: {t * 1e3:.0f} ms od startu, {(t - czekanie) * 1e3:.0f} ms bez dialogów")
+        return linie
+
+
+START = FazyStartu()
+
+
+# -------------------------
+# Przechwytywanie
+# -------------------------
+
+class PrzechwytywanieCProfile:
+    """cProfile wątku, który wywołał start() (w GUI: wątek główny)."""
+
+    def __init__(self):
+        self._profil: Optional[cProfile.Profile] = None
+
+    @property
+    def trwa(self) -> bool:
+        return self._profil is not None
+
+    def start(self) -> None:
+        self._profil = cProfile.Profile()
+        self._profil.enable()
+
+    def stop(self, plik: str, ile: int = 40) -> str:
+        """Zapisuje plik.prof (pstats / snakeviz) i plik.txt z top-listą; zwraca top-listę."""
+        profil, self._profil = self._profil, None
+        profil.disable()
+        profil.dump_stats(plik + ".prof")
+        bufor = io.StringIO()
+        pstats.Stats(profil, stream=bufor).sort_stats("cumulative").print_stats(ile)
+        with open(plik + ".txt", "w", encoding="utf-8") as f:
+            f.write(bufor.getvalue())
+        return bufor.getvalue()
+
+
+class ProbkowanieStosu:
+    """Próbkowanie stosu wybranego wątku z wątku pomocniczego.
+
+    Mierzony wątek nie jest spowalniany (poza GIL-em przy każdej próbce), więc
+    wynik jest bliższy rzeczywistości niż cProfile. Zapis w formacie "stosów
+    zwiniętych" (funkcja;funkcja;... liczba) - do flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, okres: float = 0.001, watek: Optional[int] = None):
+        self.okres = okres
+        self.watek = watek if watek is not None else threading.main_thread().ident
+        self.stosy: Counter = Counter()
+        self.probki = 0
+        self._stop = threading.Event()
+        self._w: Optional[threading.Thread] = None
+
+    @property
+    def trwa(self) -> bool:
+        return self._w is not None
+
+    def start(self) -> None:
+        self.stosy.clear()
+        self.probki = 0
+        self._stop.clear()
+        self._w = threading.Thread(target=self._petla, name="probkowanie", daemon=True)
+        self._w.start()
+
+    def _petla(self) -> None:
+        while not self._stop.wait(self.okres):
+            ramka = sys._current_frames().get(self.watek)
+            stos = []
+            while ramka is not None:
+                kod = ramka.f_code
+                stos.append(f"{kod.co_name} ({os.path.basename(kod.co_filename)}:{kod.co_firstlineno})")
+                ramka = ramka.f_back
+            if stos:
+                self.stosy[";".join(reversed(stos))] += 1
+                self.probki += 1
+
+    def stop(self, plik: str) -> int:
+        """Zapisuje stosy zwinięte; zwraca liczbę próbek."""
+        self._stop.set()
+        self._w.join()
+        self._w = None
+        with open(plik, "w", encoding="utf-8") as f:
+            for stos, n in self.stosy.most_common():
+                f.write(f"{stos} {n}\n")
+        return self.probki
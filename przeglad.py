@@ -0,0 +1,280 @@
+"""
+przeglad.py
+Drugi punkt startowy (obok main.py): przegląd parametrów startowych bez GUI.
+
+Bierze siatkę albo listę parametrów (te same pola co DialogStartowy.pobierz())
+i czas symulacji, dzieli scenariusze na paczki i liczy je w ProcessPoolExecutor
+silnikiem wsadowym. Podsumowania (poziomy końcowe, maks. T3, alarmy i czas
+ich pierwszego wystąpienia) są dopisywane do pliku JSON Lines, gdy tylko
+paczka się policzy - bez czekania na cały przegląd. Z --baza wyniki trafiają
+też (albo tylko) do kolumnowej bazy z indeksami (wyniki.py), w której można
+je potem filtrować i agregować bez ponownej symulacji.
+
+Z --migawka scenariusze startują z zapisanego (np. rozgrzanego) stanu
+instalacji, a podane parametry tylko go nadpisują - bez ponownego liczenia
+stanu przejściowego. Czasy alarmów liczone są wtedy od chwili migawki.
+
+Przykłady:
+    python przeglad.py --czas 600 --predkosc 0.2:2.0:0.2 --moc 0,3,6 -o wyniki.jsonl
+    python przeglad.py --scenariusze lista.json --procesy 8 --paczka 500
+    python przeglad.py --migawka rozgrzana.mig --czas 120 --moc 0:6:0.5
+    python przeglad.py --czas 120 --predkosc 0.2:2.0:0.1 --moc 0:6:0.25 --baza wyniki
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from migawka import Migawka
+from silnik_wsadowy import PARAMETRY_STARTOWE, SilnikWsadowy
+from wyniki import ZapisWynikow, kolumny_przebiegu
+
+# wartości domyślne jak w DialogStartowy
+DOMYSLNE = dict(
+    z1_proc=80.0, z2_proc=10.0, z3_proc=20.0, z4_proc=10.0,
+    predkosc_pompy=1.0, moc_grzalki=3.0,
+    pompa_on=True, grzalka_on=True,
+    temp_start=20.0,
+)
+
+# nazwy opcji w linii poleceń
+OPCJE = dict(
+    z1_proc="z1", z2_proc="z2", z3_proc="z3", z4_proc="z4",
+    predkosc_pompy="predkosc", moc_grzalki="moc",
+    pompa_on="pompa", grzalka_on="grzalka",
+    temp_start="temp",
+)
+
+Scenariusz = Tuple[int, Dict[str, float]]
+
+
+# -------------------------
+# Parametry wejściowe
+# -------------------------
+
+def _na_bool(tekst: str) -> bool:
+    t = str(tekst).strip().lower()
+    if t in ("1", "true", "tak", "on"):
+        return True
+    if t in ("0", "false", "nie", "off"):
+        return False
+    raise ValueError(f"nieznana wartość logiczna: {tekst!r}")
+
+
+def parsuj_wartosci(tekst: str, logiczne: bool = False) -> List:
+    """'a:b:krok' (zakres z końcem) albo 'x,y,z' (lista)."""
+    if logiczne:
+        return [_na_bool(x) for x in tekst.split(",")]
+    if ":" in tekst:
+        a, b, krok = (float(x) for x in tekst.split(":"))
+        if krok <= 0:
+            raise ValueError("krok zakresu musi być dodatni")
+        n = int(math.floor((b - a) / krok + 1e-9)) + 1
+        return [round(a + i * krok, 10) for i in range(n)]
+    return [float(x) for x in tekst.split(",")]
+
+
+def siatka(osie: Dict[str, Sequence], domyslne: bool = True) -> Iterator[Dict[str, float]]:
+    """Iloczyn kartezjański osi; brakujące parametry biorą wartość domyślną
+    (domyslne=False: pomijane - start z migawki)."""
+    klucze = [k for k in PARAMETRY_STARTOWE if k in osie or domyslne]
+    wartosci = [osie.get(k, [DOMYSLNE[k]]) for k in klucze]
+    for kombinacja in itertools.product(*wartosci):
+        yield dict(zip(klucze, kombinacja))
+
+
+def wczytaj_liste(sciezka: str, domyslne: bool = True) -> Iterator[Dict[str, float]]:
+    """Lista scenariuszy z pliku .json (lista słowników), .jsonl albo .csv."""
+    def uzupelnij(d: Dict) -> Dict[str, float]:
+        sc = dict(DOMYSLNE) if domyslne else {}
+        for k in PARAMETRY_STARTOWE:
+            if k in d and d[k] != "":
+                sc[k] = _na_bool(d[k]) if k in ("pompa_on", "grzalka_on") else float(d[k])
+        return sc
+
+    with open(sciezka, newline="", encoding="utf-8") as f:
+        if sciezka.endswith(".csv"):
+            for wiersz in csv.DictReader(f):
+                yield uzupelnij(wiersz)
+        elif sciezka.endswith(".jsonl"):
+            for linia in f:
+                if linia.strip():
+                    yield uzupelnij(json.loads(linia))
+        else:
+            for d in json.load(f):
+                yield uzupelnij(d)
+
+
+def paczki(scenariusze: Iterable[Dict[str, float]], rozmiar: int,
+           pierwszy_id: int = 0) -> Iterator[List[Scenariusz]]:
+    it = enumerate(scenariusze, pierwszy_id)
+    while True:
+        paczka = list(itertools.islice(it, rozmiar))
+        if not paczka:
+            return
+        yield paczka
+
+
+# -------------------------
+# Obliczenia (w procesie roboczym)
+# -------------------------
+
+def licz_paczke(paczka: List[Scenariusz], czas: float, dt: float,
+                migawka: Optional[bytes] = None) -> List[Dict]:
+    """Symuluje paczkę scenariuszy silnikiem wsadowym i zwraca podsumowania.
+
+    migawka: bajty Migawka - stan wspólny, który scenariusze nadpisują."""
+    return _podsumowania(paczka, _symuluj_paczke(paczka, czas, dt, migawka))
+
+
+def _licz_paczke(paczka: List[Scenariusz], czas: float, dt: float, migawka: Optional[bytes],
+                 podsumowania: bool, kolumny: bool) -> Tuple[Optional[List[Dict]], Optional[Dict]]:
+    """Jak licz_paczke; do tego (albo zamiast) wiersze bazy wyników."""
+    silnik = _symuluj_paczke(paczka, czas, dt, migawka)
+    return (_podsumowania(paczka, silnik) if podsumowania else None,
+            kolumny_przebiegu([i for i, _ in paczka], [p for _, p in paczka], silnik, czas) if kolumny else None)
+
+
+def _symuluj_paczke(paczka: List[Scenariusz], czas: float, dt: float,
+                    migawka: Optional[bytes]) -> SilnikWsadowy:
+    if migawka is None:
+        silnik = SilnikWsadowy.z_parametrow([p for _, p in paczka], statystyki=True)
+    else:
+        silnik = SilnikWsadowy.rozgalez(Migawka.z_bajtow(migawka), len(paczka), statystyki=True)
+        silnik.zmien_parametry([p for _, p in paczka])
+    silnik.symuluj(int(round(czas / dt)), dt)
+    return silnik
+
+
+def _podsumowania(paczka: List[Scenariusz], silnik: SilnikWsadowy) -> List[Dict]:
+    poziomy = silnik.poziomy()
+    wyniki = []
+    for j, (i, parametry) in enumerate(paczka):
+        alarmy = {
+            tag: round(float(silnik.pierwszy_alarm[k, j]), 6)
+            for k, tag in enumerate(silnik.tagi_alarmow)
+            if not math.isnan(silnik.pierwszy_alarm[k, j])
+        }
+        wyniki.append(dict(
+            id=i,
+            parametry=parametry,
+            poziomy_koncowe={f"Z{k + 1}": float(poziomy[k, j]) for k in range(4)},
+            max_T3=float(silnik.max_temp[2, j]),
+            T3_koncowa=float(silnik.temperatura[2, j]),
+            alarmy=alarmy,
+        ))
+    return wyniki
+
+
+# -------------------------
+# Przegląd
+# -------------------------
+
+def przeglad(scenariusze: Iterable[Dict[str, float]], czas: float, dt: float,
+             wyjscie, procesy: int = 0, paczka: int = 256, migawka: Optional[bytes] = None,
+             baza: Optional[ZapisWynikow] = None) -> int:
+    """Liczy scenariusze i strumieniowo zapisuje wyniki (JSON Lines do `wyjscie`,
+    jeśli podane, i do bazy wyników). Zwraca liczbę scenariuszy.
+
+    Przy dopisywaniu do istniejącej bazy numery scenariuszy (id) zaczynają
+    się za jej ostatnim wierszem, tak samo w JSON Lines."""
+    licznik = 0
+    pierwszy_id = baza.wiersze if baza is not None else 0
+
+    def zapisz(wynik: Tuple[Optional[List[Dict]], Optional[Dict]]) -> None:
+        nonlocal licznik
+        wyniki, kolumny = wynik
+        if wyniki is not None:
+            for w in wyniki:
+                wyjscie.write(json.dumps(w, ensure_ascii=False) + "\n")
+            wyjscie.flush()
+        if kolumny is not None:
+            baza.dopisz(kolumny)
+        licznik += len(wyniki if wyniki is not None else kolumny["id"])
+
+    rodzaje = (wyjscie is not None, baza is not None)
+    if procesy == 1:
+        for p in paczki(scenariusze, paczka, pierwszy_id):
+            zapisz(_licz_paczke(p, czas, dt, migawka, *rodzaje))
+        return licznik
+
+    with ProcessPoolExecutor(max_workers=procesy or None) as pula:
+        # ograniczona liczba paczek w locie - siatka może być ogromna
+        w_locie = set()
+        limit = 2 * (procesy or os.cpu_count() or 1)
+        for p in paczki(scenariusze, paczka, pierwszy_id):
+            w_locie.add(pula.submit(_licz_paczke, p, czas, dt, migawka, *rodzaje))
+            if len(w_locie) >= limit:
+                gotowe, w_locie = wait(w_locie, return_when=FIRST_COMPLETED)
+                for f in gotowe:
+                    zapisz(f.result())
+        while w_locie:
+            gotowe, w_locie = wait(w_locie, return_when=FIRST_COMPLETED)
+            for f in gotowe:
+                zapisz(f.result())
+    return licznik
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Przegląd parametrów startowych instalacji (bez GUI).")
+    ap.add_argument("--czas", type=float, default=300.0, help="czas symulacji [s]")
+    ap.add_argument("--dt", type=float, default=0.02, help="krok symulacji [s]")
+    ap.add_argument("--scenariusze", help="lista scenariuszy (.json / .jsonl / .csv) zamiast siatki")
+    ap.add_argument("--migawka", help="stan startowy z migawki (.mig); parametry tylko go nadpisują")
+    for k, opcja in OPCJE.items():
+        ap.add_argument(f"--{opcja}", dest=k, help=f"wartości {k}: 'a:b:krok' albo 'x,y,z'")
+    ap.add_argument("--procesy", type=int, default=0, help="liczba procesów (0 = wszystkie rdzenie, 1 = bez puli)")
+    ap.add_argument("--paczka", type=int, default=256, help="scenariuszy na paczkę")
+    ap.add_argument("-o", "--wyjscie", help="plik wynikowy JSON Lines ('-' = stdout; domyślnie stdout, chyba że jest --baza)")
+    ap.add_argument("--baza", help="katalog bazy wyników (wyniki.py) - dopisywanie, indeksy na końcu")
+    args = ap.parse_args(argv)
+
+    try:
+        migawka = None
+        if args.migawka:
+            with open(args.migawka, "rb") as f:
+                migawka = f.read()
+            SilnikWsadowy.rozgalez(Migawka.z_bajtow(migawka), 1)     # błędy od razu, nie w puli
+        domyslne = migawka is None
+
+        if args.scenariusze:
+            scenariusze = wczytaj_liste(args.scenariusze, domyslne)
+        else:
+            osie = {}
+            for k in PARAMETRY_STARTOWE:
+                tekst = getattr(args, k)
+                if tekst is not None:
+                    osie[k] = parsuj_wartosci(tekst, logiczne=k in ("pompa_on", "grzalka_on"))
+            scenariusze = siatka(osie, domyslne)
+
+        baza = ZapisWynikow(args.baza) if args.baza else None
+        wyjscie = args.wyjscie if args.wyjscie is not None else (None if baza else "-")
+        t0 = time.perf_counter()
+        try:
+            if wyjscie is None or wyjscie == "-":
+                n = przeglad(scenariusze, args.czas, args.dt, wyjscie and sys.stdout, args.procesy,
+                             args.paczka, migawka, baza)
+            else:
+                with open(wyjscie, "w", encoding="utf-8") as f:
+                    n = przeglad(scenariusze, args.czas, args.dt, f, args.procesy, args.paczka, migawka, baza)
+        finally:
+            if baza is not None:
+                baza.zamknij()      # indeksy także po przerwanym przeglądzie
+    except (OSError, ValueError) as blad:
+        print(f"błąd: {blad}", file=sys.stderr)
+        return 1
+
+    print(f"{n} scenariuszy w {time.perf_counter() - t0:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
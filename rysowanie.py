@@ -0,0 +1,573 @@
+"""
+rysowanie.py
+Warstwa rysowania (Qt) dla obiektów z model.py.
+Funkcje tylko czytają stan zbiorników, rur, pompy i grzałki - cała fizyka
+zostaje w model.py / silnik.py, więc symulacja nie potrzebuje Qt.
+
+ScenaInstalacji trzyma statyczną geometrię (tło, obudowy rur, obrysy i nazwy
+zbiorników, korpus pompy) w dwóch pixmapach, a w każdej ramce rysuje tylko
+części dynamiczne w prostokątach, które naprawdę się zmieniły.
+
+Przepływ w rurach jest animowany kreskami przesuwanymi wzdłuż trasy rury
+z prędkością proporcjonalną do strumienia (sygnał <rura>.przeplyw).
+Przesunięcia kresek wszystkich rur to jedna tablica NumPy przesuwana o czas
+modelu od poprzedniej ramki; rysowanie rury to zmiana dashOffset jej pióra
+i jedno drawPath. Do przerysowania idą prostokąty odcinków rury, a nie
+prostokąt otaczający całą trasę.
+
+ScenaFloty rysuje flotę instalacji (flota.py) jako siatkę kafli z poziomem
+szczegółów zależnym od skali: po oddaleniu uproszczony glif bez napisów,
+po przybliżeniu pełna instalacja (rysuj_instalacje). Rysowane są tylko
+widoczne kafle, a do przerysowania zgłaszane tylko te, które się zmieniły.
+"""
+
+from __future__ import annotations
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRect, QRectF, QSize
+from PyQt5.QtGui import QPainter, QColor, QPen, QPainterPath, QPixmap
+
+from model import ModelInstalacji, Zbiornik, Rura, Pompa, Grzalka
+
+
+# -------------------------
+# Kolory
+# -------------------------
+
+KOLOR_TLA = QColor(34, 34, 34)
+KOLOR_CIECZY_ZBIORNIK = QColor(0, 140, 255, 190)
+KOLOR_RURY = QColor(140, 140, 140)
+KOLOR_CIECZY_RURA = QColor(0, 180, 255)
+KOLOR_KRESEK = QColor(210, 245, 255)
+
+# animacja przepływu: kreska i przerwa [px], prędkość kresek [px/s] na jednostkę strumienia [/s]
+KRESKA = 10.0
+PRZERWA = 14.0
+PIKSELE_NA_JEDNOSTKE = 3.0
+# największe przesunięcie na ramkę [px] (duże tempo symulacji) - powyżej kreski "cofałyby się"
+MAKS_PRZESUNIECIA = 0.4 * (KRESKA + PRZERWA)
+
+
+# -------------------------
+# Elementy
+# -------------------------
+
+def sciezka_rury(r: Rura) -> QPainterPath:
+    sciezka = QPainterPath()
+    if r.punkty:
+        sciezka.moveTo(QPointF(*r.punkty[0]))
+        for x, y in r.punkty[1:]:
+            sciezka.lineTo(QPointF(x, y))
+    return sciezka
+
+
+def rysuj_zbiornik_obrys(p: QPainter, z: Zbiornik) -> None:
+    p.setPen(QPen(Qt.white, 3))
+    p.setBrush(Qt.NoBrush)
+    p.drawRect(z.x, z.y, z.w, z.h)
+    p.setPen(Qt.white)
+    p.drawText(z.x, z.y - 8, f"{z.nazwa}")
+
+
+def rysuj_zbiornik_ciecz(p: QPainter, z: Zbiornik) -> None:
+    poziom = z.poziom.wartosc
+    if poziom > 0:
+        hh = z.h * poziom
+        y0 = z.y + z.h - hh
+        p.setPen(Qt.NoPen)
+        p.setBrush(KOLOR_CIECZY_ZBIORNIK)
+        p.drawRect(int(z.x + 3), int(y0 + 2), int(z.w - 6), int(hh - 4))
+
+
+def rysuj_zbiornik_wartosci(p: QPainter, z: Zbiornik) -> None:
+    p.setPen(Qt.white)
+    p.drawText(z.x, z.y + z.h + 16, f"{z.poziom.wartosc*100:5.1f}%")
+    p.drawText(z.x, z.y + z.h + 32, f"T={z.temperatura.wartosc:4.1f}°C")
+
+
+def rysuj_zbiornik(p: QPainter, z: Zbiornik) -> None:
+    rysuj_zbiornik_ciecz(p, z)
+    rysuj_zbiornik_obrys(p, z)
+    rysuj_zbiornik_wartosci(p, z)
+
+
+def rysuj_rure_obudowe(p: QPainter, r: Rura, sciezka: QPainterPath) -> None:
+    p.setBrush(Qt.NoBrush)
+    p.setPen(QPen(KOLOR_RURY, r.grubosc, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+    p.drawPath(sciezka)
+
+
+def rysuj_rure_ciecz(p: QPainter, r: Rura, sciezka: QPainterPath) -> None:
+    if r.czy_plynie:
+        p.setBrush(Qt.NoBrush)
+        p.setPen(QPen(KOLOR_CIECZY_RURA, r.grubosc - 4, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        p.drawPath(sciezka)
+
+
+def pioro_kresek(r: Rura) -> QPen:
+    """Pióro kresek przepływu (wzorzec w jednostkach grubości pióra, jak w Qt)."""
+    grubosc = max(2.0, r.grubosc - 8.0)
+    pioro = QPen(KOLOR_KRESEK, grubosc, Qt.CustomDashLine, Qt.FlatCap, Qt.RoundJoin)
+    pioro.setDashPattern([KRESKA / grubosc, PRZERWA / grubosc])
+    return pioro
+
+
+def odcinki_rury(r: Rura) -> List[QRect]:
+    """Prostokąty odcinków trasy (z grubością rury) - obszar przerysowania animacji."""
+    m = r.grubosc / 2.0 + 2.0
+    return [QRectF(QPointF(min(x0, x1) - m, min(y0, y1) - m),
+                   QPointF(max(x0, x1) + m, max(y0, y1) + m)).toAlignedRect()
+            for (x0, y0), (x1, y1) in zip(r.punkty, r.punkty[1:])]
+
+
+def rysuj_rure(p: QPainter, r: Rura, sciezka: Optional[QPainterPath] = None) -> None:
+    if len(r.punkty) < 2:
+        return
+    if sciezka is None:
+        sciezka = sciezka_rury(r)
+
+    # obudowa + "ciecz"
+    rysuj_rure_obudowe(p, r, sciezka)
+    rysuj_rure_ciecz(p, r, sciezka)
+
+
+def rysuj_pompe_korpus(p: QPainter, pompa: Pompa) -> None:
+    r = 22
+    cx, cy = pompa.x, pompa.y
+    p.setPen(QPen(Qt.white, 2))
+    p.setBrush(QColor(50, 50, 50))
+    p.drawEllipse(cx - r, cy - r, 2 * r, 2 * r)
+    p.setPen(Qt.white)
+    p.drawText(cx - 18, cy + 38, pompa.nazwa)
+
+
+def rysuj_pompe_wirnik(p: QPainter, pompa: Pompa) -> None:
+    cx, cy = pompa.x, pompa.y
+    if pompa.wlaczona.wartosc:
+        p.setPen(QPen(QColor(0, 220, 255), 2))
+        for i in range(4):
+            a = pompa._kat + i * (math.pi / 2)
+            x2 = cx + 16 * math.cos(a)
+            y2 = cy + 16 * math.sin(a)
+            p.drawLine(QPointF(cx, cy), QPointF(x2, y2))
+    else:
+        p.setPen(QPen(QColor(255, 120, 120), 2))
+        p.drawLine(cx - 10, cy - 10, cx + 10, cy + 10)
+
+
+def rysuj_pompe(p: QPainter, pompa: Pompa) -> None:
+    rysuj_pompe_korpus(p, pompa)
+    rysuj_pompe_wirnik(p, pompa)
+
+
+def rysuj_grzalke(p: QPainter, g: Grzalka) -> None:
+    x, y = g.x, g.y
+    w, h = 60, 18
+
+    p.setPen(QPen(Qt.white, 2))
+    if g.wlaczona.wartosc:
+        p.setBrush(QColor(255, 140, 0))
+    else:
+        p.setBrush(QColor(80, 80, 80))
+
+    p.drawRoundedRect(x, y, w, h, 6, 6)
+    p.setPen(Qt.white)
+    p.drawText(x, y - 6, f"{g.nazwa}  {g.moc.wartosc:.1f}")
+
+
+# -------------------------
+# Cała instalacja
+# -------------------------
+
+def rysuj_instalacje(p: QPainter, model: ModelInstalacji) -> None:
+    # rury pod spodem
+    for r in model.rury:
+        rysuj_rure(p, r)
+
+    # elementy
+    for z in model.zbiorniki:
+        rysuj_zbiornik(p, z)
+
+    for pompa in model.pompy:
+        rysuj_pompe(p, pompa)
+    for g in model.grzalki:
+        rysuj_grzalke(p, g)
+
+
+class ScenaInstalacji:
+    """Instalacja z buforowaną warstwą statyczną.
+
+    Kolejność warstw jak w rysuj_instalacje():
+        pod  - tło + obudowy rur                  (pixmapa)
+        ciecz i kreski przepływu w rurach,
+        ciecz w zbiornikach                       (dynamiczne)
+        nad  - obrysy + nazwy zbiorników, korpus pompy (pixmapa, przezroczysta)
+        wartości zbiorników, wirnik, grzałka      (dynamiczne)
+    """
+
+    def __init__(self, model: ModelInstalacji):
+        self.model = model
+        # ścieżki rur budowane raz
+        self.sciezki: List[QPainterPath] = [sciezka_rury(r) for r in model.rury]
+
+        self._pod: Optional[QPixmap] = None
+        self._nad: Optional[QPixmap] = None
+        self._rozmiar = QSize()
+        self._dpr = 0.0
+
+        # obszary elementów dynamicznych (we współrzędnych widżetu)
+        self.obszary_rur = [
+            sc.boundingRect().adjusted(-r.grubosc, -r.grubosc, r.grubosc, r.grubosc).toAlignedRect()
+            for r, sc in zip(model.rury, self.sciezki)
+        ]
+        self.odcinki_rur = [odcinki_rury(r) for r in model.rury]
+        self.obszary_zbiornikow = [QRect(z.x - 2, z.y - 2, z.w + 4, z.h + 40) for z in model.zbiorniki]
+        self.obszary_wirnikow = [QRect(pm.x - 20, pm.y - 20, 40, 40) for pm in model.pompy]
+        self.obszary_grzalek = [QRect(g.x - 2, g.y - 22, 110, 44) for g in model.grzalki]
+
+        # animacja przepływu: pióro na rurę, przesunięcia kresek [px] wzdłuż trasy
+        self.piora_kresek = [pioro_kresek(r) for r in model.rury]
+        self.przesuniecia = np.zeros(len(model.rury))
+        self._sloty_przeplywu = [r.przeplyw.slot for r in model.rury]
+        self._t_animacji = model.t
+
+        self._ostatni: Dict[Tuple[str, int], object] = {}
+
+        # sygnał -> element sceny; zmiany odbierane przy odświeżaniu (subskrypcja bez odbiorcy)
+        self._element: Dict[str, Tuple[str, int]] = {}
+        for i, r in enumerate(model.rury):
+            self._element[r.plynie.nazwa] = ("r", i)
+        for i, z in enumerate(model.zbiorniki):
+            self._element[z.poziom.nazwa] = self._element[z.temperatura.nazwa] = ("z", i)
+        for i, pm in enumerate(model.pompy):
+            self._element[pm.wlaczona.nazwa] = ("p", i)
+        for i, g in enumerate(model.grzalki):
+            self._element[g.wlaczona.nazwa] = self._element[g.moc.nazwa] = ("g", i)
+        self.zmiany = model.sygnaly.subskrybuj(self._element)
+        self._wszystkie = True
+
+    def uniewaznij(self) -> None:
+        """Po zmianie rozmiaru / DPI - warstwa statyczna zostanie narysowana od nowa."""
+        self._pod = self._nad = None
+        self._ostatni.clear()
+        self._wszystkie = True
+
+    def _warstwa(self, rozmiar: QSize, dpr: float, tlo: Optional[QColor]) -> QPixmap:
+        pix = QPixmap(int(math.ceil(rozmiar.width() * dpr)), int(math.ceil(rozmiar.height() * dpr)))
+        pix.setDevicePixelRatio(dpr)
+        pix.fill(tlo if tlo is not None else Qt.transparent)
+        return pix
+
+    def _zbuduj_warstwy(self, rozmiar: QSize, dpr: float) -> None:
+        self._rozmiar = QSize(rozmiar)
+        self._dpr = dpr
+
+        self._pod = self._warstwa(rozmiar, dpr, KOLOR_TLA)
+        p = QPainter(self._pod)
+        p.setRenderHint(QPainter.Antialiasing)
+        for r, sc in zip(self.model.rury, self.sciezki):
+            if len(r.punkty) >= 2:
+                rysuj_rure_obudowe(p, r, sc)
+        p.end()
+
+        self._nad = self._warstwa(rozmiar, dpr, None)
+        p = QPainter(self._nad)
+        p.setRenderHint(QPainter.Antialiasing)
+        for z in self.model.zbiorniki:
+            rysuj_zbiornik_obrys(p, z)
+        for pompa in self.model.pompy:
+            rysuj_pompe_korpus(p, pompa)
+        p.end()
+
+    def rysuj(self, p: QPainter, obszar: QRect, rozmiar: QSize, dpr: float) -> None:
+        """Rysuje to, co przecina `obszar` (prostokąt z paintEvent)."""
+        if self._pod is None or rozmiar != self._rozmiar or dpr != self._dpr:
+            self._zbuduj_warstwy(rozmiar, dpr)
+
+        zrodlo = QRectF(obszar.x() * dpr, obszar.y() * dpr, obszar.width() * dpr, obszar.height() * dpr)
+        p.drawPixmap(QRectF(obszar), self._pod, zrodlo)
+
+        m = self.model
+        przesuniecia = self.przesuniecia.tolist()
+        for r, sc, o, pioro, s in zip(m.rury, self.sciezki, self.obszary_rur, self.piora_kresek, przesuniecia):
+            if r.czy_plynie and o.intersects(obszar):
+                rysuj_rure_ciecz(p, r, sc)
+                # dashOffset rośnie pod prąd trasy
+                pioro.setDashOffset(-s / pioro.widthF())
+                p.setPen(pioro)
+                p.drawPath(sc)
+        for z, o in zip(m.zbiorniki, self.obszary_zbiornikow):
+            if o.intersects(obszar):
+                rysuj_zbiornik_ciecz(p, z)
+
+        p.drawPixmap(QRectF(obszar), self._nad, zrodlo)
+
+        for z, o in zip(m.zbiorniki, self.obszary_zbiornikow):
+            if o.intersects(obszar):
+                rysuj_zbiornik_wartosci(p, z)
+        for pompa, o in zip(m.pompy, self.obszary_wirnikow):
+            if o.intersects(obszar):
+                rysuj_pompe_wirnik(p, pompa)
+        for g, o in zip(m.grzalki, self.obszary_grzalek):
+            if o.intersects(obszar):
+                rysuj_grzalke(p, g)
+
+    def _przesun_kreski(self) -> np.ndarray:
+        """Przesuwa kreski wszystkich rur o czas modelu od poprzedniej ramki; zwraca
+        indeksy rur, których kreski przesunęły się o co najmniej 1/4 piksela."""
+        m = self.model
+        dt = m.t - self._t_animacji
+        self._t_animacji = m.t
+        if dt <= 0.0 or not len(self.przesuniecia):
+            return np.empty(0, dtype=np.intp)     # pauza albo przewinięcie wstecz
+        strumien = np.asarray(m.sygnaly.odczytaj(self._sloty_przeplywu))
+        krok = np.clip(strumien * (PIKSELE_NA_JEDNOSTKE * dt), -MAKS_PRZESUNIECIA, MAKS_PRZESUNIECIA)
+        przed = np.round(self.przesuniecia * 4.0)
+        np.remainder(self.przesuniecia + krok, KRESKA + PRZERWA, out=self.przesuniecia)
+        return np.flatnonzero(np.round(self.przesuniecia * 4.0) != przed)
+
+    def brudne(self) -> List[QRect]:
+        """Prostokąty elementów, których wygląd zmienił się od ostatniego wywołania.
+
+        Sprawdzane są tylko elementy zgłoszone przez subskrypcję sygnałów (i
+        wirniki pracujących pomp oraz kreski płynących rur - animacja nie jest
+        sygnałem), więc koszt zależy od liczby zmian, a nie od wielkości instalacji."""
+        m = self.model
+        zmienione = self.zmiany.pobierz()
+        przesuniete = self._przesun_kreski()
+        if self._wszystkie:
+            self._wszystkie = False
+            elementy = set(self._element.values()) | {("p", i) for i in range(len(m.pompy))}
+        else:
+            elementy = {self._element[n] for n in zmienione}
+            elementy.update(("p", i) for i, pm in enumerate(m.pompy) if pm.wlaczona.wartosc)
+        elementy.update(("r", i) for i in przesuniete.tolist())
+
+        wynik = []
+        for rodzaj, i in elementy:
+            if rodzaj == "r":
+                r = m.rury[i]
+                stan = (r.czy_plynie, float(self.przesuniecia[i]) if r.czy_plynie else 0.0)
+                o = self.odcinki_rur[i]
+            elif rodzaj == "z":
+                z = m.zbiorniki[i]
+                # to, co widać: wysokość cieczy w pikselach + teksty
+                stan = (int(z.h * z.poziom.wartosc), f"{z.poziom.wartosc*100:5.1f}",
+                        f"{z.temperatura.wartosc:4.1f}")
+                o = self.obszary_zbiornikow[i]
+            elif rodzaj == "p":
+                pm = m.pompy[i]
+                stan = (pm.wlaczona.wartosc, round(pm._kat, 2) if pm.wlaczona.wartosc else 0.0)
+                o = self.obszary_wirnikow[i]
+            else:
+                g = m.grzalki[i]
+                stan = (g.wlaczona.wartosc, f"{g.moc.wartosc:.1f}")
+                o = self.obszary_grzalek[i]
+            if self._ostatni.get((rodzaj, i)) != stan:
+                self._ostatni[(rodzaj, i)] = stan
+                if rodzaj == "r":
+                    wynik += o          # odcinki trasy zamiast prostokąta całej rury
+                else:
+                    wynik.append(o)
+        return wynik
+
+
+# -------------------------
+# Flota: wiele instalacji, poziom szczegółów
+# -------------------------
+
+KAFEL = QSize(760, 520)         # kafel w skali 1 - jak EkranInstalacji
+ODSTEP_KAFLI = 24
+PROG_SZCZEGOLOW = 0.5           # od tej skali kafel to pełna instalacja, poniżej glif
+SKALA_MIN = 0.02
+SKALA_MAX = 2.0
+KOLOR_KAFLA = QColor(48, 48, 48)
+KOLOR_RAMKI = QColor(90, 90, 90)
+KOLOR_ALARMU = QColor(230, 40, 40)
+
+
+def rysuj_glif(p: QPainter, zbiorniki: List[QRectF], pompa: QPointF, grzalka: QPointF,
+               poziomy, alarm: bool, pompa_on: bool, grzalka_on: bool) -> None:
+    """Uproszczona instalacja we współrzędnych kafla: ciecz w zbiornikach,
+    znaczniki pompy i grzałki, ramka alarmu - bez rur i napisów."""
+    p.fillRect(QRectF(0, 0, KAFEL.width(), KAFEL.height()), KOLOR_KAFLA)
+    for z, poziom in zip(zbiorniki, poziomy):
+        p.fillRect(z, KOLOR_RAMKI)
+        hh = z.height() * float(poziom)
+        p.fillRect(QRectF(z.x(), z.bottom() - hh, z.width(), hh), KOLOR_CIECZY_RURA)
+    p.fillRect(QRectF(pompa.x() - 24, pompa.y() - 24, 48, 48),
+               QColor(0, 220, 255) if pompa_on else QColor(255, 120, 120))
+    p.fillRect(QRectF(grzalka.x(), grzalka.y(), 60, 18),
+               QColor(255, 140, 0) if grzalka_on else QColor(80, 80, 80))
+    if alarm:
+        p.setPen(QPen(KOLOR_ALARMU, 24))
+        p.setBrush(Qt.NoBrush)
+        p.drawRect(QRectF(12, 12, KAFEL.width() - 24, KAFEL.height() - 24))
+
+
+class ScenaFloty:
+    """Flota (flota.py) jako siatka kafli z przybliżaniem i przesuwaniem.
+
+    Skala < PROG_SZCZEGOLOW: glif (rysuj_glif), bez tekstu. Od progu: stan
+    instalacji przepisywany do wspólnego modelu i rysowany w pełni
+    (rysuj_instalacje) - tylko dla kafli w obszarze rysowania.
+
+    brudne() liczy dla wszystkich kafli naraz (NumPy) klucze tego, co widać
+    przy bieżącej skali, i zgłasza tylko widoczne kafle, których klucz się
+    zmienił. Zmiana widoku (skala, przesunięcie, rozmiar) unieważnia klucze."""
+
+    def __init__(self, flota, model: ModelInstalacji):
+        self.flota = flota
+        self.model = model      # wspólny model do rysowania kafli w pełnych szczegółach
+        self.kolumny = max(1, math.ceil(math.sqrt(flota.n)))
+        self.wiersze = math.ceil(flota.n / self.kolumny)
+        self.skala = 1.0
+        self.przesuniecie = QPointF(0.0, 0.0)     # punkt świata w lewym górnym rogu widoku
+
+        self._zbiorniki = [QRectF(z.x, z.y, z.w, z.h) for z in model.zbiorniki]
+        self._pompa = QPointF(model.pompy[0].x, model.pompy[0].y)
+        self._grzalka = QPointF(model.grzalki[0].x, model.grzalki[0].y)
+        self._ostatni: Optional[np.ndarray] = None
+
+    # --- widok ---
+    @property
+    def szczegoly(self) -> bool:
+        return self.skala >= PROG_SZCZEGOLOW
+
+    def uniewaznij(self) -> None:
+        self._ostatni = None
+
+    def rozmiar_swiata(self) -> QSize:
+        return QSize(ODSTEP_KAFLI + self.kolumny * (KAFEL.width() + ODSTEP_KAFLI),
+                     ODSTEP_KAFLI + self.wiersze * (KAFEL.height() + ODSTEP_KAFLI))
+
+    def _ogranicz(self, rozmiar: QSize) -> None:
+        swiat = self.rozmiar_swiata()
+        x = min(self.przesuniecie.x(), swiat.width() - rozmiar.width() / self.skala)
+        y = min(self.przesuniecie.y(), swiat.height() - rozmiar.height() / self.skala)
+        self.przesuniecie = QPointF(max(0.0, x), max(0.0, y))
+        self.uniewaznij()
+
+    def dopasuj(self, rozmiar: QSize) -> None:
+        """Cała flota w widoku."""
+        swiat = self.rozmiar_swiata()
+        self.skala = max(SKALA_MIN, min(SKALA_MAX, rozmiar.width() / swiat.width(),
+                                        rozmiar.height() / swiat.height()))
+        self.przesuniecie = QPointF(0.0, 0.0)
+        self.uniewaznij()
+
+    def powieksz(self, mnoznik: float, punkt: QPointF, rozmiar: QSize) -> None:
+        """Zmiana skali z punktem widżetu `punkt` w miejscu."""
+        punkt = QPointF(punkt)
+        swiat = self.przesuniecie + punkt / self.skala
+        self.skala = max(SKALA_MIN, min(SKALA_MAX, self.skala * mnoznik))
+        self.przesuniecie = swiat - punkt / self.skala
+        self._ogranicz(rozmiar)
+
+    def przesun(self, dx: float, dy: float, rozmiar: QSize) -> None:
+        """Przesunięcie widoku o (dx, dy) pikseli widżetu."""
+        self.przesuniecie -= QPointF(dx, dy) / self.skala
+        self._ogranicz(rozmiar)
+
+    def pokaz(self, i: int, rozmiar: QSize) -> None:
+        """Kafel i na cały widok - w pełnych szczegółach."""
+        self.skala = max(PROG_SZCZEGOLOW, min(SKALA_MAX, rozmiar.width() / KAFEL.width(),
+                                              rozmiar.height() / KAFEL.height()))
+        w, k = divmod(i, self.kolumny)
+        srodek = QPointF(ODSTEP_KAFLI + k * (KAFEL.width() + ODSTEP_KAFLI) + KAFEL.width() / 2,
+                         ODSTEP_KAFLI + w * (KAFEL.height() + ODSTEP_KAFLI) + KAFEL.height() / 2)
+        self.przesuniecie = srodek - QPointF(rozmiar.width(), rozmiar.height()) / (2 * self.skala)
+        self._ogranicz(rozmiar)
+
+    # --- geometria ---
+    def prostokat(self, i: int) -> QRect:
+        """Kafel i we współrzędnych widżetu."""
+        w, k = divmod(i, self.kolumny)
+        s = self.skala
+        x = (ODSTEP_KAFLI + k * (KAFEL.width() + ODSTEP_KAFLI) - self.przesuniecie.x()) * s
+        y = (ODSTEP_KAFLI + w * (KAFEL.height() + ODSTEP_KAFLI) - self.przesuniecie.y()) * s
+        return QRectF(x, y, KAFEL.width() * s, KAFEL.height() * s).toAlignedRect()
+
+    def _zakres(self, a: float, b: float, dlugosc: int, n: int) -> range:
+        s = self.skala
+        skok = dlugosc + ODSTEP_KAFLI
+        od = int((a / s - ODSTEP_KAFLI) // skok)
+        do = int((b / s - ODSTEP_KAFLI) // skok) + 1
+        return range(max(od, 0), min(do, n))
+
+    def widoczne(self, obszar: QRect) -> np.ndarray:
+        """Numery kafli przecinających `obszar` (współrzędne widżetu)."""
+        px, py = self.przesuniecie.x() * self.skala, self.przesuniecie.y() * self.skala
+        kolumny = self._zakres(px + obszar.left(), px + obszar.right() + 1, KAFEL.width(), self.kolumny)
+        wiersze = self._zakres(py + obszar.top(), py + obszar.bottom() + 1, KAFEL.height(), self.wiersze)
+        i = (np.arange(wiersze.start, wiersze.stop)[:, None] * self.kolumny
+             + np.arange(kolumny.start, kolumny.stop)[None, :]).ravel()
+        return i[i < self.flota.n]
+
+    def kafel_w(self, punkt: QPoint) -> Optional[int]:
+        for i in self.widoczne(QRect(punkt, QSize(1, 1))).tolist():
+            if self.prostokat(i).contains(punkt):
+                return i
+        return None
+
+    # --- zmiany ---
+    def _klucze(self) -> np.ndarray:
+        """[k, N]: to, co widać w kaflach przy bieżącym poziomie szczegółów."""
+        f = self.flota
+        s = f.silnik
+        poziomy = f.poziomy()
+        if not self.szczegoly:
+            # wysokość cieczy w pikselach ekranu + kolory znaczników
+            wysokosc = np.array([z.height() for z in self._zbiorniki])[:, None] * self.skala
+            return np.vstack((np.floor(poziomy * wysokosc), f.alarm(), s.pompa_on, s.grzalka_on))
+        # teksty jak w rysuj_zbiornik_wartosci / rysuj_grzalke, wirnik pracującej pompy, rury
+        return np.vstack((
+            np.rint(poziomy * 1000.0), np.rint(s.temperatura * 10.0),
+            s.pompa_on, np.where(s.pompa_on, np.round(s.kat, 2), 0.0),
+            s.grzalka_on, np.rint(s.moc * 10.0), s.hold > 0.0, f.alarm(),
+        ))
+
+    def brudne(self, rozmiar: QSize) -> List[QRect]:
+        """Prostokąty widocznych kafli, których wygląd zmienił się od ostatniego wywołania."""
+        klucze = self._klucze()
+        if self._ostatni is None or self._ostatni.shape != klucze.shape:
+            self._ostatni = klucze
+            return [QRect(QPoint(0, 0), rozmiar)]
+        widoczne = self.widoczne(QRect(QPoint(0, 0), rozmiar))
+        zmienione = widoczne[(klucze[:, widoczne] != self._ostatni[:, widoczne]).any(axis=0)]
+        self._ostatni[:, zmienione] = klucze[:, zmienione]
+        return [self.prostokat(i) for i in zmienione.tolist()]
+
+    # --- rysowanie ---
+    def rysuj(self, p: QPainter, obszar: QRect) -> None:
+        """Tło i kafle przecinające `obszar` (prostokąt z paintEvent)."""
+        p.fillRect(obszar, KOLOR_TLA)
+        f = self.flota
+        s = self.skala
+        szczegoly = self.szczegoly
+        p.setRenderHint(QPainter.Antialiasing, szczegoly)
+        alarm = f.alarm()
+        if not szczegoly:
+            poziomy, pompa_on, grzalka_on = f.poziomy(), f.silnik.pompa_on, f.silnik.grzalka_on
+        for i in self.widoczne(obszar).tolist():
+            r = self.prostokat(i)
+            p.save()
+            p.setClipRect(r & obszar)
+            p.translate(r.topLeft())
+            p.scale(s, s)
+            if szczegoly:
+                p.fillRect(QRect(QPoint(0, 0), KAFEL), KOLOR_TLA)
+                f.do_modelu(i, self.model)
+                rysuj_instalacje(p, self.model)
+                p.setPen(KOLOR_ALARMU if alarm[i] else Qt.white)
+                p.drawText(12, 22, f.opis(i))
+            else:
+                rysuj_glif(p, self._zbiorniki, self._pompa, self._grzalka,
+                           poziomy[:, i], bool(alarm[i]), bool(pompa_on[i]), bool(grzalka_on[i]))
+            p.restore()
+            if szczegoly:
+                p.setPen(QPen(KOLOR_ALARMU if alarm[i] else KOLOR_RAMKI, 2))
+                p.setBrush(Qt.NoBrush)
+                p.drawRect(r.adjusted(1, 1, -1, -1))
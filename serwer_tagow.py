@@ -0,0 +1,498 @@
+"""
+serwer_tagow.py
+Lokalny serwer tagów (asyncio, binarny protokół TCP w stylu Modbus-TCP)
+i klient testowy.
+
+Tagi to sygnały bazy modelu (Z1.poziom, P1.wlaczona, z1p.plynie...) oraz
+stany alarmów (<tag>.stan: 0 norma, 1 aktywny, 2 aktywny potwierdzony,
+3 powrót niepotwierdzony; alarm zawieszony ma jakość niepewną).
+
+Serwer działa we własnym wątku z pętlą asyncio i nigdy nie dotyka żywego
+modelu: właściciel modelu (okno, pętla bez GUI) po skanie woła
+publikuj(), które kopiuje wartości do niezmiennego obrazu i podmienia
+referencję. Odczyty i subskrypcje wszystkich klientów obsługiwane są
+z obrazu, więc liczba klientów nie spowalnia symulacji.
+
+Ramka (little endian): nagłówek "<HBBI" - numer transakcji, funkcja,
+status (0 = ok, 1 = błąd, dane to komunikat UTF-8), długość danych - i dane.
+
+    LISTA        -                       -> n "<H", n x ("<HBB" slot, dwustanowy, dł. nazwy; nazwa)
+    CZYTAJ       sloty "<H"... (brak = wszystkie) -> t "<d", rekordy
+    SUBSKRYBUJ   "<Hdd" id, okres [s], martwa strefa; sloty "<H"... -> -
+    ANULUJ       "<H" id                 -> -
+    POWIADOMIENIE (serwer -> klient, nr transakcji = id subskrypcji) -> t "<d", rekordy
+
+Rekord: "<HdBd" - slot, wartość, jakość, czas ostatniej zmiany. Subskrypcja
+próbkuje obraz co okres i wysyła tylko tagi zmienione o więcej niż martwa
+strefa (pierwsze powiadomienie - wszystkie). Klient, który nie nadąża
+odbierać, traci pośrednie powiadomienia, nie zmiany - następne zawiera
+wszystko, co zmieniło się od ostatniego wysłanego.
+
+Bez GUI:
+    python serwer_tagow.py --port 5020 --tempo 10
+    python serwer_tagow.py --klient --port 5020 Z1.poziom Z3.temperatura --okres 0.5
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sygnaly import JAKOSC_DOBRA, JAKOSC_NIEPEWNA
+
+PORT = 5020
+
+F_LISTA = 1
+F_CZYTAJ = 2
+F_SUBSKRYBUJ = 3
+F_ANULUJ = 4
+F_POWIADOMIENIE = 0x10
+
+STATUS_OK = 0
+STATUS_BLAD = 1
+
+NAGLOWEK = struct.Struct("<HBBI")
+_SUBSKRYPCJA = struct.Struct("<Hdd")
+_TAG = struct.Struct("<HBB")
+_CZAS = struct.Struct("<d")
+REKORD = np.dtype([("slot", "<u2"), ("wartosc", "<f8"), ("jakosc", "u1"), ("czas", "<f8")])
+
+MAKS_DANYCH = 1 << 20             # [B] największa przyjmowana ramka
+MAKS_ZALEGLOSC = 1 << 18          # [B] niewysłanych danych klienta - powyżej powiadomienia czekają
+MIN_OKRES = 0.01                  # [s] najkrótszy okres próbkowania subskrypcji
+
+
+class Obraz(NamedTuple):
+    """Niezmienny obraz tagów z jednego skanu."""
+    numer: int
+    t: float
+    wartosci: np.ndarray
+    jakosc: np.ndarray
+    czas: np.ndarray
+
+
+def _rekordy(obraz: Obraz, sloty: np.ndarray) -> bytes:
+    r = np.empty(len(sloty), dtype=REKORD)
+    r["slot"] = sloty
+    r["wartosc"] = obraz.wartosci[sloty]
+    r["jakosc"] = obraz.jakosc[sloty]
+    r["czas"] = obraz.czas[sloty]
+    return _CZAS.pack(obraz.t) + r.tobytes()
+
+
+def _ramka(nr: int, funkcja: int, dane: bytes = b"", status: int = STATUS_OK) -> bytes:
+    return NAGLOWEK.pack(nr, funkcja, status, len(dane)) + dane
+
+
+# -------------------------
+# Serwer
+# -------------------------
+
+class _Subskrypcja:
+    __slots__ = ("id", "sloty", "okres", "martwa_strefa", "zadanie", "numer", "wartosci", "jakosc")
+
+    def __init__(self, id: int, sloty: np.ndarray, okres: float, martwa_strefa: float):
+        self.id = id
+        self.sloty = sloty
+        self.okres = max(okres, MIN_OKRES)
+        self.martwa_strefa = martwa_strefa
+        self.zadanie: Optional[asyncio.Task] = None
+        self.numer = -1                       # numer obrazu z ostatniego sprawdzenia
+        self.wartosci: Optional[np.ndarray] = None     # ostatnio wysłane
+        self.jakosc: Optional[np.ndarray] = None
+
+
+class SerwerTagow:
+    """Serwer tagów modelu; start() uruchamia wątek z pętlą asyncio."""
+
+    def __init__(self, model, host: str = "127.0.0.1", port: int = PORT):
+        self.model = model
+        self.host = host
+        self.port = port
+        baza = model.sygnaly
+        self._sloty_bazy = [i for i, n in enumerate(baza.nazwy) if n]
+        self._alarmy = model.silnik_alarmow.alarmy
+        nazwy = [baza.nazwy[i] for i in self._sloty_bazy] + [f"{a.tag}.stan" for a in self._alarmy]
+        logiczne = [baza.logiczne[i] for i in self._sloty_bazy] + [0] * len(self._alarmy)
+        self.nazwy = nazwy
+        self._lista = struct.pack("<H", len(nazwy)) + b"".join(
+            _TAG.pack(i, logiczny, len(n.encode("utf-8"))) + n.encode("utf-8")
+            for i, (n, logiczny) in enumerate(zip(nazwy, logiczne)))
+
+        self._wersja_alarmow = None
+        self._alarmy_wartosci = np.zeros(len(self._alarmy))
+        self._alarmy_jakosc = np.full(len(self._alarmy), JAKOSC_DOBRA, dtype=np.uint8)
+        self._alarmy_czas = np.zeros(len(self._alarmy))
+        self._numer = 0
+        self.obraz: Obraz = None
+        self.publikuj()
+
+        self.klienci = 0
+        self._petla: Optional[asyncio.AbstractEventLoop] = None
+        self._serwer: Optional[asyncio.AbstractServer] = None
+        self._watek: Optional[threading.Thread] = None
+        self._gotowy = threading.Event()
+        self._blad: Optional[BaseException] = None
+
+    # --- strona modelu ---
+    def publikuj(self) -> None:
+        """Obraz bieżącego stanu modelu (wołać po skanie, w wątku właściciela modelu)."""
+        m = self.model
+        baza = m.sygnaly
+        s = m.silnik_alarmow
+        if (s.wersja, s.resety) != self._wersja_alarmow:
+            self._wersja_alarmow = (s.wersja, s.resety)
+            self._alarmy_wartosci = np.array([int(a.stan) for a in self._alarmy], dtype=np.float64)
+            self._alarmy_jakosc = np.array([JAKOSC_NIEPEWNA if a.zawieszony else JAKOSC_DOBRA
+                                            for a in self._alarmy], dtype=np.uint8)
+            self._alarmy_czas = np.array([a.czas_zmiany for a in self._alarmy], dtype=np.float64)
+        sloty = self._sloty_bazy
+        self._numer += 1
+        self.obraz = Obraz(
+            self._numer, m.t,
+            np.concatenate((baza.tablica()[sloty], self._alarmy_wartosci)),
+            np.concatenate((np.frombuffer(baza.jakosc, dtype=np.uint8)[sloty], self._alarmy_jakosc)),
+            np.concatenate((np.array(baza.czas, dtype=np.float64)[sloty], self._alarmy_czas)),
+        )
+
+    # --- wątek serwera ---
+    def start(self) -> None:
+        self._watek = threading.Thread(target=self._uruchom, name="serwer_tagow", daemon=True)
+        self._watek.start()
+        self._gotowy.wait()
+        if self._blad is not None:
+            raise self._blad
+
+    def _uruchom(self) -> None:
+        self._petla = asyncio.new_event_loop()
+        try:
+            self._serwer = self._petla.run_until_complete(
+                asyncio.start_server(self._klient, self.host, self.port))
+            self.port = self._serwer.sockets[0].getsockname()[1]     # port 0 = dowolny wolny
+        except OSError as blad:
+            self._blad = blad
+            self._gotowy.set()
+            return
+        self._gotowy.set()
+        self._petla.run_forever()
+        self._petla.run_until_complete(self._petla.shutdown_asyncgens())
+        self._petla.close()
+
+    def zatrzymaj(self) -> None:
+        if self._petla is None or self._watek is None or not self._watek.is_alive():
+            return
+
+        async def stop():
+            self._serwer.close()
+            for zadanie in asyncio.all_tasks():
+                if zadanie is not asyncio.current_task():
+                    zadanie.cancel()
+            await self._serwer.wait_closed()
+            self._petla.stop()
+
+        asyncio.run_coroutine_threadsafe(stop(), self._petla)
+        self._watek.join(2.0)
+
+    # --- obsługa klienta ---
+    async def _klient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subskrypcje: Dict[int, _Subskrypcja] = {}
+        self.klienci += 1
+        try:
+            while True:
+                try:
+                    naglowek = await reader.readexactly(NAGLOWEK.size)
+                    nr, funkcja, _, dlugosc = NAGLOWEK.unpack(naglowek)
+                    if dlugosc > MAKS_DANYCH:
+                        break
+                    dane = await reader.readexactly(dlugosc)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                try:
+                    odpowiedz = self._obsluz(funkcja, dane, writer, subskrypcje)
+                except ValueError as blad:
+                    writer.write(_ramka(nr, funkcja, str(blad).encode("utf-8"), STATUS_BLAD))
+                else:
+                    writer.write(_ramka(nr, funkcja, odpowiedz))
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass        # zatrzymaj(): zwykłe rozłączenie, bez śladu błędu w pętli
+        finally:
+            self.klienci -= 1
+            for sub in subskrypcje.values():
+                sub.zadanie.cancel()
+            writer.close()
+
+    def _sloty(self, dane: bytes) -> np.ndarray:
+        if len(dane) % 2:
+            raise ValueError("lista slotów: nieparzysta długość")
+        if not dane:
+            return np.arange(len(self.nazwy), dtype=np.uint16)
+        sloty = np.frombuffer(dane, dtype="<u2")
+        if sloty.max() >= len(self.nazwy):
+            raise ValueError(f"nieznany slot: {int(sloty.max())}")
+        return sloty
+
+    def _obsluz(self, funkcja: int, dane: bytes, writer, subskrypcje: Dict[int, _Subskrypcja]) -> bytes:
+        if funkcja == F_LISTA:
+            return self._lista
+        if funkcja == F_CZYTAJ:
+            return _rekordy(self.obraz, self._sloty(dane))
+        if funkcja == F_SUBSKRYBUJ:
+            if len(dane) < _SUBSKRYPCJA.size:
+                raise ValueError("subskrypcja: za krótkie dane")
+            id, okres, martwa_strefa = _SUBSKRYPCJA.unpack_from(dane)
+            if not (math.isfinite(okres) and okres > 0):
+                raise ValueError(f"subskrypcja: okres musi być dodatni i skończony ({okres!r})")
+            if not (math.isfinite(martwa_strefa) and martwa_strefa >= 0):
+                raise ValueError(f"subskrypcja: martwa strefa musi być nieujemna i skończona ({martwa_strefa!r})")
+            if id in subskrypcje:
+                raise ValueError(f"subskrypcja {id} już istnieje")
+            sub = _Subskrypcja(id, self._sloty(dane[_SUBSKRYPCJA.size:]), okres, martwa_strefa)
+            sub.zadanie = asyncio.ensure_future(self._probkuj(sub, writer))
+            subskrypcje[id] = sub
+            return b""
+        if funkcja == F_ANULUJ:
+            if len(dane) != 2:
+                raise ValueError("anulowanie: oczekiwane 2 bajty id")
+            (id,) = struct.unpack("<H", dane)
+            sub = subskrypcje.pop(id, None)
+            if sub is None:
+                raise ValueError(f"nieznana subskrypcja: {id}")
+            sub.zadanie.cancel()
+            return b""
+        raise ValueError(f"nieznana funkcja: {funkcja}")
+
+    async def _probkuj(self, sub: _Subskrypcja, writer: asyncio.StreamWriter) -> None:
+        """Co okres: tagi zmienione względem ostatnio wysłanych -> POWIADOMIENIE."""
+        termin = time.perf_counter()
+        while not writer.is_closing():
+            obraz = self.obraz
+            if obraz.numer != sub.numer and writer.transport.get_write_buffer_size() < MAKS_ZALEGLOSC:
+                sub.numer = obraz.numer
+                v = obraz.wartosci[sub.sloty]
+                q = obraz.jakosc[sub.sloty]
+                if sub.wartosci is None:
+                    zmienione = sub.sloty
+                else:
+                    maska = (np.abs(v - sub.wartosci) > sub.martwa_strefa) | (q != sub.jakosc)
+                    zmienione = sub.sloty[maska]
+                    # ostatnio wysłane zostają dla niezmienionych - martwa strefa od wysłanej wartości
+                    v = np.where(maska, v, sub.wartosci)
+                if len(zmienione):
+                    writer.write(_ramka(sub.id, F_POWIADOMIENIE, _rekordy(obraz, zmienione)))
+                    sub.wartosci, sub.jakosc = v, q
+            termin += sub.okres
+            await asyncio.sleep(max(0.0, termin - time.perf_counter()))
+
+
+# -------------------------
+# Klient testowy
+# -------------------------
+
+class Odczyt(NamedTuple):
+    wartosc: float
+    jakosc: int
+    czas: float
+
+
+def _odczyty(dane: bytes, nazwy: Sequence[str]) -> Tuple[float, Dict[str, Odczyt]]:
+    (t,) = _CZAS.unpack_from(dane)
+    r = np.frombuffer(dane, dtype=REKORD, offset=_CZAS.size)
+    return t, {nazwy[s]: Odczyt(w, q, c) for s, w, q, c in
+               zip(r["slot"].tolist(), r["wartosc"].tolist(), r["jakosc"].tolist(), r["czas"].tolist())}
+
+
+class KlientTagow:
+    """Klient asyncio: lista(), czytaj(nazwy), subskrybuj(...) -> kolejka powiadomień.
+
+    Po zerwaniu połączenia klient jest zamknięty: zapytania kończą się od razu
+    ConnectionError, a każda kolejka subskrypcji dostaje None (koniec)."""
+
+    def __init__(self):
+        self.nazwy: List[str] = []
+        self.sloty: Dict[str, int] = {}
+        self._reader = self._writer = None
+        self._nr = 0
+        self._oczekujace: Dict[int, asyncio.Future] = {}
+        self._kolejki: Dict[int, asyncio.Queue] = {}
+        self._odbior: Optional[asyncio.Task] = None
+        self._nr_subskrypcji = 0
+        self.zamkniety = False
+
+    async def polacz(self, host: str = "127.0.0.1", port: int = PORT) -> "KlientTagow":
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._odbior = asyncio.ensure_future(self._odbieraj())
+        await self.lista()
+        return self
+
+    async def _odbieraj(self) -> None:
+        komunikat = "połączenie zamknięte"
+        try:
+            while True:
+                nr, funkcja, status, dlugosc = NAGLOWEK.unpack(await self._reader.readexactly(NAGLOWEK.size))
+                dane = await self._reader.readexactly(dlugosc)
+                if funkcja == F_POWIADOMIENIE:
+                    kolejka = self._kolejki.get(nr)
+                    if kolejka is not None:
+                        kolejka.put_nowait(_odczyty(dane, self.nazwy))
+                    continue
+                f = self._oczekujace.pop(nr, None)
+                if f is None or f.done():
+                    continue
+                if status == STATUS_OK:
+                    f.set_result(dane)
+                else:
+                    f.set_exception(ValueError(dane.decode("utf-8")))
+        except (asyncio.IncompleteReadError, ConnectionError) as blad:
+            komunikat = f"serwer zamknął połączenie: {blad}"
+        finally:
+            self._rozlacz(komunikat)
+
+    def _rozlacz(self, komunikat: str) -> None:
+        """Oczekujące zapytania dostają ConnectionError, kolejki subskrypcji - None."""
+        self.zamkniety = True
+        for f in self._oczekujace.values():
+            if not f.done():
+                f.set_exception(ConnectionError(komunikat))
+        self._oczekujace.clear()
+        for kolejka in self._kolejki.values():
+            kolejka.put_nowait(None)
+        self._kolejki.clear()
+
+    async def _zapytanie(self, funkcja: int, dane: bytes = b"") -> bytes:
+        if self.zamkniety:
+            raise ConnectionError("połączenie z serwerem zamknięte")
+        self._nr = (self._nr + 1) & 0xFFFF
+        f = asyncio.get_running_loop().create_future()
+        self._oczekujace[self._nr] = f
+        self._writer.write(_ramka(self._nr, funkcja, dane))
+        await self._writer.drain()
+        return await f
+
+    def _numery(self, nazwy: Optional[Sequence[str]]) -> bytes:
+        if not nazwy:
+            return b""
+        try:
+            return np.array([self.sloty[n] for n in nazwy], dtype="<u2").tobytes()
+        except KeyError as blad:
+            raise ValueError(f"nieznany tag: {blad.args[0]}") from None
+
+    async def lista(self) -> List[str]:
+        dane = await self._zapytanie(F_LISTA)
+        (n,) = struct.unpack_from("<H", dane)
+        poz = 2
+        nazwy = []
+        for _ in range(n):
+            _, _, dlugosc = _TAG.unpack_from(dane, poz)
+            poz += _TAG.size
+            nazwy.append(dane[poz:poz + dlugosc].decode("utf-8"))
+            poz += dlugosc
+        self.nazwy = nazwy
+        self.sloty = {n: i for i, n in enumerate(nazwy)}
+        return nazwy
+
+    async def czytaj(self, nazwy: Optional[Sequence[str]] = None) -> Tuple[float, Dict[str, Odczyt]]:
+        """Odczyt zbiorczy (None = wszystkie tagi): (czas symulacji, nazwa -> Odczyt)."""
+        return _odczyty(await self._zapytanie(F_CZYTAJ, self._numery(nazwy)), self.nazwy)
+
+    async def subskrybuj(self, nazwy: Optional[Sequence[str]] = None, okres: float = 0.5,
+                         martwa_strefa: float = 0.0) -> Tuple[int, asyncio.Queue]:
+        """Subskrypcja; kolejka dostaje (t, {nazwa: Odczyt}) tylko ze zmienionymi tagami,
+        a po zerwaniu połączenia None."""
+        self._nr_subskrypcji += 1
+        id = self._nr_subskrypcji
+        kolejka: asyncio.Queue = asyncio.Queue()
+        # kolejka przed zapytaniem - pierwsze powiadomienie może przyjść tuż po odpowiedzi
+        self._kolejki[id] = kolejka
+        try:
+            await self._zapytanie(F_SUBSKRYBUJ, _SUBSKRYPCJA.pack(id, okres, martwa_strefa) + self._numery(nazwy))
+        except BaseException:
+            self._kolejki.pop(id, None)
+            raise
+        return id, kolejka
+
+    async def anuluj(self, id: int) -> None:
+        await self._zapytanie(F_ANULUJ, struct.pack("<H", id))
+        self._kolejki.pop(id, None)
+
+    async def zamknij(self) -> None:
+        self.zamkniety = True
+        if self._odbior is not None:
+            self._odbior.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+# -------------------------
+# Uruchomienie bez GUI
+# -------------------------
+
+async def _serwuj(port: int, tempo: Optional[float]) -> None:
+    from model import ModelInstalacji
+    from przeglad import DOMYSLNE
+    from symulacja_w_tle import SymulacjaWTle
+
+    model = ModelInstalacji()
+    model.ustaw_parametry_startowe(**DOMYSLNE)
+    symulacja = SymulacjaWTle(model, 0.02, tempo, tryb="watek")
+    serwer = SerwerTagow(model, port=port)
+    serwer.start()
+    symulacja.start()
+    print(f"serwer tagów: {serwer.host}:{serwer.port}, {len(serwer.nazwy)} tagów")
+    try:
+        while True:
+            if symulacja.odbierz():
+                serwer.publikuj()
+            await asyncio.sleep(0.02)
+    finally:
+        serwer.zatrzymaj()
+        symulacja.zamknij()
+
+
+async def _klient_cli(host: str, port: int, tagi: Sequence[str], okres: float, martwa_strefa: float) -> None:
+    klient = await KlientTagow().polacz(host, port)
+    t, odczyty = await klient.czytaj(tagi or None)
+    print(f"t = {t:.1f} s")
+    for nazwa, o in odczyty.items():
+        print(f"  {nazwa:24s} {o.wartosc:12.4f}  q={o.jakosc}")
+    _, kolejka = await klient.subskrybuj(tagi or None, okres, martwa_strefa)
+    while True:
+        powiadomienie = await kolejka.get()
+        if powiadomienie is None:
+            print("serwer zamknął połączenie", file=sys.stderr)
+            return
+        t, zmiany = powiadomienie
+        print(json.dumps(dict(t=round(t, 2), **{n: round(o.wartosc, 4) for n, o in zmiany.items()}),
+                         ensure_ascii=False))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--tempo", type=float, default=1.0, help="serwer: tempo symulacji (0 = max)")
+    p.add_argument("--klient", action="store_true", help="klient testowy zamiast serwera")
+    p.add_argument("--okres", type=float, default=0.5, help="klient: okres próbkowania subskrypcji [s]")
+    p.add_argument("--martwa-strefa", type=float, default=0.0)
+    p.add_argument("tagi", nargs="*", help="klient: tagi (domyślnie wszystkie)")
+    a = p.parse_args(argv)
+    try:
+        if a.klient:
+            asyncio.run(_klient_cli(a.host, a.port, a.tagi, a.okres, a.martwa_strefa))
+        else:
+            asyncio.run(_serwuj(a.port, a.tempo or None))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+silnik.py
+Bezgłowy silnik symulacji instalacji 4 zbiorników (bez Qt).
+
+Ten sam bilans masy i ciepła co ModelInstalacji.krok() dla domyślnej
+instalacji z graf.py (specjalizacja na sztywno), ale cały stan to
+zwykłe liczby float, a pętla w symuluj() działa na zmiennych lokalnych -
+dzięki temu import jest natychmiastowy, a jeden proces liczy setki tysięcy
+kroków na sekundę. Można go uruchomić na węźle bez serwera X.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+from stale import (
+    BAZOWY_PRZEPLYW, TEMP_OTOCZENIA, PUSTY, SPLYW, SPLYW_MIN,
+    POWROT_BAZA, POWROT_POZIOM, POWROT_MIN, PRZELEW_PROG, PRZELEW,
+    GRZANIE, GRZANIE_MIN_POZIOM, CHLODZENIE, OBROTY_POMPY,
+    HOLD, PROG,
+)
+
+
+# -------------------------
+# Stałe silnika (stałe procesu - stale.py)
+# -------------------------
+
+PROBKOWANIE = 0.2           # okres próbkowania trendów [s]
+LIMIT_HISTORII = 600
+
+NAZWY_RUR = ("z1p", "pT", "Tz2", "Tz3", "z2z4", "z3z4", "z4z1")
+TAGI_ALARMOW = ("Z2.HH", "Z3.HH", "Z4.HH", "T3.HI", "P1.TRIP")
+
+
+class SilnikInstalacji:
+    """Stan instalacji + krok symulacji na zwykłych liczbach."""
+
+    __slots__ = (
+        "ilosc", "pojemnosc", "temperatura",
+        "pompa_on", "predkosc", "grzalka_on", "moc", "kat",
+        "t", "akum_probki", "hold", "przeplywy", "historia",
+    )
+
+    def __init__(self, pojemnosc: Tuple[float, float, float, float] = (100.0, 100.0, 100.0, 100.0),
+                 zapisuj_historie: bool = False):
+        if min(pojemnosc) <= 0:
+            raise ValueError("pojemność zbiornika musi być dodatnia")
+
+        self.pojemnosc: List[float] = [float(c) for c in pojemnosc]
+        self.ilosc: List[float] = [0.0, 0.0, 0.0, 0.0]
+        self.temperatura: List[float] = [TEMP_OTOCZENIA] * 4
+
+        self.pompa_on = True
+        self.predkosc = 1.0
+        self.grzalka_on = True
+        self.moc = 3.0
+        self.kat = 0.0
+
+        self.t = 0.0
+        self.akum_probki = 0.0
+        self.hold: List[float] = [0.0] * len(NAZWY_RUR)
+
+        # ilości przeniesione w ostatnim kroku (ile_z_z1, do_z2, do_z3, z2_do_z4, z3_do_z4, z4_do_z1)
+        self.przeplywy: Tuple[float, ...] = (0.0,) * 6
+
+        # (t, z1, z2, z3, z4, tempZ3) - tak jak ModelInstalacji.historia
+        self.historia: Optional[List[tuple]] = [] if zapisuj_historie else None
+
+    # --- parametry startowe (jak ModelInstalacji.ustaw_parametry_startowe) ---
+    def ustaw_parametry_startowe(
+        self,
+        z1_proc: float, z2_proc: float, z3_proc: float, z4_proc: float,
+        predkosc_pompy: float, moc_grzalki: float,
+        pompa_on: bool, grzalka_on: bool,
+        temp_start: float
+    ) -> None:
+        for i, proc in enumerate((z1_proc, z2_proc, z3_proc, z4_proc)):
+            c = self.pojemnosc[i]
+            self.ilosc[i] = max(0.0, min(c, float(c * proc / 100.0)))
+
+        self.temperatura = [float(temp_start)] * 4
+        self.predkosc = float(predkosc_pompy)
+        self.pompa_on = bool(pompa_on)
+        self.moc = float(moc_grzalki)
+        self.grzalka_on = bool(grzalka_on)
+
+        self.t = 0.0
+        self.akum_probki = 0.0
+        self.hold = [0.0] * len(NAZWY_RUR)
+        self.przeplywy = (0.0,) * 6
+        if self.historia is not None:
+            self.historia.clear()
+
+    # --- odczyt ---
+    def poziomy(self) -> Tuple[float, float, float, float]:
+        c = self.pojemnosc
+        i = self.ilosc
+        return (i[0] / c[0], i[1] / c[1], i[2] / c[2], i[3] / c[3])
+
+    def alarmy(self) -> Dict[str, bool]:
+        p1, p2, p3, p4 = self.poziomy()
+        return {
+            "Z2.HH": p2 > 0.95,
+            "Z3.HH": p3 > 0.95,
+            "Z4.HH": p4 > 0.95,
+            "T3.HI": self.temperatura[2] > 80.0,
+            "P1.TRIP": (not self.pompa_on) and (p1 > 0.2),
+        }
+
+    def plynie(self) -> Dict[str, bool]:
+        return {k: h > 0.0 for k, h in zip(NAZWY_RUR, self.hold)}
+
+    # --- symulacja ---
+    def krok(self, dt: float) -> None:
+        self.symuluj(1, dt)
+
+    def symuluj(self, n: int, dt: float) -> None:
+        """n kroków Eulera o długości dt (ten sam bilans co ModelInstalacji.krok)."""
+        z1, z2, z3, z4 = self.ilosc
+        c1, c2, c3, c4 = self.pojemnosc
+        T1, T2, T3, T4 = self.temperatura
+        h0, h1, h2, h3, h4, h5, h6 = self.hold
+        t = self.t
+        kat = self.kat
+        akum = self.akum_probki
+        historia = self.historia
+
+        pompa_on = self.pompa_on
+        grzalka_on = self.grzalka_on
+        przeplyw_pompy = BAZOWY_PRZEPLYW * self.predkosc
+        d_kat = (OBROTY_POMPY * self.predkosc) * dt if pompa_on else 0.0
+        d_grz = (GRZANIE * self.moc) * dt
+        graw = SPLYW * dt
+        przelew = PRZELEW * dt
+        chl = CHLODZENIE * dt
+        Ta = TEMP_OTOCZENIA
+
+        ile = d2 = d3 = a = b = r = 0.0
+
+        for _ in range(n):
+            t += dt
+            kat += d_kat
+
+            # Z1 -> pompa -> T
+            ile = 0.0
+            if pompa_on and z1 > PUSTY and przeplyw_pompy > 0:
+                ile = przeplyw_pompy * dt
+                if ile > z1:
+                    ile = z1
+                z1 -= ile
+
+            # rozdział w T na Z2 i Z3 wg wolnego miejsca
+            w2 = c2 - z2
+            if w2 < 0.0:
+                w2 = 0.0
+            w3 = c3 - z3
+            if w3 < 0.0:
+                w3 = 0.0
+            suma = w2 + w3
+
+            d2 = d3 = 0.0
+            if ile > 0 and suma > 0:
+                d2 = ile * (w2 / suma)
+                if d2 > c2 - z2:
+                    d2 = c2 - z2
+                z2 += d2
+                d3 = ile - d2
+                if d3 > c3 - z3:
+                    d3 = c3 - z3
+                z3 += d3
+
+            # spływ do Z4
+            a = 0.0
+            if z2 > SPLYW_MIN:
+                a = graw if graw < z2 else z2
+                z2 -= a
+            b = 0.0
+            if z3 > SPLYW_MIN:
+                b = graw if graw < z3 else z3
+                z3 -= b
+            d = a + b
+            if d > c4 - z4:
+                d = c4 - z4
+            z4 += d
+
+            # powrót zależny od poziomu Z4
+            r = 0.0
+            if z4 > POWROT_MIN:
+                r = (POWROT_BAZA + POWROT_POZIOM * (z4 / c4)) * dt
+                if r > z4:
+                    r = z4
+                z4 -= r
+            d = r
+            if d > c1 - z1:
+                d = c1 - z1
+            z1 += d
+
+            # przelew awaryjny
+            if z4 / c4 > PRZELEW_PROG:
+                z4 -= przelew if przelew < z4 else z4
+
+            # grzanie Z3 + chłodzenie
+            if grzalka_on and z3 / c3 > GRZANIE_MIN_POZIOM:
+                T3 += d_grz
+            T1 += (Ta - T1) * chl
+            T2 += (Ta - T2) * chl
+            T3 += (Ta - T3) * chl
+            T4 += (Ta - T4) * chl
+
+            # anty-miganie rur
+            if ile > PROG:
+                h0 = h1 = HOLD
+            else:
+                h0 = h0 - dt if h0 - dt > 0.0 else 0.0
+                h1 = h1 - dt if h1 - dt > 0.0 else 0.0
+            if d2 > PROG:
+                h2 = HOLD
+            else:
+                h2 = h2 - dt if h2 - dt > 0.0 else 0.0
+            if d3 > PROG:
+                h3 = HOLD
+            else:
+                h3 = h3 - dt if h3 - dt > 0.0 else 0.0
+            if a > PROG:
+                h4 = HOLD
+            else:
+                h4 = h4 - dt if h4 - dt > 0.0 else 0.0
+            if b > PROG:
+                h5 = HOLD
+            else:
+                h5 = h5 - dt if h5 - dt > 0.0 else 0.0
+            if r > PROG:
+                h6 = HOLD
+            else:
+                h6 = h6 - dt if h6 - dt > 0.0 else 0.0
+
+            # trendy
+            if historia is not None:
+                akum += dt
+                if akum >= PROBKOWANIE:
+                    akum = 0.0
+                    historia.append((t, z1 / c1, z2 / c2, z3 / c3, z4 / c4, T3))
+                    if len(historia) > LIMIT_HISTORII:
+                        del historia[:-LIMIT_HISTORII]
+            else:
+                akum += dt
+                if akum >= PROBKOWANIE:
+                    akum = 0.0
+
+        self.ilosc = [z1, z2, z3, z4]
+        self.temperatura = [T1, T2, T3, T4]
+        self.hold = [h0, h1, h2, h3, h4, h5, h6]
+        self.t = t
+        self.kat = kat
+        self.akum_probki = akum
+        self.przeplywy = (ile, d2, d3, a, b, r)
+
+    # --- wymiana stanu z ModelInstalacji ---
+    @classmethod
+    def z_modelu(cls, model) -> "SilnikInstalacji":
+        s = cls(tuple(z.pojemnosc for z in model.zbiorniki))
+        s.ilosc = [z.ilosc for z in model.zbiorniki]
+        s.temperatura = [z.temperatura.wartosc for z in model.zbiorniki]
+        pompa, grzalka = model.pompy[0], model.grzalki[0]
+        s.pompa_on = bool(pompa.wlaczona.wartosc)
+        s.predkosc = float(pompa.predkosc.wartosc)
+        s.grzalka_on = bool(grzalka.wlaczona.wartosc)
+        s.moc = float(grzalka.moc.wartosc)
+        s.kat = pompa._kat
+        s.t = model.t
+        s.akum_probki = model._akum_probki
+        s.hold = [float(model.graf.hold[model.graf.rura[k]]) for k in NAZWY_RUR]
+        return s
+
+    def do_modelu(self, model, alarmy: bool = True) -> None:
+        """Przepisuje stan do ModelInstalacji (np. żeby go narysować).
+
+        alarmy=False: bez przeliczania alarmów modelu (model tylko do rysowania)."""
+        for z, ilosc, temp in zip(model.zbiorniki, self.ilosc, self.temperatura):
+            z.ilosc = ilosc
+            z._aktualizuj_poziom()
+            z.temperatura.wartosc = temp
+        pompa, grzalka = model.pompy[0], model.grzalki[0]
+        pompa.wlaczona.wartosc = self.pompa_on
+        pompa.predkosc.wartosc = self.predkosc
+        pompa._kat = self.kat
+        grzalka.wlaczona.wartosc = self.grzalka_on
+        grzalka.moc.wartosc = self.moc
+        model.t = self.t
+        model._akum_probki = self.akum_probki
+        for k, h in zip(NAZWY_RUR, self.hold):
+            j = model.graf.rura[k]
+            model.graf.hold[j] = h
+            model.rury[j].ustaw_przeplyw(h > 0.0)
+        if alarmy:
+            model.aktualizuj_alarmy()
+
+    # --- migawka (migawka.py; import dopiero tutaj - sam silnik zostaje bez NumPy) ---
+    def migawka(self):
+        from migawka import Migawka
+        m = Migawka("silnik", dict(
+            t=self.t, akum_probki=self.akum_probki, kat=self.kat,
+            pompa_on=self.pompa_on, predkosc=self.predkosc,
+            grzalka_on=self.grzalka_on, moc=self.moc,
+            rury=list(NAZWY_RUR),
+        ))
+        for nazwa in ("pojemnosc", "ilosc", "temperatura", "hold", "przeplywy"):
+            m[nazwa] = getattr(self, nazwa)
+        if self.historia is not None:
+            m["historia"] = self.historia
+        return m
+
+    def przywroc(self, m) -> None:
+        """Stan z migawki silnika albo ModelInstalacji (instalacja domyślna, jak z_modelu).
+
+        Najpierw cała migawka jest odczytana i sprawdzona - przy błędzie
+        (ValueError) stan silnika zostaje bez zmian."""
+        m.sprawdz_rodzaj("silnik", "model")
+        o = m.opis
+        if m["pojemnosc"].tolist() != self.pojemnosc:
+            raise ValueError("migawka instalacji o innych pojemnościach zbiorników")
+        t, akum_probki = o["t"], o["akum_probki"]
+        ilosc = m["ilosc"].tolist()
+        temperatura = m["temperatura"].tolist()
+        if len(ilosc) != 4 or len(temperatura) != 4:
+            raise ValueError("migawka modelu innej instalacji niż domyślna")
+        historia = None
+        if m.rodzaj == "silnik":
+            kat = o["kat"]
+            nastawy = (o["pompa_on"], o["predkosc"], o["grzalka_on"], o["moc"])
+            hold = m["hold"].tolist()
+            przeplywy = tuple(m["przeplywy"].tolist())
+            if len(hold) != len(NAZWY_RUR) or len(przeplywy) != len(self.przeplywy):
+                raise ValueError("migawka silnika: zła liczba rur")
+            if self.historia is not None:
+                historia = [tuple(p) for p in m["historia"].tolist()] if "historia" in m else []
+        else:
+            rury = o["rury"]
+            hold_rur = m["hold"].tolist()
+            if any(k not in rury for k in NAZWY_RUR) or len(hold_rur) != len(rury):
+                raise ValueError("migawka modelu innej instalacji niż domyślna")
+            kat = float(m["kat"][0])
+            nastawy = (bool(m["pompa_on"][0]), float(m["predkosc"][0]),
+                       bool(m["grzalka_on"][0]), float(m["moc"][0]))
+            hold = [hold_rur[rury.index(k)] for k in NAZWY_RUR]
+            przeplywy = (0.0,) * len(self.przeplywy)
+
+        # wszystko sprawdzone - dopiero teraz zmiana stanu
+        self.ilosc, self.temperatura = ilosc, temperatura
+        self.t, self.akum_probki = t, akum_probki
+        self.kat = kat
+        self.pompa_on, self.predkosc, self.grzalka_on, self.moc = nastawy
+        self.hold = hold
+        self.przeplywy = przeplywy
+        if historia is not None:
+            self.historia[:] = historia
+
+    @classmethod
+    def z_migawki(cls, m, zapisuj_historie: bool = False) -> "SilnikInstalacji":
+        s = cls(tuple(m["pojemnosc"].tolist()), zapisuj_historie)
+        s.przywroc(m)
+        return s
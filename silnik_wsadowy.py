@@ -0,0 +1,328 @@
+"""
+silnik_wsadowy.py
+Wsadowy silnik symulacji: N instalacji naraz, stan w tablicach NumPy
+(struktura tablic - osobny wiersz na każdy zbiornik / rurę, kolumna na scenariusz).
+
+Jeden krok liczy wszystkie scenariusze operacjami wektorowymi, z tym samym
+bilansem co ModelInstalacji.krok() / SilnikInstalacji.symuluj() - wynik dla
+każdego scenariusza jest taki sam jak przy liczeniu go osobno.
+
+Alarmy (maski [k, N]: statystyka pierwszy_alarm, flota) budowane są z listy
+alarmów konfiguracji - tej samej, z której ModelInstalacji tworzy SilnikAlarmow.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from graf import INSTALACJA_DOMYSLNA
+from migawka import Migawka
+from silnik import PROBKOWANIE, NAZWY_RUR, SilnikInstalacji
+from stale import (
+    BAZOWY_PRZEPLYW, TEMP_OTOCZENIA, PUSTY, SPLYW, SPLYW_MIN,
+    POWROT_BAZA, POWROT_POZIOM, POWROT_MIN, PRZELEW_PROG, PRZELEW,
+    GRZANIE, GRZANIE_MIN_POZIOM, CHLODZENIE, OBROTY_POMPY,
+    HOLD, PROG,
+)
+
+# wiersze tablic (zbiorniki) i jedyna pompa (ssie z Z1) - jak w instalacji domyślnej
+ZBIORNIKI = tuple(z["nazwa"] for z in INSTALACJA_DOMYSLNA["zbiorniki"])
+POMPA = "P1"
+
+# kolejność pól w ustaw_parametry_startowe / DialogStartowy.pobierz()
+PARAMETRY_STARTOWE = (
+    "z1_proc", "z2_proc", "z3_proc", "z4_proc",
+    "predkosc_pompy", "moc_grzalki",
+    "pompa_on", "grzalka_on",
+    "temp_start",
+)
+
+
+def warunki_alarmow(alarmy: Sequence[Mapping]) -> List[Tuple[str, str, int, float, str]]:
+    """Opisy alarmów z konfiguracji (format jak w ModelInstalacji._alarm) -> krotki
+    (tag, wielkość, zbiornik, granica, kierunek); wielkość to "poziom", "temperatura"
+    albo "pompa" (pompa stoi, a poziom źródła > granica). Liczy się warunek
+    załączenia - bez martwej strefy i opóźnień."""
+    warunki = []
+    for a in alarmy:
+        if "pompa" in a:
+            if a["pompa"] != POMPA:
+                raise ValueError(f"alarm {a['tag']}: silnik wsadowy ma tylko pompę {POMPA}")
+            warunki.append((a["tag"], "pompa", 0, float(a["granica"]), ">"))
+            continue
+        zbiornik, _, wielkosc = a["sygnal"].partition(".")
+        if zbiornik not in ZBIORNIKI or wielkosc not in ("poziom", "temperatura"):
+            raise ValueError(f"alarm {a['tag']}: sygnał {a['sygnal']!r} poza silnikiem wsadowym")
+        kierunek = a.get("kierunek", ">")
+        if kierunek not in (">", "<"):
+            raise ValueError(f"nieznany kierunek progu: {kierunek!r}")
+        warunki.append((a["tag"], wielkosc, ZBIORNIKI.index(zbiornik), float(a["granica"]), kierunek))
+    return warunki
+
+
+class SilnikWsadowy:
+    """N instalacji w tablicach: ilosc[4, N], temperatura[4, N], hold[7, N]..."""
+
+    def __init__(self, n: int, pojemnosc: Sequence[float] = (100.0, 100.0, 100.0, 100.0),
+                 statystyki: bool = False, alarmy: Optional[Sequence[Mapping]] = None):
+        if n < 1:
+            raise ValueError("liczba scenariuszy musi być dodatnia")
+        if min(pojemnosc) <= 0:
+            raise ValueError("pojemność zbiornika musi być dodatnia")
+
+        self.n = int(n)
+        self.pojemnosc = np.array(pojemnosc, dtype=np.float64)   # wspólna dla scenariuszy
+
+        self.ilosc = np.zeros((4, n))
+        self.temperatura = np.full((4, n), TEMP_OTOCZENIA)
+        self.hold = np.zeros((len(NAZWY_RUR), n))
+
+        self.pompa_on = np.ones(n, dtype=bool)
+        self.predkosc = np.ones(n)
+        self.grzalka_on = np.ones(n, dtype=bool)
+        self.moc = np.full(n, 3.0)
+        self.kat = np.zeros(n)
+
+        # czas wspólny - wszystkie scenariusze idą tym samym krokiem
+        self.t = 0.0
+        self.akum_probki = 0.0
+
+        # alarmy konfiguracji (domyślnie instalacji domyślnej)
+        self._warunki_alarmow = warunki_alarmow(INSTALACJA_DOMYSLNA["alarmy"] if alarmy is None else alarmy)
+        self.tagi_alarmow = tuple(w[0] for w in self._warunki_alarmow)
+
+        # statystyki przebiegu (liczone w każdym kroku, jeśli włączone)
+        self.statystyki = statystyki
+        self._zeruj_statystyki()
+
+    # --- parametry startowe ---
+    def ustaw_parametry_startowe(
+        self,
+        z1_proc, z2_proc, z3_proc, z4_proc,
+        predkosc_pompy, moc_grzalki,
+        pompa_on, grzalka_on,
+        temp_start
+    ) -> None:
+        """Jak ModelInstalacji.ustaw_parametry_startowe, ale każdy argument może być tablicą [N]."""
+        n = self.n
+        for i, proc in enumerate((z1_proc, z2_proc, z3_proc, z4_proc)):
+            c = self.pojemnosc[i]
+            proc = np.broadcast_to(np.asarray(proc, dtype=np.float64), (n,))
+            self.ilosc[i] = np.maximum(0.0, np.minimum(c, c * proc / 100.0))
+
+        self.temperatura[:] = np.broadcast_to(np.asarray(temp_start, dtype=np.float64), (n,))
+        self.predkosc[:] = np.broadcast_to(np.asarray(predkosc_pompy, dtype=np.float64), (n,))
+        self.pompa_on[:] = np.broadcast_to(np.asarray(pompa_on, dtype=bool), (n,))
+        self.moc[:] = np.broadcast_to(np.asarray(moc_grzalki, dtype=np.float64), (n,))
+        self.grzalka_on[:] = np.broadcast_to(np.asarray(grzalka_on, dtype=bool), (n,))
+
+        self.kat[:] = 0.0
+        self.hold[:] = 0.0
+        self.t = 0.0
+        self.akum_probki = 0.0
+        self._zeruj_statystyki()
+
+    @classmethod
+    def z_parametrow(cls, scenariusze: Sequence[Mapping[str, float]], **kwargs) -> "SilnikWsadowy":
+        """Buduje silnik z listy słowników w formacie DialogStartowy.pobierz()."""
+        s = cls(len(scenariusze), **kwargs)
+        s.ustaw_parametry_startowe(**{
+            k: np.array([sc[k] for sc in scenariusze]) for k in PARAMETRY_STARTOWE
+        })
+        return s
+
+    # --- odczyt ---
+    def poziomy(self) -> np.ndarray:
+        return self.ilosc / self.pojemnosc[:, None]
+
+    def alarmy(self) -> Dict[str, np.ndarray]:
+        return dict(zip(self.tagi_alarmow, self._alarmy(self.ilosc, self.temperatura)))
+
+    def scenariusz(self, i: int) -> SilnikInstalacji:
+        """Stan i-tego scenariusza jako SilnikInstalacji (np. do narysowania)."""
+        s = SilnikInstalacji(tuple(self.pojemnosc))
+        s.ilosc = [float(x) for x in self.ilosc[:, i]]
+        s.temperatura = [float(x) for x in self.temperatura[:, i]]
+        s.hold = [float(x) for x in self.hold[:, i]]
+        s.pompa_on = bool(self.pompa_on[i])
+        s.predkosc = float(self.predkosc[i])
+        s.grzalka_on = bool(self.grzalka_on[i])
+        s.moc = float(self.moc[i])
+        s.kat = float(self.kat[i])
+        s.t = self.t
+        s.akum_probki = self.akum_probki
+        return s
+
+    # --- migawka (migawka.py) ---
+    _STAN = ("ilosc", "temperatura", "hold", "pompa_on", "predkosc", "grzalka_on", "moc", "kat")
+    _STATYSTYKI = ("min_poziom", "max_poziom", "min_temp", "max_temp", "pierwszy_alarm")
+
+    def migawka(self) -> Migawka:
+        m = Migawka("wsadowy", dict(n=self.n, t=self.t, akum_probki=self.akum_probki,
+                                    statystyki=self.statystyki))
+        m["pojemnosc"] = self.pojemnosc
+        for nazwa in self._STAN + (self._STATYSTYKI if self.statystyki else ()):
+            m[nazwa] = getattr(self, nazwa)
+        return m
+
+    def przywroc(self, m: Migawka) -> None:
+        m.sprawdz_rodzaj("wsadowy")
+        if m.opis["n"] != self.n or not np.array_equal(m["pojemnosc"], self.pojemnosc):
+            raise ValueError("migawka silnika wsadowego o innej liczbie scenariuszy albo pojemnościach")
+        for nazwa in self._STAN:
+            getattr(self, nazwa)[:] = m[nazwa]
+        self.t = m.opis["t"]
+        self.akum_probki = m.opis["akum_probki"]
+        if self.statystyki and m.opis["statystyki"]:
+            for nazwa in self._STATYSTYKI:
+                setattr(self, nazwa, m[nazwa].copy())
+        else:
+            self._zeruj_statystyki()
+
+    @classmethod
+    def rozgalez(cls, m: Migawka, n: int, **kwargs) -> "SilnikWsadowy":
+        """n kopii jednego stanu (migawka silnika albo modelu) - np. rozgrzanej
+        instalacji, od której liczone są warianty bez ponownego stanu przejściowego.
+        Czas biegnie dalej od chwili migawki; statystyki liczone są od niej."""
+        jeden = SilnikInstalacji.z_migawki(m)
+        s = cls(n, jeden.pojemnosc, **kwargs)
+        s.ilosc[:] = np.array(jeden.ilosc)[:, None]
+        s.temperatura[:] = np.array(jeden.temperatura)[:, None]
+        s.hold[:] = np.array(jeden.hold)[:, None]
+        s.pompa_on[:] = jeden.pompa_on
+        s.predkosc[:] = jeden.predkosc
+        s.grzalka_on[:] = jeden.grzalka_on
+        s.moc[:] = jeden.moc
+        s.kat[:] = jeden.kat
+        s.t = jeden.t
+        s.akum_probki = jeden.akum_probki
+        s._zeruj_statystyki()
+        return s
+
+    def zmien_parametry(self, scenariusze: Sequence[Mapping[str, float]]) -> None:
+        """Nadpisuje wybrane pola ustaw_parametry_startowe (format DialogStartowy.pobierz())
+        w kolejnych scenariuszach; pola nieobecne w słowniku zostają bez zmian.
+        temp_start ustawia temperaturę wszystkich zbiorników."""
+        if len(scenariusze) != self.n:
+            raise ValueError("liczba słowników musi być równa liczbie scenariuszy")
+        for k in PARAMETRY_STARTOWE:
+            jest = np.array([k in sc for sc in scenariusze])
+            if not jest.any():
+                continue
+            kolumny = np.flatnonzero(jest)
+            wartosci = np.array([scenariusze[j][k] for j in kolumny.tolist()], dtype=np.float64)
+            if k.startswith("z") and k.endswith("_proc"):
+                i = int(k[1]) - 1
+                c = self.pojemnosc[i]
+                self.ilosc[i, kolumny] = np.maximum(0.0, np.minimum(c, c * wartosci / 100.0))
+            elif k == "temp_start":
+                self.temperatura[:, kolumny] = wartosci
+            else:
+                pole = dict(predkosc_pompy="predkosc", moc_grzalki="moc").get(k, k)
+                getattr(self, pole)[kolumny] = wartosci
+        self._zeruj_statystyki()
+
+    # --- symulacja ---
+    def krok(self, dt: float) -> None:
+        self.symuluj(1, dt)
+
+    def symuluj(self, n: int, dt: float) -> None:
+        """n kroków o długości dt dla wszystkich scenariuszy naraz."""
+        c1, c2, c3, c4 = (float(c) for c in self.pojemnosc)
+        z1, z2, z3, z4 = self.ilosc          # widoki - operacje w miejscu
+        T = self.temperatura
+        T3 = T[2]
+        h = self.hold
+
+        przeplyw_pompy = BAZOWY_PRZEPLYW * self.predkosc
+        ile_pompy = przeplyw_pompy * dt
+        pompa_moze = self.pompa_on & (przeplyw_pompy > 0)
+        d_kat = np.where(self.pompa_on, (OBROTY_POMPY * self.predkosc) * dt, 0.0)
+        d_grz = (GRZANIE * self.moc) * dt
+        graw = SPLYW * dt
+        przelew = PRZELEW * dt
+        chl = CHLODZENIE * dt
+
+        for _ in range(n):
+            self.t += dt
+            self.kat += d_kat
+
+            # Z1 -> pompa -> T
+            ile = np.where(pompa_moze & (z1 > PUSTY), np.minimum(ile_pompy, z1), 0.0)
+            z1 -= ile
+
+            # rozdział w T na Z2 i Z3 wg wolnego miejsca
+            w2 = np.maximum(c2 - z2, 0.0)
+            w3 = np.maximum(c3 - z3, 0.0)
+            suma = w2 + w3
+            rozdzial = (ile > 0) & (suma > 0)
+            udzial = np.divide(w2, suma, out=np.zeros_like(w2), where=rozdzial)
+            d2 = np.where(rozdzial, np.minimum(ile * udzial, c2 - z2), 0.0)
+            z2 += d2
+            d3 = np.where(rozdzial, np.minimum(ile - d2, c3 - z3), 0.0)
+            z3 += d3
+
+            # spływ do Z4
+            a = np.where(z2 > SPLYW_MIN, np.minimum(graw, z2), 0.0)
+            z2 -= a
+            b = np.where(z3 > SPLYW_MIN, np.minimum(graw, z3), 0.0)
+            z3 -= b
+            z4 += np.minimum(a + b, c4 - z4)
+
+            # powrót zależny od poziomu Z4
+            r = np.where(z4 > POWROT_MIN,
+                         np.minimum((POWROT_BAZA + POWROT_POZIOM * (z4 / c4)) * dt, z4), 0.0)
+            z4 -= r
+            z1 += np.minimum(r, c1 - z1)
+
+            # przelew awaryjny
+            z4 -= np.where(z4 / c4 > PRZELEW_PROG, np.minimum(przelew, z4), 0.0)
+
+            # grzanie Z3 + chłodzenie
+            T3 += np.where(self.grzalka_on & (z3 / c3 > GRZANIE_MIN_POZIOM), d_grz, 0.0)
+            T += (TEMP_OTOCZENIA - T) * chl
+
+            # anty-miganie rur (z1p i pT mają ten sam warunek)
+            for wiersz, ilosc in ((0, ile), (1, ile), (2, d2), (3, d3), (4, a), (5, b), (6, r)):
+                h[wiersz] = np.where(ilosc > PROG, HOLD, np.maximum(h[wiersz] - dt, 0.0))
+
+            self.akum_probki += dt
+            if self.akum_probki >= PROBKOWANIE:
+                self.akum_probki = 0.0
+
+            if self.statystyki:
+                self._aktualizuj_statystyki()
+
+    # --- pomocnicze ---
+    def _alarmy(self, ilosc: np.ndarray, temperatura: np.ndarray) -> np.ndarray:
+        poz = ilosc / self.pojemnosc[:, None]
+        maski = []
+        for _, wielkosc, i, granica, kierunek in self._warunki_alarmow:
+            if wielkosc == "pompa":
+                maski.append((~self.pompa_on) & (poz[i] > granica))
+                continue
+            v = poz[i] if wielkosc == "poziom" else temperatura[i]
+            maski.append(v > granica if kierunek == ">" else v < granica)
+        return np.stack(maski) if maski else np.zeros((0, self.n), dtype=bool)
+
+    def _zeruj_statystyki(self) -> None:
+        if not getattr(self, "statystyki", False):
+            return
+        poz = self.poziomy()
+        self.min_poziom = poz.copy()
+        self.max_poziom = poz.copy()
+        self.min_temp = self.temperatura.copy()
+        self.max_temp = self.temperatura.copy()
+        # czas pierwszej aktywacji alarmu (NaN = nie wystąpił); alarmy jak w modelu
+        # sprawdzane dopiero po kroku
+        self.pierwszy_alarm = np.full((len(self.tagi_alarmow), self.n), np.nan)
+
+    def _aktualizuj_statystyki(self) -> None:
+        poz = self.poziomy()
+        np.minimum(self.min_poziom, poz, out=self.min_poziom)
+        np.maximum(self.max_poziom, poz, out=self.max_poziom)
+        np.minimum(self.min_temp, self.temperatura, out=self.min_temp)
+        np.maximum(self.max_temp, self.temperatura, out=self.max_temp)
+        nowe = self._alarmy(self.ilosc, self.temperatura) & np.isnan(self.pierwszy_alarm)
+        self.pierwszy_alarm[nowe] = self.t
@@ -0,0 +1,26 @@
+"""
+stale.py
+Stałe procesu instalacji 4 zbiorników (bez zależności).
+
+Z nich graf.py buduje domyślną konfigurację (INSTALACJA_DOMYSLNA) i wartości
+domyślne pól konfiguracji, a silnik.py / silnik_wsadowy.py - swoje
+specjalizacje na sztywno tej samej instalacji.
+"""
+
+BAZOWY_PRZEPLYW = 18.0      # przepływ pompy przy prędkości 1.0 [/s]
+TEMP_OTOCZENIA = 20.0       # °C
+PUSTY = 0.1                 # Z1 "pusty" - pompa nie tłoczy
+SPLYW = 7.0                 # spływ grawitacyjny Z2/Z3 -> Z4 [/s]
+SPLYW_MIN = 2.0             # minimalna ilość, przy której jest spływ
+POWROT_BAZA = 8.0           # powrót Z4 -> Z1: 8 + 20 * poziom [/s]
+POWROT_POZIOM = 20.0
+POWROT_MIN = 1.0
+PRZELEW_PROG = 0.97         # przelew awaryjny Z4
+PRZELEW = 25.0
+GRZANIE = 2.5               # °C/s na jednostkę mocy
+GRZANIE_MIN_POZIOM = 0.10   # blokada grzałki przy pustym Z3
+CHLODZENIE = 0.08           # 1/s, chłodzenie do otoczenia
+OBROTY_POMPY = 8.0          # rad/s przy prędkości 1.0 (animacja)
+
+HOLD = 0.30                 # anty-miganie rur [s]
+PROG = 0.05                 # minimalna ilość na krok, przy której rura "płynie"
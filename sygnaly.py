@@ -0,0 +1,348 @@
+"""
+sygnaly.py
+Baza sygnałów (tagów): wartości, jakość, znacznik czasu i numer skanu
+ostatniej zmiany w kolumnach - po jednym slocie na sygnał.
+
+Sygnal jest tylko lekkim widokiem (__slots__: baza + numer slotu), więc
+tysiące tagów to kilka kolumn zamiast tysięcy obiektów ze słownikami. Obok
+dostępu pojedynczego (s.wartosc) są operacje zbiorcze po listach slotów
+(odczytaj / zapisz) i kopia wszystkich wartości jako tablica NumPy.
+
+Kolumny zapisywane w każdym skanie (wartości, czas, skan zmiany) to zwykłe
+listy: przypisanie elementu listy jest kilka razy tańsze niż do array("d"),
+które przy każdym odczycie pakuje liczbę w nowy obiekt. Jakość zmienia się
+rzadko i zostaje w bytearray.
+
+Zapis innej wartości ustawia czas i numer bieżącego skanu (skan), a
+koniec_skanu() tylko zwiększa licznik - sygnał jest zmieniony w skanie, gdy
+skan_zmiany[slot] == skan. Zapis to więc porównanie i trzy przypisania, bez
+flag i list do kasowania; alarmy i rejestratory czytają w skanie tylko to,
+co się zmieniło.
+
+Subskrypcje (publikuj / subskrybuj): odbiorca zapisuje się na listę
+sygnałów z martwą strefą i minimalnym okresem powiadomień. koniec_skanu()
+rozsyła zmiany raz na skan, zbiorczo (słownik nazwa -> wartość), tylko do
+subskrypcji tych sygnałów. Subskrypcja bez odbiorcy zbiera zmiany, a
+widok odbiera je sam przez pobierz() - we własnym rytmie, np. przy
+odświeżaniu ekranu.
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+# jakość jak w OPC: dobra / niepewna / zła
+JAKOSC_DOBRA = 192
+JAKOSC_NIEPEWNA = 64
+JAKOSC_ZLA = 0
+
+
+class BazaSygnalow:
+    """Sloty sygnałów: wartosci (float), jakosc (uint8), czas (float),
+    skan_zmiany (numer skanu ostatniej zmiany wartości lub jakości).
+
+    teraz - znacznik czasu nadawany przy zapisie (model ustawia czas symulacji).
+    """
+
+    def __init__(self):
+        self.nazwy: List[str] = []
+        self.logiczne = bytearray()          # 1 = sygnał dwustanowy (wartość 0.0 / 1.0)
+        self.wartosci: List[float] = []
+        self.jakosc = array("B")
+        self.czas: List[float] = []
+        self.skan_zmiany: List[int] = []
+        self.skan = 1
+        self.teraz = 0.0
+        self._slot: Dict[str, int] = {}
+        self._subskrypcje: Dict[int, List[Subskrypcja]] = {}    # slot -> subskrypcje
+        self._wysylajace: List[Subskrypcja] = []                 # subskrypcje z odbiorcą
+
+    def __len__(self) -> int:
+        return len(self.nazwy)
+
+    def __contains__(self, nazwa: str) -> bool:
+        return nazwa in self._slot
+
+    def dodaj(self, nazwa: str, wartosc: float, logiczny: bool = False) -> int:
+        """Nowy slot; zwraca jego numer. Nazwa pusta = sygnał anonimowy."""
+        if nazwa and nazwa in self._slot:
+            raise ValueError(f"sygnał {nazwa} już istnieje")
+        i = len(self.nazwy)
+        self.nazwy.append(nazwa)
+        if nazwa:
+            self._slot[nazwa] = i
+        self.logiczne.append(1 if logiczny else 0)
+        self.wartosci.append(float(wartosc))
+        self.jakosc.append(JAKOSC_DOBRA)
+        self.czas.append(self.teraz)
+        self.skan_zmiany.append(self.skan)
+        return i
+
+    def slot(self, nazwa: str) -> int:
+        try:
+            return self._slot[nazwa]
+        except KeyError:
+            raise ValueError(f"nieznany sygnał: {nazwa!r}") from None
+
+    def __getitem__(self, nazwa: str) -> "Sygnal":
+        i = self.slot(nazwa)
+        return (SygnalBool if self.logiczne[i] else SygnalFloat).widok(self, i)
+
+    # --- pojedynczo ---
+    def ustaw(self, i: int, wartosc: float, jakosc: int = JAKOSC_DOBRA) -> None:
+        wartosc = float(wartosc)
+        if self.wartosci[i] != wartosc or self.jakosc[i] != jakosc:
+            self.wartosci[i] = wartosc
+            self.jakosc[i] = jakosc
+            self.czas[i] = self.teraz
+            self.skan_zmiany[i] = self.skan
+
+    # --- zbiorczo ---
+    def odczytaj(self, sloty: Sequence[int]) -> List[float]:
+        w = self.wartosci
+        return [w[i] for i in sloty]
+
+    def zapisz(self, sloty: Sequence[int], wartosci: Iterable[float]) -> None:
+        """Zapis wielu slotów (jakość bez zmian); czas i skan tylko przy zmianie."""
+        w, czas, sk = self.wartosci, self.czas, self.skan_zmiany
+        teraz, n = self.teraz, self.skan
+        for i, v in zip(sloty, wartosci):
+            if w[i] != v:
+                w[i] = v
+                czas[i] = teraz
+                sk[i] = n
+
+    def ustaw_jakosc(self, sloty: Sequence[int], jakosc: int) -> None:
+        for i in sloty:
+            if self.jakosc[i] != jakosc:
+                self.jakosc[i] = jakosc
+                self.czas[i] = self.teraz
+                self.skan_zmiany[i] = self.skan
+
+    def przepisz(self, wartosci: np.ndarray, jakosc: np.ndarray) -> None:
+        """Wszystkie sloty naraz (kopia bazy z innego wątku / procesu); czas i skan tylko przy zmianie."""
+        q = np.frombuffer(self.jakosc, dtype=np.uint8)
+        zmiana = np.flatnonzero((self.tablica() != wartosci) | (q != jakosc))
+        if len(zmiana):
+            q[zmiana] = jakosc[zmiana]
+            w, czas, sk = self.wartosci, self.czas, self.skan_zmiany
+            teraz, n = self.teraz, self.skan
+            for i, v in zip(zmiana.tolist(), wartosci[zmiana].tolist()):
+                w[i] = v
+                czas[i] = teraz
+                sk[i] = n
+
+    def tablica(self) -> np.ndarray:
+        """Kopia wszystkich wartości jako tablica NumPy."""
+        return np.array(self.wartosci, dtype=np.float64)
+
+    # --- skan ---
+    def zmienione_sloty(self) -> List[int]:
+        """Sloty zmienione od ostatniego koniec_skanu() (rosnąco)."""
+        n = self.skan
+        return [i for i, s in enumerate(self.skan_zmiany) if s == n]
+
+    def koniec_skanu(self) -> None:
+        """Rozesłanie zmian do subskrypcji i następny numer skanu."""
+        if self._subskrypcje:
+            w, jakosc, sk, n = self.wartosci, self.jakosc, self.skan_zmiany, self.skan
+            for i, lista in self._subskrypcje.items():
+                if sk[i] == n:
+                    v, q = w[i], jakosc[i]
+                    for sub in lista:
+                        sub._zmiana(i, v, q)
+        for sub in self._wysylajace:
+            if sub._oczekujace:
+                sub._wyslij()
+        self.skan += 1
+
+    # --- subskrypcje ---
+    def subskrybuj(self, sygnaly: Iterable[Union[str, int]],
+                   odbiorca: Optional[Callable[[Dict[str, float]], None]] = None,
+                   martwa_strefa: float = 0.0, okres: float = 0.0,
+                   zegar: Optional[Callable[[], float]] = None) -> "Subskrypcja":
+        """Subskrypcja zmian sygnałów (nazwy lub numery slotów).
+
+        odbiorca      - wywoływany w koniec_skanu() ze słownikiem nazwa -> wartość;
+                        None = subskrypcja do odczytu przez pobierz()
+        martwa_strefa - zmiana mniejsza lub równa (względem ostatnio
+                        przekazanej wartości) nie jest zgłaszana
+        okres         - najmniejszy odstęp między powiadomieniami; zmiany
+                        wstrzymane w tym czasie idą w następnym
+        zegar         - źródło czasu dla okresu (domyślnie czas bazy, teraz)
+        Na początek zgłaszane są bieżące wartości wszystkich sygnałów.
+        """
+        sloty = [self.slot(s) if isinstance(s, str) else int(s) for s in sygnaly]
+        sub = Subskrypcja(self, sloty, odbiorca, martwa_strefa, okres, zegar)
+        for i in sloty:
+            self._subskrypcje.setdefault(i, []).append(sub)
+            sub._oczekujace[i] = self.wartosci[i]
+        if odbiorca is not None:
+            self._wysylajace.append(sub)
+        return sub
+
+    def _anuluj(self, sub: "Subskrypcja") -> None:
+        for i in sub.sloty:
+            lista = self._subskrypcje.get(i)
+            if lista and sub in lista:
+                lista.remove(sub)
+                if not lista:
+                    del self._subskrypcje[i]
+        if sub in self._wysylajace:
+            self._wysylajace.remove(sub)
+
+    def oznacz_wszystkie(self) -> None:
+        """Wszystkie sloty jako zmienione (np. po resecie odbiorców)."""
+        self.skan_zmiany[:] = [self.skan] * len(self.nazwy)
+
+    # --- migawka (migawka.py) ---
+    def zapisz_stan(self, m, prefiks: str = "sygnaly") -> None:
+        m.opis[prefiks] = dict(nazwy=self.nazwy, teraz=self.teraz)
+        m[f"{prefiks}.wartosci"] = self.tablica()
+        m[f"{prefiks}.jakosc"] = np.frombuffer(self.jakosc, dtype=np.uint8)
+        m[f"{prefiks}.czas"] = np.array(self.czas, dtype=np.float64)
+
+    def wczytaj_stan(self, m, prefiks: str = "sygnaly") -> None:
+        if m.opis[prefiks]["nazwy"] != self.nazwy:
+            raise ValueError("migawka z innym zestawem sygnałów")
+        self.teraz = m.opis[prefiks]["teraz"]
+        self.wartosci = m[f"{prefiks}.wartosci"].tolist()
+        self.jakosc = array("B", m[f"{prefiks}.jakosc"].tobytes())
+        self.czas = m[f"{prefiks}.czas"].tolist()
+        self.oznacz_wszystkie()
+
+
+class Subskrypcja:
+    """Zapis na zmiany grupy sygnałów (tworzy ją BazaSygnalow.subskrybuj)."""
+
+    __slots__ = ("baza", "sloty", "odbiorca", "martwa_strefa", "okres", "zegar",
+                 "_ostatnie", "_oczekujace", "_wyslano")
+
+    def __init__(self, baza: BazaSygnalow, sloty: List[int],
+                 odbiorca: Optional[Callable[[Dict[str, float]], None]],
+                 martwa_strefa: float, okres: float,
+                 zegar: Optional[Callable[[], float]]):
+        self.baza = baza
+        self.sloty = sloty
+        self.odbiorca = odbiorca
+        self.martwa_strefa = float(martwa_strefa)
+        self.okres = float(okres)
+        self.zegar = zegar
+        self._ostatnie: Dict[int, tuple] = {}       # slot -> (wartość, jakość) ostatnio przekazane
+        self._oczekujace: Dict[int, float] = {}     # slot -> wartość czekająca na przekazanie
+        self._wyslano: Optional[float] = None
+
+    def _zmiana(self, i: int, v: float, q: int) -> None:
+        if i in self._oczekujace:
+            self._oczekujace[i] = v
+            return
+        ostatnia = self._ostatnie.get(i)
+        if ostatnia is None or ostatnia[1] != q or abs(v - ostatnia[0]) > self.martwa_strefa:
+            self._oczekujace[i] = v
+
+    def _czas(self) -> float:
+        return self.zegar() if self.zegar is not None else self.baza.teraz
+
+    def _wyslij(self) -> None:
+        if self.okres > 0.0:
+            teraz = self._czas()
+            if self._wyslano is not None and teraz - self._wyslano < self.okres:
+                return
+            self._wyslano = teraz
+        self.odbiorca(self.pobierz())
+
+    def oczekuje(self) -> bool:
+        return bool(self._oczekujace)
+
+    def pobierz(self) -> Dict[str, float]:
+        """Zmiany zebrane od poprzedniego pobrania (nazwa -> wartość) - i ich skasowanie."""
+        if not self._oczekujace:
+            return {}
+        nazwy, jakosc = self.baza.nazwy, self.baza.jakosc
+        ostatnie = self._ostatnie
+        wynik = {}
+        for i, v in self._oczekujace.items():
+            ostatnie[i] = (v, jakosc[i])
+            wynik[nazwy[i]] = v
+        self._oczekujace = {}
+        return wynik
+
+    def anuluj(self) -> None:
+        self.baza._anuluj(self)
+        self._oczekujace = {}
+
+
+# -------------------------
+# Widoki sygnałów
+# -------------------------
+
+class Sygnal:
+    """Widok na slot bazy. Sygnal(wartosc) bez bazy dostaje własną, jednoslotową."""
+
+    __slots__ = ("baza", "slot")
+
+    _logiczny = False
+
+    def __init__(self, wartosc, baza: Optional[BazaSygnalow] = None, nazwa: str = ""):
+        if baza is None:
+            baza = BazaSygnalow()
+        self.baza = baza
+        self.slot = baza.dodaj(nazwa, wartosc, self._logiczny)
+
+    @classmethod
+    def widok(cls, baza: BazaSygnalow, slot: int) -> "Sygnal":
+        s = cls.__new__(cls)
+        s.baza = baza
+        s.slot = slot
+        return s
+
+    @property
+    def wartosc(self):
+        return self.baza.wartosci[self.slot]
+
+    @wartosc.setter
+    def wartosc(self, v) -> None:
+        self.baza.ustaw(self.slot, v)
+
+    @property
+    def nazwa(self) -> str:
+        return self.baza.nazwy[self.slot]
+
+    @property
+    def jakosc(self) -> int:
+        return self.baza.jakosc[self.slot]
+
+    @property
+    def czas(self) -> float:
+        return self.baza.czas[self.slot]
+
+    @property
+    def zmieniony(self) -> bool:
+        return self.baza.skan_zmiany[self.slot] == self.baza.skan
+
+    def subskrybuj(self, odbiorca=None, martwa_strefa: float = 0.0, okres: float = 0.0,
+                   zegar=None) -> Subskrypcja:
+        return self.baza.subskrybuj([self.slot], odbiorca, martwa_strefa, okres, zegar)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.nazwa or self.slot}={self.wartosc!r})"
+
+
+class SygnalFloat(Sygnal):
+    __slots__ = ()
+
+
+class SygnalBool(Sygnal):
+    __slots__ = ()
+
+    _logiczny = True
+
+    @property
+    def wartosc(self) -> bool:
+        return self.baza.wartosci[self.slot] != 0.0
+
+    @wartosc.setter
+    def wartosc(self, v) -> None:
+        self.baza.ustaw(self.slot, 1.0 if v else 0.0)
@@ -0,0 +1,355 @@
+"""
+symulacja_w_tle.py
+Symulacja w osobnym wątku albo procesie - GUI tylko wyświetla jej stan.
+
+Wątek / proces symulacji ma własny ModelInstalacji i stały takt
+(zegar.Harmonogram; kroki i tempo jak w GUI - ZegarSymulacji). Stan do
+wyświetlenia idzie przez WymianaStanu: dwa sloty (podwójne buforowanie)
+w jednym buforze - bytearray dla wątku, pamięć współdzielona dla procesu.
+Symulacja pisze do slotu, którego nie opublikowała ostatnio, i dopiero po
+zapisie go publikuje. Każdy slot ma licznik sekwencji (seqlock: nieparzysty
+= zapis w toku), więc odczyt nigdy nie blokuje symulacji - GUI, które trafi
+na slot w trakcie zapisu, czyta jeszcze raz albo zostaje przy poprzedniej
+klatce. Spójność zapewnia kolejność zapisów (x86 / CPython); bez blokad.
+
+Klatka to stan "ciągły": czas, wszystkie sygnały z bazy (z jakością), kąty
+wirników. To, czego nie wolno zgubić, idzie kolejkami: próbki trendów (z
+całą bazą z chwili próbki - rejestratory lustra widzą dokładny stan),
+przyrosty stanu alarmów, odpowiedzi na polecenia. W drugą stronę idą
+polecenia (start / stop, tempo, akcje alarmów, migawka, przywrócenie).
+
+GUI trzyma lustrzany model tej samej instalacji: SymulacjaWTle.odbierz()
+przepisuje do niego klatkę i zdarzenia, a widoki czytają zwykły
+ModelInstalacji (subskrypcje sygnałów działają jak przy symulacji w GUI).
+"""
+
+from __future__ import annotations
+import multiprocessing
+from array import array
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from migawka import Migawka
+from model import ModelInstalacji
+from zegar import Harmonogram, ZegarSymulacji
+
+TRYBY = ("watek", "proces")
+OKRES_TAKTU = 0.005          # [s] takt pętli symulacji (klatka publikowana po każdym takcie z krokami)
+UDZIAL_BUDZETU = 0.6         # część taktu na kroki - reszta dla GUI (w trybie wątku wspólny GIL)
+
+# pola nagłówka klatki (float64) przed wartościami sygnałów i kątami wirników
+POLA_KLATKI = ("numer", "epoka", "t", "tempo", "zaleglosc", "krok_s")
+_STEROWANIE = 4              # uint64: opublikowany slot, sekwencja slotu 0, sekwencja slotu 1, zapas
+
+
+# -------------------------
+# Wymiana stanu (podwójny bufor + seqlock)
+# -------------------------
+
+def _wyrownaj(n: int) -> int:
+    return -(-n // 8) * 8
+
+
+class WymianaStanu:
+    """Dwa sloty klatek w jednym buforze; pisze symulacja, czyta GUI."""
+
+    def __init__(self, bufor, sygnaly: int, pompy: int):
+        self.sygnaly = sygnaly
+        self.pompy = pompy
+        liczby = len(POLA_KLATKI) + sygnaly + pompy
+        poczatek = 8 * _STEROWANIE
+        slot = 8 * liczby + _wyrownaj(sygnaly)
+        self._ster = np.ndarray((_STEROWANIE,), np.uint64, buffer=bufor)
+        self._liczby = [np.ndarray((liczby,), np.float64, buffer=bufor, offset=poczatek + k * slot)
+                        for k in (0, 1)]
+        self._jakosc = [np.ndarray((sygnaly,), np.uint8, buffer=bufor, offset=poczatek + k * slot + 8 * liczby)
+                        for k in (0, 1)]
+
+    @staticmethod
+    def rozmiar(sygnaly: int, pompy: int) -> int:
+        return 8 * _STEROWANIE + 2 * (8 * (len(POLA_KLATKI) + sygnaly + pompy) + _wyrownaj(sygnaly))
+
+    def publikuj(self, naglowek: Sequence[float], wartosci, jakosc, kat: Sequence[float]) -> None:
+        ster = self._ster
+        k = 1 - int(ster[0])
+        liczby = self._liczby[k]
+        p = len(POLA_KLATKI)
+        ster[1 + k] += 1                    # nieparzysty: zapis w toku
+        liczby[:p] = naglowek
+        liczby[p:p + self.sygnaly] = wartosci
+        liczby[p + self.sygnaly:] = kat
+        self._jakosc[k][:] = jakosc
+        ster[1 + k] += 1
+        ster[0] = k
+
+    def czytaj(self, klatka: "Klatka", proby: int = 3) -> bool:
+        """Kopia opublikowanego slotu do klatki; False gdy nie udało się przeczytać spójnie."""
+        ster = self._ster
+        for _ in range(proby):
+            k = int(ster[0])
+            sekwencja = int(ster[1 + k])
+            if sekwencja & 1:
+                continue
+            np.copyto(klatka.liczby, self._liczby[k])
+            np.copyto(klatka.jakosc, self._jakosc[k])
+            if int(ster[1 + k]) == sekwencja:
+                return True
+        return False
+
+
+class Klatka:
+    """Kopia klatki po stronie GUI."""
+
+    def __init__(self, sygnaly: int, pompy: int):
+        p = len(POLA_KLATKI)
+        self.liczby = np.zeros(p + sygnaly + pompy)
+        self.jakosc = np.zeros(sygnaly, dtype=np.uint8)
+        self.wartosci = self.liczby[p:p + sygnaly]
+        self.kat = self.liczby[p + sygnaly:]
+
+    def __getattr__(self, nazwa: str) -> float:
+        try:
+            return float(self.liczby[POLA_KLATKI.index(nazwa)])
+        except ValueError:
+            raise AttributeError(nazwa) from None
+
+
+# -------------------------
+# Strona symulacji (wątek / proces)
+# -------------------------
+
+class _Symulacja:
+    """Pętla symulacji: polecenia -> kroki -> publikacja klatki -> czekanie na takt."""
+
+    def __init__(self, konfiguracja: Mapping, migawka: bytes, dt: float, tempo: Optional[float],
+                 bufor, polecenia, zdarzenia, okres: float):
+        self.model = ModelInstalacji(konfiguracja=konfiguracja)
+        self.model.przywroc(Migawka.z_bajtow(migawka))
+        self.model.rejestratory.append(self)
+        self.wymiana = WymianaStanu(bufor, len(self.model.sygnaly), len(self.model.pompy))
+        self.zegar = ZegarSymulacji(dt, tempo, budzet_ramki=okres * UDZIAL_BUDZETU)
+        self.takt = Harmonogram(okres)
+        self.polecenia = polecenia
+        self.zdarzenia = zdarzenia
+
+        self.biegnie = False
+        self.koniec = False
+        self.epoka = 0
+        self.numer = 0
+        self.krok_s = 0.0
+        self._probki = []
+        self._zsynchronizuj_alarmy()
+
+    def _zsynchronizuj_alarmy(self) -> None:
+        s = self.model.silnik_alarmow
+        self._wersja, self._resety = s.wersja, s.resety
+
+    # rejestrator modelu: stan bazy z chwili próbki trendów, do najbliższej publikacji
+    def dopisz(self, t: float, *probka: float) -> None:
+        self._probki.append((t, array("d", self.model.sygnaly.wartosci)))
+
+    def petla(self) -> None:
+        self._publikuj()
+        while not self.koniec:
+            zmiana = self._wykonaj_polecenia()
+            if self.biegnie:
+                poczatek = time.perf_counter()
+                n = self.zegar.tik(self.model.krok)
+                if n:
+                    self.krok_s = (time.perf_counter() - poczatek) / n
+                    zmiana = True
+            if zmiana:
+                self._publikuj()
+            self.takt.czekaj()
+
+    def _wykonaj_polecenia(self) -> bool:
+        zmiana = False
+        while True:
+            try:
+                nazwa, *argumenty = self.polecenia.get_nowait()
+            except queue.Empty:
+                return zmiana
+            zmiana = True
+            if nazwa == "start":
+                self.biegnie = True
+                self.zegar.start()
+                self.takt.start()
+            elif nazwa == "stop":
+                self.biegnie = False
+            elif nazwa == "tempo":
+                self.zegar.ustaw_tempo(argumenty[0])
+            elif nazwa == "alarm":
+                metoda, *tagi = argumenty
+                getattr(self.model.silnik_alarmow, metoda)(*tagi, self.model.t)
+            elif nazwa == "migawka":
+                self.zdarzenia.put(("migawka", self.epoka, argumenty[0], self.model.migawka().do_bajtow()))
+            elif nazwa == "przywroc":
+                self.epoka, dane = argumenty
+                try:
+                    self.model.przywroc(Migawka.z_bajtow(dane))
+                except ValueError as blad:
+                    self.zdarzenia.put(("blad", self.epoka, str(blad)))
+                self._probki = []
+                self._zsynchronizuj_alarmy()
+                self.zegar.start()
+            elif nazwa == "koniec":
+                self.koniec = True
+
+    def _publikuj(self) -> None:
+        m = self.model
+        if self._probki:
+            self.zdarzenia.put(("probki", self.epoka, self._probki))
+            self._probki = []
+        s = m.silnik_alarmow
+        if s.wersja != self._wersja or s.resety != self._resety:
+            stan = Migawka("alarmy")
+            s.zapisz_stan(stan, "alarmy", od_wersji=self._wersja if s.resety == self._resety else None)
+            self.zdarzenia.put(("alarmy", self.epoka, stan.do_bajtow()))
+            self._zsynchronizuj_alarmy()
+        self.numer += 1
+        self.wymiana.publikuj(
+            (self.numer, self.epoka, m.t, self.zegar.tempo_rzeczywiste, self.zegar.zaleglosc(), self.krok_s),
+            m.sygnaly.wartosci, m.sygnaly.jakosc, [p._kat for p in m.pompy])
+
+
+def _uruchom(konfiguracja, migawka, dt, tempo, bufor, polecenia, zdarzenia, okres) -> None:
+    _Symulacja(konfiguracja, migawka, dt, tempo, bufor, polecenia, zdarzenia, okres).petla()
+
+
+def _uruchom_w_procesie(konfiguracja, migawka, dt, tempo, nazwa_pamieci, polecenia, zdarzenia, okres) -> None:
+    pamiec = shared_memory.SharedMemory(name=nazwa_pamieci)
+    try:
+        _uruchom(konfiguracja, migawka, dt, tempo, pamiec.buf, polecenia, zdarzenia, okres)
+    finally:
+        pamiec.close()
+
+
+# -------------------------
+# Strona GUI
+# -------------------------
+
+class SymulacjaWTle:
+    """Symulacja modelu lustro w wątku ("watek") albo procesie ("proces").
+
+    Start od bieżącego stanu lustra; odbierz() w każdej ramce GUI przepisuje
+    do lustra najnowszą klatkę i zaległe zdarzenia."""
+
+    def __init__(self, lustro: ModelInstalacji, dt: float, tempo: Optional[float] = 1.0,
+                 tryb: str = "watek", okres: float = OKRES_TAKTU):
+        if tryb not in TRYBY:
+            raise ValueError(f"nieznany tryb symulacji: {tryb!r} (dostępne: {', '.join(TRYBY)})")
+        self.lustro = lustro
+        self.tryb = tryb
+        n, p = len(lustro.sygnaly), len(lustro.pompy)
+        rozmiar = WymianaStanu.rozmiar(n, p)
+        argumenty = (lustro.graf.konfiguracja, lustro.migawka().do_bajtow(), dt, tempo)
+
+        self._pamiec = None
+        if tryb == "watek":
+            bufor = bytearray(rozmiar)
+            self._polecenia, self._zdarzenia = queue.SimpleQueue(), queue.SimpleQueue()
+            self._praca = threading.Thread(
+                target=_uruchom, name="symulacja", daemon=True,
+                args=argumenty + (bufor, self._polecenia, self._zdarzenia, okres))
+        else:
+            # spawn: proces potomny bez kopii stanu Qt
+            kontekst = multiprocessing.get_context("spawn")
+            self._pamiec = shared_memory.SharedMemory(create=True, size=rozmiar)
+            bufor = self._pamiec.buf
+            self._polecenia, self._zdarzenia = kontekst.Queue(), kontekst.Queue()
+            self._praca = kontekst.Process(
+                target=_uruchom_w_procesie, name="symulacja", daemon=True,
+                args=argumenty + (self._pamiec.name, self._polecenia, self._zdarzenia, okres))
+
+        self.wymiana = WymianaStanu(bufor, n, p)
+        self.klatka = Klatka(n, p)
+        self.epoka = 0
+        self.bledy = []
+        self._numer = 0
+        self._nr_migawki = 0
+        self._odbiorcy_migawek: Dict[int, Callable[[Migawka], None]] = {}
+        self._praca.start()
+
+    # --- polecenia ---
+    def polecenie(self, nazwa: str, *argumenty) -> None:
+        self._polecenia.put((nazwa,) + argumenty)
+
+    def start(self) -> None:
+        self.polecenie("start")
+
+    def stop(self) -> None:
+        self.polecenie("stop")
+
+    def ustaw_tempo(self, tempo: Optional[float]) -> None:
+        self.polecenie("tempo", tempo)
+
+    def migawka(self, odbiorca: Callable[[Migawka], None]) -> None:
+        """Migawka stanu symulacji - odbiorca dostanie ją w jednym z kolejnych odbierz()."""
+        self._nr_migawki += 1
+        self._odbiorcy_migawek[self._nr_migawki] = odbiorca
+        self.polecenie("migawka", self._nr_migawki)
+
+    def przywroc(self, m: Migawka) -> None:
+        """Stan z migawki w lustrze (ValueError gdy nie pasuje) i w symulacji;
+        zdarzenia i klatki sprzed przywrócenia są odrzucane."""
+        self.lustro.przywroc(m)
+        self.epoka += 1
+        self.polecenie("przywroc", self.epoka, m.do_bajtow())
+
+    # --- odbiór ---
+    def odbierz(self) -> bool:
+        """Zaległe zdarzenia i najnowsza klatka do lustra; True gdy przyszła nowa klatka."""
+        lustro = self.lustro
+        while True:
+            try:
+                rodzaj, epoka, *dane = self._zdarzenia.get_nowait()
+            except queue.Empty:
+                break
+            if rodzaj == "migawka":
+                nr, bajty = dane
+                odbiorca = self._odbiorcy_migawek.pop(nr, None)
+                if odbiorca is not None:
+                    odbiorca(Migawka.z_bajtow(bajty))
+            elif epoka != self.epoka:
+                continue
+            elif rodzaj == "probki":
+                baza = lustro.sygnaly
+                sloty = range(len(baza))
+                for t, wartosci in dane[0]:
+                    lustro.t = baza.teraz = t
+                    baza.zapisz(sloty, wartosci)
+                    lustro.dopisz_probke(t, *lustro.probka())
+            elif rodzaj == "alarmy":
+                lustro.silnik_alarmow.wczytaj_stan(Migawka.z_bajtow(dane[0]), "alarmy")
+            elif rodzaj == "blad":
+                self.bledy.append(dane[0])
+
+        k = self.klatka
+        if not self.wymiana.czytaj(k) or k.numer == self._numer or k.epoka != self.epoka:
+            return False
+        self._numer = k.numer
+        lustro.t = k.t
+        lustro.sygnaly.teraz = k.t
+        lustro.sygnaly.przepisz(k.wartosci, k.jakosc)
+        for pompa, kat in zip(lustro.pompy, k.kat.tolist()):
+            pompa._kat = kat
+        lustro.sygnaly.koniec_skanu()
+        return True
+
+    def zamknij(self, czekaj: float = 2.0) -> None:
+        if self._praca.is_alive():
+            self.polecenie("koniec")
+            self._praca.join(czekaj)
+        if self.tryb == "proces":
+            if self._praca.is_alive():
+                self._praca.terminate()
+                self._praca.join(czekaj)
+            # widoki numpy na bufor muszą zniknąć przed zamknięciem pamięci
+            del self.wymiana
+            self._pamiec.close()
+            self._pamiec.unlink()
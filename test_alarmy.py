@@ -0,0 +1,200 @@
+"""
+test_alarmy.py
+SilnikAlarmow: strefa martwa, opóźnienia załączenia i wyłączenia,
+potwierdzanie i zawieszanie, dziennik (długość, wersje, migawka).
+
+Uwaga - alarmy domyślnej instalacji (graf.INSTALACJA_DOMYSLNA) działają
+inaczej niż w pierwotnym modelu, gdzie każdy alarm był czystym progiem
+(włączony dokładnie wtedy, gdy wartość jest za progiem): Zx.HH i T3.HI
+mają strefę martwą (0.02 poziomu, 2 °C) i opóźnienie wyłączenia 1 s, więc
+wracają do normy później i nie migają na progu
+(test_alarmy_domyslnej_instalacji).
+
+    python -m pytest -q test_alarmy.py
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from alarmy import Alarm, SilnikAlarmow, StanAlarmu
+from migawka import Migawka
+from model import ModelInstalacji
+
+
+def _silnik(**kwargs) -> SilnikAlarmow:
+    return SilnikAlarmow([Alarm.prog("X.HI", "wysoki X", "x", 10.0, **kwargs)])
+
+
+def _rodzaje(s: SilnikAlarmow):
+    return [(z.t, z.tag, z.rodzaj) for z in s.dziennik]
+
+
+def test_strefa_martwa():
+    s = _silnik(martwa_strefa=1.0)
+    a = s["X.HI"]
+    s.aktualizuj(0.0, {"x": 10.0})
+    assert not a.aktywny                      # na progu - jeszcze nie
+    s.aktualizuj(1.0, {"x": 10.5})
+    assert a.aktywny and a.stan == StanAlarmu.AKTYWNY_NIEPOTW
+    s.aktualizuj(2.0, {"x": 9.5})
+    assert a.aktywny                          # poniżej progu, ale w strefie martwej
+    s.aktualizuj(3.0, {"x": 9.1})
+    assert a.aktywny
+    s.aktualizuj(4.0, {"x": 9.0})             # granica strefy już wyłącza
+    assert not a.aktywny and a.stan == StanAlarmu.POWROT_NIEPOTW
+    assert _rodzaje(s) == [(1.0, "X.HI", "ZAL"), (4.0, "X.HI", "WYL")]
+
+
+def test_strefa_martwa_kierunek_w_dol():
+    s = SilnikAlarmow([Alarm.prog("X.LO", "niski X", "x", 2.0, kierunek="<", martwa_strefa=0.5)])
+    s.aktualizuj(0.0, {"x": 1.0})
+    s.aktualizuj(1.0, {"x": 2.4})
+    assert s["X.LO"].aktywny
+    s.aktualizuj(2.0, {"x": 2.6})
+    assert not s["X.LO"].aktywny
+    with pytest.raises(ValueError):
+        Alarm.prog("X", "", "x", 1.0, kierunek="=")
+
+
+def test_opoznienie_zalaczenia():
+    s = _silnik(opoznienie_zal=2.0)
+    a = s["X.HI"]
+    s.aktualizuj(0.0, {"x": 11.0})
+    assert not a.aktywny and s.najblizszy_termin() == 2.0
+    s.aktualizuj(1.0, {})
+    assert not a.aktywny
+    s.aktualizuj(2.0, {})
+    assert a.aktywny
+    assert _rodzaje(s) == [(2.0, "X.HI", "ZAL")]
+
+
+def test_opoznienie_zalaczenia_kasowane_powrotem():
+    s = _silnik(opoznienie_zal=2.0)
+    s.aktualizuj(0.0, {"x": 11.0})
+    s.aktualizuj(1.0, {"x": 9.0})             # warunek zniknął przed końcem opóźnienia
+    s.aktualizuj(2.5, {})
+    assert not s["X.HI"].aktywny and not s.dziennik
+    s.aktualizuj(3.0, {"x": 12.0})            # timer liczy się od nowa
+    s.aktualizuj(4.5, {})
+    assert not s["X.HI"].aktywny
+    s.aktualizuj(5.0, {})
+    assert _rodzaje(s) == [(5.0, "X.HI", "ZAL")]
+
+
+def test_opoznienie_wylaczenia():
+    s = _silnik(opoznienie_wyl=1.0)
+    a = s["X.HI"]
+    s.aktualizuj(0.0, {"x": 11.0})
+    assert a.aktywny                          # bez opóźnienia załączenia
+    s.aktualizuj(1.0, {"x": 9.0})
+    assert a.aktywny
+    s.aktualizuj(1.5, {"x": 11.0})            # wrócił przed końcem opóźnienia - bez WYL
+    s.aktualizuj(2.0, {})
+    assert a.aktywny
+    s.aktualizuj(3.0, {"x": 9.0})
+    s.aktualizuj(4.0, {})
+    assert not a.aktywny
+    assert _rodzaje(s) == [(0.0, "X.HI", "ZAL"), (4.0, "X.HI", "WYL")]
+
+
+def test_potwierdzanie():
+    s = _silnik()
+    a = s["X.HI"]
+    s.aktualizuj(0.0, {"x": 11.0})
+    s.potwierdz("X.HI", 1.0)
+    assert a.stan == StanAlarmu.AKTYWNY_POTW and a.potwierdzony
+    s.aktualizuj(2.0, {"x": 9.0})
+    assert a.stan == StanAlarmu.NORMALNY      # potwierdzony wraca od razu do normy
+
+    s.aktualizuj(3.0, {"x": 11.0})
+    s.aktualizuj(4.0, {"x": 9.0})
+    assert a.stan == StanAlarmu.POWROT_NIEPOTW and s.niepotwierdzone() == [a]
+    s.potwierdz_wszystkie(5.0)
+    assert a.stan == StanAlarmu.NORMALNY and not s.niepotwierdzone()
+    wersja = s.wersja
+    s.potwierdz("X.HI", 6.0)                  # nic do potwierdzenia - bez wpisu
+    assert s.wersja == wersja
+    assert [z.rodzaj for z in s.dziennik] == ["ZAL", "POTW", "WYL", "ZAL", "WYL", "POTW"]
+
+
+def test_zawieszanie():
+    s = _silnik()
+    a = s["X.HI"]
+    s.aktualizuj(0.0, {"x": 11.0})
+    s.zawies("X.HI", 1.0, na_ile=5.0)
+    assert a.zawieszony and a.opis_stanu() == "ZAWIESZONY"
+    assert not s.aktywne() and not s.niepotwierdzone()
+    s.aktualizuj(2.0, {"x": 9.0})             # zawieszony dalej śledzi warunek
+    assert not a.aktywny and s.dziennik[-1].rodzaj == "WYL"
+    s.aktualizuj(6.0, {})
+    assert not a.zawieszony and s.dziennik[-1][:3] == (6.0, "X.HI", "ODWIES")
+
+    s.zawies("X.HI", 7.0)                     # bez czasu - do odwieszenia
+    s.aktualizuj(1000.0, {"x": 11.0})
+    assert a.zawieszony and s.niepotwierdzone() == []
+    s.odwies("X.HI", 1001.0)
+    assert s.aktywne() == [a]
+
+
+def test_dziennik_i_wersje():
+    s = SilnikAlarmow([Alarm.prog("A", "", "a", 1.0), Alarm.prog("B", "", "b", 1.0)],
+                      dlugosc_dziennika=3)
+    with pytest.raises(ValueError):
+        s.dodaj(Alarm.prog("A", "", "a", 2.0))
+    s.aktualizuj(0.0, {"a": 2.0, "b": 0.0})
+    wersja = s.wersja
+    s.aktualizuj(1.0, {"a": 2.0, "b": 2.0})   # "a" bez zmiany - sprawdzany tylko B
+    assert [x.tag for x in s.zmienione] == ["B"]
+    assert s.tagi_zmienione_od(wersja) == {"B"}
+    for t in range(2, 6):
+        s.aktualizuj(float(t), {"a": float(t % 2) * 2.0})
+    assert len(s.dziennik) == 3 and s.wersja == 6
+    assert s.tagi_zmienione_od(wersja) is None          # dziennik już tego nie pamięta
+    assert s.tagi_zmienione_od(s.wersja - 2) == {"A"}
+
+    resety = s.resety
+    s.resetuj()
+    assert s.resety == resety + 1 and not s.aktywne() and len(s.dziennik) == 3
+
+
+def test_migawka_stanu():
+    s = _silnik(opoznienie_wyl=2.0)
+    s.aktualizuj(0.0, {"x": 11.0})
+    s.aktualizuj(1.0, {"x": 9.0})             # oczekujący timer wyłączenia
+    m = Migawka("test", {})
+    s.zapisz_stan(m)
+
+    k = _silnik(opoznienie_wyl=2.0)
+    k.wczytaj_stan(m)
+    for silnik in (s, k):
+        silnik.aktualizuj(3.0, {})
+    assert _rodzaje(k) == _rodzaje(s) == [(0.0, "X.HI", "ZAL"), (3.0, "X.HI", "WYL")]
+    with pytest.raises(ValueError):
+        SilnikAlarmow([Alarm.prog("Y", "", "y", 1.0)]).wczytaj_stan(m)
+
+
+def test_alarmy_domyslnej_instalacji():
+    """T3.HI: załączenie powyżej 80 °C, wyłączenie poniżej 78 °C i po 1 s (nie na progu)."""
+    m = ModelInstalacji()
+    m.ustaw_parametry_startowe(z1_proc=10.0, z2_proc=10.0, z3_proc=50.0, z4_proc=10.0,
+                               predkosc_pompy=0.0, moc_grzalki=0.0, pompa_on=False,
+                               grzalka_on=False, temp_start=81.0)
+    t3 = m["Z3"].temperatura
+    s = m.silnik_alarmow
+    m.krok(0.02)
+    assert s["T3.HI"].aktywny
+
+    t3.wartosc = 79.0                          # poniżej progu, w strefie martwej
+    m.krok(0.02)
+    assert s["T3.HI"].warunek_spelniony and s["T3.HI"].aktywny
+    t3.wartosc = 77.0                          # za strefą - dopiero po opóźnieniu
+    m.krok(0.02)
+    t_zejscia = m.t
+    assert not s["T3.HI"].warunek_spelniony and s["T3.HI"].aktywny
+    while s["T3.HI"].aktywny:
+        m.krok(0.02)
+    assert m.t - t_zejscia == pytest.approx(1.0, abs=0.021)
+    for nazwa in ("Z2", "Z3", "Z4"):
+        a = next(o for o in m.graf.konfiguracja["alarmy"] if o["tag"] == f"{nazwa}.HH")
+        assert (a["martwa_strefa"], a["opoznienie_wyl"]) == (0.02, 1.0)
@@ -0,0 +1,65 @@
+"""
+test_calkowanie.py
+Postać ciągła (ModelInstalacji.symuluj_do, calkowanie.py) wobec dyskretnego
+kroku Eulera z małym krokiem: ten sam dziennik alarmów (czasy z dokładnością
+do błędu Eulera) i ten sam stan końcowy.
+
+Krok Eulera różni się od postaci ciągłej o O(dt) - na progach (pompa nad
+pustym źródłem, spływ ponad minimum) zabiera co krok całą porcję i poziom
+"miga" nad progiem, zamiast stać na nim. Przy dt = 0.02 Z1 w stanie
+ustalonym domyślnego scenariusza to ~0.003 zamiast 0.001, przy dt = 0.002
+różnica spada do ~3e-4 - stąd odniesienie z małym krokiem.
+
+    python -m pytest -q test_calkowanie.py
+"""
+
+from __future__ import annotations
+import functools
+
+import pytest
+
+from calkowanie import Calkowanie
+from model import ModelInstalacji
+from test_silniki import SCENARIUSZE
+
+CZAS = 120.0
+DT_EULERA = 0.002
+
+TOL_POZIOMU = 2e-3
+TOL_TEMPERATURY = 0.1          # °C
+TOL_CZASU_ALARMU = 0.05        # s
+
+
+def _model(parametry: dict) -> ModelInstalacji:
+    m = ModelInstalacji()
+    m.ustaw_parametry_startowe(**parametry)
+    return m
+
+
+def _wynik(m: ModelInstalacji):
+    dziennik = [(z.t, z.tag, z.rodzaj) for z in m.silnik_alarmow.dziennik]
+    return ([z.poziom.wartosc for z in m.zbiorniki], [z.temperatura.wartosc for z in m.zbiorniki],
+            dziennik)
+
+
+@functools.lru_cache(maxsize=None)
+def _euler(i: int):
+    m = _model(SCENARIUSZE[i])
+    for _ in range(round(CZAS / DT_EULERA)):
+        m.krok(DT_EULERA)
+    return _wynik(m)
+
+
+@pytest.mark.parametrize("metoda", ["auto", "rk45", "ros2"])
+@pytest.mark.parametrize("i", range(len(SCENARIUSZE)))
+def test_ciagly_jak_euler(i, metoda):
+    m = _model(SCENARIUSZE[i])
+    m.symuluj_do(CZAS, Calkowanie(metoda))
+    poziomy, temperatury, dziennik = _wynik(m)
+    e_poziomy, e_temperatury, e_dziennik = _euler(i)
+
+    assert poziomy == pytest.approx(e_poziomy, abs=TOL_POZIOMU)
+    assert temperatury == pytest.approx(e_temperatury, abs=TOL_TEMPERATURY)
+    assert [z[1:] for z in dziennik] == [z[1:] for z in e_dziennik]
+    for (t, tag, _), (t_e, _, _) in zip(dziennik, e_dziennik):
+        assert t == pytest.approx(t_e, abs=TOL_CZASU_ALARMU), tag
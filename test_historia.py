@@ -0,0 +1,126 @@
+"""
+test_historia.py
+Historia trendów: bufor kołowy po przepełnieniu (kolejność, zakresy przez
+granicę bufora), kaskada agregatów min/max/średnia i wybór poziomu
+w Historia.zapytaj.
+
+    python -m pytest -q test_historia.py
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from historia import BuforCykliczny, Historia
+from migawka import Migawka
+
+OKRES = 1.0
+POZIOMY = ((4, 40.0), (16, 160.0))      # co 4 i co 16 próbek surowych
+
+
+def _historia(n: int) -> Historia:
+    """n próbek: t = i, sygnały i oraz -i."""
+    h = Historia(okres=OKRES, retencja=20.0, poziomy=POZIOMY, sygnaly=("a", "b"))
+    for i in range(n):
+        h.dopisz(float(i), float(i), -float(i))
+    return h
+
+
+def test_bufor_zawijanie():
+    b = BuforCykliczny(5, 1)
+    assert b.najstarszy() == np.inf and b.najnowszy() == -np.inf
+    for i in range(8):
+        b.dopisz(float(i), np.array([10.0 * i]))
+    assert (b.n, b.glowa) == (5, 3)
+    assert (b.najstarszy(), b.najnowszy()) == (3.0, 7.0)
+
+    p = b.ostatnie(4)                       # przez granicę bufora
+    assert p.t.tolist() == [4.0, 5.0, 6.0, 7.0]
+    assert p.srednia[0].tolist() == [40.0, 50.0, 60.0, 70.0]
+    assert b.ostatnie(2).t.tolist() == [6.0, 7.0]
+
+    p = b.zakres(3.5, 6.0)
+    assert p.t.tolist() == [4.0, 5.0, 6.0]
+    assert p.min is p.srednia or p.min.tolist() == p.srednia.tolist()
+    assert b.zakres(0.0, 100.0).t.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert b.zakres(8.0, 9.0).t.size == 0
+
+    with pytest.raises(ValueError):
+        BuforCykliczny(0, 1)
+
+
+def test_bufor_migawka_po_zawinieciu():
+    b = BuforCykliczny(4, 2, statystyki=True)
+    for i in range(6):
+        b.dopisz(float(i), np.array([i, 2 * i]), np.array([i - 1, 0]), np.array([i + 1, 9]))
+    m = Migawka("test")
+    b.zapisz_stan(m, "b")
+
+    k = BuforCykliczny(4, 2, statystyki=True)
+    k.wczytaj_stan(m, "b")
+    for x, y in zip(b.zakres(0.0, 10.0), k.zakres(0.0, 10.0)):
+        assert np.array_equal(x, y)
+    with pytest.raises(ValueError):
+        BuforCykliczny(5, 2).wczytaj_stan(m, "b")
+
+
+def test_kaskada_agregatow():
+    h = _historia(35)
+    p0, p1 = h.poziomy
+    assert (p0.krok, p1.krok) == (4, 4)
+    assert p0.bufor.n == 8 and p0._ile == 3           # 32 próbki w 8 przedziałach, 3 w otwartym
+    assert p1.bufor.n == 2 and p1._ile == 0
+
+    p = p0.bufor.zakres(0.0, 100.0)
+    assert p.t.tolist() == [1.5 + 4 * i for i in range(8)]
+    assert p.srednia[0].tolist() == [1.5 + 4 * i for i in range(8)]
+    assert p.min[0].tolist() == [4 * i for i in range(8)]
+    assert p.max[1].tolist() == [-4 * i for i in range(8)]
+
+    # drugi poziom z agregatów pierwszego: min z min, max z max
+    p = p1.bufor.zakres(0.0, 100.0)
+    assert p.t.tolist() == [7.5, 23.5]
+    assert p.srednia[0].tolist() == [7.5, 23.5]
+    assert p.min[0].tolist() == [0.0, 16.0] and p.max[0].tolist() == [15.0, 31.0]
+
+    h.wyczysc()
+    assert not h and p0._ile == 0 and p1.bufor.n == 0
+
+
+def test_zle_krotnosci():
+    with pytest.raises(ValueError):
+        Historia(poziomy=((4, 10.0), (6, 10.0)))
+    with pytest.raises(ValueError):
+        Historia(poziomy=((4, 10.0), (4, 10.0)))
+
+
+def test_zapytaj_wybor_poziomu():
+    h = _historia(200)                       # surowe trzymają 20 s, poziom 0 - 40 s, poziom 1 - 160 s
+    assert len(h) == 20 and h.najnowszy() == 199.0
+
+    # krótkie okno w retencji surowych - dane surowe
+    assert h.zapytaj(185.0, 199.0).t.tolist() == [float(t) for t in range(185, 200)]
+    # okno sięga przed najstarszą próbkę surową - poziom 0 (co 4)
+    p = h.zapytaj(165.0, 199.0)
+    assert np.diff(p.t).tolist() == [4.0] * (p.t.size - 1)
+    # poza retencją poziomu 0 - poziom 1 (co 16)
+    p = h.zapytaj(50.0, 199.0)
+    assert np.diff(p.t).tolist() == [16.0] * (p.t.size - 1)
+    # okno w retencji surowych, ale za dużo punktów - poziom 0
+    p = h.zapytaj(185.0, 199.0, maks_punktow=5)
+    assert p.t.size and np.all(np.diff(p.t) == 4.0)
+    # nic nie pokrywa - najrzadszy dostępny poziom
+    assert np.all(np.diff(h.zapytaj(0.0, 199.0, maks_punktow=1).t) == 16.0)
+
+    p = h.ostatnie(5.0)
+    assert p.t.tolist() == [194.0, 195.0, 196.0, 197.0, 198.0, 199.0]
+    assert p.srednia.shape == (2, 6)
+
+
+def test_zapytaj_przed_zapelnieniem_i_pusta():
+    h = _historia(3)
+    p = h.zapytaj(-100.0, 10.0)              # bufor niepełny pokrywa całe okno
+    assert p.t.tolist() == [0.0, 1.0, 2.0]
+    p = _historia(0).zapytaj(0.0, 1.0)
+    assert p.t.size == 0 and p.srednia.shape == (2, 0)
@@ -0,0 +1,134 @@
+"""
+test_pamiec.py
+Pamięć przebiegów: wypychanie LRU z RAM, powrót wpisu z dysku (także
+w nowej pamięci, jak po ponownym uruchomieniu) i powierzchnia odpowiedzi -
+interpolacja tylko w komórce z błędem w tolerancji, inaczej symulacja.
+
+    python -m pytest -q test_pamiec.py
+"""
+
+from __future__ import annotations
+import math
+import os
+
+import numpy as np
+import pytest
+
+from pamiec import PamiecPrzebiegow, blad, klucz, kwantuj, symuluj_przebieg
+
+CZAS = 30.0         # [s] procesu na wpis - krótko, wystarczy do porównań
+PARAMETRY = dict(z1_proc=80.0, z2_proc=10.0, z3_proc=20.0, z4_proc=10.0,
+                 predkosc_pompy=1.1, moc_grzalki=3.5, pompa_on=True, grzalka_on=True,
+                 temp_start=22.5)
+BEZ_TOLERANCJI = dict(poziom=0.0, temperatura=0.0, czas=0.0)
+DUZA_TOLERANCJA = dict(poziom=1.0, temperatura=100.0, czas=1000.0)
+
+
+def _p(**zmiany) -> dict:
+    return dict(PARAMETRY, **zmiany)
+
+
+def test_kwantowanie_klucza():
+    assert kwantuj(_p(predkosc_pompy=1.12))["predkosc_pompy"] == 1.1
+    assert klucz(_p(predkosc_pompy=1.12)) == klucz(_p(predkosc_pompy=1.09))
+    assert klucz(_p(grzalka_on=False)) != klucz(PARAMETRY)
+
+
+def test_lru():
+    pm = PamiecPrzebiegow(maks_wpisow=2, czas=CZAS)
+    a, b, c = _p(moc_grzalki=1.0), _p(moc_grzalki=2.0), _p(moc_grzalki=3.0)
+    pm.pobierz(a)
+    pm.pobierz(b)
+    assert pm.znajdz(a) is not None          # a najświeższy - wypchnięty będzie b
+    pm.pobierz(c)
+    assert len(pm) == 2
+    assert pm.znajdz(b) is None and pm.znajdz(a) is not None and pm.znajdz(c) is not None
+    assert pm.statystyki["symulacje"] == 3
+
+    r = pm.pobierz(_p(moc_grzalki=1.1))      # ten sam kwant co a - bez symulacji
+    assert r is pm.znajdz(a) and pm.statystyki["symulacje"] == 3
+
+
+def test_wpis_z_dysku(tmp_path):
+    katalog = str(tmp_path / "pamiec")
+    pm = PamiecPrzebiegow(maks_wpisow=1, katalog=katalog, czas=CZAS)
+    assert os.path.isdir(katalog)
+    a, b = _p(moc_grzalki=1.0), _p(moc_grzalki=2.0)
+    wynik_a = pm.pobierz(a)
+    pm.pobierz(b)                            # a wypchnięty z RAM, zostaje na dysku
+    assert len(os.listdir(katalog)) == 2
+
+    r = pm.znajdz(a)
+    assert pm.statystyki["z_dysku"] == 1
+    assert np.array_equal(r.poziomy, wynik_a.poziomy)
+    assert np.array_equal(r.alarmy, wynik_a.alarmy, equal_nan=True)
+
+    nowa = PamiecPrzebiegow(katalog=katalog, czas=CZAS)        # kolejne uruchomienie
+    assert nowa.podglad(b)[1] == "pamięć" and nowa.statystyki["symulacje"] == 0
+    # wpis z innym czasem przebiegu nie pasuje - liczony od nowa
+    assert PamiecPrzebiegow(katalog=katalog, czas=2 * CZAS).znajdz(b) is None
+
+
+def test_uszkodzony_wpis_na_dysku(tmp_path):
+    pm = PamiecPrzebiegow(katalog=str(tmp_path), czas=CZAS)
+    pm.pobierz(PARAMETRY)
+    (plik,) = tmp_path.iterdir()
+    plik.write_bytes(b"to nie jest migawka")
+    nowa = PamiecPrzebiegow(katalog=str(tmp_path), czas=CZAS)
+    assert nowa.znajdz(PARAMETRY) is None
+    nowa.pobierz(PARAMETRY)
+    assert nowa.statystyki["symulacje"] == 1
+    assert PamiecPrzebiegow(katalog=str(tmp_path), czas=CZAS).znajdz(PARAMETRY) is not None
+
+
+def test_narozniki():
+    pm = PamiecPrzebiegow(czas=CZAS)
+    punkty, wagi = pm.narozniki(PARAMETRY)
+    assert len(punkty) == 8 and sum(wagi) == pytest.approx(1.0)
+    assert {p["predkosc_pompy"] for p in punkty} == {1.0, 1.2}
+    assert {p["temp_start"] for p in punkty} == {20.0, 25.0}
+    punkty, wagi = pm.narozniki(_p(predkosc_pompy=1.2, moc_grzalki=3.0, temp_start=20.0))
+    assert len(punkty) == 1 and wagi == [pytest.approx(1.0)]   # węzeł siatki
+
+
+def test_interpolacja_w_tolerancji():
+    pm = PamiecPrzebiegow(czas=CZAS)
+    assert pm.podglad(PARAMETRY, DUZA_TOLERANCJA)[1] == "symulacja"
+    assert pm.statystyki["symulacje"] == 9                     # punkt + 8 narożników
+
+    q = _p(predkosc_pompy=1.15, moc_grzalki=3.75)
+    wynik, zrodlo = pm.podglad(q, DUZA_TOLERANCJA)
+    assert zrodlo == "interpolacja" and pm.statystyki["symulacje"] == 9
+    assert wynik.parametry == kwantuj(q)
+    prawdziwy = symuluj_przebieg(kwantuj(q), CZAS)
+    b = blad(wynik, prawdziwy)
+    komorka = next(iter(pm._bledy_komorek.values()))
+    assert b["temperatura"] < 1.0 and b["poziom"] <= 2 * komorka["poziom"] + 1e-3
+
+
+def test_blad_ponad_tolerancje_to_symulacja():
+    pm = PamiecPrzebiegow(czas=CZAS)
+    pm.podglad(PARAMETRY, BEZ_TOLERANCJI)
+    q = _p(predkosc_pompy=1.15)
+    assert pm.podglad(q, BEZ_TOLERANCJI)[1] == "symulacja"
+    assert pm.statystyki["interpolacje"] == 0 and pm.statystyki["symulacje"] == 10
+    # ta sama komórka z większą tolerancją - już interpolowana
+    assert pm.podglad(_p(predkosc_pompy=1.05), DUZA_TOLERANCJA)[1] == "interpolacja"
+
+
+def test_brak_naroznika_to_symulacja():
+    pm = PamiecPrzebiegow(maks_wpisow=4, czas=CZAS)            # narożniki nie mieszczą się w RAM
+    pm.podglad(PARAMETRY, DUZA_TOLERANCJA)
+    assert pm.podglad(_p(predkosc_pompy=1.15), DUZA_TOLERANCJA)[1] == "symulacja"
+
+
+def test_alarm_w_czesci_naroznikow():
+    # bez grzałki: start z 85 °C daje T3.HI, z 80 °C nie - komórka nieciągła
+    p = _p(grzalka_on=False, temp_start=82.5)
+    pm = PamiecPrzebiegow(czas=CZAS)
+    pm.podglad(p, DUZA_TOLERANCJA)
+    punkty, _ = pm.narozniki(p)
+    t3 = {x["temp_start"]: pm.znajdz(x).pierwsze_alarmy().get("T3.HI") for x in punkty}
+    assert t3[80.0] is None and t3[85.0] is not None
+    assert all(math.isinf(v) for v in next(iter(pm._bledy_komorek.values())).values())
+    assert pm.podglad(_p(grzalka_on=False, temp_start=81.5), DUZA_TOLERANCJA)[1] == "symulacja"
@@ -0,0 +1,130 @@
+"""
+test_serwer_tagow.py
+Serwer i klient tagów w jednym procesie (port 0 = dowolny wolny): LISTA,
+CZYTAJ, subskrypcja z martwą strefą, błędy SUBSKRYBUJ / ANULUJ
+i rozłączenie przy zatrzymaniu serwera.
+
+    python -m pytest -q test_serwer_tagow.py
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import math
+
+import pytest
+
+from model import ModelInstalacji
+from serwer_tagow import F_ANULUJ, SerwerTagow, KlientTagow
+
+CZEKAJ = 2.0        # [s] na odpowiedź / powiadomienie
+
+
+@pytest.fixture
+def serwer():
+    model = ModelInstalacji()
+    model.ustaw_parametry_startowe(z1_proc=80.0, z2_proc=10.0, z3_proc=20.0, z4_proc=10.0,
+                                   predkosc_pompy=1.0, moc_grzalki=3.0, pompa_on=True,
+                                   grzalka_on=False, temp_start=20.0)
+    s = SerwerTagow(model, port=0)
+    s.publikuj()
+    s.start()
+    yield s
+    s.zatrzymaj()
+
+
+def _ustaw(serwer: SerwerTagow, nazwa: str, wartosc: float) -> None:
+    serwer.model.sygnal(nazwa).wartosc = wartosc
+    serwer.publikuj()
+
+
+def test_lista_i_czytaj(serwer):
+    async def przebieg():
+        k = await KlientTagow().polacz(port=serwer.port)
+        assert k.nazwy == serwer.nazwy
+        assert "Z1.poziom" in k.nazwy and "T3.HI.stan" in k.nazwy
+
+        t, odczyty = await k.czytaj(["Z1.poziom", "P1.wlaczona"])
+        assert t == serwer.model.t
+        assert set(odczyty) == {"Z1.poziom", "P1.wlaczona"}
+        assert odczyty["Z1.poziom"].wartosc == pytest.approx(0.8)
+        assert odczyty["P1.wlaczona"].wartosc == 1.0
+
+        _, wszystkie = await k.czytaj()
+        assert list(wszystkie) == serwer.nazwy
+        with pytest.raises(ValueError, match="nieznany tag"):
+            await k.czytaj(["brak"])
+        await k.zamknij()
+
+    asyncio.run(przebieg())
+
+
+def test_subskrypcja_z_martwa_strefa(serwer):
+    async def przebieg():
+        k = await KlientTagow().polacz(port=serwer.port)
+        _, kolejka = await k.subskrybuj(["Z1.poziom", "Z2.poziom"], okres=0.02, martwa_strefa=0.05)
+        _, pierwsze = await asyncio.wait_for(kolejka.get(), CZEKAJ)
+        assert set(pierwsze) == {"Z1.poziom", "Z2.poziom"}
+
+        # Z1 w martwej strefie, Z2 poza nią
+        _ustaw(serwer, "Z1.poziom", 0.83)
+        _ustaw(serwer, "Z2.poziom", 0.3)
+        _, zmiany = await asyncio.wait_for(kolejka.get(), CZEKAJ)
+        assert set(zmiany) == {"Z2.poziom"}
+        assert zmiany["Z2.poziom"].wartosc == pytest.approx(0.3)
+
+        # martwa strefa liczona od wysłanej wartości (0.8), nie od poprzedniego obrazu
+        _ustaw(serwer, "Z1.poziom", 0.86)
+        _, zmiany = await asyncio.wait_for(kolejka.get(), CZEKAJ)
+        assert set(zmiany) == {"Z1.poziom"}
+        await k.zamknij()
+
+    asyncio.run(przebieg())
+
+
+def test_bledy_subskrypcji_i_anulowania(serwer):
+    async def przebieg():
+        k = await KlientTagow().polacz(port=serwer.port)
+        for okres, martwa_strefa in ((math.nan, 0.0), (0.0, 0.0), (-1.0, 0.0), (math.inf, 0.0),
+                                     (0.1, math.nan), (0.1, -1.0)):
+            with pytest.raises(ValueError, match="subskrypcja"):
+                await k.subskrybuj(["Z1.poziom"], okres, martwa_strefa)
+
+        id, _ = await k.subskrybuj(["Z1.poziom"], okres=0.1)
+        with pytest.raises(ValueError, match="nieznana subskrypcja"):
+            await k.anuluj(id + 100)
+        with pytest.raises(ValueError, match="oczekiwane 2 bajty"):
+            await k._zapytanie(F_ANULUJ, b"\x01")
+        await k.anuluj(id)
+        with pytest.raises(ValueError, match="nieznana subskrypcja"):
+            await k.anuluj(id)
+
+        # po błędach połączenie działa dalej
+        _, odczyty = await k.czytaj(["Z1.poziom"])
+        assert "Z1.poziom" in odczyty
+        await k.zamknij()
+
+    asyncio.run(przebieg())
+
+
+def test_rozlaczenie_przy_zatrzymaniu(serwer, caplog):
+    async def przebieg():
+        k = await KlientTagow().polacz(port=serwer.port)
+        _, kolejka = await k.subskrybuj(["Z1.poziom"], okres=0.02)
+        await asyncio.wait_for(kolejka.get(), CZEKAJ)
+        assert serwer.klienci == 1
+
+        serwer.zatrzymaj()
+        while True:
+            powiadomienie = await asyncio.wait_for(kolejka.get(), CZEKAJ)
+            if powiadomienie is None:
+                break
+        assert k.zamkniety
+        with pytest.raises(ConnectionError):
+            await k.czytaj()
+        await k.zamknij()
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        asyncio.run(przebieg())
+    assert serwer.klienci == 0
+    assert not [r for r in caplog.records if r.name == "asyncio"], caplog.text
@@ -0,0 +1,172 @@
+"""
+test_silniki.py
+Zgodność silników symulacji: ModelInstalacji (graf, krok skalarny i wektorowy),
+SilnikInstalacji i SilnikWsadowy liczą ten sam bilans - poziomy, temperatury
+i podtrzymanie rur mają być identyczne co do bitu, nie tylko "bliskie".
+
+    python -m pytest -q test_silniki.py
+"""
+
+from __future__ import annotations
+import copy
+
+import numpy as np
+import pytest
+
+from graf import INSTALACJA_DOMYSLNA
+from model import ModelInstalacji
+from silnik import NAZWY_RUR, TAGI_ALARMOW, SilnikInstalacji
+from silnik_wsadowy import SilnikWsadowy
+
+DT = 0.02
+KROKI = 1500
+
+SCENARIUSZE = [
+    dict(z1_proc=80.0, z2_proc=10.0, z3_proc=20.0, z4_proc=10.0, predkosc_pompy=1.0,
+         moc_grzalki=3.0, pompa_on=True, grzalka_on=True, temp_start=20.0),
+    # przepełnienia Z2-Z4, przelew awaryjny Z4, grzanie do alarmu T3
+    dict(z1_proc=100.0, z2_proc=90.0, z3_proc=95.0, z4_proc=96.0, predkosc_pompy=2.0,
+         moc_grzalki=6.0, pompa_on=True, grzalka_on=True, temp_start=75.0),
+    # pompa stoi, grzałka wyłączona, pusty Z3 - tylko spływy i chłodzenie
+    dict(z1_proc=30.0, z2_proc=60.0, z3_proc=0.0, z4_proc=50.0, predkosc_pompy=0.5,
+         moc_grzalki=0.0, pompa_on=False, grzalka_on=False, temp_start=60.0),
+    # prawie pusta instalacja (próg pustego zbiornika przy pompie)
+    dict(z1_proc=0.2, z2_proc=0.0, z3_proc=3.0, z4_proc=0.5, predkosc_pompy=1.5,
+         moc_grzalki=4.0, pompa_on=True, grzalka_on=True, temp_start=30.0),
+]
+
+
+def _przelacz(i: int) -> dict:
+    """Nastawy zmieniane w trakcie przebiegu (co 300 kroków)."""
+    return dict(pompa_on=(i // 300) % 3 != 1, grzalka_on=(i // 300) % 2 == 0,
+                predkosc=0.5 + 0.25 * ((i // 300) % 4))
+
+
+def _model(parametry: dict, skalarny: bool = True) -> ModelInstalacji:
+    m = ModelInstalacji()
+    m.ustaw_parametry_startowe(**parametry)
+    if not skalarny:
+        m.graf.skalarny = False
+    return m
+
+
+def _krok_modelu(m: ModelInstalacji, i: int) -> None:
+    n = _przelacz(i)
+    m.pompy[0].wlaczona.wartosc = n["pompa_on"]
+    m.pompy[0].predkosc.wartosc = n["predkosc"]
+    m.grzalki[0].wlaczona.wartosc = n["grzalka_on"]
+    m.krok(DT)
+
+
+def _stan_modelu(m: ModelInstalacji):
+    return ([z.ilosc for z in m.zbiorniki], [z.temperatura.wartosc for z in m.zbiorniki],
+            m.graf.hold.tolist())
+
+
+@pytest.mark.parametrize("parametry", SCENARIUSZE)
+def test_model_jak_silnik_instalacji(parametry):
+    m = _model(parametry)
+    s = SilnikInstalacji()
+    s.ustaw_parametry_startowe(**parametry)
+    assert m.graf.skalarny and list(m.graf.id_rur) == list(NAZWY_RUR)
+    for i in range(KROKI):
+        _krok_modelu(m, i)
+        n = _przelacz(i)
+        s.pompa_on, s.predkosc, s.grzalka_on = n["pompa_on"], n["predkosc"], n["grzalka_on"]
+        s.krok(DT)
+        assert _stan_modelu(m) == (s.ilosc, s.temperatura, s.hold), f"krok {i}"
+
+
+@pytest.mark.parametrize("parametry", SCENARIUSZE)
+def test_krok_skalarny_jak_wektorowy(parametry):
+    a, b = _model(parametry), _model(parametry, skalarny=False)
+    for i in range(KROKI):
+        _krok_modelu(a, i)
+        _krok_modelu(b, i)
+        assert _stan_modelu(a) == _stan_modelu(b), f"krok {i}"
+    assert a.graf.przeplyw_rur.tolist() == b.graf.przeplyw_rur.tolist()
+
+
+def test_krok_skalarny_wspolne_zrodlo():
+    """Kilka rur z jednego zbiornika (podział, gdy źródło nie wystarcza) i rozdział w węźle."""
+    k = copy.deepcopy(INSTALACJA_DOMYSLNA)
+    k["zbiorniki"] += [dict(nazwa="ZA", x=600, y=400, w=20, h=20, pojemnosc=50.0),
+                       dict(nazwa="ZB", x=640, y=400, w=20, h=20, pojemnosc=10.0)]
+    for j in range(3):
+        k["rury"].append(dict(id=f"r{j}", z="ZA.dol", do="ZB.gora", wydatek=40.0 + j, min=0.0))
+    k["rury"].append(dict(id="rz", z="ZB.dol", do="ZA.gora", wydatek=3.0, min=0.0))
+    a, b = ModelInstalacji(konfiguracja=k), ModelInstalacji(konfiguracja=k)
+    b.graf.skalarny = False
+    for m in (a, b):
+        m.ustaw_parametry_startowe(**SCENARIUSZE[1])
+        m.zbiorniki[4].ilosc = 30.0
+    assert a.graf.skalarny
+    for i in range(KROKI):
+        _krok_modelu(a, i)
+        _krok_modelu(b, i)
+        assert _stan_modelu(a) == _stan_modelu(b), f"krok {i}"
+
+
+def test_silnik_wsadowy_jak_silnik_instalacji():
+    w = SilnikWsadowy.z_parametrow(SCENARIUSZE, statystyki=True)
+    silniki = []
+    for p in SCENARIUSZE:
+        s = SilnikInstalacji()
+        s.ustaw_parametry_startowe(**p)
+        silniki.append(s)
+    for _ in range(KROKI // 100):
+        w.symuluj(100, DT)
+        for s in silniki:
+            s.symuluj(100, DT)
+        alarmy = w.alarmy()
+        for j, s in enumerate(silniki):
+            assert w.ilosc[:, j].tolist() == s.ilosc
+            assert w.temperatura[:, j].tolist() == s.temperatura
+            assert w.hold[:, j].tolist() == s.hold
+            assert {tag: bool(a[j]) for tag, a in alarmy.items()} == s.alarmy()
+
+
+def test_alarmy_wsadowe_z_konfiguracji():
+    assert SilnikWsadowy(1).tagi_alarmow == TAGI_ALARMOW
+    alarmy = copy.deepcopy(INSTALACJA_DOMYSLNA["alarmy"])
+    alarmy[3]["granica"] = 50.0
+    alarmy.append(dict(tag="Z1.LL", opis="Niski poziom Z1", sygnal="Z1.poziom", granica=0.5, kierunek="<"))
+    w = SilnikWsadowy(2, alarmy=alarmy, statystyki=True)
+    w.ustaw_parametry_startowe(z1_proc=np.array([30.0, 80.0]), z2_proc=0.0, z3_proc=50.0, z4_proc=0.0,
+                               predkosc_pompy=1.0, moc_grzalki=0.0, pompa_on=True, grzalka_on=False,
+                               temp_start=np.array([60.0, 40.0]))
+    w.symuluj(1, DT)
+    assert w.tagi_alarmow[-1] == "Z1.LL"
+    assert w.alarmy()["T3.HI"].tolist() == [True, False]
+    assert w.alarmy()["Z1.LL"].tolist() == [True, False]
+    assert w.pierwszy_alarm[3].tolist()[0] == pytest.approx(DT)
+    with pytest.raises(ValueError):
+        SilnikWsadowy(1, alarmy=[dict(tag="X", sygnal="Z9.poziom", granica=1.0)])
+
+
+def _stan_silnika(s: SilnikInstalacji):
+    return (list(s.ilosc), list(s.temperatura), list(s.hold), s.przeplywy, s.t, s.kat,
+            (s.pompa_on, s.predkosc, s.grzalka_on, s.moc), list(s.historia))
+
+
+def test_przywroc_zlej_migawki_bez_zmian():
+    """Migawka, która nie pasuje, jest odrzucona (ValueError) przed jakąkolwiek zmianą stanu."""
+    s = SilnikInstalacji(zapisuj_historie=True)
+    s.ustaw_parametry_startowe(**SCENARIUSZE[0])
+    for _ in range(100):
+        s.krok(DT)
+    zla = s.migawka()
+    zla["hold"] = np.zeros(3)
+    m = _model(SCENARIUSZE[1])
+    for _ in range(100):
+        m.krok(DT)
+    zly_model = m.migawka(historia=False)
+    zly_model["hold"] = zly_model["hold"][:-1]
+
+    for _ in range(50):
+        s.krok(DT)
+    przed = _stan_silnika(s)
+    for migawka in (zla, zly_model):
+        with pytest.raises(ValueError):
+            s.przywroc(migawka)
+        assert _stan_silnika(s) == przed
@@ -0,0 +1,112 @@
+"""
+test_sygnaly.py
+Baza sygnałów: subskrypcje z martwą strefą i ograniczeniem częstości
+powiadomień (okres), odbiór przez pobierz(), anulowanie i numery skanów.
+
+    python -m pytest -q test_sygnaly.py
+"""
+
+from __future__ import annotations
+
+from sygnaly import JAKOSC_NIEPEWNA, BazaSygnalow
+
+
+def _baza():
+    b = BazaSygnalow()
+    b.dodaj("x", 0.0)
+    b.dodaj("y", 0.0)
+    b.dodaj("z", 0.0)
+    return b
+
+
+def _skan(b: BazaSygnalow, t: float, **wartosci: float) -> None:
+    b.teraz = t
+    for nazwa, v in wartosci.items():
+        b.ustaw(b.slot(nazwa), v)
+    b.koniec_skanu()
+
+
+def test_martwa_strefa():
+    b = _baza()
+    odebrane = []
+    b.subskrybuj(["x", "y"], odebrane.append, martwa_strefa=0.5)
+    _skan(b, 0.0)
+    assert odebrane == [{"x": 0.0, "y": 0.0}]          # na początek bieżące wartości
+
+    _skan(b, 1.0, x=0.5, y=0.6, z=9.0)                  # "x" na granicy strefy, "z" bez subskrypcji
+    assert odebrane[-1] == {"y": 0.6}
+    _skan(b, 2.0, x=0.9)                                # 0.9 - 0.0 > 0.5: liczone od przekazanej
+    assert odebrane[-1] == {"x": 0.9}
+    _skan(b, 3.0, x=1.3, y=1.0)                         # obie w strefie
+    assert len(odebrane) == 3
+
+    b.ustaw_jakosc([b.slot("y")], JAKOSC_NIEPEWNA)      # zmiana jakości przechodzi przez strefę
+    _skan(b, 4.0)
+    assert odebrane[-1] == {"y": 1.0}
+
+
+def test_okres_powiadomien():
+    b = _baza()
+    odebrane = []
+    b.subskrybuj(["x"], lambda z: odebrane.append((b.teraz, z)), okres=1.0)
+    _skan(b, 0.0)
+    _skan(b, 0.3, x=1.0)
+    _skan(b, 0.6, x=2.0)                                # wstrzymane - nadpisuje poprzednią
+    assert odebrane == [(0.0, {"x": 0.0})]
+    _skan(b, 1.0)                                       # okres minął - ostatnia wartość
+    assert odebrane[-1] == (1.0, {"x": 2.0})
+    _skan(b, 1.5)
+    _skan(b, 5.0)                                       # bez zmian - bez powiadomienia
+    assert len(odebrane) == 2
+    _skan(b, 5.5, x=3.0)                                # dawno po okresie - od razu
+    assert odebrane[-1] == (5.5, {"x": 3.0})
+
+
+def test_okres_z_wlasnym_zegarem():
+    b = _baza()
+    zegar = [0.0]
+    odebrane = []
+    b.subskrybuj(["x"], odebrane.append, okres=10.0, zegar=lambda: zegar[0])
+    _skan(b, 0.0)
+    _skan(b, 100.0, x=1.0)                              # czas bazy nie ma znaczenia
+    assert len(odebrane) == 1
+    zegar[0] = 10.0
+    _skan(b, 100.0)
+    assert odebrane[-1] == {"x": 1.0}
+
+
+def test_martwa_strefa_z_okresem():
+    b = _baza()
+    odebrane = []
+    b.subskrybuj(["x"], odebrane.append, martwa_strefa=0.5, okres=1.0)
+    _skan(b, 0.0)
+    _skan(b, 0.2, x=2.0)                                # poza strefą, czeka na okres
+    _skan(b, 0.4, x=0.1)                                # czekająca zmiana dostaje najnowszą wartość
+    _skan(b, 1.0)
+    assert odebrane == [{"x": 0.0}, {"x": 0.1}]
+
+
+def test_pobierz_i_anuluj():
+    b = _baza()
+    sub = b["x"].subskrybuj(martwa_strefa=0.1)
+    assert sub.oczekuje() and sub.pobierz() == {"x": 0.0}
+    assert sub.pobierz() == {}
+    _skan(b, 1.0, x=0.05)
+    _skan(b, 2.0, x=0.2)
+    _skan(b, 3.0, x=0.25)                               # czekająca zmiana - najnowsza wartość
+    assert sub.pobierz() == {"x": 0.25}
+
+    sub.anuluj()
+    _skan(b, 4.0, x=5.0)
+    assert not sub.oczekuje() and not b._subskrypcje
+
+
+def test_skan_zmiany():
+    b = _baza()
+    b.koniec_skanu()
+    b.teraz = 2.0
+    b.zapisz([b.slot("x"), b.slot("y")], [1.0, 0.0])    # "y" bez zmiany
+    assert b.zmienione_sloty() == [b.slot("x")]
+    assert b["x"].zmieniony and b["x"].czas == 2.0 and not b["y"].zmieniony
+    b.koniec_skanu()
+    assert b.zmienione_sloty() == []
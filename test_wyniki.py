@@ -0,0 +1,161 @@
+"""
+test_wyniki.py
+Baza wyników przeglądów: Zapytanie.wiersze przez indeks i przez przejście
+po kolumnach (ten sam wynik co liczony wprost), grupuj z parametrami NaN
+(scenariusze z migawki) i dopisywanie do istniejącej bazy.
+
+    python -m pytest -q test_wyniki.py
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import przeglad
+import wyniki
+from wyniki import BazaWynikow, ZapisWynikow
+
+N = 400
+WARUNKI = [
+    [("predkosc_pompy", "==", 0.4)],
+    [("predkosc_pompy", ">=", 1.6), ("moc_grzalki", "<", 2.0)],
+    [("T3.HI.pierwszy", "<=", 10.0)],
+    [("T3.HI.pierwszy", "jest", None), ("predkosc_pompy", "!=", 0.4)],
+    [("T3.HI.pierwszy", "brak", None)],
+    [("predkosc_pompy", "brak", None), ("Z4.poziom.max", ">", 0.5)],
+    [("moc_grzalki", ">", 100.0)],
+]
+
+
+def _kolumny(n: int, start: int = 0) -> dict:
+    rng = np.random.default_rng(start)
+    k = {nazwa: np.zeros(n) for nazwa, _ in wyniki.kolumny_bazy()}
+    k["id"] = np.arange(start, start + n)
+    k["predkosc_pompy"] = np.round(rng.integers(1, 11, n) * 0.2, 1)
+    k["predkosc_pompy"][rng.random(n) < 0.1] = np.nan       # z migawki
+    k["moc_grzalki"] = rng.integers(0, 7, n).astype(float)
+    pierwszy = rng.random(n) * 60.0
+    pierwszy[rng.random(n) < 0.5] = np.nan                  # alarm nie wystąpił
+    k["T3.HI.pierwszy"] = pierwszy
+    k["Z4.poziom.max"] = rng.random(n)
+    return k
+
+
+@pytest.fixture
+def baza(tmp_path):
+    z = ZapisWynikow(str(tmp_path))
+    z.dopisz(_kolumny(N))
+    z.zamknij()
+    return BazaWynikow(str(tmp_path))
+
+
+def _wprost(b: BazaWynikow, warunki) -> np.ndarray:
+    maska = np.ones(b.n, dtype=bool)
+    for kolumna, op, x in warunki:
+        maska &= wyniki.OPERATORY[op](np.asarray(b.kolumny[kolumna]), x)
+    return np.flatnonzero(maska)
+
+
+def _zapytanie(b: BazaWynikow, warunki) -> wyniki.Zapytanie:
+    z = b.wszystkie()
+    for w in warunki:
+        z = z.gdzie(*w)
+    return z
+
+
+@pytest.mark.parametrize("prog", [1 << 30, 0], ids=["indeks", "przejscie"])
+@pytest.mark.parametrize("warunki", WARUNKI)
+def test_wiersze_jak_wprost(baza, monkeypatch, warunki, prog):
+    # PROG_INDEKSU 2^30 - indeks dla każdego warunku zakresowego, 0 - nigdy
+    monkeypatch.setattr(wyniki, "PROG_INDEKSU", prog)
+    wiersze = _zapytanie(baza, warunki).wiersze()
+    assert wiersze.tolist() == _wprost(baza, warunki).tolist()
+
+
+def test_wiersze_bez_indeksow(tmp_path):
+    z = ZapisWynikow(str(tmp_path))
+    z.dopisz(_kolumny(N))
+    z.zamknij(indeksuj=False)
+    b = BazaWynikow(str(tmp_path))
+    assert not b.indeksy
+    for warunki in WARUNKI:
+        assert _zapytanie(b, warunki).wiersze().tolist() == _wprost(b, warunki).tolist()
+
+
+def test_indeks_nieaktualny_po_dopisaniu(tmp_path, baza):
+    z = ZapisWynikow(str(tmp_path))
+    assert z.wiersze == N
+    z.dopisz(_kolumny(10, start=N))
+    z.zamknij(indeksuj=False)
+    b = BazaWynikow(str(tmp_path))
+    assert b.n == N + 10 and not b.indeksy
+    assert b.kolumny["id"].tolist() == list(range(N + 10))
+    warunki = [("predkosc_pompy", "==", 0.4)]
+    assert _zapytanie(b, warunki).wiersze().tolist() == _wprost(b, warunki).tolist()
+
+
+def _klucz(wartosci) -> tuple:
+    # NaN != NaN - w kluczach słownika zastąpiony przez -1 (parametry są nieujemne)
+    return tuple(-1.0 if np.isnan(x) else float(x) for x in wartosci)
+
+
+def _grupy_wprost(b: BazaWynikow, po, kolumna, funkcja):
+    wiersze = {}
+    for i, wartosci in enumerate(zip(*(b.kolumny[p] for p in po))):
+        wiersze.setdefault(_klucz(wartosci), []).append(i)
+    wynik = {}
+    for klucz, i in wiersze.items():
+        if funkcja == "liczba":
+            wynik[klucz] = float(len(i))
+        else:
+            k = np.asarray(b.kolumny[kolumna], dtype=np.float64)[i]
+            wynik[klucz] = float(np.nanmean(k)) if np.any(~np.isnan(k)) else np.nan
+    return wynik
+
+
+def _porownaj(grupy, oczekiwane):
+    a = sorted((_klucz(k), v) for k, v in grupy.items())
+    b = sorted(oczekiwane.items())
+    assert [k for k, _ in a] == [k for k, _ in b]
+    assert [v for _, v in a] == pytest.approx([v for _, v in b], nan_ok=True)
+
+
+@pytest.mark.parametrize("indeksy", [True, False])
+def test_grupuj_z_nan(baza, indeksy):
+    if not indeksy:
+        baza.indeksy = {}
+    assert np.isnan(baza.unikalne("predkosc_pompy")).sum() == 1
+    po = ["predkosc_pompy", "moc_grzalki"]
+
+    grupy = baza.wszystkie().grupuj(po)
+    _porownaj(grupy, _grupy_wprost(baza, po, None, "liczba"))
+    assert sum(grupy.values()) == N
+    assert sum(v for k, v in grupy.items() if np.isnan(k[0])) \
+        == np.isnan(baza.kolumny["predkosc_pompy"]).sum()
+
+    # NaN w kolumnie agregowanej pomijane, grupa bez wartości - NaN
+    grupy = baza.wszystkie().grupuj(po, "T3.HI.pierwszy", "srednia")
+    _porownaj(grupy, _grupy_wprost(baza, po, "T3.HI.pierwszy", "srednia"))
+
+    z = baza.gdzie("predkosc_pompy", "brak")
+    assert list(z.grupuj(["moc_grzalki"])) == [(float(m),) for m in np.unique(z.kolumna("moc_grzalki"))]
+    assert baza.gdzie("moc_grzalki", ">", 100.0).grupuj(po) == {}
+    with pytest.raises(ValueError):
+        baza.wszystkie().grupuj(po, "T3.HI.pierwszy", "mediana")
+
+
+def test_przeglad_dopisuje_do_bazy(tmp_path, capsys):
+    katalog = str(tmp_path / "baza")
+    argumenty = ["--czas", "1", "--procesy", "1", "--baza", katalog]
+    assert przeglad.main(argumenty + ["--moc", "0,3"]) == 0
+    assert przeglad.main(argumenty + ["--moc", "1,2,4"]) == 0
+    b = BazaWynikow(katalog)
+    assert b.kolumny["id"].tolist() == [0, 1, 2, 3, 4]          # id bez powtórzeń
+    assert b.kolumny["moc_grzalki"].tolist() == [0.0, 3.0, 1.0, 2.0, 4.0]
+    assert "moc_grzalki" in b.indeksy
+
+    capsys.readouterr()
+    assert przeglad.main(argumenty + ["--moc", "x"]) == 1
+    assert przeglad.main(["--migawka", str(tmp_path / "brak.mig")]) == 1
+    assert capsys.readouterr().err.count("błąd: ") == 2
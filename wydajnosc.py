@@ -0,0 +1,476 @@
+"""
+wydajnosc.py
+Pomiary wydajności gorących ścieżek (bez okna na ekranie: Qt "offscreen").
+
+Mierzone są:
+- import model.py / okno_glowne.py (w świeżym procesie) i budowa ModelInstalacji,
+- start okna: od uruchomienia procesu do pierwszego narysowania synoptyki
+  (jak main.py, bez czekania w dialogu startowym),
+- przepustowość ModelInstalacji.krok [kroków/s],
+- czas ramki EkranInstalacji.paintEvent (pełna z warstwą statyczną, pełna
+  z bufora, tylko zmienione prostokąty, animacja przepływu w RURY_ANIMACJI
+  rurach),
+- EkranTrendy.odswiez przy rosnącej długości historii,
+- EkranAlarmow.odswiez przy rosnącej liczbie alarmów,
+- migawka stanu modelu (zapis do bajtów, odtworzenie, rozmiar) przy rosnącej
+  historii i rozgałęzienie migawki na silnik wsadowy.
+
+Każda wartość to mediana z kilku serii (gc wyłączony w trakcie serii), obok
+zapisywany jest 95. percentyl. Wyniki idą do pliku JSON razem z opisem
+środowiska; --porownaj zestawia je z zapisanym plikiem bazowym i kończy się
+kodem 1, gdy któraś metryka pogorszyła się bardziej niż --prog.
+
+--kod KATALOG mierzy moduły z innego drzewa źródeł (np. wersji bazowej
+wyciągniętej przez git worktree) tym samym skryptem; starsze wersje nie mają
+konfiguracji instalacji ani profilowania startu, więc wtedy mierzone są tylko
+grupy z GRUPY_KODU (budowa modelu i krok).
+
+Przykłady:
+    python wydajnosc.py -o bazowy.json
+    python wydajnosc.py -o teraz.json --porownaj bazowy.json --prog 0.15
+    python wydajnosc.py --wejscie teraz.json --porownaj bazowy.json
+    python wydajnosc.py --tylko krok,alarmy --szybko
+    git worktree add ../bazowy <commit>
+    python wydajnosc.py --kod ../bazowy -o bazowy.json
+    python wydajnosc.py --tylko model,krok --porownaj bazowy.json
+"""
+
+from __future__ import annotations
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+KATALOG = os.path.dirname(os.path.abspath(__file__))
+
+# ten sam scenariusz co domyślne wartości dialogu startowego
+PARAMETRY = dict(
+    z1_proc=80.0, z2_proc=10.0, z3_proc=20.0, z4_proc=10.0,
+    predkosc_pompy=1.0, moc_grzalki=3.0,
+    pompa_on=True, grzalka_on=True,
+    temp_start=20.0,
+)
+
+ROZMIAR_OKNA = (1000, 700)
+DLUGOSCI_HISTORII = (600, 18000, 100000)       # próbek co 0.2 s: 2 min, 1 h, ponad retencję
+LICZBY_ALARMOW = (10, 100, 1000, 5000)
+RURY_ANIMACJI = 300            # dodatkowych rur z przepływem (kreski animowane w każdej ramce)
+
+GRUPY = ("import", "model", "krok", "instalacja", "trendy", "alarmy", "migawka")
+GRUPY_KODU = ("model", "krok")     # grupy mierzalne na dowolnej wersji (--kod)
+
+Wyniki = Dict[str, dict]
+
+# start jak w main.py, dialog startowy od razu zamknięty; wypisuje [s] do synoptyki bez dialogów
+KOD_STARTU = """
+import time; t0 = time.perf_counter()
+from profilowanie import START; START.od(t0)
+from PyQt5.QtWidgets import QApplication, QDialog
+import okno_glowne
+okno_glowne.DialogStartowy.exec_ = lambda self: QDialog.Rejected
+app = QApplication([])
+okno = okno_glowne.OknoGlowne(); okno.show()
+while "synoptyka" not in START.znaczniki: app.processEvents()
+print(START.znaczniki["synoptyka"] - START.czekanie())
+"""
+
+
+# -------------------------
+# Pomiar
+# -------------------------
+
+def _czasy(fn: Callable[[], None], n: int, przygotuj: Optional[Callable[[], None]] = None) -> List[float]:
+    """Czasy n wywołań fn [s]; przygotuj() przed każdym, poza pomiarem."""
+    czasy = []
+    gc_byl = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(n):
+            if przygotuj is not None:
+                przygotuj()
+            t0 = time.perf_counter()
+            fn()
+            czasy.append(time.perf_counter() - t0)
+    finally:
+        if gc_byl:
+            gc.enable()
+    return czasy
+
+
+def _p95(czasy: Sequence[float]) -> float:
+    s = sorted(czasy)
+    return s[min(len(s) - 1, int(math.ceil(0.95 * len(s))) - 1)]
+
+
+def _wynik(wartosc: float, jednostka: str, lepiej: str = "mniej", **dodatkowe) -> dict:
+    return dict(wartosc=wartosc, jednostka=jednostka, lepiej=lepiej, **dodatkowe)
+
+
+def _ms(czasy: Sequence[float], **dodatkowe) -> dict:
+    return _wynik(statistics.median(czasy) * 1e3, "ms", p95=_p95(czasy) * 1e3, n=len(czasy), **dodatkowe)
+
+
+_app = None
+
+
+def _qt():
+    """Jedna QApplication na cały pomiar."""
+    global _app
+    from PyQt5.QtWidgets import QApplication
+    _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def _model(konfiguracja=None):
+    from model import ModelInstalacji
+    # bez argumentu, gdy niepotrzebny - wersje sprzed konfiguracji instalacji go nie znają
+    m = ModelInstalacji() if konfiguracja is None else ModelInstalacji(konfiguracja=konfiguracja)
+    m.ustaw_parametry_startowe(**PARAMETRY)
+    return m
+
+
+def _konfiguracja_rur(n: int) -> dict:
+    """Instalacja domyślna + n rur ze stałym spływem między dwoma ogromnymi zbiornikami
+    (ZA -> ZB, przez cały pomiar płyną), rozsianych po prawej części okna."""
+    import copy
+    from graf import INSTALACJA_DOMYSLNA
+    k = copy.deepcopy(INSTALACJA_DOMYSLNA)
+    w, h = ROZMIAR_OKNA
+    k["zbiorniki"] += [dict(nazwa="ZA", x=w - 50, y=h - 50, w=20, h=20, pojemnosc=1e9),
+                       dict(nazwa="ZB", x=w - 25, y=h - 50, w=20, h=20, pojemnosc=1e9)]
+    for i in range(n):
+        x, y = 620 + (i * 13) % (w - 680), 10 + (i * 7) % (h - 60)
+        k["rury"].append(dict(id=f"r{i}", z="ZA.dol", do="ZB.gora", wydatek=5.0, min=0.0, grubosc=8,
+                              punkty=[(x, y), (x + 40, y), (x + 40, y + 40)]))
+    return k
+
+
+# -------------------------
+# Grupy pomiarów
+# -------------------------
+
+def zmierz_import(szybko: bool) -> Wyniki:
+    """Import w świeżym interpreterze (bez pamięci podręcznej modułów procesu)."""
+    wyniki = {}
+    for modul in ("model", "okno_glowne"):
+        kod = ("import time; t0 = time.perf_counter(); "
+               f"import {modul}; print(time.perf_counter() - t0)")
+        czasy = []
+        for _ in range(3 if szybko else 7):
+            wyjscie = subprocess.run([sys.executable, "-c", kod], cwd=KATALOG, capture_output=True,
+                                     text=True, check=True, env=dict(os.environ))
+            czasy.append(float(wyjscie.stdout.strip().splitlines()[-1]))
+        wyniki[f"import.{modul}_ms"] = _ms(czasy)
+
+    czasy = []
+    with tempfile.TemporaryDirectory() as archiwum:
+        for _ in range(3 if szybko else 7):
+            wyjscie = subprocess.run([sys.executable, "-c", KOD_STARTU], cwd=KATALOG, capture_output=True,
+                                     text=True, check=True, env=dict(os.environ, SCADA_ARCHIWUM=archiwum))
+            czasy.append(float(wyjscie.stdout.strip().splitlines()[-1]))
+    wyniki["start.synoptyka_ms"] = _ms(czasy)
+    return wyniki
+
+
+def zmierz_model(szybko: bool) -> Wyniki:
+    from model import ModelInstalacji
+    _model()
+    czasy = _czasy(lambda: ModelInstalacji().ustaw_parametry_startowe(**PARAMETRY), 20 if szybko else 100)
+    return {"model.budowa_ms": _ms(czasy)}
+
+
+def zmierz_krok(szybko: bool) -> Wyniki:
+    m = _model()
+    for _ in range(500):
+        m.krok(0.02)
+    n = 2000 if szybko else 5000
+
+    def seria():
+        for _ in range(n):
+            m.krok(0.02)
+
+    serie = _czasy(seria, 3 if szybko else 7)
+    na_krok = [s / n for s in serie]
+    return {
+        "krok.kroki_na_s": _wynik(n / statistics.median(serie), "1/s", "wiecej"),
+        "krok.czas_us": _wynik(statistics.median(na_krok) * 1e6, "us", p95=_p95(na_krok) * 1e6),
+    }
+
+
+def zmierz_instalacje(szybko: bool) -> Wyniki:
+    app = _qt()
+    from okno_glowne import EkranInstalacji
+    m = _model()
+    ekran = EkranInstalacji(m)
+    ekran.resize(*ROZMIAR_OKNA)
+    ekran.show()
+    app.processEvents()
+    n = 30 if szybko else 200
+
+    def pelna_od_nowa():
+        ekran.scena.uniewaznij()
+        ekran.repaint()
+
+    def krok_modelu():
+        m.krok(0.02)
+
+    def zmienione():
+        ekran.odswiez()
+        app.processEvents()
+
+    wyniki = {
+        "instalacja.ramka_statyczna_ms": _ms(_czasy(pelna_od_nowa, n)),
+        "instalacja.ramka_pelna_ms": _ms(_czasy(ekran.repaint, n)),
+        "instalacja.ramka_zmiany_ms": _ms(_czasy(zmienione, n, krok_modelu)),
+    }
+    ekran.close()
+
+    # animacja przepływu: wszystkie rury płyną, kreski przesuwają się w każdej ramce
+    m = _model(_konfiguracja_rur(RURY_ANIMACJI))
+    m.ustaw_stan_poczatkowy([80.0, 10.0, 20.0, 10.0, 50.0, 0.0], 1.0, 3.0, True, True, 20.0)
+    ekran = EkranInstalacji(m)
+    ekran.resize(*ROZMIAR_OKNA)
+    ekran.show()
+    for _ in range(5):
+        m.krok(0.02)
+    ekran.odswiez()
+    app.processEvents()
+    wyniki["instalacja.ramka_przeplyw_ms"] = _ms(_czasy(zmienione, n, krok_modelu),
+                                                  rury=len(m.rury))
+    ekran.close()
+    return wyniki
+
+
+def _historia_syntetyczna(m, n: int) -> None:
+    """n próbek co okres historii - przebiegi jak z procesu, bez liczenia fizyki."""
+    okres = m.historia.okres
+    for i in range(n):
+        t = i * okres
+        m.historia.dopisz(t, 0.5 + 0.4 * math.sin(t / 300.0), 0.5 + 0.4 * math.cos(t / 200.0),
+                          0.5 + 0.3 * math.sin(t / 100.0), 0.3, 60.0 + 30.0 * math.sin(t / 500.0))
+
+
+def zmierz_trendy(szybko: bool) -> Wyniki:
+    app = _qt()
+    from okno_glowne import EkranTrendy
+    wyniki = {}
+    n = 30 if szybko else 200
+    for dlugosc in DLUGOSCI_HISTORII[:2] if szybko else DLUGOSCI_HISTORII:
+        m = _model()
+        m.historia.wyczysc()
+        _historia_syntetyczna(m, dlugosc)
+        ekran = EkranTrendy(m)
+        ekran.resize(*ROZMIAR_OKNA)
+        ekran.show()
+        app.processEvents()
+        stan = dict(t=m.historia.najnowszy())
+
+        def nowa_probka():
+            # nowa próbka jak w biegu na żywo; limit częstotliwości odświeżania pominięty
+            stan["t"] += m.historia.okres
+            m.historia.dopisz(stan["t"], 0.5, 0.5, 0.5, 0.3, 60.0)
+            ekran._ostatnio = 0.0
+
+        def pelne():
+            nowa_probka()
+            ekran._granice = None
+
+        wyniki[f"trendy.odswiez_ms[{dlugosc}]"] = _ms(_czasy(ekran.odswiez, n, nowa_probka))
+        wyniki[f"trendy.przerysowanie_ms[{dlugosc}]"] = _ms(_czasy(ekran.odswiez, max(10, n // 4), pelne))
+        ekran.close()
+    return wyniki
+
+
+def zmierz_alarmy(szybko: bool) -> Wyniki:
+    app = _qt()
+    from alarmy import Alarm, SilnikAlarmow
+    from okno_glowne import EkranAlarmow
+    wyniki = {}
+    n = 30 if szybko else 200
+    for liczba in LICZBY_ALARMOW[:3] if szybko else LICZBY_ALARMOW:
+        silnik = SilnikAlarmow([Alarm.prog(f"A{i:05d}", f"Alarm testowy {i}", f"s{i}", 0.5)
+                                for i in range(liczba)])
+        silnik.aktualizuj(0.0, {f"s{i}": 0.0 for i in range(liczba)})
+        ekran = EkranAlarmow(SimpleNamespace(silnik_alarmow=silnik, t=0.0))
+        ekran.resize(*ROZMIAR_OKNA)
+        ekran.show()
+        app.processEvents()
+        stan = dict(t=0.0, i=0)
+        na_skan = max(1, liczba // 20)              # 5% alarmów zmienia stan w każdym skanie
+
+        def skan():
+            stan["t"] += 0.2
+            odczyty = {}
+            for _ in range(na_skan):
+                i = stan["i"] % liczba
+                odczyty[f"s{i}"] = 1.0 - silnik.wartosci[f"s{i}"]
+                stan["i"] += 7
+            silnik.aktualizuj(stan["t"], odczyty)
+
+        def odswiez():
+            ekran.odswiez()
+            app.processEvents()
+
+        wyniki[f"alarmy.odswiez_ms[{liczba}]"] = _ms(_czasy(odswiez, n, skan))
+        ekran.close()
+    return wyniki
+
+
+def zmierz_migawke(szybko: bool) -> Wyniki:
+    from migawka import Migawka
+    from model import ModelInstalacji
+    from silnik_wsadowy import SilnikWsadowy
+    wyniki = {}
+    n = 10 if szybko else 50
+    for dlugosc in DLUGOSCI_HISTORII[:2] if szybko else DLUGOSCI_HISTORII:
+        m = _model()
+        for _ in range(500):
+            m.krok(0.02)
+        m.historia.wyczysc()
+        _historia_syntetyczna(m, dlugosc)
+        dane = m.migawka().do_bajtow()
+        cel = ModelInstalacji()
+        wyniki[f"migawka.zapis_ms[{dlugosc}]"] = _ms(_czasy(lambda: m.migawka().do_bajtow(), n))
+        wyniki[f"migawka.odczyt_ms[{dlugosc}]"] = _ms(_czasy(lambda: cel.przywroc(Migawka.z_bajtow(dane)), n))
+        wyniki[f"migawka.rozmiar_kb[{dlugosc}]"] = _wynik(len(dane) / 1024, "kB")
+    bez_historii = m.migawka(historia=False)
+    wyniki["migawka.rozgalez_ms[10000]"] = _ms(_czasy(lambda: SilnikWsadowy.rozgalez(bez_historii, 10000), n))
+    return wyniki
+
+
+POMIARY = dict(zip(GRUPY, (
+    zmierz_import, zmierz_model, zmierz_krok, zmierz_instalacje, zmierz_trendy, zmierz_alarmy,
+    zmierz_migawke,
+)))
+
+
+def srodowisko() -> dict:
+    import numpy as np
+    opis = dict(
+        data=datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platforma=platform.platform(),
+        procesor=platform.processor() or platform.machine(),
+        rdzenie=os.cpu_count(),
+        qt_platforma=os.environ.get("QT_QPA_PLATFORM", ""),
+        kod=KATALOG,
+    )
+    try:
+        from PyQt5.QtCore import QT_VERSION_STR
+        import matplotlib
+        opis.update(qt=QT_VERSION_STR, matplotlib=matplotlib.__version__)
+    except ImportError:
+        pass
+    return opis
+
+
+def zmierz(grupy: Sequence[str] = GRUPY, szybko: bool = False) -> dict:
+    wyniki: Wyniki = {}
+    for g in grupy:
+        print(f"pomiar: {g}...", file=sys.stderr)
+        wyniki.update(POMIARY[g](szybko))
+    return dict(wersja=1, srodowisko=srodowisko(), szybko=szybko, wyniki=wyniki)
+
+
+# -------------------------
+# Porównanie z bazowym
+# -------------------------
+
+def porownaj(bazowy: dict, teraz: dict, prog: float = 0.15) -> List[dict]:
+    """Wiersze porównania; pogorszenie > 0 niezależnie od tego, czy metryka ma maleć, czy rosnąć."""
+    wiersze = []
+    b, w = bazowy["wyniki"], teraz["wyniki"]
+    for nazwa in (k for k in w if k in b):
+        stara, nowa = b[nazwa]["wartosc"], w[nazwa]["wartosc"]
+        if stara <= 0:
+            continue
+        zmiana = (nowa - stara) / stara
+        pogorszenie = -zmiana if w[nazwa].get("lepiej", "mniej") == "wiecej" else zmiana
+        wiersze.append(dict(nazwa=nazwa, bazowy=stara, teraz=nowa, jednostka=w[nazwa]["jednostka"],
+                            zmiana=zmiana, pogorszenie=pogorszenie, regresja=pogorszenie > prog))
+    return wiersze
+
+
+def _tabela(wyniki: Wyniki) -> str:
+    linie = [f"{'metryka':40s} {'wartość':>12s}  {'p95':>10s}"]
+    for nazwa, w in wyniki.items():
+        p95 = f"{w['p95']:10.3f}" if "p95" in w else " " * 10
+        linie.append(f"{nazwa:40s} {w['wartosc']:12.3f}  {p95} {w['jednostka']}")
+    return "\n".join(linie)
+
+
+def _tabela_porownania(wiersze: Sequence[dict], prog: float) -> str:
+    linie = [f"{'metryka':40s} {'bazowy':>12s} {'teraz':>12s} {'zmiana':>9s}"]
+    for r in wiersze:
+        znak = "  REGRESJA" if r["regresja"] else ("  lepiej" if r["pogorszenie"] < -prog else "")
+        linie.append(f"{r['nazwa']:40s} {r['bazowy']:12.3f} {r['teraz']:12.3f} "
+                     f"{r['zmiana'] * 100 + 0.0:+8.1f}%{znak}")
+    return "\n".join(linie)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Pomiary wydajności symulacji, rysowania i widoków.")
+    ap.add_argument("-o", "--wyjscie", help="plik wynikowy JSON")
+    ap.add_argument("--wejscie", help="nie mierz - weź wyniki z pliku JSON")
+    ap.add_argument("--porownaj", metavar="BAZOWY", help="plik JSON z wynikami bazowymi")
+    ap.add_argument("--prog", type=float, default=0.15, help="dopuszczalne pogorszenie (0.15 = 15%%)")
+    ap.add_argument("--tylko", help=f"grupy pomiarów po przecinku ({', '.join(GRUPY)})")
+    ap.add_argument("--szybko", action="store_true", help="mniej powtórzeń i mniejsze rozmiary (orientacyjnie)")
+    ap.add_argument("--kod", metavar="KATALOG",
+                    help=f"mierz moduły z innego drzewa źródeł (grupy: {', '.join(GRUPY_KODU)})")
+    args = ap.parse_args(argv)
+
+    global KATALOG
+    if args.kod:
+        KATALOG = os.path.abspath(args.kod)
+        if not os.path.isfile(os.path.join(KATALOG, "model.py")):
+            ap.error(f"brak model.py w {KATALOG}")
+        sys.path.insert(0, KATALOG)
+
+    if args.wejscie:
+        with open(args.wejscie, encoding="utf-8") as f:
+            teraz = json.load(f)
+    else:
+        dozwolone = GRUPY_KODU if args.kod else GRUPY
+        grupy = args.tylko.split(",") if args.tylko else dozwolone
+        nieznane = [g for g in grupy if g not in dozwolone]
+        if nieznane:
+            ap.error(f"nieznane grupy: {', '.join(nieznane)}")
+        teraz = zmierz(grupy, args.szybko)
+        print(_tabela(teraz["wyniki"]))
+
+    if args.wyjscie:
+        with open(args.wyjscie, "w", encoding="utf-8") as f:
+            json.dump(teraz, f, indent=2, ensure_ascii=False)
+
+    if not args.porownaj:
+        return 0
+    with open(args.porownaj, encoding="utf-8") as f:
+        bazowy = json.load(f)
+    for klucz in ("python", "platforma", "procesor"):
+        if bazowy["srodowisko"].get(klucz) != teraz["srodowisko"].get(klucz):
+            print(f"uwaga: inne środowisko ({klucz}) niż w pliku bazowym", file=sys.stderr)
+    wiersze = porownaj(bazowy, teraz, args.prog)
+    print(_tabela_porownania(wiersze, args.prog))
+    regresje = [r["nazwa"] for r in wiersze if r["regresja"]]
+    if regresje:
+        print(f"{len(regresje)} regresji powyżej {args.prog:.0%}: {', '.join(regresje)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
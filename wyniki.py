@@ -0,0 +1,400 @@
+"""
+wyniki.py
+Baza wyników przeglądów: wiersz na scenariusz, układ kolumnowy, indeksy i zapytania.
+
+Baza to katalog (jak archiwum historian.py, tylko dopisywanie):
+    meta.json            - nazwy i typy kolumn
+    <kolumna>.<typ>      - wartości kolumny, np. T3.HI.pierwszy.f4
+    <kolumna>.idx        - indeks: (wartość, wiersz) posortowane po wartości
+
+Kolumny:
+    id, czas                         - numer scenariusza w przeglądzie, czas symulacji [s]
+    z1_proc ... temp_start           - parametry ustaw_parametry_startowe (NaN = z migawki)
+    <tag alarmu>.pierwszy            - czas pierwszej aktywacji [s], NaN = nie wystąpił
+    Zk.poziom.min / .max / .koniec   - poziom 0..1
+    Zk.temperatura.min / .max / .koniec
+
+Zapytanie to koniunkcja warunków (kolumna, operator, wartość). Warunek
+zakresowy na kolumnie z indeksem wybiera wiersze wyszukiwaniem binarnym
+(najwęższy z nich), pozostałe warunki są liczone wektorowo tylko na tych
+wierszach; bez pasującego indeksu - jedno przejście po memmap kolumny.
+Agregacje: liczba, min, max, średnia, suma, też w grupach (np. po parametrach).
+
+    python przeglad.py --czas 120 --predkosc 0.2:2.0:0.1 --moc 0:6:0.25 --baza wyniki
+    python wyniki.py wyniki "T3.HI.pierwszy <= 60" --grupuj predkosc_pompy,moc_grzalki
+    python wyniki.py wyniki "Z4.poziom.max > 0.97" --agreguj Z4.poziom.max:max
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from silnik import TAGI_ALARMOW
+from silnik_wsadowy import PARAMETRY_STARTOWE
+
+WERSJA = 1
+ZBIORNIKI = ("Z1", "Z2", "Z3", "Z4")
+TYP_ID = np.dtype("<i8")
+TYP_PARAMETRU = np.dtype("<f8")     # parametry porównywane dokładnie (== 0.4)
+TYP_WYNIKU = np.dtype("<f4")
+# kolumna z indeksem zawęża wiersze, gdy pasuje ich mniej niż 1/PROG_INDEKSU - inaczej przejście po kolumnie
+PROG_INDEKSU = 8
+
+OPERATORY = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal,
+    "jest": lambda k, _: ~np.isnan(k),      # np. alarm wystąpił
+    "brak": lambda k, _: np.isnan(k),
+}
+FUNKCJE = ("liczba", "min", "max", "srednia", "suma")
+
+
+def kolumny_bazy() -> List[Tuple[str, np.dtype]]:
+    k = [("id", TYP_ID), ("czas", TYP_PARAMETRU)]
+    k += [(p, TYP_PARAMETRU) for p in PARAMETRY_STARTOWE]
+    k += [(f"{tag}.pierwszy", TYP_WYNIKU) for tag in TAGI_ALARMOW]
+    for z in ZBIORNIKI:
+        for sygnal in ("poziom", "temperatura"):
+            k += [(f"{z}.{sygnal}.{miara}", TYP_WYNIKU) for miara in ("min", "max", "koniec")]
+    return k
+
+
+def kolumny_przebiegu(ids: Sequence[int], parametry: Sequence[Mapping[str, float]],
+                      silnik, czas: float) -> Dict[str, np.ndarray]:
+    """Wiersze bazy dla scenariuszy policzonych silnikiem wsadowym (statystyki=True)."""
+    n = silnik.n
+    k = {"id": np.asarray(ids, dtype=TYP_ID), "czas": np.full(n, float(czas))}
+    for p in PARAMETRY_STARTOWE:
+        k[p] = np.array([float(sc.get(p, np.nan)) for sc in parametry])
+    for j, tag in enumerate(silnik.tagi_alarmow):
+        k[f"{tag}.pierwszy"] = silnik.pierwszy_alarm[j]
+    poziomy = silnik.poziomy()
+    for j, z in enumerate(ZBIORNIKI):
+        for sygnal, mn, mx, koniec in (("poziom", silnik.min_poziom, silnik.max_poziom, poziomy),
+                                       ("temperatura", silnik.min_temp, silnik.max_temp, silnik.temperatura)):
+            k[f"{z}.{sygnal}.min"] = mn[j]
+            k[f"{z}.{sygnal}.max"] = mx[j]
+            k[f"{z}.{sygnal}.koniec"] = koniec[j]
+    return k
+
+
+def _plik_kolumny(katalog: str, nazwa: str, typ: np.dtype) -> str:
+    return os.path.join(katalog, f"{nazwa}.{typ.str[1:]}")
+
+
+def _plik_indeksu(katalog: str, nazwa: str) -> str:
+    return os.path.join(katalog, f"{nazwa}.idx")
+
+
+def _typ_indeksu(typ: np.dtype) -> np.dtype:
+    return np.dtype([("wartosc", typ), ("wiersz", TYP_ID)])
+
+
+def _wczytaj_meta(katalog: str) -> List[Tuple[str, np.dtype]]:
+    with open(os.path.join(katalog, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return [(nazwa, np.dtype(typ)) for nazwa, typ in meta["kolumny"]]
+
+
+def _liczba_wierszy(katalog: str, kolumny: Sequence[Tuple[str, np.dtype]]) -> int:
+    """Pełne wiersze - po przerwanym zapisie kolumny mogą mieć różne długości."""
+    return min(os.path.getsize(_plik_kolumny(katalog, n, t)) // t.itemsize for n, t in kolumny)
+
+
+# -------------------------
+# Zapis
+# -------------------------
+
+class ZapisWynikow:
+    """Dopisywanie wierszy do bazy (nowej albo istniejącej); indeksy przy zamknij()."""
+
+    def __init__(self, katalog: str):
+        self.katalog = katalog
+        self.kolumny = kolumny_bazy()
+        os.makedirs(katalog, exist_ok=True)
+        sciezka_meta = os.path.join(katalog, "meta.json")
+        if os.path.exists(sciezka_meta):
+            if _wczytaj_meta(katalog) != self.kolumny:
+                raise ValueError(f"baza {katalog} ma inne kolumny")
+        else:
+            with open(sciezka_meta, "w", encoding="utf-8") as f:
+                json.dump(dict(wersja=WERSJA, kolumny=[[n, t.str] for n, t in self.kolumny]), f, indent=2)
+
+        sciezki = [_plik_kolumny(katalog, n, t) for n, t in self.kolumny]
+        for p in sciezki:
+            open(p, "ab").close()
+        # po przerwanym zapisie: obcięcie do pełnych wierszy
+        self.wiersze = _liczba_wierszy(katalog, self.kolumny)
+        for p, (_, t) in zip(sciezki, self.kolumny):
+            os.truncate(p, self.wiersze * t.itemsize)
+        self._pliki = [open(p, "ab") for p in sciezki]
+
+    def dopisz(self, kolumny: Mapping[str, np.ndarray]) -> None:
+        """Paczka wierszy: słownik kolumna -> tablica (jak kolumny_przebiegu())."""
+        dlugosci = {len(kolumny[n]) for n, _ in self.kolumny}
+        if len(dlugosci) != 1:
+            raise ValueError("kolumny paczki mają różne długości")
+        for f, (n, t) in zip(self._pliki, self.kolumny):
+            f.write(np.asarray(kolumny[n]).astype(t).tobytes())
+        self.wiersze += dlugosci.pop()
+
+    def zamknij(self, indeksuj: bool = True) -> None:
+        if not self._pliki:
+            return
+        for f in self._pliki:
+            f.close()
+        self._pliki = []
+        if indeksuj:
+            zbuduj_indeksy(self.katalog)
+
+
+def zbuduj_indeksy(katalog: str) -> None:
+    """Indeks każdej kolumny oprócz id: wartości posortowane (NaN na końcu) z numerami wierszy."""
+    kolumny = _wczytaj_meta(katalog)
+    n = _liczba_wierszy(katalog, kolumny)
+    for nazwa, typ in kolumny:
+        if nazwa == "id":
+            continue
+        wartosci = np.fromfile(_plik_kolumny(katalog, nazwa, typ), dtype=typ, count=n)
+        kolejnosc = np.argsort(wartosci)
+        indeks = np.empty(n, dtype=_typ_indeksu(typ))
+        indeks["wartosc"] = wartosci[kolejnosc]
+        indeks["wiersz"] = kolejnosc
+        tymczasowy = _plik_indeksu(katalog, nazwa) + ".tmp"
+        indeks.tofile(tymczasowy)
+        os.replace(tymczasowy, _plik_indeksu(katalog, nazwa))
+
+
+# -------------------------
+# Odczyt i zapytania
+# -------------------------
+
+class BazaWynikow:
+    """Odczyt bazy przez numpy.memmap; zapytania przez gdzie() / wszystkie()."""
+
+    def __init__(self, katalog: str):
+        self.katalog = katalog
+        self.typy = dict(_wczytaj_meta(katalog))
+        n = self.n = _liczba_wierszy(katalog, list(self.typy.items()))
+        self.kolumny: Dict[str, np.ndarray] = {
+            nazwa: (np.memmap(_plik_kolumny(katalog, nazwa, typ), dtype=typ, mode="r", shape=(n,))
+                    if n else np.zeros(0, dtype=typ))
+            for nazwa, typ in self.typy.items()
+        }
+        # indeks tylko, jeśli obejmuje wszystkie wiersze (po dopisaniu bez zamknij() jest nieaktualny)
+        self.indeksy: Dict[str, np.ndarray] = {}
+        for nazwa, typ in self.typy.items():
+            plik = _plik_indeksu(katalog, nazwa)
+            if n and os.path.exists(plik) and os.path.getsize(plik) == n * _typ_indeksu(typ).itemsize:
+                self.indeksy[nazwa] = np.memmap(plik, dtype=_typ_indeksu(typ), mode="r", shape=(n,))
+        self._unikalne: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __contains__(self, nazwa: str) -> bool:
+        return nazwa in self.kolumny
+
+    def wszystkie(self) -> "Zapytanie":
+        return Zapytanie(self)
+
+    def gdzie(self, kolumna: str, operator: str, wartosc: Optional[float] = None) -> "Zapytanie":
+        return Zapytanie(self).gdzie(kolumna, operator, wartosc)
+
+    def unikalne(self, kolumna: str) -> np.ndarray:
+        """Posortowane różne wartości kolumny (z indeksu bez sortowania; zapamiętywane)."""
+        if kolumna not in self._unikalne:
+            indeks = self.indeksy.get(kolumna)
+            if indeks is None:
+                u = np.unique(self.kolumny[kolumna])
+            else:
+                w = np.asarray(indeks["wartosc"])
+                nowe = w[1:] != w[:-1]
+                if w.dtype.kind == "f":
+                    nowe &= ~(np.isnan(w[1:]) & np.isnan(w[:-1]))     # NaN raz, jak np.unique
+                u = w[np.concatenate(([True], nowe))] if len(w) else w
+            self._unikalne[kolumna] = u
+        return self._unikalne[kolumna]
+
+    def _przedzial(self, kolumna: str, operator: str, wartosc) -> Optional[Tuple[int, int]]:
+        """Zakres pozycji w indeksie kolumny spełniających warunek (None - bez indeksu)."""
+        indeks = self.indeksy.get(kolumna)
+        if indeks is None or operator == "!=":
+            return None
+        w = indeks["wartosc"]
+        szukaj = np.searchsorted
+        liczby = int(szukaj(w, np.nan, "left")) if w.dtype.kind == "f" else self.n   # NaN na końcu
+        if operator in ("jest", "brak"):
+            return (0, liczby) if operator == "jest" else (liczby, self.n)
+        x = np.asarray(wartosc, dtype=w.dtype)
+        return {
+            "<": lambda: (0, int(szukaj(w, x, "left"))),
+            "<=": lambda: (0, int(szukaj(w, x, "right"))),
+            ">": lambda: (int(szukaj(w, x, "right")), liczby),
+            ">=": lambda: (int(szukaj(w, x, "left")), liczby),
+            "==": lambda: (int(szukaj(w, x, "left")), int(szukaj(w, x, "right"))),
+        }[operator]()
+
+
+class Zapytanie:
+    """Koniunkcja warunków; wynik (numery wierszy) liczony raz, przy pierwszym użyciu."""
+
+    def __init__(self, baza: BazaWynikow, warunki: Tuple = ()):
+        self.baza = baza
+        self.warunki = warunki
+        self._wiersze: Optional[np.ndarray] = None
+
+    def gdzie(self, kolumna: str, operator: str, wartosc: Optional[float] = None) -> "Zapytanie":
+        if kolumna not in self.baza:
+            raise KeyError(f"nieznana kolumna {kolumna!r}")
+        if operator not in OPERATORY:
+            raise ValueError(f"nieznany operator {operator!r} (dostępne: {' '.join(OPERATORY)})")
+        if wartosc is None and operator not in ("jest", "brak"):
+            raise ValueError(f"operator {operator!r} wymaga wartości")
+        return Zapytanie(self.baza, self.warunki + ((kolumna, operator, wartosc),))
+
+    def wiersze(self) -> np.ndarray:
+        """Numery wierszy spełniających wszystkie warunki (rosnąco)."""
+        if self._wiersze is not None:
+            return self._wiersze
+        b = self.baza
+        warunki = list(self.warunki)
+
+        # najwęższy przedział z indeksu - jeśli wystarczająco wąski
+        najlepszy = None
+        for j, (kolumna, op, x) in enumerate(warunki):
+            p = b._przedzial(kolumna, op, x)
+            if p is not None and (najlepszy is None or p[1] - p[0] < najlepszy[1][1] - najlepszy[1][0]):
+                najlepszy = (j, p)
+        if najlepszy is not None and (najlepszy[1][1] - najlepszy[1][0]) * PROG_INDEKSU <= b.n:
+            j, (a, z) = najlepszy
+            wiersze = np.sort(b.indeksy[warunki.pop(j)[0]]["wiersz"][a:z])
+        else:
+            wiersze = None
+
+        for kolumna, op, x in warunki:
+            k = b.kolumny[kolumna]
+            if wiersze is None:
+                wiersze = np.flatnonzero(OPERATORY[op](k, x))
+            else:
+                wiersze = wiersze[OPERATORY[op](k[wiersze], x)]
+        if wiersze is None:
+            wiersze = np.arange(b.n)
+        self._wiersze = wiersze
+        return wiersze
+
+    def __len__(self) -> int:
+        return len(self.wiersze())
+
+    def liczba(self) -> int:
+        return len(self)
+
+    def kolumna(self, nazwa: str) -> np.ndarray:
+        if nazwa not in self.baza:
+            raise KeyError(f"nieznana kolumna {nazwa!r}")
+        return np.asarray(self.baza.kolumny[nazwa][self.wiersze()])
+
+    def agreguj(self, kolumna: str, funkcja: str = "srednia") -> float:
+        """liczba / min / max / srednia / suma; NaN (np. alarm nie wystąpił) pomijane."""
+        if funkcja == "liczba":
+            return float(len(self))
+        k = self.kolumna(kolumna).astype(np.float64)
+        if not np.any(~np.isnan(k)):
+            return float("nan")
+        return float(dict(min=np.nanmin, max=np.nanmax, srednia=np.nanmean, suma=np.nansum)[funkcja](k))
+
+    def grupuj(self, po: Sequence[str], kolumna: Optional[str] = None,
+               funkcja: str = "liczba") -> Dict[Tuple[float, ...], float]:
+        """Agregat w grupach wartości kolumn `po` (np. parametrów startowych)."""
+        if funkcja not in FUNKCJE:
+            raise ValueError(f"nieznana funkcja {funkcja!r} (dostępne: {', '.join(FUNKCJE)})")
+        if not len(self):
+            return {}
+        # kody wartości każdej kolumny (słownik wartości z indeksu) -> jeden kod grupy
+        wartosci = [self.baza.unikalne(p) for p in po]
+        rozmiary = [len(w) for w in wartosci]
+        kod = np.ravel_multi_index([np.searchsorted(w, self.kolumna(p)) for w, p in zip(wartosci, po)],
+                                   rozmiary)
+        if np.prod(rozmiary, dtype=np.float64) <= 4 * len(kod) + (1 << 16):
+            # mało kombinacji: obecne kody przez bincount, bez sortowania
+            grupy = np.flatnonzero(np.bincount(kod))
+            mapa = np.zeros(grupy[-1] + 1, dtype=np.intp)
+            mapa[grupy] = np.arange(len(grupy))
+            grupa = mapa[kod]
+        else:
+            grupy, grupa = np.unique(kod, return_inverse=True)
+            grupa = grupa.ravel()
+        m = len(grupy)
+        if funkcja == "liczba":
+            wyniki = np.bincount(grupa, minlength=m).astype(np.float64)
+        else:
+            k = self.kolumna(kolumna).astype(np.float64)
+            jest = ~np.isnan(k)
+            if funkcja in ("srednia", "suma"):
+                suma = np.bincount(grupa, weights=np.where(jest, k, 0.0), minlength=m)
+                ile = np.bincount(grupa, weights=jest, minlength=m)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    wyniki = suma if funkcja == "suma" else suma / ile
+            else:
+                wyniki = np.full(m, np.nan)
+                (np.fmin if funkcja == "min" else np.fmax).at(wyniki, grupa, k)
+        klucze = np.unravel_index(grupy, rozmiary)
+        return {tuple(float(w[j]) for w, j in zip(wartosci, kl)): float(v)
+                for kl, v in zip(zip(*klucze), wyniki)}
+
+
+# -------------------------
+# Linia poleceń
+# -------------------------
+
+def parsuj_warunek(tekst: str) -> Tuple[str, str, Optional[float]]:
+    """'kolumna op wartość' albo 'kolumna jest' / 'kolumna brak'."""
+    czesci = tekst.split()
+    if len(czesci) == 2 and czesci[1] in ("jest", "brak"):
+        return czesci[0], czesci[1], None
+    if len(czesci) != 3:
+        raise ValueError(f"warunek {tekst!r}: oczekiwano 'kolumna operator wartość'")
+    return czesci[0], czesci[1], float(czesci[2])
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Zapytania do bazy wyników przeglądów.")
+    ap.add_argument("katalog", help="katalog bazy (przeglad.py --baza)")
+    ap.add_argument("warunki", nargs="*", help="np. 'T3.HI.pierwszy <= 60', 'Z4.HH.pierwszy jest'")
+    ap.add_argument("--grupuj", help="kolumny grup, po przecinku (np. predkosc_pompy,moc_grzalki)")
+    ap.add_argument("--agreguj", default="liczba",
+                    help=f"'kolumna:funkcja' albo 'liczba' (funkcje: {', '.join(FUNKCJE)})")
+    ap.add_argument("--kolumny", action="store_true", help="wypisz nazwy kolumn")
+    args = ap.parse_args(argv)
+
+    try:
+        baza = BazaWynikow(args.katalog)
+        if args.kolumny:
+            print("\n".join(baza.typy))
+            return 0
+        z = baza.wszystkie()
+        for w in args.warunki:
+            z = z.gdzie(*parsuj_warunek(w))
+        kolumna, _, funkcja = args.agreguj.rpartition(":") if ":" in args.agreguj else (None, "", "liczba")
+        if args.grupuj:
+            po = args.grupuj.split(",")
+            grupy = z.grupuj(po, kolumna or None, funkcja)
+            print(",".join(po + [args.agreguj]))
+            for klucz, wartosc in grupy.items():
+                print(",".join(f"{v:g}" for v in klucz) + f",{wartosc:g}")
+        else:
+            print(f"{len(z)} / {len(baza)} scenariuszy" +
+                  (f", {funkcja}({kolumna}) = {z.agreguj(kolumna, funkcja):g}" if kolumna else ""))
+    except (OSError, ValueError, KeyError) as blad:
+        print(f"błąd: {blad}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+zegar.py
+Zegar symulacji: stały krok fizyki niezależny od timera GUI.
+
+Czas ścienny mnożony przez tempo (x1, x10, x100...) trafia do akumulatora,
+z którego w każdej ramce wykonuje się tyle kroków model.krok(dt), ile się
+uzbierało. Po zacięciu pętli zdarzeń zaległość jest nadrabiana w kolejnych
+ramkach (z limitem czasu na ramkę i limitem samej zaległości). Tempo "max"
+liczy kroki przez cały dostępny czas ramki.
+
+Harmonogram to stały takt dla pętli poza GUI (symulacja w tle): terminy
+liczone od startu (bez dryfu), uśpienie do chwili tuż przed terminem
+i dokładne dobicie w pętli (sleep(0) - bez trzymania GIL).
+"""
+
+from __future__ import annotations
+import time
+from typing import Callable, Optional
+
+
+class ZegarSymulacji:
+    def __init__(self, dt: float, tempo: Optional[float] = 1.0,
+                 budzet_ramki: float = 0.012, maks_zaleglosc: float = 2.0):
+        self.dt = dt
+        self.tempo = tempo                    # None = najszybciej jak się da
+        self.budzet_ramki = budzet_ramki      # [s] czasu ściennego na kroki w jednej ramce
+        self.maks_zaleglosc = maks_zaleglosc  # [s] czasu ściennego, który wolno nadrobić
+
+        self.akum = 0.0                       # [s] czasu symulacji do wykonania
+        self.kroki_razem = 0
+        self.tempo_rzeczywiste = 0.0          # zmierzone: s symulacji / s ścienną
+        self._ostatni = time.perf_counter()
+
+    def ustaw_tempo(self, tempo: Optional[float]) -> None:
+        self.tempo = tempo
+        self.akum = 0.0
+
+    def start(self) -> None:
+        """Wywołać przy (ponownym) starcie - przerwa nie jest zaległością."""
+        self._ostatni = time.perf_counter()
+        self.akum = 0.0
+
+    def tik(self, krok: Callable[[float], None]) -> int:
+        """Wykonuje zaległe kroki krok(dt); zwraca ich liczbę."""
+        teraz = time.perf_counter()
+        uplynelo = teraz - self._ostatni
+        self._ostatni = teraz
+        koniec = teraz + self.budzet_ramki
+        dt = self.dt
+        zegar = time.perf_counter
+
+        n = 0
+        if self.tempo is None:
+            # max: paczki kroków aż do końca budżetu ramki
+            while zegar() < koniec:
+                for _ in range(16):
+                    krok(dt)
+                n += 16
+        else:
+            limit = self.maks_zaleglosc * self.tempo
+            self.akum = min(self.akum + uplynelo * self.tempo, limit)
+            do_wykonania = int(self.akum / dt)
+            while n < do_wykonania:
+                krok(dt)
+                n += 1
+                if (n & 15) == 0 and zegar() >= koniec:
+                    break
+            self.akum -= n * dt
+
+        self.kroki_razem += n
+        if uplynelo > 0:
+            # wygładzone tempo do wyświetlenia
+            chwilowe = n * dt / uplynelo
+            self.tempo_rzeczywiste += 0.1 * (chwilowe - self.tempo_rzeczywiste)
+        return n
+
+    def zaleglosc(self) -> float:
+        """[s] czasu symulacji, który czeka na wykonanie."""
+        return self.akum
+
+
+class Harmonogram:
+    """Stały takt: czekaj() wraca w kolejnych terminach start + k * okres."""
+
+    def __init__(self, okres: float, dobijanie: float = 0.0015, maks_spoznienie: float = 0.25):
+        self.okres = okres
+        self.dobijanie = dobijanie            # [s] końcówka czekania w pętli zamiast sleep
+        self.maks_spoznienie = maks_spoznienie
+        self.spoznienia = 0                   # terminy opuszczone po zacięciu
+        self.start()
+
+    def start(self) -> None:
+        self._termin = time.perf_counter() + self.okres
+
+    def czekaj(self) -> float:
+        """Czeka do następnego terminu; zwraca spóźnienie [s] (0 gdy na czas)."""
+        termin = self._termin
+        zegar = time.perf_counter
+        teraz = zegar()
+        if termin - teraz > self.dobijanie:
+            time.sleep(termin - teraz - self.dobijanie)
+        while zegar() < termin:
+            time.sleep(0)             # oddaje GIL (tryb wątku: GUI nie czeka)
+        teraz = zegar()
+        spoznienie = teraz - termin
+        if spoznienie > self.maks_spoznienie:
+            # po dłuższym zacięciu nowy początek zamiast serii terminów naraz
+            self.spoznienia += 1
+            self._termin = teraz + self.okres
+        else:
+            self._termin = termin + self.okres
+        return spoznienie